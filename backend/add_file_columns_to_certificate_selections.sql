@@ -0,0 +1,22 @@
+-- Add typed file references for verification and certificate artifacts to certificate_selections
+-- The files themselves live in CERTIFICATE_STORAGE_PATH (or uploads/certificates for generated PDFs);
+-- migrate_certificate_images_to_files.py moves existing verification_image/certificate_image values over
+ALTER TABLE certificate_selections
+ADD COLUMN IF NOT EXISTS verification_file_path VARCHAR(500),
+ADD COLUMN IF NOT EXISTS verification_mime_type VARCHAR(100),
+ADD COLUMN IF NOT EXISTS certificate_file_path VARCHAR(500),
+ADD COLUMN IF NOT EXISTS certificate_mime_type VARCHAR(100);
+
+-- Add comments for documentation
+COMMENT ON COLUMN certificate_selections.verification_file_path IS 'Stored path of the verification image or PDF';
+COMMENT ON COLUMN certificate_selections.verification_mime_type IS 'MIME type of the verification file';
+COMMENT ON COLUMN certificate_selections.certificate_file_path IS 'Stored path of the certificate image or PDF';
+COMMENT ON COLUMN certificate_selections.certificate_mime_type IS 'MIME type of the certificate file';
+COMMENT ON COLUMN certificate_selections.verification_image IS 'Deprecated: legacy image data or path, moved to verification_file_path';
+COMMENT ON COLUMN certificate_selections.certificate_image IS 'Deprecated: legacy image data or path, moved to certificate_file_path';
+
+-- Display success message
+DO $$
+BEGIN
+    RAISE NOTICE '✅ Added file reference columns to certificate_selections table';
+END $$;
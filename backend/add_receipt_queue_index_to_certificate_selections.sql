@@ -0,0 +1,13 @@
+-- Partial index for the receipt work queue (database/receipt_queue.py)
+-- Holds only certificate selections that have not been invoiced yet, in the
+-- order the queue groups and pages them, so invoiced history is never read.
+-- The WHERE clause must stay identical to receipt_queue.PENDING.
+CREATE INDEX IF NOT EXISTS idx_certificate_selections_receipt_queue
+ON certificate_selections (client_name, candidate_id, creation_date DESC)
+WHERE (status IS NULL OR status <> 'done');
+
+-- Display success message
+DO $$
+BEGIN
+    RAISE NOTICE '✅ Created receipt queue index on certificate_selections';
+END $$;
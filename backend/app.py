@@ -1,42 +1,85 @@
 from flask import Flask
 from flask_cors import CORS
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
-from datetime import datetime
 from config import Config
-from routes import register_blueprints
-from database import init_db  # Neon PostgreSQL database
 import os
 import sys
 import subprocess
 
-# Initialize Flask app
-app = Flask(__name__)
-
-# Initialize Neon PostgreSQL database
-try:
-    init_db(app)
-    print("✅ [DATABASE] Neon PostgreSQL initialized successfully")
-except Exception as e:
-    print(f"❌ [DATABASE] Failed to initialize Neon PostgreSQL: {e}")
-    sys.exit(1)
-
-# Initialize rate limiter
-limiter = Limiter(
-    app=app,
-    key_func=get_remote_address,
-    default_limits=["200 per day", "200 per hour"],  # Global limits - increased for development
-    storage_uri="memory://",  # In-memory storage (use Redis for production)
-)
-print("✅ [RATE LIMITER] Flask-Limiter initialized successfully")
-
-# Configure CORS
-CORS(app, origins=["http://localhost:3000", "http://127.0.0.1:3000", "http://localhost:3001", "http://127.0.0.1:3001"],
-      methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-      allow_headers=["Content-Type", "Authorization", "Accept", "X-Requested-With"])
-
-# Register all blueprints
-register_blueprints(app)
+# Heavy modules (OCR, PDF, Google Drive) are imported by the routes on first
+# use. The module-level `app` is built on first access so that importing
+# create_app (wsgi.py) does not build a second application.
+
+
+def create_app(check_database=True, start_background=True, report=None):
+    """
+    Build the Flask application.
+
+    Args:
+        check_database (bool): Run init_db's connection test
+            (wsgi.py checks the pool once before forking instead)
+        start_background (bool): Start the temp session janitor in this process
+            (under gunicorn it is started per worker after fork)
+        report (StartupReport): Optional per-phase startup timing
+
+    Returns:
+        Flask: Configured application
+    """
+    if report is None:
+        from utils.startup import StartupReport
+        report = StartupReport()
+
+    # Initialize Flask app
+    app = Flask(__name__)
+
+    # Initialize Neon PostgreSQL database
+    with report.phase('database'):
+        from database import init_db
+        try:
+            init_db(app, check_connection=check_database)
+            print("✅ [DATABASE] Neon PostgreSQL initialized successfully")
+        except Exception as e:
+            print(f"❌ [DATABASE] Failed to initialize Neon PostgreSQL: {e}")
+            sys.exit(1)
+
+    # Initialize rate limiter (counters shared across workers, see utils/rate_limit.py)
+    from utils.rate_limit import limiter
+    limiter.init_app(app)
+    print("✅ [RATE LIMITER] Flask-Limiter initialized successfully")
+
+    # Request metrics and Prometheus /metrics endpoint
+    with report.phase('metrics'):
+        from utils.metrics import init_metrics
+        init_metrics(app)
+        limiter.exempt(app.view_functions['metrics'])
+    print("✅ [METRICS] Request instrumentation enabled at /metrics")
+
+    # Configure CORS
+    CORS(app, origins=["http://localhost:3000", "http://127.0.0.1:3000", "http://localhost:3001", "http://127.0.0.1:3001"],
+          methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+          allow_headers=["Content-Type", "Authorization", "Accept", "X-Requested-With", "Idempotency-Key", "X-Consistency"])
+
+    # Register all blueprints
+    with report.phase('routes'):
+        from routes import register_blueprints
+        register_blueprints(app)
+
+    # Start the temp upload session janitor
+    if start_background and Config.ENABLE_TEMP_JANITOR:
+        from utils.temp_sessions import get_session_manager
+        get_session_manager().start_janitor(Config.TEMP_JANITOR_INTERVAL_SECONDS)
+        print("✅ [TEMP SESSIONS] Janitor thread started")
+
+    app.extensions['startup_report'] = report
+    return app
+
+
+def __getattr__(name):
+    """Build the module-level `app` (used by start_server.py and app.run) on first access"""
+    if name == 'app':
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def check_dependencies():
     """Check if critical dependencies are available"""
@@ -132,6 +175,7 @@ if __name__ == '__main__':
   print("=" * 60)
   print("[API] Available endpoints:")
   print("   GET  /                     - Health check")
+  print("   GET  /metrics              - Prometheus metrics (localhost only)")
   print("   POST /upload-images        - Upload multiple images to temp session")
   print("   POST /upload-payment-screenshot - Upload payment screenshot to session")
   print("   POST /candidate/save-candidate-data  - Save candidate data & organize files")
@@ -158,6 +202,7 @@ if __name__ == '__main__':
 
   # Start the Flask application
   try:
+      app = create_app()
       app.run(host='0.0.0.0', port=5000, debug=True)
   except KeyboardInterrupt:
       print("\n\n👋 Server stopped by user")
@@ -20,20 +20,41 @@ import logging
 import time
 import argparse
 from datetime import datetime, timedelta
+from database.counters import count, inserted
 from database.db_connection import execute_query
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Source tables whose new rows trigger an update
+SOURCE_TABLES = ('certificate_selections', 'receiptinvoicedata', 'candidates')
+
 class MasterTableUpdater:
     def __init__(self):
         self.last_update_check = datetime.now()
         self.update_interval = 60  # Check every 60 seconds by default
+        # Insert counters seen at the last check (None until read)
+        self.last_inserted = inserted(SOURCE_TABLES)
 
     def check_for_new_data(self):
         """Check if there's new data in source tables since last update."""
         try:
+            # Maintained insert counters: three key lookups instead of three scans
+            current = inserted(SOURCE_TABLES)
+            if current is not None and self.last_inserted is not None:
+                new_counts = {table: current[table] - self.last_inserted.get(table, 0) for table in SOURCE_TABLES}
+                self.last_inserted = current
+                total_new = sum(new_counts.values())
+                if total_new > 0:
+                    logger.info(f"📊 Found {total_new} new records: {new_counts['certificate_selections']} cert selections, "
+                                f"{new_counts['receiptinvoicedata']} receipts, {new_counts['candidates']} candidates")
+                    return True
+                logger.debug("✅ No new data found")
+                return False
+            self.last_inserted = current
+
+            # Counters unavailable: fall back to scanning by timestamp
             # Check certificate_selections for new records
             cs_query = """
                 SELECT COUNT(*) as new_count
@@ -133,12 +154,9 @@ class MasterTableUpdater:
             # Execute with the last update check timestamp
             execute_query(populate_query, (self.last_update_check,), fetch=False)
 
-            # Get updated count
-            count_query = "SELECT COUNT(*) as count FROM Master_Database_Table_A;"
-            result = execute_query(count_query)
-            if result:
-                count = result[0]['count']
-                logger.info(f"✅ Master_Database_Table_A updated successfully. Total records: {count}")
+            # Get updated count (an estimate is fine for the log line)
+            total = count('master_database_table_a', exact=False)
+            logger.info(f"✅ Master_Database_Table_A updated successfully. Total records: {total}")
 
             self.last_update_check = datetime.now()
             return True
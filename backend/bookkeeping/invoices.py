@@ -0,0 +1,795 @@
+"""
+Server-side rendering of tax invoices, payment receipts and adjustment notes
+
+Documents are rendered with reportlab from database rows, so the browser no
+longer has to draw them and POST them back as base64. Company, customer and
+vendor details come from ReferenceData, an in-process snapshot of the small
+reference tables refreshed on a TTL. Fonts and paragraph styles are built
+once per process.
+
+Tax invoices use the GST layout of the frontend preview: CGST + SGST when
+the customer is in the company's state, IGST otherwise (state codes are
+taken from the GSTIN when not stored).
+
+Month-end runs render every document of a period in a process pool and
+stream the PDFs as a zip without holding the archive in memory.
+
+Usage:
+    from bookkeeping.invoices import get_reference_data, render_document, render_period_zip
+
+    pdf_bytes = render_document('sales', invoice_row, company, customer)
+    for chunk in render_period_zip(date(2025, 4, 1), date(2025, 4, 30)):
+        ...
+"""
+
+import functools
+import logging
+import os
+import re
+import threading
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from decimal import Decimal
+from io import BytesIO
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_KINDS = ('sales', 'receipt', 'client_adjustment', 'vendor_adjustment')
+
+# Used when neither the company GSTIN nor company_details gives a state code
+DEFAULT_STATE_CODE = '27'
+
+# TrueType fonts with the rupee sign; the first one found is used
+FONT_CANDIDATES = (
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    '/usr/share/fonts/dejavu/DejaVuSans.ttf',
+    '/Library/Fonts/Arial Unicode.ttf',
+    'C:\\Windows\\Fonts\\arial.ttf',
+)
+
+
+# ---------------------------------------------------------------------------
+# Amounts and GST
+# ---------------------------------------------------------------------------
+
+_ONES = ['', 'One', 'Two', 'Three', 'Four', 'Five', 'Six', 'Seven', 'Eight', 'Nine']
+_TEENS = ['Ten', 'Eleven', 'Twelve', 'Thirteen', 'Fourteen', 'Fifteen', 'Sixteen',
+          'Seventeen', 'Eighteen', 'Nineteen']
+_TENS = ['', '', 'Twenty', 'Thirty', 'Forty', 'Fifty', 'Sixty', 'Seventy', 'Eighty', 'Ninety']
+
+
+def _below_thousand(n):
+    words = []
+    if n >= 100:
+        words += [_ONES[n // 100], 'Hundred']
+        n %= 100
+    if n >= 20:
+        words.append(_TENS[n // 10])
+        n %= 10
+    elif n >= 10:
+        words.append(_TEENS[n - 10])
+        n = 0
+    if n:
+        words.append(_ONES[n])
+    return ' '.join(words)
+
+
+def _indian_words(n):
+    if n == 0:
+        return 'Zero'
+    parts = []
+    for divisor, label in ((10000000, 'Crore'), (100000, 'Lakh'), (1000, 'Thousand')):
+        if n >= divisor:
+            # Crores can exceed 999 (e.g. 1500 Crore)
+            count = n // divisor
+            parts.append(f"{_indian_words(count) if count >= 1000 else _below_thousand(count)} {label}")
+            n %= divisor
+    if n:
+        parts.append(_below_thousand(n))
+    return ' '.join(parts)
+
+
+def amount_in_words(amount):
+    """'INR One Lakh Twenty Three Thousand and Fifty Paise Only' (Indian numbering)"""
+    amount = Decimal(str(amount or 0)).quantize(Decimal('0.01'))
+    rupees = int(abs(amount))
+    paise = int((abs(amount) - rupees) * 100)
+    words = 'INR ' + _indian_words(rupees)
+    if paise:
+        words += ' and ' + _indian_words(paise) + ' Paise'
+    return words + ' Only'
+
+
+def state_code(gst_number=None, stored=None):
+    """Two-digit GST state code from the stored value or the GSTIN prefix"""
+    if stored and str(stored).strip():
+        return str(stored).strip().zfill(2)
+    match = re.match(r'\s*(\d{2})', gst_number or '')
+    return match.group(1) if match else None
+
+
+def gst_lines(taxable, tax, company_state, customer_state):
+    """
+    Split the tax of an invoice into its GST lines.
+
+    Args:
+        taxable (Decimal): Amount before tax
+        tax (Decimal): Total GST charged
+        company_state (str): Supplier state code
+        customer_state (str): Place of supply (None is treated as intra-state)
+
+    Returns:
+        list: (label, amount) tuples - CGST and SGST halves within a state,
+        a single IGST line across states, nothing when no tax is charged
+    """
+    taxable = Decimal(str(taxable or 0))
+    tax = Decimal(str(tax or 0))
+    if tax <= 0:
+        return []
+    rate = (tax * 100 / taxable).quantize(Decimal('0.01')).normalize() if taxable else Decimal('0')
+
+    if customer_state and company_state and customer_state != company_state:
+        return [(f"IGST {rate:f}%", tax)]
+
+    half_rate = (rate / 2).normalize()
+    cgst = (tax / 2).quantize(Decimal('0.01'))
+    return [(f"CGST {half_rate:f}%", cgst), (f"SGST {half_rate:f}%", tax - cgst)]
+
+
+def format_money(amount, symbol='₹'):
+    return f"{symbol}{Decimal(str(amount or 0)):,.2f}"
+
+
+def safe_filename(value):
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', str(value)).strip('_') or 'document'
+
+
+def document_filename(kind, document):
+    """Archive path of one rendered document"""
+    if kind == 'sales':
+        return f"invoices/{safe_filename(document['invoice_no'])}.pdf"
+    if kind == 'receipt':
+        return f"receipts/RCPT-{document['receipt_amount_id']}.pdf"
+    return f"adjustments/{kind.split('_')[0]}-ADJ-{document['id']}.pdf"
+
+
+# ---------------------------------------------------------------------------
+# Reference data
+# ---------------------------------------------------------------------------
+
+class ReferenceData:
+    """
+    In-process snapshot of company_details, b2bcustomersdetails and vendors.
+
+    The tables are small and change rarely, so they are read in three
+    queries and kept for ttl_seconds; invalidate() forces a reload.
+
+    Args:
+        ttl_seconds (int): Snapshot lifetime
+        query (callable): execute_query-compatible function (for tests)
+    """
+
+    def __init__(self, ttl_seconds=300, query=None):
+        self.ttl_seconds = ttl_seconds
+        self._query = query
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self._companies = []
+        self._customers = []
+        self._vendors = []
+
+    def _execute(self, sql):
+        if self._query is None:
+            from database.db_connection import execute_query
+            self._query = execute_query
+        return [dict(row) for row in self._query(sql) or []]
+
+    def _ensure_loaded(self):
+        with self._lock:
+            if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl_seconds:
+                return
+            self._companies = self._execute("""
+                SELECT id, company_name, company_address, company_gst_number, bank_name,
+                       account_number, branch, ifsc_code, swift_code
+                FROM company_details ORDER BY id
+            """)
+            self._customers = self._execute("""
+                SELECT id, company_name, gst_number, address, city, state, state_code, pincode
+                FROM b2bcustomersdetails ORDER BY id
+            """)
+            self._vendors = self._execute("""
+                SELECT id, vendor_name, gst_number, vendor_address, state_code
+                FROM vendors ORDER BY id
+            """)
+            self._loaded_at = time.monotonic()
+            logger.info(f"[INVOICE_PDF] Loaded reference data: {len(self._companies)} companies, "
+                        f"{len(self._customers)} customers, {len(self._vendors)} vendors")
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    @staticmethod
+    def _find(rows, key, value):
+        if value in (None, ''):
+            return None
+        if isinstance(value, str):
+            value = value.strip().lower()
+            return next((row for row in rows if str(row.get(key) or '').strip().lower() == value), None)
+        return next((row for row in rows if row.get(key) == value), None)
+
+    def company(self, company_id=None, name=None, account_number=None):
+        self._ensure_loaded()
+        return (self._find(self._companies, 'account_number', account_number)
+                or self._find(self._companies, 'id', company_id)
+                or self._find(self._companies, 'company_name', name))
+
+    def customer(self, customer_id=None, name=None):
+        self._ensure_loaded()
+        return self._find(self._customers, 'id', customer_id) or self._find(self._customers, 'company_name', name)
+
+    def vendor(self, vendor_id):
+        self._ensure_loaded()
+        vendor = self._find(self._vendors, 'id', vendor_id)
+        if vendor is None:
+            return None
+        # Same shape as a customer so the party block renders either
+        return {'id': vendor['id'], 'company_name': vendor['vendor_name'], 'gst_number': vendor['gst_number'],
+                'address': vendor['vendor_address'], 'state_code': vendor['state_code']}
+
+    def parties_for(self, kind, document):
+        """(company, party) for a document row"""
+        if kind == 'sales':
+            return (self.company(account_number=document.get('company_account_number'),
+                                 name=document.get('company_name')),
+                    self.customer(name=document.get('party_name') or document.get('customer_name')))
+        if kind == 'receipt':
+            return (self.company(account_number=document.get('account_no'), name=document.get('company_name')),
+                    self.customer(name=document.get('customer_name')))
+        if kind == 'client_adjustment':
+            return self.company(company_id=document.get('company_id')), self.customer(document.get('customer_id'))
+        return self.company(company_id=document.get('company_id')), self.vendor(document.get('vendor_id'))
+
+
+_reference_data = None
+_reference_lock = threading.Lock()
+
+
+def get_reference_data():
+    """Process-wide ReferenceData singleton"""
+    global _reference_data
+    if _reference_data is None:
+        with _reference_lock:
+            if _reference_data is None:
+                from config import Config
+                _reference_data = ReferenceData(Config.REFERENCE_CACHE_TTL_SECONDS)
+    return _reference_data
+
+
+# ---------------------------------------------------------------------------
+# Fonts and styles (once per process)
+# ---------------------------------------------------------------------------
+
+@functools.lru_cache(maxsize=None)
+def register_fonts():
+    """
+    Register a Unicode TrueType font if one is available.
+
+    Returns:
+        tuple: (regular font, bold font, currency symbol) - Helvetica and
+        'Rs.' when no font with the rupee sign is installed
+    """
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from config import Config
+
+    configured = Config.INVOICE_FONT_PATH
+    for path in ((configured,) if configured else ()) + FONT_CANDIDATES:
+        if not os.path.exists(path):
+            continue
+        try:
+            pdfmetrics.registerFont(TTFont('InvoiceSans', path))
+            bold_path = path.replace('DejaVuSans.ttf', 'DejaVuSans-Bold.ttf')
+            if bold_path != path and os.path.exists(bold_path):
+                pdfmetrics.registerFont(TTFont('InvoiceSans-Bold', bold_path))
+                bold = 'InvoiceSans-Bold'
+            else:
+                bold = 'InvoiceSans'
+            pdfmetrics.registerFontFamily('InvoiceSans', normal='InvoiceSans', bold=bold,
+                                          italic='InvoiceSans', boldItalic=bold)
+            logger.info(f"[INVOICE_PDF] Using font {path}")
+            return 'InvoiceSans', bold, '₹'
+        except Exception as e:
+            logger.warning(f"[INVOICE_PDF] Could not register font {path}: {e}")
+    return 'Helvetica', 'Helvetica-Bold', 'Rs. '
+
+
+@functools.lru_cache(maxsize=None)
+def _styles():
+    from reportlab.lib.styles import ParagraphStyle
+
+    regular, bold, _ = register_fonts()
+    return {
+        'title': ParagraphStyle('InvoiceTitle', fontName=bold, fontSize=18, leading=22, alignment=1, spaceAfter=10),
+        'letterhead': ParagraphStyle('Letterhead', fontName=bold, fontSize=14, leading=17),
+        'heading': ParagraphStyle('InvoiceHeading', fontName=bold, fontSize=9, leading=12, spaceBefore=4),
+        'normal': ParagraphStyle('InvoiceNormal', fontName=regular, fontSize=9, leading=11),
+        'small': ParagraphStyle('InvoiceSmall', fontName=regular, fontSize=8, leading=10),
+    }
+
+
+def _escape(value):
+    return (str(value if value is not None else '')
+            .replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;'))
+
+
+def _lines(text):
+    return [line.strip() for line in str(text or '').splitlines() if line.strip()]
+
+
+# ---------------------------------------------------------------------------
+# Layout blocks
+# ---------------------------------------------------------------------------
+
+def _letterhead(company, fallback_name):
+    from reportlab.platypus import Paragraph
+
+    styles = _styles()
+    company = company or {}
+    block = [Paragraph(_escape(company.get('company_name') or fallback_name or ''), styles['letterhead'])]
+    block += [Paragraph(_escape(line), styles['normal']) for line in _lines(company.get('company_address'))]
+    if company.get('company_gst_number'):
+        block.append(Paragraph(f"<b>GSTIN/UIN:</b> {_escape(company['company_gst_number'])}", styles['normal']))
+    code = state_code(company.get('company_gst_number')) or DEFAULT_STATE_CODE
+    block.append(Paragraph(f"<b>State Code:</b> {code}", styles['normal']))
+    return block
+
+
+def _party_block(title, party, fallback_name):
+    from reportlab.platypus import Paragraph
+
+    styles = _styles()
+    party = party or {}
+    block = [Paragraph(title, styles['heading']),
+             Paragraph(f"<b>{_escape(party.get('company_name') or fallback_name or '')}</b>", styles['normal'])]
+    block += [Paragraph(_escape(line), styles['normal']) for line in _lines(party.get('address'))]
+    if party.get('gst_number'):
+        block.append(Paragraph(f"<b>GSTIN/UIN:</b> {_escape(party['gst_number'])}", styles['normal']))
+    code = state_code(party.get('gst_number'), party.get('state_code'))
+    if code:
+        block.append(Paragraph(f"<b>State Code:</b> {code}", styles['normal']))
+    return block
+
+
+def _details_grid(pairs):
+    """Two-column label/value grid for document numbers and dates"""
+    from reportlab.platypus import Paragraph, Table, TableStyle
+
+    styles = _styles()
+    cells = [Paragraph(f"<b>{_escape(label)}</b><br/>{_escape(value)}", styles['normal'])
+             for label, value in pairs if value not in (None, '')]
+    if len(cells) % 2:
+        cells.append('')
+    rows = [cells[i:i + 2] for i in range(0, len(cells), 2)]
+    table = Table(rows, colWidths=[125, 125])
+    table.setStyle(TableStyle([
+        ('GRID', (0, 0), (-1, -1), 0.5, '#9ca3af'),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ]))
+    return table
+
+
+def _header(left_blocks, details):
+    from reportlab.platypus import Table, TableStyle
+
+    table = Table([[left_blocks, details]], colWidths=[265, 255])
+    table.setStyle(TableStyle([
+        ('BOX', (0, 0), (-1, -1), 0.5, '#9ca3af'),
+        ('LINEAFTER', (0, 0), (0, 0), 0.5, '#9ca3af'),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ]))
+    return table
+
+
+def _amount_table(lines, totals):
+    """
+    Sl No / Particulars / Amount table.
+
+    Args:
+        lines (list): (particulars, amount) rows, numbered
+        totals (list): (label, amount) rows spanning the first two columns
+    """
+    from reportlab.platypus import Paragraph, Table, TableStyle
+
+    styles = _styles()
+    regular, bold, symbol = register_fonts()
+    rows = [['Sl No.', 'Particulars', 'Amount']]
+    for index, (particulars, amount) in enumerate(lines, 1):
+        rows.append([str(index), Paragraph(_escape(particulars).replace('\n', '<br/>'), styles['normal']),
+                     format_money(amount, symbol)])
+    first_total = len(rows)
+    for label, amount in totals:
+        rows.append([label, '', format_money(amount, symbol)])
+
+    commands = [
+        ('FONTNAME', (0, 0), (-1, -1), regular),
+        ('FONTNAME', (0, 0), (-1, 0), bold),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('BACKGROUND', (0, 0), (-1, 0), '#e5e7eb'),
+        ('GRID', (0, 0), (-1, -1), 0.5, '#6b7280'),
+        ('ALIGN', (0, 0), (0, -1), 'CENTER'),
+        ('ALIGN', (2, 0), (2, -1), 'RIGHT'),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ]
+    for row in range(first_total, len(rows)):
+        commands += [('SPAN', (0, row), (1, row)), ('ALIGN', (0, row), (0, row), 'RIGHT')]
+    if totals:
+        commands += [('FONTNAME', (0, -1), (-1, -1), bold), ('BACKGROUND', (0, -1), (-1, -1), '#f3f4f6')]
+
+    table = Table(rows, colWidths=[45, 375, 100], repeatRows=1)
+    table.setStyle(TableStyle(commands))
+    return table
+
+
+def _bank_details(company):
+    from reportlab.platypus import Paragraph
+
+    styles = _styles()
+    company = company or {}
+    if not company.get('account_number'):
+        return []
+    block = [Paragraph("Company's Bank Details", styles['heading']),
+             Paragraph(f"A/c Holder's Name: {_escape(company.get('company_name'))}", styles['normal']),
+             Paragraph(f"Bank Name: {_escape(company.get('bank_name'))}", styles['normal']),
+             Paragraph(f"A/c No.: {_escape(company.get('account_number'))}", styles['normal']),
+             Paragraph(f"Branch &amp; IFS Code: {_escape(company.get('branch'))} &amp; "
+                       f"{_escape(company.get('ifsc_code'))}", styles['normal'])]
+    if company.get('swift_code'):
+        block.append(Paragraph(f"SWIFT Code: {_escape(company['swift_code'])}", styles['normal']))
+    return block
+
+
+def _signatures(left_label, company_name):
+    from reportlab.platypus import Table, TableStyle
+
+    regular, _, _ = register_fonts()
+    table = Table([[left_label, '', f"for {company_name or ''}"], ['', '', 'Authorised Signatory']],
+                  colWidths=[200, 120, 200], rowHeights=[40, 14])
+    table.setStyle(TableStyle([
+        ('FONTNAME', (0, 0), (-1, -1), regular),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, 0), 'TOP'),
+        ('LINEBELOW', (0, 0), (0, 0), 0.5, '#000000'),
+        ('LINEBELOW', (2, 0), (2, 0), 0.5, '#000000'),
+    ]))
+    return table
+
+
+def _build(title, story):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import Paragraph, SimpleDocTemplate
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, leftMargin=36, rightMargin=36, topMargin=36, bottomMargin=36,
+                            title=title)
+    doc.build([Paragraph(title.upper(), _styles()['title'])] + story)
+    return buffer.getvalue()
+
+
+# ---------------------------------------------------------------------------
+# Documents
+# ---------------------------------------------------------------------------
+
+def course_particulars(courses):
+    """'JOHN DOE (BST, AFF)' lines from resolved course dicts, grouped per candidate"""
+    grouped = {}
+    for course in courses or []:
+        if not isinstance(course, dict):
+            continue
+        candidate = ' '.join(str(course.get('candidate_name') or 'Unknown Candidate')
+                             .replace('_', ' ').split()[:2]).upper()
+        grouped.setdefault(candidate, []).append(course.get('certificate_name') or 'Unknown Certificate')
+    return '\n'.join(f"{name} ({', '.join(certificates)})" for name, certificates in grouped.items())
+
+
+def render_sales_invoice(invoice, company, customer):
+    """Tax invoice for a ReceiptInvoiceData row (selected_courses resolved to dicts)"""
+    from reportlab.platypus import Paragraph, Spacer
+
+    styles = _styles()
+    _, _, symbol = register_fonts()
+    taxable = Decimal(str(invoice.get('amount') or 0))
+    tax = Decimal(str(invoice.get('cgst') or 0)) + Decimal(str(invoice.get('sgst') or 0))
+    if not tax and invoice.get('final_amount'):
+        tax = max(Decimal(str(invoice['final_amount'])) - taxable, Decimal('0'))
+    total = taxable + tax
+
+    company_state = state_code((company or {}).get('company_gst_number')) or DEFAULT_STATE_CODE
+    customer_state = state_code((customer or {}).get('gst_number'), (customer or {}).get('state_code'))
+
+    header = _header(
+        _letterhead(company, invoice.get('company_name'))
+        + [Spacer(1, 6)]
+        + _party_block('Customer (Bill to)', customer, invoice.get('party_name') or invoice.get('customer_name')),
+        _details_grid([
+            ('Invoice No.', invoice.get('invoice_no')),
+            ('Dated', invoice.get('invoice_date')),
+            ('Delivery Note', invoice.get('delivery_note')),
+            ('Delivery Date', invoice.get('delivery_date')),
+            ('Dispatch Doc No', invoice.get('dispatch_doc_no')),
+            ('Dispatched through', invoice.get('dispatch_through')),
+            ('Destination', invoice.get('destination')),
+            ('Terms of Delivery', invoice.get('terms_of_delivery')),
+            ('Place of Supply', customer_state),
+        ]))
+
+    particulars = course_particulars(invoice.get('selected_courses')) or 'Training services'
+    totals = [('Total Amount', taxable)] + gst_lines(taxable, tax, company_state, customer_state) + [('Total', total)]
+
+    story = [header, Spacer(1, 10), _amount_table([(particulars, taxable)], totals), Spacer(1, 8),
+             Paragraph("<b>Amount Chargeable (in words)</b> E. &amp; O.E", styles['normal']),
+             Paragraph(f"<b>Total Amount: {format_money(total, symbol)}</b>", styles['normal']),
+             Paragraph(amount_in_words(total), styles['normal']), Spacer(1, 10)]
+    story += _bank_details(company)
+    story += [Spacer(1, 24), _signatures("Customer's Seal and Signature", (company or {}).get('company_name')
+                                         or invoice.get('company_name'))]
+    return _build('Tax Invoice', story)
+
+
+def render_receipt(receipt, company, customer):
+    """Payment receipt for a ReceiptAmountReceived row"""
+    from reportlab.platypus import Paragraph, Spacer
+
+    styles = _styles()
+    _, _, symbol = register_fonts()
+    amount = Decimal(str(receipt.get('amount_received') or 0))
+    on_account_of = receipt.get('on_account_of')
+    particulars = 'Payment Received' + (f"\nOn Account of: {on_account_of}" if on_account_of else '')
+
+    header = _header(
+        _letterhead(company, receipt.get('company_name'))
+        + [Spacer(1, 6)]
+        + _party_block('Received From', customer, receipt.get('customer_name')),
+        _details_grid([
+            ('Receipt No.', receipt.get('receipt_amount_id')),
+            ('Dated', receipt.get('transaction_date')),
+            ('Transaction ID', receipt.get('transaction_id')),
+            ('Payment Type', receipt.get('payment_type')),
+            ('On Account of', on_account_of),
+            ('TDS', format_money(receipt['tds_amount'], symbol) if receipt.get('tds_amount') else None),
+        ]))
+
+    story = [header, Spacer(1, 10),
+             _amount_table([(particulars, amount)], [('Net Amount Received', amount)]), Spacer(1, 8),
+             Paragraph("<b>Amount Received (in words)</b>", styles['normal']),
+             Paragraph(amount_in_words(amount), styles['normal']), Spacer(1, 8)]
+    if receipt.get('remark'):
+        story += [Paragraph(f"<b>Remarks:</b> {_escape(receipt['remark'])}", styles['normal']), Spacer(1, 8)]
+    story += _bank_details(company)
+    story += [Spacer(1, 24), _signatures("Customer's Seal and Signature", (company or {}).get('company_name')
+                                         or receipt.get('company_name'))]
+    return _build('Payment Receipt', story)
+
+
+def render_adjustment(adjustment, company, party, adjustment_type='client'):
+    """Adjustment note for a client_adjustments / vendor_adjustments row"""
+    from reportlab.platypus import Paragraph, Spacer
+
+    styles = _styles()
+    amount = Decimal(str(adjustment.get('adjustment_amount') or 0))
+    label = adjustment_type.title()
+
+    header = _header(
+        _letterhead(company, None) + [Spacer(1, 6)] + _party_block(label, party, None),
+        _details_grid([
+            ('Adjustment No.', f"ADJ-{adjustment.get('id')}"),
+            ('Dated', adjustment.get('date_of_service')),
+            ('Type', f"{label} Adjustment ({'credit' if amount >= 0 else 'debit'})"),
+            ('On Account of', adjustment.get('on_account_of')),
+        ]))
+
+    story = [header, Spacer(1, 10),
+             _amount_table([(adjustment.get('particular_of_service') or '', abs(amount))],
+                           [('Adjustment Amount', abs(amount))]), Spacer(1, 8),
+             Paragraph(amount_in_words(abs(amount)), styles['normal']), Spacer(1, 8)]
+    if adjustment.get('remark'):
+        story.append(Paragraph(f"<b>Remarks:</b> {_escape(adjustment['remark'])}", styles['normal']))
+    story += [Spacer(1, 24), _signatures(f"{label}'s Seal and Signature", (company or {}).get('company_name'))]
+    return _build(f"{label} Adjustment Invoice", story)
+
+
+def render_document(kind, document, company, party):
+    """Render one document to PDF bytes (module-level so process pools can pickle it)"""
+    if kind == 'sales':
+        return render_sales_invoice(document, company, party)
+    if kind == 'receipt':
+        return render_receipt(document, company, party)
+    if kind in ('client_adjustment', 'vendor_adjustment'):
+        return render_adjustment(document, company, party, kind.split('_')[0])
+    raise ValueError(f"Unknown document kind: {kind}")
+
+
+def _init_worker():
+    try:
+        register_fonts()
+    except Exception as e:
+        # The job itself reports the failure
+        logger.warning(f"[INVOICE_PDF] Worker could not register fonts: {e}")
+
+
+def _render_job(job):
+    kind, document, company, party = job
+    return document_filename(kind, document), render_document(kind, document, company, party)
+
+
+# ---------------------------------------------------------------------------
+# Period runs
+# ---------------------------------------------------------------------------
+
+def resolve_courses(invoices, query):
+    """Replace selected_courses ids with certificate/candidate names in one query"""
+    ids = set()
+    for invoice in invoices:
+        for course in invoice.get('selected_courses') or []:
+            if isinstance(course, int) or (isinstance(course, str) and course.isdigit()):
+                ids.add(int(course))
+    names = {}
+    if ids:
+        rows = query("""
+            SELECT id, certificate_name, candidate_name
+            FROM certificate_selections WHERE id = ANY(%s)
+        """, (sorted(ids),))
+        names = {row['id']: dict(row) for row in rows or []}
+    for invoice in invoices:
+        resolved = []
+        for course in invoice.get('selected_courses') or []:
+            if isinstance(course, dict):
+                resolved.append(course)
+            elif str(course).isdigit() and int(course) in names:
+                resolved.append(names[int(course)])
+            elif isinstance(course, str):
+                resolved.append({'certificate_name': course})
+        invoice['selected_courses'] = resolved
+    return invoices
+
+
+def load_period_documents(start_date, end_date, kinds=DOCUMENT_KINDS, query=None):
+    """
+    Every document of the given kinds dated within [start_date, end_date].
+
+    Returns:
+        list: (kind, document dict) tuples, oldest first per kind
+    """
+    if query is None:
+        from database.db_connection import execute_query as query
+
+    sql = {
+        'sales': """SELECT * FROM ReceiptInvoiceData
+                    WHERE invoice_date BETWEEN %s AND %s ORDER BY invoice_date, invoice_no""",
+        'receipt': """SELECT * FROM ReceiptAmountReceived
+                      WHERE transaction_date BETWEEN %s AND %s ORDER BY transaction_date, receipt_amount_id""",
+        'client_adjustment': """SELECT * FROM client_adjustments
+                                WHERE date_of_service BETWEEN %s AND %s ORDER BY date_of_service, id""",
+        'vendor_adjustment': """SELECT * FROM vendor_adjustments
+                                WHERE date_of_service BETWEEN %s AND %s ORDER BY date_of_service, id""",
+    }
+    documents = []
+    for kind in kinds:
+        rows = [dict(row) for row in query(sql[kind], (start_date, end_date)) or []]
+        if kind == 'sales':
+            resolve_courses(rows, query)
+        documents.extend((kind, row) for row in rows)
+    return documents
+
+
+def render_batch(jobs, workers=0):
+    """
+    Render (kind, document, company, party) jobs.
+
+    Args:
+        jobs (list): Render jobs with their reference rows already attached
+        workers (int): Process pool size; 0 renders in this process
+
+    Yields:
+        tuple: (archive filename, pdf bytes) as each document finishes; a
+        document that fails is logged and yielded as a .error.txt entry
+    """
+    if workers <= 0 or len(jobs) < 2:
+        for job in jobs:
+            try:
+                yield _render_job(job)
+            except Exception as e:
+                logger.error(f"[INVOICE_PDF] Failed to render {document_filename(job[0], job[1])}: {e}")
+                yield document_filename(job[0], job[1]) + '.error.txt', str(e).encode('utf-8')
+        return
+
+    import multiprocessing
+
+    # spawn: forking a threaded server process is unsafe
+    context = multiprocessing.get_context('spawn')
+    pending_jobs = iter(jobs)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as pool:
+        in_flight = {}
+
+        def submit_next():
+            job = next(pending_jobs, None)
+            if job is not None:
+                in_flight[pool.submit(_render_job, job)] = job
+
+        # Bounded look-ahead keeps memory flat for large periods
+        for _ in range(workers * 2):
+            submit_next()
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                job = in_flight.pop(future)
+                try:
+                    yield future.result()
+                except Exception as e:
+                    logger.error(f"[INVOICE_PDF] Failed to render {document_filename(job[0], job[1])}: {e}")
+                    yield document_filename(job[0], job[1]) + '.error.txt', str(e).encode('utf-8')
+                submit_next()
+
+
+class _ChunkWriter:
+    """Write-only sink that zipfile can stream into; chunks are drained by the caller"""
+
+    def __init__(self):
+        self.chunks = []
+        self.offset = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_zip(files):
+    """
+    Zip (filename, bytes) pairs on the fly.
+
+    Yields:
+        bytes: archive chunks; nothing but the current file is held in memory
+    """
+    sink = _ChunkWriter()
+    with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for filename, data in files:
+            archive.writestr(filename, data)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    chunk = sink.drain()
+    if chunk:
+        yield chunk
+
+
+def render_period_zip(start_date, end_date, kinds=DOCUMENT_KINDS, workers=None, reference=None):
+    """
+    Render every document of a period and stream them as a zip archive.
+
+    Reference rows are attached in this process, so workers never query
+    the database.
+    """
+    if workers is None:
+        from config import Config
+        workers = Config.INVOICE_RENDER_WORKERS
+    reference = reference or get_reference_data()
+
+    jobs = [(kind, document) + reference.parties_for(kind, document)
+            for kind, document in load_period_documents(start_date, end_date, kinds)]
+    logger.info(f"[INVOICE_PDF] Rendering {len(jobs)} documents for {start_date}..{end_date} "
+                f"with {workers or 'no'} worker processes")
+    return stream_zip(render_batch(jobs, workers))
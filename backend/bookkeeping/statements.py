@@ -0,0 +1,312 @@
+"""
+Bank statement parsing and party matching for bulk receipt/payment import
+
+A statement (CSV or XLSX export from the bank) is parsed into normalized
+lines, then each line is matched against in-memory indexes of B2B customers
+(credits -> receipts) and vendors (debits -> vendor payments). Matching is
+by GST number or account number appearing in the narration first, then by
+the party's name tokens. Lines that match nothing, or more than one party
+equally well, are returned for manual reconciliation.
+
+Usage:
+    from bookkeeping.statements import parse_statement, PartyIndex, match_statement
+
+    lines = parse_statement(file_bytes, 'statement.csv')
+    index = PartyIndex(customers, vendors)
+    matched, unmatched = match_statement(lines, index, account_no='0012345')
+"""
+
+import csv
+import hashlib
+import io
+import re
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+# Header aliases, compared after normalize_header()
+HEADER_ALIASES = {
+    'date': ('date', 'txndate', 'transactiondate', 'valuedate', 'postingdate', 'trandate'),
+    'description': ('description', 'narration', 'particulars', 'remarks', 'details', 'transactiondetails'),
+    'reference': ('reference', 'refno', 'chqrefno', 'chequeno', 'chqno', 'utr', 'utrno',
+                  'referenceno', 'transactionid', 'chequerefno'),
+    'debit': ('debit', 'withdrawal', 'withdrawals', 'withdrawalamt', 'debitamount', 'dr'),
+    'credit': ('credit', 'deposit', 'deposits', 'depositamt', 'creditamount', 'cr'),
+    'amount': ('amount', 'transactionamount'),
+    'direction': ('drcr', 'type', 'crdr', 'debitcredit'),
+}
+
+DATE_FORMATS = ('%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y', '%d/%m/%y', '%d-%m-%y',
+                '%d-%b-%Y', '%d %b %Y', '%d-%b-%y', '%d %b %y', '%Y-%m-%d', '%Y/%m/%d')
+
+# Words that say nothing about which party a narration refers to
+STOPWORDS = {
+    'PVT', 'PRIVATE', 'LTD', 'LIMITED', 'LLP', 'CO', 'COMPANY', 'THE', 'AND', 'OF', 'INDIA',
+    'SERVICES', 'SERVICE', 'MARITIME', 'MARINE', 'SHIPPING', 'ENTERPRISES', 'INTERNATIONAL',
+    'NEFT', 'RTGS', 'IMPS', 'UPI', 'TRF', 'TRANSFER', 'CHQ', 'CHEQUE', 'DEP', 'BY', 'TO', 'FROM',
+}
+
+_GST_RE = re.compile(r'\d{2}[A-Z]{5}\d{4}[A-Z][A-Z0-9]Z[A-Z0-9]')
+
+
+def normalize_header(value):
+    return re.sub(r'[^a-z]', '', str(value or '').lower())
+
+
+def normalize_text(value):
+    return re.sub(r'[^A-Z0-9]+', ' ', str(value or '').upper()).strip()
+
+
+def parse_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value or '').strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_amount(value):
+    """Parse '1,23,456.00', '(500)', '500 Cr' style amounts; None when blank"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float, Decimal)):
+        return Decimal(str(value))
+    text = str(value).strip().upper().replace(',', '')
+    text = re.sub(r'\s*(CR|DR)\.?$', '', text)
+    negative = text.startswith('(') and text.endswith(')')
+    text = text.strip('()').strip()
+    if not text or text == '-':
+        return None
+    try:
+        amount = Decimal(text)
+    except InvalidOperation:
+        return None
+    return -amount if negative else amount
+
+
+def _read_rows(file_bytes, filename):
+    if filename.lower().endswith(('.xlsx', '.xlsm')):
+        import openpyxl
+        workbook = openpyxl.load_workbook(io.BytesIO(file_bytes), read_only=True, data_only=True)
+        try:
+            return [list(row) for row in workbook.active.iter_rows(values_only=True)]
+        finally:
+            workbook.close()
+
+    text = file_bytes.decode('utf-8-sig', errors='replace')
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=',;\t|')
+    except csv.Error:
+        dialect = csv.excel
+    return list(csv.reader(io.StringIO(text), dialect))
+
+
+def _find_columns(rows, max_scan=30):
+    """Locate the header row (banks often prepend account details) and map columns"""
+    for row_index, row in enumerate(rows[:max_scan]):
+        headers = [normalize_header(cell) for cell in row]
+        columns = {}
+        for field, aliases in HEADER_ALIASES.items():
+            for position, header in enumerate(headers):
+                if header in aliases and field not in columns:
+                    columns[field] = position
+        if 'date' in columns and ('debit' in columns or 'credit' in columns or 'amount' in columns):
+            return row_index, columns
+    raise ValueError("Could not find a header row with a date and debit/credit or amount column")
+
+
+def parse_statement(file_bytes, filename):
+    """
+    Parse a bank statement export into normalized lines.
+
+    Returns:
+        list: dicts with line_no, date, description, reference, debit, credit
+        (line_no is the 1-based row in the source file). Rows without a
+        parseable date or amount - totals, balances, footers - are skipped.
+    """
+    rows = _read_rows(file_bytes, filename)
+    header_index, columns = _find_columns(rows)
+
+    def cell(row, field):
+        position = columns.get(field)
+        return row[position] if position is not None and position < len(row) else None
+
+    lines = []
+    for offset, row in enumerate(rows[header_index + 1:]):
+        txn_date = parse_date(cell(row, 'date'))
+        if txn_date is None:
+            continue
+
+        debit = parse_amount(cell(row, 'debit'))
+        credit = parse_amount(cell(row, 'credit'))
+        if debit is None and credit is None:
+            amount = parse_amount(cell(row, 'amount'))
+            if amount is None:
+                continue
+            direction = str(cell(row, 'direction') or '').strip().upper()
+            if direction.startswith('D') or (not direction and amount < 0):
+                debit = abs(amount)
+            else:
+                credit = abs(amount)
+
+        debit = debit if debit and debit > 0 else None
+        credit = credit if credit and credit > 0 else None
+        if debit is None and credit is None:
+            continue
+
+        reference = str(cell(row, 'reference') or '').strip() or None
+        lines.append({
+            'line_no': header_index + offset + 2,
+            'date': txn_date,
+            'description': str(cell(row, 'description') or '').strip(),
+            'reference': reference,
+            'debit': debit,
+            'credit': credit,
+        })
+    return lines
+
+
+def _starts_with_name(token, compact):
+    """True when token begins with the run-together name, not just a longer number"""
+    if not token.startswith(compact):
+        return False
+    rest = token[len(compact):]
+    return not (rest and rest[0].isdigit() and compact[-1].isdigit())
+
+
+class PartyIndex:
+    """
+    In-memory lookup of customers and vendors by identifier and name tokens.
+
+    Args:
+        customers (list): dicts with id, company_name and optional gst_number
+        vendors (list): dicts with id, vendor_name and optional account_number / gst_number
+    """
+
+    def __init__(self, customers, vendors):
+        self.parties = {}
+        self._by_identifier = {'customer': {}, 'vendor': {}}
+        self._by_token = {'customer': defaultdict(set), 'vendor': defaultdict(set)}
+        self._compact = {'customer': [], 'vendor': []}
+
+        for customer in customers:
+            self._add('customer', customer['id'], customer.get('company_name'), [customer.get('gst_number')])
+        for vendor in vendors:
+            self._add('vendor', vendor['id'], vendor.get('vendor_name'),
+                      [vendor.get('gst_number'), vendor.get('account_number')])
+
+    def _add(self, kind, party_id, name, identifiers):
+        if not name:
+            return
+        key = (kind, party_id)
+        tokens = [t for t in normalize_text(name).split() if t not in STOPWORDS and len(t) > 1]
+        if not tokens:
+            tokens = normalize_text(name).split()
+        self.parties[key] = {'kind': kind, 'id': party_id, 'name': name, 'tokens': frozenset(tokens)}
+
+        for identifier in identifiers:
+            identifier = re.sub(r'[^A-Z0-9]', '', str(identifier or '').upper())
+            if len(identifier) >= 6:
+                self._by_identifier[kind][identifier] = key
+        for token in tokens:
+            self._by_token[kind][token].add(key)
+        compact = ''.join(tokens)
+        if len(compact) >= 6:
+            self._compact[kind].append((compact, key))
+
+    def match(self, description, kind):
+        """
+        Find the party a narration refers to.
+
+        Returns:
+            tuple: (party dict or None, reason) - reason is 'gst', 'account',
+            'name', 'ambiguous' or 'no_match'
+        """
+        text = normalize_text(description)
+        tokens = set(text.split())
+
+        identifiers = self._by_identifier[kind]
+        for gst in _GST_RE.findall(text.replace(' ', '')):
+            if gst in identifiers:
+                return self.parties[identifiers[gst]], 'gst'
+        for token in tokens:
+            if len(token) >= 6 and token.isdigit() and token in identifiers:
+                return self.parties[identifiers[token]], 'account'
+
+        # Every significant name token must appear; the most specific name wins
+        candidates = set()
+        for token in tokens:
+            candidates |= self._by_token[kind].get(token, set())
+        full_matches = [key for key in candidates if self.parties[key]['tokens'] <= tokens]
+
+        if not full_matches:
+            # Narrations often run the name together ("IMPS-SEAHAWKMARINE")
+            full_matches = [key for compact, key in self._compact[kind]
+                            if any(_starts_with_name(token, compact) for token in tokens)]
+
+        if not full_matches:
+            return None, 'no_match'
+        best = max(len(self.parties[key]['tokens']) for key in full_matches)
+        best_keys = [key for key in full_matches if len(self.parties[key]['tokens']) == best]
+        if len(best_keys) > 1:
+            return None, 'ambiguous'
+        return self.parties[best_keys[0]], 'name'
+
+
+def synthetic_reference(line, account_no, occurrence):
+    """
+    Reference for a line the bank gave none: date, direction, amount and a
+    hash of the normalized narration, plus the occurrence among identical
+    lines of the same statement. It does not depend on the line's position,
+    so overlapping exports (another date range, an extra header row) give
+    the same line the same reference.
+    """
+    direction, amount = ('C', line['credit']) if line['credit'] else ('D', line['debit'])
+    digest = hashlib.sha1(normalize_text(line['description']).encode('utf-8')).hexdigest()[:10]
+    return f"STMT-{account_no}-{line['date']:%Y%m%d}-{direction}{amount:.2f}-{digest}-{occurrence}"
+
+
+def match_statement(lines, index, account_no=''):
+    """
+    Match parsed statement lines to receipts (credits) and vendor payments (debits).
+
+    Lines without a bank reference get a stable synthetic one
+    (synthetic_reference), so importing the same or an overlapping
+    statement again is detected as a duplicate.
+
+    Returns:
+        tuple: (matched, unmatched) lists; matched lines gain kind, party_id,
+        party_name, amount and match_reason; unmatched lines gain reason
+    """
+    matched, unmatched = [], []
+    seen_references = set()
+    occurrences = defaultdict(int)  # identical unreferenced lines seen so far
+
+    for line in lines:
+        kind = 'receipt' if line['credit'] else 'payment'
+        reference = line['reference']
+        if not reference:
+            identity = (line['date'], line['credit'], line['debit'], normalize_text(line['description']))
+            occurrences[identity] += 1
+            reference = synthetic_reference(line, account_no, occurrences[identity])
+        entry = dict(line, kind=kind, reference=reference, amount=line['credit'] or line['debit'])
+
+        if reference in seen_references:
+            unmatched.append(dict(entry, reason='duplicate_reference'))
+            continue
+        seen_references.add(reference)
+
+        party, reason = index.match(line['description'], 'customer' if kind == 'receipt' else 'vendor')
+        if party is None:
+            unmatched.append(dict(entry, reason=reason))
+            continue
+
+        matched.append(dict(entry, party_id=party['id'], party_name=party['name'], match_reason=reason))
+
+    return matched, unmatched
@@ -1,8 +1,5 @@
 import os
-import pytesseract
 from dotenv import load_dotenv
-from flask_cors import CORS
-from openai import OpenAI
 from urllib.parse import urlparse
 
 # Define the base directory for the backend
@@ -12,8 +9,9 @@ backend_dir = os.path.dirname(os.path.abspath(__file__))
 dotenv_path = os.path.join(backend_dir, '.env')
 load_dotenv(dotenv_path=dotenv_path)
 
-# Configure Tesseract path for Windows
-if os.name == 'nt':  # Windows
+# Tesseract path for Windows; applied to pytesseract by the ocr package on first use
+TESSERACT_CMD = os.getenv("TESSERACT_CMD")
+if not TESSERACT_CMD and os.name == 'nt':  # Windows
     # Try common installation paths
     possible_paths = [
         r'C:\Program Files\Tesseract-OCR\tesseract.exe',
@@ -23,7 +21,7 @@ if os.name == 'nt':  # Windows
 
     for path in possible_paths:
         if os.path.exists(path):
-            pytesseract.pytesseract.tesseract_cmd = path
+            TESSERACT_CMD = path
             print(f"[OK] Tesseract found at: {path}")
             break
     else:
@@ -42,9 +40,26 @@ class Config:
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'pdf', 'doc', 'docx'}
     MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
 
+    # Temp upload session janitor
+    TEMP_SESSION_TTL_HOURS = float(os.getenv("TEMP_SESSION_TTL_HOURS", "24"))
+    TEMP_JANITOR_INTERVAL_SECONDS = int(os.getenv("TEMP_JANITOR_INTERVAL_SECONDS", "300"))
+    TEMP_JANITOR_BATCH_SIZE = int(os.getenv("TEMP_JANITOR_BATCH_SIZE", "50"))
+    TEMP_QUOTA_MB = int(os.getenv("TEMP_QUOTA_MB", "2048"))  # 0 disables the quota
+    ENABLE_TEMP_JANITOR = os.getenv("ENABLE_TEMP_JANITOR", "true").lower() == "true"
+
     # File storage configuration
     BASE_STORAGE_PATH = os.getenv("BASE_STORAGE_PATH", os.path.join(backend_dir, "storage", "candidates"))
     INVOICE_STORAGE_PATH = os.getenv("INVOICE_STORAGE_PATH", os.path.join(backend_dir, "storage", "invoices"))
+    CERTIFICATE_STORAGE_PATH = os.getenv("CERTIFICATE_STORAGE_PATH", os.path.join(backend_dir, "storage", "certificates"))
+
+    # Rate limit counters shared by all workers on the host (sqlite://<file>, or any Flask-Limiter storage URI)
+    RATELIMIT_STORAGE_URI = os.getenv("RATELIMIT_STORAGE_URI", "sqlite://" + os.path.join(backend_dir, "cache", "rate_limits.sqlite3"))
+
+    # Orphaned file GC: grace period, quarantine retention, per-run scan budget and rate
+    FILE_GC_GRACE_HOURS = float(os.getenv("FILE_GC_GRACE_HOURS", "24"))
+    FILE_GC_QUARANTINE_DAYS = int(os.getenv("FILE_GC_QUARANTINE_DAYS", "14"))
+    FILE_GC_MAX_FILES_PER_RUN = int(os.getenv("FILE_GC_MAX_FILES_PER_RUN", "5000"))
+    FILE_GC_FILES_PER_SECOND = int(os.getenv("FILE_GC_FILES_PER_SECOND", "500"))  # 0 disables throttling
 
     # Google Drive config
     SERVICE_ACCOUNT_FILE = os.path.join(backend_dir, os.getenv("GOOGLE_DRIVE_SERVICE_ACCOUNT_FILE", "service-account.json"))
@@ -57,12 +72,48 @@ class Config:
     OPENAI_TEMPERATURE = float(os.getenv("OPENAI_TEMPERATURE", "0.1"))
     ENABLE_CHATGPT_FILTERING = os.getenv("ENABLE_CHATGPT_FILTERING", "true").lower() == "true"
 
+    # LLM field extraction service (backend: openai | fake | none)
+    LLM_EXTRACTION_BACKEND = os.getenv("LLM_EXTRACTION_BACKEND", "openai").lower()
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+    LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "20"))
+    EXTRACTION_CACHE_PATH = os.getenv("EXTRACTION_CACHE_PATH", os.path.join(backend_dir, "cache", "extraction_cache.sqlite3"))
+    EXTRACTION_CACHE_TTL_DAYS = int(os.getenv("EXTRACTION_CACHE_TTL_DAYS", "30"))  # 0 keeps entries forever
+
+    # Resolution that OCR input pages are normalized to (up- or downsampled)
+    OCR_TARGET_DPI = int(os.getenv("OCR_TARGET_DPI", "300"))
+
+    # Tesseract language used for the passport MRZ strip ('ocrb' or 'mrz' if that traineddata is installed)
+    MRZ_TESSERACT_LANG = os.getenv("MRZ_TESSERACT_LANG", "eng")
+
     # Toggle to enable/disable OCR-related endpoints (useful while working on manual entry)
     ENABLE_OCR = os.getenv("ENABLE_OCR", "false").lower() == "true"
 
+    # Metrics: allow /metrics to be scraped from non-loopback addresses
+    METRICS_ALLOW_REMOTE = os.getenv("METRICS_ALLOW_REMOTE", "false").lower() == "true"
+    # Per-worker metric files summed by /metrics (empty: each worker reports only its own series)
+    METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(backend_dir, "logs", "metrics"))
+
+    # Change feed (/changes Server-Sent Events): open streams per worker, keep-alive interval,
+    # and stream lifetime before the browser reconnects (frees the worker thread)
+    CHANGE_FEED_MAX_SUBSCRIBERS = int(os.getenv("CHANGE_FEED_MAX_SUBSCRIBERS", "2"))
+    CHANGE_FEED_HEARTBEAT_SECONDS = int(os.getenv("CHANGE_FEED_HEARTBEAT_SECONDS", "15"))
+    CHANGE_FEED_STREAM_SECONDS = int(os.getenv("CHANGE_FEED_STREAM_SECONDS", "300"))
+
     # Application Configuration
     BASE_URL = os.getenv("BASE_URL", "http://localhost:5000")
 
+    # Public QR /verify cache and optional signed static records (off unless both are set)
+    VERIFY_CACHE_SIZE = int(os.getenv("VERIFY_CACHE_SIZE", "10000"))
+    VERIFY_CACHE_TTL_SECONDS = int(os.getenv("VERIFY_CACHE_TTL_SECONDS", "300"))
+    VERIFY_NEGATIVE_TTL_SECONDS = int(os.getenv("VERIFY_NEGATIVE_TTL_SECONDS", "60"))
+    VERIFY_STATIC_DIR = os.getenv("VERIFY_STATIC_DIR", "")
+    VERIFY_SIGNING_KEY = os.getenv("VERIFY_SIGNING_KEY", "")
+
+    # Server-side invoice/receipt PDFs: reference data cache, month-end worker processes (0 = inline)
+    REFERENCE_CACHE_TTL_SECONDS = int(os.getenv("REFERENCE_CACHE_TTL_SECONDS", "300"))
+    INVOICE_RENDER_WORKERS = int(os.getenv("INVOICE_RENDER_WORKERS", "2"))
+    INVOICE_FONT_PATH = os.getenv("INVOICE_FONT_PATH", "")  # TrueType font with the rupee sign
+
     # PostgreSQL Database config (Neon-compatible)
     DB_HOST = os.getenv("DB_HOST", "localhost")
     DB_PORT = int(os.getenv("DB_PORT", "5432"))
@@ -73,6 +124,18 @@ class Config:
     DB_SSL_MODE = os.getenv("DB_SSL_MODE", "require")
     DB_CONNECTION_TIMEOUT = int(os.getenv("DB_CONNECTION_TIMEOUT", "30"))
 
+    # Optional read replica (same database, user and password); empty host sends all reads to the primary.
+    # Reads fall back to the primary while replica lag exceeds DB_REPLICA_MAX_LAG_SECONDS.
+    DB_REPLICA_HOST = os.getenv("DB_REPLICA_HOST", "")
+    DB_REPLICA_PORT = int(os.getenv("DB_REPLICA_PORT", os.getenv("DB_PORT", "5432")))
+    DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "5"))
+    DB_REPLICA_LAG_CHECK_SECONDS = float(os.getenv("DB_REPLICA_LAG_CHECK_SECONDS", "2"))
+
+    # Slow-query log (set SLOW_QUERY_THRESHOLD_MS=-1 to disable)
+    SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "500"))
+    SLOW_QUERY_EXPLAIN_COOLDOWN_SECONDS = int(os.getenv("SLOW_QUERY_EXPLAIN_COOLDOWN_SECONDS", "300"))
+    SLOW_QUERY_LOG_DIR = os.getenv("SLOW_QUERY_LOG_DIR", os.path.join(backend_dir, "logs", "slow_queries"))
+
     @staticmethod
     def validate_base_url():
         """Validate that BASE_URL is a proper URL format"""
@@ -85,48 +148,10 @@ class Config:
             print(f"[ERROR] BASE_URL validation failed: {e}")
             raise
 
-# Initialize OpenAI client
-def init_openai_client():
-    """Initialize OpenAI client with proper error handling"""
-    try:
-        if Config.OPENAI_API_KEY and Config.OPENAI_API_KEY != "your_openai_api_key_here":
-            # Initialize OpenAI client with proper parameters
-            client = OpenAI(
-                api_key=Config.OPENAI_API_KEY,
-                timeout=30.0,
-                max_retries=2
-            )
-            print("[OK] OpenAI client initialized successfully")
-
-            # Test the client with a simple request
-            try:
-                # Make a test call to verify the API key works
-                test_response = client.chat.completions.create(
-                    model=Config.OPENAI_MODEL,
-                    messages=[{"role": "user", "content": "test"}],
-                    max_tokens=5
-                )
-                print("[OK] OpenAI API key verified and working")
-            except Exception as test_error:
-                print(f"[WARNING] OpenAI API key test failed: {test_error}")
-                client = None
-        else:
-            client = None
-            print("[WARNING] OpenAI API key not configured")
-    except Exception as e:
-        print(f"[WARNING] OpenAI client initialization failed: {e}")
-        print("[INFO] Falling back to regex-based text extraction")
-        client = None
-
-    return client
-
-# Global OpenAI client instance
-openai_client = init_openai_client()
-
 # Create directories if they don't exist
 def create_directories():
     """Create all necessary directories"""
-    for folder in [Config.UPLOAD_FOLDER, Config.IMAGES_FOLDER, Config.JSON_FOLDER, Config.PDFS_FOLDER, Config.TEMP_FOLDER, Config.BASE_STORAGE_PATH, Config.INVOICE_STORAGE_PATH]:
+    for folder in [Config.UPLOAD_FOLDER, Config.IMAGES_FOLDER, Config.JSON_FOLDER, Config.PDFS_FOLDER, Config.TEMP_FOLDER, Config.BASE_STORAGE_PATH, Config.INVOICE_STORAGE_PATH, Config.CERTIFICATE_STORAGE_PATH]:
         os.makedirs(folder, exist_ok=True)
 
 # Initialize directories on import
@@ -0,0 +1,49 @@
+"""
+Shared test fakes for the database layer
+
+make_conn builds a mock psycopg2 connection whose cursor context manager
+returns the given fetchone() results in order. install_fake_database routes execute_query to a FakeDatabase for features
+whose schema is installed lazily (row counters, candidate directory): the
+install is reported as done and any back-off after a failure is cleared.
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+import database.db_connection as db_connection
+
+
+@pytest.fixture
+def make_conn():
+    """make_conn(*fetchone_results) -> (conn, cursor)"""
+    def make(*fetchone_results):
+        conn = MagicMock()
+        cursor = conn.cursor.return_value.__enter__.return_value
+        cursor.fetchone.side_effect = list(fetchone_results)
+        return conn, cursor
+    return make
+
+
+class FakeDatabase:
+    """execute_query stand-in that records each statement (whitespace collapsed) and its params"""
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.queries = []
+
+    def execute_query(self, query, params=None, fetch=True):
+        self.queries.append((' '.join(query.split()), params))
+        return self.answer(query, params)
+
+
+@pytest.fixture
+def install_fake_database(monkeypatch):
+    """install(feature_module, ensure_name, answer) -> FakeDatabase; answer(query, params) returns rows or raises"""
+    def install(feature, ensure_name, answer):
+        fake = FakeDatabase(answer)
+        monkeypatch.setattr(db_connection, 'execute_query', fake.execute_query)
+        monkeypatch.setattr(feature, ensure_name, lambda force=False: False)
+        monkeypatch.setattr(feature, '_unavailable_until', 0.0)
+        return fake
+    return install
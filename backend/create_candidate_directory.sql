@@ -0,0 +1,137 @@
+-- Candidate directory: one row per candidate name known to any table
+-- Dropdowns and the name search read this table instead of a DISTINCT over a
+-- UNION of Master_Database_Table_A, candidate_uploads, certificate_selections
+-- and candidates. AFTER triggers on those tables keep a per-source row count,
+-- so a name stays listed while any source still has a row for it, and copy
+-- id and passport from candidates. The backfill below rebuilds the directory
+-- while writes are locked out.
+-- This script is idempotent and can be run multiple times safely
+
+CREATE TABLE IF NOT EXISTS candidate_directory (
+    candidate_name VARCHAR(255) PRIMARY KEY,
+    candidate_id INTEGER,
+    passport VARCHAR(100),
+    master_rows INTEGER NOT NULL DEFAULT 0,
+    upload_rows INTEGER NOT NULL DEFAULT 0,
+    certificate_rows INTEGER NOT NULL DEFAULT 0,
+    candidate_rows INTEGER NOT NULL DEFAULT 0
+);
+
+-- Prefix search on name and passport (LIKE 'abc%' needs pattern ops)
+CREATE INDEX IF NOT EXISTS idx_candidate_directory_name_prefix
+    ON candidate_directory (LOWER(candidate_name) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_candidate_directory_passport_prefix
+    ON candidate_directory (UPPER(passport) text_pattern_ops) WHERE passport IS NOT NULL;
+
+CREATE OR REPLACE FUNCTION candidate_directory_bump(p_name TEXT, p_source TEXT, p_delta INTEGER)
+RETURNS VOID AS $$
+BEGIN
+    IF p_name IS NULL OR p_name = '' THEN
+        RETURN;
+    END IF;
+    INSERT INTO candidate_directory (candidate_name, master_rows, upload_rows, certificate_rows, candidate_rows)
+    VALUES (p_name,
+            CASE WHEN p_source = 'master' THEN p_delta ELSE 0 END,
+            CASE WHEN p_source = 'uploads' THEN p_delta ELSE 0 END,
+            CASE WHEN p_source = 'certificates' THEN p_delta ELSE 0 END,
+            CASE WHEN p_source = 'candidates' THEN p_delta ELSE 0 END)
+    ON CONFLICT (candidate_name) DO UPDATE SET
+        master_rows = candidate_directory.master_rows + EXCLUDED.master_rows,
+        upload_rows = candidate_directory.upload_rows + EXCLUDED.upload_rows,
+        certificate_rows = candidate_directory.certificate_rows + EXCLUDED.certificate_rows,
+        candidate_rows = candidate_directory.candidate_rows + EXCLUDED.candidate_rows;
+    DELETE FROM candidate_directory
+    WHERE candidate_name = p_name
+      AND master_rows <= 0 AND upload_rows <= 0 AND certificate_rows <= 0 AND candidate_rows <= 0;
+END;
+$$ LANGUAGE plpgsql;
+
+-- TG_ARGV[0] is the source name passed to candidate_directory_bump
+CREATE OR REPLACE FUNCTION candidate_directory_track() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.candidate_name IS NOT DISTINCT FROM NEW.candidate_name THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP <> 'INSERT' THEN
+        PERFORM candidate_directory_bump(OLD.candidate_name, TG_ARGV[0], -1);
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        PERFORM candidate_directory_bump(NEW.candidate_name, TG_ARGV[0], 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION candidate_directory_track_candidates() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND OLD.candidate_name IS DISTINCT FROM NEW.candidate_name) THEN
+        PERFORM candidate_directory_bump(OLD.candidate_name, 'candidates', -1);
+        UPDATE candidate_directory SET candidate_id = NULL, passport = NULL
+        WHERE candidate_name = OLD.candidate_name;
+    END IF;
+    IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND OLD.candidate_name IS DISTINCT FROM NEW.candidate_name) THEN
+        PERFORM candidate_directory_bump(NEW.candidate_name, 'candidates', 1);
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        UPDATE candidate_directory
+        SET candidate_id = NEW.id,
+            passport = NULLIF(TRIM(NEW.json_data->>'passport'), '')
+        WHERE candidate_name = NEW.candidate_name;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Rebuild the directory while writers wait on the table locks
+LOCK TABLE Master_Database_Table_A, candidate_uploads, certificate_selections, candidates
+    IN SHARE ROW EXCLUSIVE MODE;
+
+DROP TRIGGER IF EXISTS trg_candidate_directory_master ON Master_Database_Table_A;
+CREATE TRIGGER trg_candidate_directory_master
+    AFTER INSERT OR DELETE OR UPDATE OF candidate_name ON Master_Database_Table_A
+    FOR EACH ROW EXECUTE FUNCTION candidate_directory_track('master');
+
+DROP TRIGGER IF EXISTS trg_candidate_directory_uploads ON candidate_uploads;
+CREATE TRIGGER trg_candidate_directory_uploads
+    AFTER INSERT OR DELETE OR UPDATE OF candidate_name ON candidate_uploads
+    FOR EACH ROW EXECUTE FUNCTION candidate_directory_track('uploads');
+
+DROP TRIGGER IF EXISTS trg_candidate_directory_certificates ON certificate_selections;
+CREATE TRIGGER trg_candidate_directory_certificates
+    AFTER INSERT OR DELETE OR UPDATE OF candidate_name ON certificate_selections
+    FOR EACH ROW EXECUTE FUNCTION candidate_directory_track('certificates');
+
+DROP TRIGGER IF EXISTS trg_candidate_directory_candidates ON candidates;
+CREATE TRIGGER trg_candidate_directory_candidates
+    AFTER INSERT OR DELETE OR UPDATE OF candidate_name, json_data ON candidates
+    FOR EACH ROW EXECUTE FUNCTION candidate_directory_track_candidates();
+
+TRUNCATE candidate_directory;
+
+INSERT INTO candidate_directory (candidate_name, master_rows, upload_rows, certificate_rows, candidate_rows)
+SELECT candidate_name,
+       SUM(CASE WHEN source = 'master' THEN rows ELSE 0 END),
+       SUM(CASE WHEN source = 'uploads' THEN rows ELSE 0 END),
+       SUM(CASE WHEN source = 'certificates' THEN rows ELSE 0 END),
+       SUM(CASE WHEN source = 'candidates' THEN rows ELSE 0 END)
+FROM (
+    SELECT candidate_name, 'master' AS source, COUNT(*) AS rows FROM Master_Database_Table_A GROUP BY candidate_name
+    UNION ALL
+    SELECT candidate_name, 'uploads', COUNT(*) FROM candidate_uploads GROUP BY candidate_name
+    UNION ALL
+    SELECT candidate_name, 'certificates', COUNT(*) FROM certificate_selections GROUP BY candidate_name
+    UNION ALL
+    SELECT candidate_name, 'candidates', COUNT(*) FROM candidates GROUP BY candidate_name
+) AS sources
+WHERE candidate_name IS NOT NULL AND candidate_name <> ''
+GROUP BY candidate_name;
+
+UPDATE candidate_directory d
+SET candidate_id = c.id,
+    passport = NULLIF(TRIM(c.json_data->>'passport'), '')
+FROM candidates c
+WHERE c.candidate_name = d.candidate_name;
+
+COMMENT ON TABLE candidate_directory IS 'Trigger-maintained list of candidate names across tables for dropdowns and prefix search; read through database.candidate_directory';
+COMMENT ON COLUMN candidate_directory.candidate_id IS 'candidates.id, NULL if the name has no candidates row';
+COMMENT ON COLUMN candidate_directory.passport IS 'Trimmed passport from candidates.json_data, NULL if missing';
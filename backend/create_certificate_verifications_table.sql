@@ -0,0 +1,35 @@
+-- Precomputed public verification records for the QR /verify endpoint
+-- Rows are maintained by utils/verification.py whenever a certificate or candidate changes;
+-- run_rebuild_verification_records.py backfills all certificates.
+-- This script is idempotent and can be run multiple times safely
+
+CREATE TABLE IF NOT EXISTS certificate_verifications (
+    certificate_number VARCHAR(100) PRIMARY KEY,
+    certificate_id INTEGER,
+    candidate_id INTEGER,
+    record JSONB NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_certificate_verifications_certificate_id ON certificate_verifications(certificate_id);
+CREATE INDEX IF NOT EXISTS idx_certificate_verifications_candidate_id ON certificate_verifications(candidate_id);
+
+-- Certificate numbers are looked up on every scan and must identify one certificate
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT certificate_number FROM certificate_selections
+        WHERE certificate_number IS NOT NULL
+        GROUP BY certificate_number HAVING COUNT(*) > 1
+    ) THEN
+        RAISE NOTICE 'Duplicate certificate numbers found - creating a non-unique index; resolve duplicates and re-run';
+        CREATE INDEX IF NOT EXISTS idx_certificate_selections_certificate_number
+            ON certificate_selections(certificate_number);
+    ELSE
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_certificate_selections_certificate_number_unique
+            ON certificate_selections(certificate_number);
+    END IF;
+END $$;
+
+COMMENT ON TABLE certificate_verifications IS 'Verification response per certificate number, rebuilt on certificate/candidate writes';
+COMMENT ON COLUMN certificate_verifications.record IS 'Date-independent verification fields plus expiry_date_iso';
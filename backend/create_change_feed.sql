@@ -0,0 +1,93 @@
+-- Change feed: NOTIFY change_feed with the key of every changed entity
+-- AFTER triggers on the journal and the candidate/certificate tables send one
+-- JSON payload per changed row: {"topic": ..., "op": ..., "key": {...}}.
+-- Notifications are delivered when the writing transaction commits, and
+-- identical payloads within one transaction are delivered once, so a bulk
+-- posting for one party produces a single ledger event. Keys carry only what
+-- a screen needs to decide what to refetch (party, candidate, certificate).
+-- This script is idempotent and can be run multiple times safely
+
+CREATE OR REPLACE FUNCTION change_feed_notify(p_topic TEXT, p_op TEXT, p_key JSONB)
+RETURNS VOID AS $$
+    SELECT pg_notify('change_feed', json_build_object('topic', p_topic, 'op', p_op, 'key', p_key)::TEXT);
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION change_feed_journal() RETURNS TRIGGER AS $$
+DECLARE
+    r journal_entries%ROWTYPE;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        r := OLD;
+    ELSE
+        r := NEW;
+    END IF;
+    -- Client legs carry only party_name (party_id is NULL), vendor legs both
+    PERFORM change_feed_notify('ledger', TG_OP, jsonb_build_object(
+        'party_type', r.party_type, 'party_id', r.party_id, 'party_name', r.party_name,
+        'company_id', r.company_id, 'account', r.account, 'period', r.period));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION change_feed_candidates() RETURNS TRIGGER AS $$
+DECLARE
+    r candidates%ROWTYPE;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        r := OLD;
+    ELSE
+        r := NEW;
+    END IF;
+    PERFORM change_feed_notify('candidates', TG_OP, jsonb_build_object(
+        'candidate_id', r.id, 'candidate_name', r.candidate_name));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION change_feed_candidate_uploads() RETURNS TRIGGER AS $$
+DECLARE
+    r candidate_uploads%ROWTYPE;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        r := OLD;
+    ELSE
+        r := NEW;
+    END IF;
+    PERFORM change_feed_notify('candidates', TG_OP, jsonb_build_object(
+        'candidate_name', r.candidate_name, 'uploads', TRUE));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION change_feed_certificate_selections() RETURNS TRIGGER AS $$
+DECLARE
+    r certificate_selections%ROWTYPE;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        r := OLD;
+    ELSE
+        r := NEW;
+    END IF;
+    PERFORM change_feed_notify('certificates', TG_OP, jsonb_build_object(
+        'id', r.id, 'candidate_id', r.candidate_id, 'client_name', r.client_name, 'status', r.status));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_change_feed_journal ON journal_entries;
+CREATE TRIGGER trg_change_feed_journal AFTER INSERT OR UPDATE OR DELETE ON journal_entries
+    FOR EACH ROW EXECUTE FUNCTION change_feed_journal();
+
+DROP TRIGGER IF EXISTS trg_change_feed_candidates ON candidates;
+CREATE TRIGGER trg_change_feed_candidates AFTER INSERT OR UPDATE OR DELETE ON candidates
+    FOR EACH ROW EXECUTE FUNCTION change_feed_candidates();
+
+DROP TRIGGER IF EXISTS trg_change_feed_candidate_uploads ON candidate_uploads;
+CREATE TRIGGER trg_change_feed_candidate_uploads AFTER INSERT OR DELETE ON candidate_uploads
+    FOR EACH ROW EXECUTE FUNCTION change_feed_candidate_uploads();
+
+DROP TRIGGER IF EXISTS trg_change_feed_certificate_selections ON certificate_selections;
+CREATE TRIGGER trg_change_feed_certificate_selections AFTER INSERT OR UPDATE OR DELETE ON certificate_selections
+    FOR EACH ROW EXECUTE FUNCTION change_feed_certificate_selections();
+
+COMMENT ON FUNCTION change_feed_notify(TEXT, TEXT, JSONB) IS 'Sends a change event on channel change_feed; read through database.change_feed';
@@ -0,0 +1,30 @@
+-- Receivables open items: one row per ClientLedger invoice line with its unpaid balance
+-- Rows are maintained by database/open_items.py whenever a client's ledger changes;
+-- POST /api/bookkeeping/receivables/rebuild backfills every client.
+-- This script is idempotent and can be run multiple times safely
+
+ALTER TABLE ClientLedger ADD COLUMN IF NOT EXISTS reference_id VARCHAR(100);
+
+CREATE TABLE IF NOT EXISTS client_open_items (
+    ledger_id INTEGER PRIMARY KEY,
+    company_name VARCHAR(255) NOT NULL,
+    voucher_no VARCHAR(100),
+    invoice_date DATE NOT NULL,
+    amount DECIMAL(15,2) NOT NULL,
+    remaining DECIMAL(15,2) NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- The dues dashboard only reads unpaid items
+CREATE INDEX IF NOT EXISTS idx_client_open_items_open
+    ON client_open_items(company_name, invoice_date) WHERE remaining > 0;
+
+CREATE TABLE IF NOT EXISTS client_unapplied_credit (
+    company_name VARCHAR(255) PRIMARY KEY,
+    amount DECIMAL(15,2) NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON TABLE client_open_items IS 'Invoice lines from ClientLedger with the amount still unpaid after receipt allocation';
+COMMENT ON COLUMN client_open_items.remaining IS 'Unpaid balance: receipts naming the invoice first, then FIFO';
+COMMENT ON TABLE client_unapplied_credit IS 'Receipts not yet matched to any invoice (on-account balance)';
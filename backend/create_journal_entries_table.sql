@@ -0,0 +1,390 @@
+-- Unified double-entry journal: one append-only row per ledger leg
+-- Every source document (ClientLedger, client_adjustments, vendor_services,
+-- vendor_payments, vendor_adjustments, bank_ledger) is journaled by an AFTER
+-- trigger, so all posting routes write here without knowing about it.
+-- Journal rows are never updated or deleted: changing or deleting a source
+-- document appends a reversal (debit and credit swapped, reverses_id set),
+-- and an update then appends the corrected leg.
+-- Run after create_ledger_table.sql and create_separate_vendor_tables.sql.
+-- This script is idempotent and can be run multiple times safely
+
+ALTER TABLE ClientLedger ADD COLUMN IF NOT EXISTS candidate_name VARCHAR(255);
+ALTER TABLE bank_ledger ADD COLUMN IF NOT EXISTS transaction_type VARCHAR(20) DEFAULT 'payment';
+
+CREATE TABLE IF NOT EXISTS client_adjustments (
+    id SERIAL PRIMARY KEY,
+    company_id INTEGER NOT NULL,
+    customer_id INTEGER NOT NULL,
+    date_of_service DATE NOT NULL,
+    particular_of_service TEXT NOT NULL,
+    adjustment_amount DECIMAL(15,2) NOT NULL CHECK (adjustment_amount != 0),
+    on_account_of TEXT,
+    remark TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (company_id) REFERENCES company_details(id),
+    FOREIGN KEY (customer_id) REFERENCES b2bcustomersdetails(id)
+);
+
+CREATE TABLE IF NOT EXISTS vendor_adjustments (
+    id SERIAL PRIMARY KEY,
+    company_id INTEGER NOT NULL,
+    vendor_id INTEGER NOT NULL,
+    date_of_service DATE NOT NULL,
+    particular_of_service TEXT NOT NULL,
+    adjustment_amount DECIMAL(15,2) NOT NULL CHECK (adjustment_amount != 0),
+    on_account_of TEXT,
+    remark TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (company_id) REFERENCES company_details(id),
+    FOREIGN KEY (vendor_id) REFERENCES vendors(id)
+);
+
+CREATE TABLE IF NOT EXISTS journal_entries (
+    id BIGSERIAL PRIMARY KEY,
+    entry_date DATE NOT NULL,
+    period INTEGER GENERATED ALWAYS AS (
+        (EXTRACT(YEAR FROM entry_date) * 100 + EXTRACT(MONTH FROM entry_date))::INTEGER
+    ) STORED,
+    account VARCHAR(20) NOT NULL CHECK (account IN ('receivable', 'payable', 'bank')),
+    party_type VARCHAR(20) NOT NULL CHECK (party_type IN ('client', 'vendor', 'bank')),
+    party_id INTEGER,
+    party_name VARCHAR(255),
+    company_id INTEGER,
+    source_table VARCHAR(30) NOT NULL,
+    source_id INTEGER NOT NULL,
+    voucher_no VARCHAR(100),
+    voucher_type VARCHAR(50),
+    entry_type VARCHAR(50),
+    particulars TEXT,
+    remark TEXT,
+    on_account_of TEXT,
+    candidate_name VARCHAR(255),
+    transaction_id VARCHAR(100),
+    debit DECIMAL(15,2) NOT NULL DEFAULT 0,
+    credit DECIMAL(15,2) NOT NULL DEFAULT 0,
+    reverses_id BIGINT REFERENCES journal_entries(id),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Ledger views are range scans on (party, date); debit/credit are covered
+CREATE INDEX IF NOT EXISTS idx_journal_party_name
+    ON journal_entries (party_type, lower(party_name), entry_date, id)
+    INCLUDE (debit, credit) WHERE reverses_id IS NULL;
+CREATE INDEX IF NOT EXISTS idx_journal_party_id
+    ON journal_entries (party_type, party_id, entry_date, id)
+    INCLUDE (debit, credit) WHERE reverses_id IS NULL;
+CREATE INDEX IF NOT EXISTS idx_journal_account_company
+    ON journal_entries (account, company_id, entry_date, id)
+    INCLUDE (debit, credit) WHERE reverses_id IS NULL;
+CREATE INDEX IF NOT EXISTS idx_journal_period
+    ON journal_entries (period, entry_date, id)
+    INCLUDE (debit, credit) WHERE reverses_id IS NULL;
+-- Daily/monthly/yearly ledgers: top-N page and opening balance by date across all parties
+CREATE INDEX IF NOT EXISTS idx_journal_entry_date
+    ON journal_entries (entry_date, id)
+    INCLUDE (source_table, debit, credit) WHERE reverses_id IS NULL;
+CREATE INDEX IF NOT EXISTS idx_journal_source
+    ON journal_entries (source_table, source_id);
+-- An entry is reversed at most once; also serves the "is it reversed" probe
+CREATE UNIQUE INDEX IF NOT EXISTS idx_journal_reverses
+    ON journal_entries (reverses_id) WHERE reverses_id IS NOT NULL;
+
+CREATE OR REPLACE FUNCTION journal_entries_append_only() RETURNS TRIGGER AS $$
+BEGIN
+    RAISE EXCEPTION 'journal_entries is append-only; post a reversal instead';
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_journal_entries_append_only ON journal_entries;
+CREATE TRIGGER trg_journal_entries_append_only
+    BEFORE UPDATE OR DELETE ON journal_entries
+    FOR EACH ROW EXECUTE FUNCTION journal_entries_append_only();
+
+-- Reverse every live leg of one source document
+CREATE OR REPLACE FUNCTION journal_reverse(p_source_table TEXT, p_source_id INTEGER) RETURNS VOID AS $$
+BEGIN
+    INSERT INTO journal_entries (
+        entry_date, account, party_type, party_id, party_name, company_id,
+        source_table, source_id, voucher_no, voucher_type, entry_type,
+        particulars, remark, on_account_of, candidate_name, transaction_id,
+        debit, credit, reverses_id
+    )
+    SELECT j.entry_date, j.account, j.party_type, j.party_id, j.party_name, j.company_id,
+           j.source_table, j.source_id, j.voucher_no, j.voucher_type, j.entry_type,
+           j.particulars, j.remark, j.on_account_of, j.candidate_name, j.transaction_id,
+           j.credit, j.debit, j.id
+    FROM journal_entries j
+    WHERE j.source_table = p_source_table
+      AND j.source_id = p_source_id
+      AND j.reverses_id IS NULL
+      AND NOT EXISTS (SELECT 1 FROM journal_entries r WHERE r.reverses_id = j.id);
+END;
+$$ LANGUAGE plpgsql;
+
+-- ClientLedger: receivable leg of the client named in company_name
+CREATE OR REPLACE FUNCTION journal_client_ledger() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM journal_reverse('client_ledger', OLD.id);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO journal_entries (
+            entry_date, account, party_type, party_name, source_table, source_id,
+            voucher_no, voucher_type, entry_type, particulars, candidate_name, debit, credit
+        ) VALUES (
+            NEW.date, 'receivable', 'client', NEW.company_name, 'client_ledger', NEW.id,
+            NEW.voucher_no, NEW.voucher_type, NEW.entry_type, NEW.particulars, NEW.candidate_name,
+            COALESCE(NEW.debit, 0), COALESCE(NEW.credit, 0)
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- client_adjustments: negative amounts are debits, positive amounts credits
+CREATE OR REPLACE FUNCTION journal_client_adjustment() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM journal_reverse('client_adjustment', OLD.id);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO journal_entries (
+            entry_date, account, party_type, party_id, party_name, company_id, source_table, source_id,
+            voucher_no, voucher_type, entry_type, particulars, remark, on_account_of, debit, credit
+        )
+        SELECT NEW.date_of_service, 'receivable', 'client', NEW.customer_id, b2b.company_name, NEW.company_id,
+               'client_adjustment', NEW.id, 'ADJ-' || NEW.id, 'Adjustment', 'Adjustment',
+               NEW.particular_of_service, NEW.remark, NEW.on_account_of,
+               CASE WHEN NEW.adjustment_amount < 0 THEN ABS(NEW.adjustment_amount) ELSE 0 END,
+               CASE WHEN NEW.adjustment_amount > 0 THEN NEW.adjustment_amount ELSE 0 END
+        FROM (SELECT 1) one
+        LEFT JOIN b2bcustomersdetails b2b ON b2b.id = NEW.customer_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- vendor_services: the vendor's bill, debited to payables
+CREATE OR REPLACE FUNCTION journal_vendor_service() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM journal_reverse('vendor_service', OLD.id);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO journal_entries (
+            entry_date, account, party_type, party_id, party_name, company_id, source_table, source_id,
+            voucher_type, entry_type, particulars, remark, on_account_of, debit, credit
+        )
+        SELECT NEW.service_date, 'payable', 'vendor', NEW.vendor_id, v.vendor_name, NEW.company_id,
+               'vendor_service', NEW.id, 'Service', 'Service',
+               NEW.particulars, NEW.remark, NEW.on_account_of, NEW.amount, 0
+        FROM (SELECT 1) one
+        LEFT JOIN vendors v ON v.id = NEW.vendor_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- vendor_payments: payment to the vendor, credited to payables
+CREATE OR REPLACE FUNCTION journal_vendor_payment() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM journal_reverse('vendor_payment', OLD.id);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO journal_entries (
+            entry_date, account, party_type, party_id, party_name, company_id, source_table, source_id,
+            voucher_type, entry_type, particulars, remark, on_account_of, transaction_id, debit, credit
+        )
+        SELECT NEW.payment_date, 'payable', 'vendor', NEW.vendor_id, v.vendor_name, NEW.company_id,
+               'vendor_payment', NEW.id, 'Payment', 'Payment',
+               'Payment - ' || NEW.transaction_id, NEW.remark, NEW.on_account_of, NEW.transaction_id,
+               0, NEW.amount
+        FROM (SELECT 1) one
+        LEFT JOIN vendors v ON v.id = NEW.vendor_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- vendor_adjustments: same sign convention as client adjustments
+CREATE OR REPLACE FUNCTION journal_vendor_adjustment() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM journal_reverse('vendor_adjustment', OLD.id);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO journal_entries (
+            entry_date, account, party_type, party_id, party_name, company_id, source_table, source_id,
+            voucher_no, voucher_type, entry_type, particulars, remark, on_account_of, transaction_id, debit, credit
+        )
+        SELECT NEW.date_of_service, 'payable', 'vendor', NEW.vendor_id, v.vendor_name, NEW.company_id,
+               'vendor_adjustment', NEW.id, 'ADJ-' || NEW.id, 'Adjustment', 'Adjustment',
+               NEW.particular_of_service, NEW.remark, NEW.on_account_of, 'ADJ-' || NEW.id,
+               CASE WHEN NEW.adjustment_amount < 0 THEN ABS(NEW.adjustment_amount) ELSE 0 END,
+               CASE WHEN NEW.adjustment_amount > 0 THEN NEW.adjustment_amount ELSE 0 END
+        FROM (SELECT 1) one
+        LEFT JOIN vendors v ON v.id = NEW.vendor_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- bank_ledger: receipts are debits (money in), payments credits (money out)
+CREATE OR REPLACE FUNCTION journal_bank_ledger() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM journal_reverse('bank_ledger', OLD.id);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO journal_entries (
+            entry_date, account, party_type, party_id, party_name, company_id, source_table, source_id,
+            voucher_type, entry_type, particulars, remark, transaction_id, debit, credit
+        )
+        SELECT NEW.payment_date, 'bank', 'bank', NEW.company_id, cd.company_name, NEW.company_id,
+               'bank_ledger', NEW.id, initcap(COALESCE(NEW.transaction_type, 'payment')),
+               initcap(COALESCE(NEW.transaction_type, 'payment')),
+               COALESCE(NEW.remark, initcap(COALESCE(NEW.transaction_type, 'payment')) || ' - ' || COALESCE(NEW.vendor_name, 'N/A')),
+               NEW.remark, NEW.transaction_id,
+               CASE WHEN NEW.transaction_type = 'receipt' THEN NEW.amount ELSE 0 END,
+               CASE WHEN NEW.transaction_type = 'receipt' THEN 0 ELSE NEW.amount END
+        FROM (SELECT 1) one
+        LEFT JOIN company_details cd ON cd.id = NEW.company_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Only changes to journaled columns post a reversal (e.g. certificate_id backfills do not)
+DROP TRIGGER IF EXISTS trg_journal_client_ledger_insert ON ClientLedger;
+CREATE TRIGGER trg_journal_client_ledger_insert AFTER INSERT OR DELETE ON ClientLedger
+    FOR EACH ROW EXECUTE FUNCTION journal_client_ledger();
+DROP TRIGGER IF EXISTS trg_journal_client_ledger_update ON ClientLedger;
+CREATE TRIGGER trg_journal_client_ledger_update
+    AFTER UPDATE OF company_name, date, particulars, voucher_no, voucher_type, debit, credit, entry_type, candidate_name
+    ON ClientLedger
+    FOR EACH ROW EXECUTE FUNCTION journal_client_ledger();
+
+DROP TRIGGER IF EXISTS trg_journal_client_adjustments ON client_adjustments;
+CREATE TRIGGER trg_journal_client_adjustments AFTER INSERT OR UPDATE OR DELETE ON client_adjustments
+    FOR EACH ROW EXECUTE FUNCTION journal_client_adjustment();
+
+DROP TRIGGER IF EXISTS trg_journal_vendor_services ON vendor_services;
+CREATE TRIGGER trg_journal_vendor_services AFTER INSERT OR UPDATE OR DELETE ON vendor_services
+    FOR EACH ROW EXECUTE FUNCTION journal_vendor_service();
+
+DROP TRIGGER IF EXISTS trg_journal_vendor_payments ON vendor_payments;
+CREATE TRIGGER trg_journal_vendor_payments AFTER INSERT OR UPDATE OR DELETE ON vendor_payments
+    FOR EACH ROW EXECUTE FUNCTION journal_vendor_payment();
+
+DROP TRIGGER IF EXISTS trg_journal_vendor_adjustments ON vendor_adjustments;
+CREATE TRIGGER trg_journal_vendor_adjustments AFTER INSERT OR UPDATE OR DELETE ON vendor_adjustments
+    FOR EACH ROW EXECUTE FUNCTION journal_vendor_adjustment();
+
+DROP TRIGGER IF EXISTS trg_journal_bank_ledger_insert ON bank_ledger;
+CREATE TRIGGER trg_journal_bank_ledger_insert AFTER INSERT OR DELETE ON bank_ledger
+    FOR EACH ROW EXECUTE FUNCTION journal_bank_ledger();
+DROP TRIGGER IF EXISTS trg_journal_bank_ledger_update ON bank_ledger;
+CREATE TRIGGER trg_journal_bank_ledger_update
+    AFTER UPDATE OF payment_date, transaction_id, company_id, vendor_name, amount, remark, transaction_type
+    ON bank_ledger
+    FOR EACH ROW EXECUTE FUNCTION journal_bank_ledger();
+
+-- Backfill documents posted before the journal existed
+INSERT INTO journal_entries (
+    entry_date, account, party_type, party_name, source_table, source_id,
+    voucher_no, voucher_type, entry_type, particulars, candidate_name, debit, credit, created_at
+)
+SELECT l.date, 'receivable', 'client', l.company_name, 'client_ledger', l.id,
+       l.voucher_no, l.voucher_type, l.entry_type, l.particulars, l.candidate_name,
+       COALESCE(l.debit, 0), COALESCE(l.credit, 0), l.created_at
+FROM ClientLedger l
+WHERE NOT EXISTS (SELECT 1 FROM journal_entries j WHERE j.source_table = 'client_ledger' AND j.source_id = l.id)
+ORDER BY l.id;
+
+INSERT INTO journal_entries (
+    entry_date, account, party_type, party_id, party_name, company_id, source_table, source_id,
+    voucher_no, voucher_type, entry_type, particulars, remark, on_account_of, debit, credit, created_at
+)
+SELECT ca.date_of_service, 'receivable', 'client', ca.customer_id, b2b.company_name, ca.company_id,
+       'client_adjustment', ca.id, 'ADJ-' || ca.id, 'Adjustment', 'Adjustment',
+       ca.particular_of_service, ca.remark, ca.on_account_of,
+       CASE WHEN ca.adjustment_amount < 0 THEN ABS(ca.adjustment_amount) ELSE 0 END,
+       CASE WHEN ca.adjustment_amount > 0 THEN ca.adjustment_amount ELSE 0 END,
+       ca.created_at
+FROM client_adjustments ca
+LEFT JOIN b2bcustomersdetails b2b ON b2b.id = ca.customer_id
+WHERE NOT EXISTS (SELECT 1 FROM journal_entries j WHERE j.source_table = 'client_adjustment' AND j.source_id = ca.id)
+ORDER BY ca.id;
+
+INSERT INTO journal_entries (
+    entry_date, account, party_type, party_id, party_name, company_id, source_table, source_id,
+    voucher_type, entry_type, particulars, remark, on_account_of, debit, credit, created_at
+)
+SELECT vs.service_date, 'payable', 'vendor', vs.vendor_id, v.vendor_name, vs.company_id,
+       'vendor_service', vs.id, 'Service', 'Service',
+       vs.particulars, vs.remark, vs.on_account_of, vs.amount, 0, vs.created_at
+FROM vendor_services vs
+LEFT JOIN vendors v ON v.id = vs.vendor_id
+WHERE NOT EXISTS (SELECT 1 FROM journal_entries j WHERE j.source_table = 'vendor_service' AND j.source_id = vs.id)
+ORDER BY vs.id;
+
+INSERT INTO journal_entries (
+    entry_date, account, party_type, party_id, party_name, company_id, source_table, source_id,
+    voucher_type, entry_type, particulars, remark, on_account_of, transaction_id, debit, credit, created_at
+)
+SELECT vp.payment_date, 'payable', 'vendor', vp.vendor_id, v.vendor_name, vp.company_id,
+       'vendor_payment', vp.id, 'Payment', 'Payment',
+       'Payment - ' || vp.transaction_id, vp.remark, vp.on_account_of, vp.transaction_id,
+       0, vp.amount, vp.created_at
+FROM vendor_payments vp
+LEFT JOIN vendors v ON v.id = vp.vendor_id
+WHERE NOT EXISTS (SELECT 1 FROM journal_entries j WHERE j.source_table = 'vendor_payment' AND j.source_id = vp.id)
+ORDER BY vp.id;
+
+INSERT INTO journal_entries (
+    entry_date, account, party_type, party_id, party_name, company_id, source_table, source_id,
+    voucher_no, voucher_type, entry_type, particulars, remark, on_account_of, transaction_id, debit, credit, created_at
+)
+SELECT va.date_of_service, 'payable', 'vendor', va.vendor_id, v.vendor_name, va.company_id,
+       'vendor_adjustment', va.id, 'ADJ-' || va.id, 'Adjustment', 'Adjustment',
+       va.particular_of_service, va.remark, va.on_account_of, 'ADJ-' || va.id,
+       CASE WHEN va.adjustment_amount < 0 THEN ABS(va.adjustment_amount) ELSE 0 END,
+       CASE WHEN va.adjustment_amount > 0 THEN va.adjustment_amount ELSE 0 END,
+       va.created_at
+FROM vendor_adjustments va
+LEFT JOIN vendors v ON v.id = va.vendor_id
+WHERE NOT EXISTS (SELECT 1 FROM journal_entries j WHERE j.source_table = 'vendor_adjustment' AND j.source_id = va.id)
+ORDER BY va.id;
+
+INSERT INTO journal_entries (
+    entry_date, account, party_type, party_id, party_name, company_id, source_table, source_id,
+    voucher_type, entry_type, particulars, remark, transaction_id, debit, credit, created_at
+)
+SELECT b.payment_date, 'bank', 'bank', b.company_id, cd.company_name, b.company_id,
+       'bank_ledger', b.id, initcap(COALESCE(b.transaction_type, 'payment')),
+       initcap(COALESCE(b.transaction_type, 'payment')),
+       COALESCE(b.remark, initcap(COALESCE(b.transaction_type, 'payment')) || ' - ' || COALESCE(b.vendor_name, 'N/A')),
+       b.remark, b.transaction_id,
+       CASE WHEN b.transaction_type = 'receipt' THEN b.amount ELSE 0 END,
+       CASE WHEN b.transaction_type = 'receipt' THEN 0 ELSE b.amount END,
+       b.created_at
+FROM bank_ledger b
+LEFT JOIN company_details cd ON cd.id = b.company_id
+WHERE NOT EXISTS (SELECT 1 FROM journal_entries j WHERE j.source_table = 'bank_ledger' AND j.source_id = b.id)
+ORDER BY b.id;
+
+-- Live legs: neither a reversal nor reversed. Ledger reads go through this view.
+CREATE OR REPLACE VIEW journal_ledger AS
+SELECT j.*
+FROM journal_entries j
+WHERE j.reverses_id IS NULL
+  AND NOT EXISTS (SELECT 1 FROM journal_entries r WHERE r.reverses_id = j.id);
+
+COMMENT ON TABLE journal_entries IS 'Append-only double-entry journal of every receivable, payable and bank leg; written by triggers on the source tables';
+COMMENT ON COLUMN journal_entries.period IS 'Accounting period as YYYYMM, derived from entry_date';
+COMMENT ON COLUMN journal_entries.source_table IS 'client_ledger, client_adjustment, vendor_service, vendor_payment, vendor_adjustment or bank_ledger';
+COMMENT ON COLUMN journal_entries.reverses_id IS 'Set on reversal entries: the journal entry this row cancels';
+COMMENT ON VIEW journal_ledger IS 'Live journal legs (excludes reversals and reversed entries)';
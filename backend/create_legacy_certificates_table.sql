@@ -21,6 +21,7 @@ CREATE INDEX IF NOT EXISTS idx_legacy_certificates_candidate_name ON legacy_cert
 CREATE INDEX IF NOT EXISTS idx_legacy_certificates_passport ON legacy_certificates(passport);
 CREATE INDEX IF NOT EXISTS idx_legacy_certificates_certificate_number ON legacy_certificates(certificate_number);
 CREATE INDEX IF NOT EXISTS idx_legacy_certificates_created_at ON legacy_certificates(created_at);
+CREATE INDEX IF NOT EXISTS idx_legacy_certificates_expiry_date ON legacy_certificates(expiry_date, id);
 
 -- Add check constraints for date validation
 ALTER TABLE legacy_certificates DROP CONSTRAINT IF EXISTS chk_dates_valid;
@@ -69,4 +70,5 @@ BEGIN
     RAISE NOTICE '- idx_legacy_certificates_passport';
     RAISE NOTICE '- idx_legacy_certificates_certificate_number';
     RAISE NOTICE '- idx_legacy_certificates_created_at';
+    RAISE NOTICE '- idx_legacy_certificates_expiry_date';
 END $$;
\ No newline at end of file
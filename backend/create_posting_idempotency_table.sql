@@ -0,0 +1,16 @@
+-- Idempotency keys for atomic receipt / vendor payment / vendor service posting
+-- Rows are written by database/posting.py in the same statement as the posting itself.
+-- This script is idempotent and can be run multiple times safely
+
+CREATE TABLE IF NOT EXISTS posting_idempotency (
+    idempotency_key VARCHAR(128) PRIMARY KEY,
+    posting_kind VARCHAR(50) NOT NULL,
+    document_id INTEGER NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_posting_idempotency_created_at ON posting_idempotency(created_at);
+
+COMMENT ON TABLE posting_idempotency IS 'Client-supplied idempotency keys and the document each one posted';
+COMMENT ON COLUMN posting_idempotency.posting_kind IS 'receipt, vendor_payment or vendor_service';
+COMMENT ON COLUMN posting_idempotency.document_id IS 'receipt_amount_id / vendor_payments.id / vendor_services.id';
@@ -0,0 +1,169 @@
+-- Maintained row counts: one row per (table, dimension, key)
+-- dimension '' / key '' is the table total; other dimensions count rows per
+-- value of a commonly filtered column (NULL values are counted under key '').
+-- dimension 'inserted' only ever goes up, so pollers can detect new rows by
+-- comparing it with the value they saw last instead of scanning by timestamp.
+-- AFTER triggers keep the counts in the writing transaction; the backfill
+-- below recomputes them from the tables while writes are locked out.
+-- This script is idempotent and can be run multiple times safely
+
+CREATE TABLE IF NOT EXISTS row_counters (
+    table_name VARCHAR(63) NOT NULL,
+    dimension VARCHAR(63) NOT NULL DEFAULT '',
+    key TEXT NOT NULL DEFAULT '',
+    count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (table_name, dimension, key)
+);
+
+CREATE OR REPLACE FUNCTION row_counters_bump(p_table TEXT, p_dimensions TEXT[], p_keys TEXT[], p_delta BIGINT)
+RETURNS VOID AS $$
+    INSERT INTO row_counters (table_name, dimension, key, count)
+    SELECT p_table, t.dimension, COALESCE(t.key, ''), p_delta
+    FROM unnest(p_dimensions, p_keys) AS t(dimension, key)
+    ON CONFLICT (table_name, dimension, key) DO UPDATE SET count = row_counters.count + EXCLUDED.count;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION row_counters_total() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM row_counters_bump(TG_TABLE_NAME, ARRAY['', 'inserted'], ARRAY['', ''], 1);
+    ELSE
+        PERFORM row_counters_bump(TG_TABLE_NAME, ARRAY[''], ARRAY[''], -1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION row_counters_truncated() RETURNS TRIGGER AS $$
+BEGIN
+    DELETE FROM row_counters WHERE table_name = TG_TABLE_NAME AND dimension NOT IN ('', 'inserted');
+    UPDATE row_counters SET count = 0 WHERE table_name = TG_TABLE_NAME AND dimension = '';
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION row_counters_certificate_selections() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        PERFORM row_counters_bump('certificate_selections',
+            ARRAY['', 'candidate_id', 'client_name', 'status'],
+            ARRAY['', OLD.candidate_id::TEXT, OLD.client_name, OLD.status], -1);
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        PERFORM row_counters_bump('certificate_selections',
+            ARRAY['', 'candidate_id', 'client_name', 'status'],
+            ARRAY['', NEW.candidate_id::TEXT, NEW.client_name, NEW.status], 1);
+    END IF;
+    IF TG_OP = 'INSERT' THEN
+        PERFORM row_counters_bump('certificate_selections', ARRAY['inserted'], ARRAY[''], 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Only uploads whose file is in storage are listed, so only those are counted
+CREATE OR REPLACE FUNCTION row_counters_candidate_uploads() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        IF COALESCE(OLD.file_path, '') <> '' THEN
+            PERFORM row_counters_bump('candidate_uploads',
+                ARRAY['', 'candidate_name'], ARRAY['', OLD.candidate_name], -1);
+        END IF;
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        IF COALESCE(NEW.file_path, '') <> '' THEN
+            PERFORM row_counters_bump('candidate_uploads',
+                ARRAY['', 'candidate_name'], ARRAY['', NEW.candidate_name], 1);
+        END IF;
+    END IF;
+    IF TG_OP = 'INSERT' THEN
+        PERFORM row_counters_bump('candidate_uploads', ARRAY['inserted'], ARRAY[''], 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Recompute every counter while writers wait on the table locks
+LOCK TABLE certificate_selections, candidate_uploads, candidates, receiptinvoicedata, Master_Database_Table_A
+    IN SHARE ROW EXCLUSIVE MODE;
+
+DROP TRIGGER IF EXISTS trg_row_counters_certificate_selections ON certificate_selections;
+CREATE TRIGGER trg_row_counters_certificate_selections AFTER INSERT OR DELETE ON certificate_selections
+    FOR EACH ROW EXECUTE FUNCTION row_counters_certificate_selections();
+DROP TRIGGER IF EXISTS trg_row_counters_certificate_selections_update ON certificate_selections;
+CREATE TRIGGER trg_row_counters_certificate_selections_update
+    AFTER UPDATE OF candidate_id, client_name, status ON certificate_selections
+    FOR EACH ROW EXECUTE FUNCTION row_counters_certificate_selections();
+
+DROP TRIGGER IF EXISTS trg_row_counters_candidate_uploads ON candidate_uploads;
+CREATE TRIGGER trg_row_counters_candidate_uploads AFTER INSERT OR DELETE ON candidate_uploads
+    FOR EACH ROW EXECUTE FUNCTION row_counters_candidate_uploads();
+DROP TRIGGER IF EXISTS trg_row_counters_candidate_uploads_update ON candidate_uploads;
+CREATE TRIGGER trg_row_counters_candidate_uploads_update
+    AFTER UPDATE OF candidate_name, file_path ON candidate_uploads
+    FOR EACH ROW EXECUTE FUNCTION row_counters_candidate_uploads();
+
+DROP TRIGGER IF EXISTS trg_row_counters_candidates ON candidates;
+CREATE TRIGGER trg_row_counters_candidates AFTER INSERT OR DELETE ON candidates
+    FOR EACH ROW EXECUTE FUNCTION row_counters_total();
+
+DROP TRIGGER IF EXISTS trg_row_counters_receiptinvoicedata ON receiptinvoicedata;
+CREATE TRIGGER trg_row_counters_receiptinvoicedata AFTER INSERT OR DELETE ON receiptinvoicedata
+    FOR EACH ROW EXECUTE FUNCTION row_counters_total();
+
+DROP TRIGGER IF EXISTS trg_row_counters_master_database_table_a ON Master_Database_Table_A;
+CREATE TRIGGER trg_row_counters_master_database_table_a AFTER INSERT OR DELETE ON Master_Database_Table_A
+    FOR EACH ROW EXECUTE FUNCTION row_counters_total();
+
+DROP TRIGGER IF EXISTS trg_row_counters_certificate_selections_truncate ON certificate_selections;
+CREATE TRIGGER trg_row_counters_certificate_selections_truncate AFTER TRUNCATE ON certificate_selections
+    FOR EACH STATEMENT EXECUTE FUNCTION row_counters_truncated();
+DROP TRIGGER IF EXISTS trg_row_counters_candidate_uploads_truncate ON candidate_uploads;
+CREATE TRIGGER trg_row_counters_candidate_uploads_truncate AFTER TRUNCATE ON candidate_uploads
+    FOR EACH STATEMENT EXECUTE FUNCTION row_counters_truncated();
+DROP TRIGGER IF EXISTS trg_row_counters_candidates_truncate ON candidates;
+CREATE TRIGGER trg_row_counters_candidates_truncate AFTER TRUNCATE ON candidates
+    FOR EACH STATEMENT EXECUTE FUNCTION row_counters_truncated();
+DROP TRIGGER IF EXISTS trg_row_counters_receiptinvoicedata_truncate ON receiptinvoicedata;
+CREATE TRIGGER trg_row_counters_receiptinvoicedata_truncate AFTER TRUNCATE ON receiptinvoicedata
+    FOR EACH STATEMENT EXECUTE FUNCTION row_counters_truncated();
+DROP TRIGGER IF EXISTS trg_row_counters_master_database_table_a_truncate ON Master_Database_Table_A;
+CREATE TRIGGER trg_row_counters_master_database_table_a_truncate AFTER TRUNCATE ON Master_Database_Table_A
+    FOR EACH STATEMENT EXECUTE FUNCTION row_counters_truncated();
+
+DELETE FROM row_counters
+WHERE table_name IN ('certificate_selections', 'candidate_uploads', 'candidates',
+                     'receiptinvoicedata', 'master_database_table_a')
+  AND dimension <> 'inserted';
+
+INSERT INTO row_counters (table_name, dimension, key, count)
+SELECT 'certificate_selections', '', '', COUNT(*) FROM certificate_selections
+UNION ALL
+SELECT 'certificate_selections', 'candidate_id', COALESCE(candidate_id::TEXT, ''), COUNT(*)
+FROM certificate_selections GROUP BY candidate_id
+UNION ALL
+SELECT 'certificate_selections', 'client_name', COALESCE(client_name, ''), COUNT(*)
+FROM certificate_selections GROUP BY COALESCE(client_name, '')
+UNION ALL
+SELECT 'certificate_selections', 'status', COALESCE(status, ''), COUNT(*)
+FROM certificate_selections GROUP BY COALESCE(status, '')
+UNION ALL
+SELECT 'candidate_uploads', '', '', COUNT(*) FROM candidate_uploads
+WHERE file_path IS NOT NULL AND file_path <> ''
+UNION ALL
+SELECT 'candidate_uploads', 'candidate_name', COALESCE(candidate_name, ''), COUNT(*)
+FROM candidate_uploads WHERE file_path IS NOT NULL AND file_path <> '' GROUP BY COALESCE(candidate_name, '')
+UNION ALL
+SELECT 'candidates', '', '', COUNT(*) FROM candidates
+UNION ALL
+SELECT 'receiptinvoicedata', '', '', COUNT(*) FROM receiptinvoicedata
+UNION ALL
+SELECT 'master_database_table_a', '', '', COUNT(*) FROM Master_Database_Table_A;
+
+-- The insert counter starts at the current row count and is never reset
+INSERT INTO row_counters (table_name, dimension, key, count)
+SELECT table_name, 'inserted', '', count FROM row_counters WHERE dimension = '' AND key = ''
+ON CONFLICT (table_name, dimension, key) DO NOTHING;
+
+COMMENT ON TABLE row_counters IS 'Trigger-maintained row counts per table and per filtered column value; read through database.counters';
+COMMENT ON COLUMN row_counters.dimension IS 'Empty for the table total, a column name for per-value counts, or inserted for the monotonic insert counter';
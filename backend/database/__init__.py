@@ -44,12 +44,15 @@ def create_database_url():
         logger.error(f"[DB] Failed to build database URL: {e}")
         raise
 
-def init_db(app):
+def init_db(app, check_connection=True):
     """
     Initialize database connection for Flask app.
 
     Args:
         app: Flask application instance
+        check_connection (bool): Open a throwaway engine and run SELECT 1.
+            The production entry point (wsgi.py) skips this and checks the
+            psycopg2 pool once in its pre-fork warm-up instead.
 
     Raises:
         Exception: If database connection fails
@@ -71,6 +74,9 @@ def init_db(app):
         # Initialize SQLAlchemy with the app
         db.init_app(app)
 
+        if not check_connection:
+            return
+
         # Test the connection
         with app.app_context():
             # Create engine to test connection
@@ -0,0 +1,160 @@
+"""
+Candidate directory for dropdowns and name search
+
+candidate_directory (create_candidate_directory.sql) holds one row per
+candidate name found in Master_Database_Table_A, candidate_uploads,
+certificate_selections or candidates. Triggers on those tables keep it in
+step with every write path and copy id and passport from candidates, so a
+dropdown or keystroke search is an indexed prefix lookup returning the top
+matches instead of a sorted DISTINCT over all four tables. Where the
+directory is not installed (or the lookup fails) search() runs the same
+filter over the source tables.
+
+Usage:
+    from database.candidate_directory import search
+
+    matches = search('jane', limit=20)
+    dropdown = search(limit=1000, with_passport=True)
+"""
+
+import logging
+import os
+import time
+
+from database.schema import install_once
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'create_candidate_directory.sql')
+
+# Serializes concurrent installs across processes
+_ADVISORY_LOCK_KEY = 7301046
+# True once the schema exists
+_CHECK_SQL = "SELECT to_regclass('candidate_directory') IS NOT NULL"
+
+# Columns of one directory entry, in output order
+DIRECTORY_FIELDS = ('candidate_name', 'candidate_id', 'passport', 'sources')
+
+# After a failed install or lookup, query the source tables for this long
+RETRY_SECONDS = 60
+
+_unavailable_until = 0.0
+
+_DIRECTORY_SQL = """
+    SELECT candidate_name, candidate_id, passport,
+           array_remove(ARRAY[
+               CASE WHEN master_rows > 0 THEN 'master' END,
+               CASE WHEN upload_rows > 0 THEN 'uploads' END,
+               CASE WHEN certificate_rows > 0 THEN 'certificates' END,
+               CASE WHEN candidate_rows > 0 THEN 'candidates' END
+           ], NULL) AS sources
+    FROM candidate_directory
+    WHERE {conditions}
+    ORDER BY candidate_name
+    {limit}
+"""
+
+_SOURCES_SQL = """
+    SELECT n.candidate_name, c.id AS candidate_id,
+           NULLIF(TRIM(c.json_data->>'passport'), '') AS passport,
+           array_agg(DISTINCT n.source ORDER BY n.source) AS sources
+    FROM (
+        SELECT candidate_name, 'master' AS source FROM Master_Database_Table_A
+        UNION
+        SELECT candidate_name, 'uploads' FROM candidate_uploads
+        UNION
+        SELECT candidate_name, 'certificates' FROM certificate_selections
+        UNION
+        SELECT candidate_name, 'candidates' FROM candidates
+    ) AS n
+    LEFT JOIN candidates c ON c.candidate_name = n.candidate_name
+    WHERE n.candidate_name IS NOT NULL AND n.candidate_name <> '' AND {conditions}
+    GROUP BY n.candidate_name, c.id, c.json_data
+    ORDER BY n.candidate_name
+    {limit}
+"""
+
+
+def ensure_directory(force=False):
+    """
+    Install the directory (table, indexes, triggers, backfill) once per database.
+
+    Args:
+        force (bool): Re-run the script even if the directory exists, e.g. to
+            rebuild it after the triggers were disabled
+
+    Returns:
+        bool: True if the script was run by this call
+    """
+    ran = install_once(_CHECK_SQL, SCHEMA_FILE, _ADVISORY_LOCK_KEY, force=force)
+    if ran:
+        logger.info("[DIRECTORY] Candidate directory installed and backfilled")
+    return ran
+
+
+def like_prefix(prefix):
+    """LIKE pattern matching values that start with prefix (wildcards escaped)"""
+    escaped = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return escaped + '%'
+
+
+def build_search_query(prefix=None, limit=None, with_passport=False, from_directory=True):
+    """
+    SQL and parameters for a directory search.
+
+    Args:
+        prefix (str): Case-insensitive prefix of the name or passport (None for all)
+        limit (int): Maximum matches (None for all)
+        with_passport (bool): Only candidates with a passport on file
+        from_directory (bool): False builds the equivalent query over the source tables
+
+    Returns:
+        tuple: (query, params)
+    """
+    name_col = 'candidate_name' if from_directory else 'n.candidate_name'
+    passport_col = 'passport' if from_directory else "NULLIF(TRIM(c.json_data->>'passport'), '')"
+
+    conditions, params = [], []
+    if prefix:
+        conditions.append(f"(LOWER({name_col}) LIKE %s OR UPPER({passport_col}) LIKE %s)")
+        params.extend([like_prefix(prefix.lower()), like_prefix(prefix.upper())])
+    if with_passport:
+        conditions.append(f"{passport_col} IS NOT NULL")
+    page = ""
+    if limit is not None:
+        page = "LIMIT %s"
+        params.append(limit)
+
+    template = _DIRECTORY_SQL if from_directory else _SOURCES_SQL
+    return template.format(conditions=' AND '.join(conditions) or 'TRUE', limit=page), params
+
+
+def search(prefix=None, limit=None, with_passport=False):
+    """
+    Candidates whose name or passport starts with prefix, ordered by name.
+
+    Args:
+        prefix (str): Case-insensitive prefix (None or '' for all)
+        limit (int): Maximum matches (None for all)
+        with_passport (bool): Only candidates with a passport on file
+
+    Returns:
+        list: dicts with DIRECTORY_FIELDS
+    """
+    global _unavailable_until
+    from database.db_connection import execute_query
+
+    prefix = (prefix or '').strip()
+    if time.monotonic() >= _unavailable_until:
+        try:
+            ensure_directory()
+            query, params = build_search_query(prefix, limit, with_passport)
+            return execute_query(query, params) or []
+        except Exception as e:
+            _unavailable_until = time.monotonic() + RETRY_SECONDS
+            logger.warning(f"[DIRECTORY] Candidate directory unavailable, "
+                           f"searching source tables for {RETRY_SECONDS}s: {e}")
+
+    query, params = build_search_query(prefix, limit, with_passport, from_directory=False)
+    return execute_query(query, params) or []
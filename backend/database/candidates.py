@@ -0,0 +1,251 @@
+"""
+Candidate persistence
+
+Saving a candidate writes the candidates row, one candidate_uploads row per
+file of the temp upload session and the Master_Database_Table_A update in a
+single transaction on one connection. Files are promoted from the session
+folder into CANDIDATE_<id>/ with os.replace instead of being read into memory
+and written again; if anything fails before the commit completes, the rows
+are rolled back and the files are moved back into the session. When an
+existing candidate is saved again, the files being replaced are first moved
+aside (<name>.previous) and put back on failure, or deleted after the commit.
+
+Usage:
+    from database.candidates import plan_uploads, save_candidate_from_session
+
+    uploads = plan_uploads(temp_session_folder, temp_files, payment_proof='pay.jpg')
+    result = save_candidate_from_session(candidate_name, session_id, data, ocr_data, uploads)
+    result['candidate_id'], result['upload_ids']
+"""
+
+import errno
+import json
+import logging
+import mimetypes
+import os
+import shutil
+
+logger = logging.getLogger(__name__)
+
+# Form field key (file name stem in the temp session) -> image_type
+FIELD_TO_IMAGE_TYPE = {
+    'photo': 'photo',
+    'signature': 'signature',
+    'passport_front_img': 'passport_front',
+    'passport_back_img': 'passport_back',
+    'cdc_img': 'cdc',
+    'marksheet': 'marksheet',
+    'coc_img': 'coc'
+}
+
+# image_type -> fixed file name inside CANDIDATE_<id>/
+UPLOAD_FILENAMES = {
+    'photo': 'photo.png',
+    'signature': 'signature.png',
+    'passport_front': 'passport_front.jpg',
+    'passport_back': 'passport_back.jpg',
+    'cdc': 'cdc.jpg',
+    'coc': 'coc.jpg',
+    'payment': 'payment.jpg',
+    'marksheet': 'marksheet.pdf'
+}
+
+UPLOAD_COLUMNS = ('candidate_id', 'candidate_name', 'file_name', 'file_type', 'file_path',
+                  'mime_type', 'file_size', 'image_type')
+
+CANDIDATE_UPSERT_SQL = """
+    INSERT INTO candidates (
+        candidate_name, session_id, json_data, ocr_data, last_updated
+    ) VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP)
+    ON CONFLICT (candidate_name)
+    DO UPDATE SET
+        session_id = EXCLUDED.session_id,
+        json_data = EXCLUDED.json_data,
+        ocr_data = EXCLUDED.ocr_data,
+        last_updated = CURRENT_TIMESTAMP
+    RETURNING id
+"""
+
+
+def upload_filename(image_type, file_type):
+    """Fixed stored file name for an image type"""
+    return UPLOAD_FILENAMES.get(image_type, f"{image_type or 'unknown'}.{file_type}")
+
+
+def plan_uploads(temp_folder, filenames, payment_proof=None):
+    """
+    Describe the files of a temp upload session as candidate_uploads rows.
+
+    The payment screenshot (if any) comes first with image_type 'payment';
+    every other file gets its image_type from its name's stem. Stored names
+    that would collide get a numeric suffix so no file overwrites another.
+
+    Args:
+        temp_folder (str): Temp session folder
+        filenames (list): File names in the session (manifest excluded)
+        payment_proof (str): File name of the payment screenshot
+
+    Returns:
+        list: dicts with source, file_name, file_type, mime_type, file_size,
+            image_type and stored_name
+    """
+    ordered = [(payment_proof, 'payment')] if payment_proof and payment_proof in filenames else []
+    ordered += [(name, FIELD_TO_IMAGE_TYPE.get(name.split('.')[0]))
+                for name in filenames if name != payment_proof]
+
+    uploads = []
+    used = set()
+    for filename, image_type in ordered:
+        source = os.path.join(temp_folder, filename)
+        file_type = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+        stored_name = upload_filename(image_type, file_type)
+        stem, ext = os.path.splitext(stored_name)
+        counter = 1
+        while stored_name in used:
+            stored_name = f"{stem}_{counter}{ext}"
+            counter += 1
+        used.add(stored_name)
+        uploads.append({
+            'source': source,
+            'file_name': filename,
+            'file_type': file_type,
+            'mime_type': mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+            'file_size': os.path.getsize(source),
+            'image_type': image_type,
+            'stored_name': stored_name
+        })
+    return uploads
+
+
+def promote_file(source, target):
+    """
+    Move a file into place atomically.
+
+    os.replace is a rename on the same filesystem. When the temp folder and
+    the storage root are on different filesystems the file is copied next to
+    the target first, so the target still appears in one step.
+    """
+    try:
+        os.replace(source, target)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        staging = f"{target}.tmp"
+        shutil.copyfile(source, staging)
+        os.replace(staging, target)
+        os.remove(source)
+
+
+def _insert_uploads_sql(count):
+    """One multi-row INSERT for count candidate_uploads rows"""
+    row = '(' + ', '.join(['%s'] * len(UPLOAD_COLUMNS)) + ', CURRENT_TIMESTAMP)'
+    return (f"INSERT INTO candidate_uploads ({', '.join(UPLOAD_COLUMNS)}, upload_time) "
+            f"VALUES {', '.join([row] * count)} RETURNING id")
+
+
+def _restore(promoted, candidate_dir, replaced=()):
+    """Move promoted files back into the temp session and replaced files back into place after a failed save"""
+    for source, target in reversed(promoted):
+        try:
+            promote_file(target, source)
+        except OSError as e:
+            logger.error(f"[CANDIDATE] Could not move {target} back to {source}: {e}")
+    for target, previous in reversed(replaced):
+        try:
+            os.replace(previous, target)
+        except OSError as e:
+            logger.error(f"[CANDIDATE] Could not restore {target} from {previous}: {e}")
+    try:
+        os.rmdir(candidate_dir)
+    except OSError:
+        pass
+
+
+def save_candidate_from_session(candidate_name, session_id, data, ocr_data, uploads, storage_root=None, conn=None):
+    """
+    Save a candidate, its uploads and its master table entry in one transaction.
+
+    Args:
+        candidate_name (str): Unique candidate name
+        session_id (str): Temp upload session the files come from
+        data (dict): Candidate form data (stored as json_data)
+        ocr_data (dict): OCR results, if any
+        uploads (list): Rows from plan_uploads()
+        storage_root (str): Candidate storage root (default Config.BASE_STORAGE_PATH)
+        conn: Connection to use (default: one from the pool)
+
+    Returns:
+        dict: candidate_id and upload_ids
+    """
+    from database.db_connection import DatabaseConnection
+    from hooks.post_data_insert import update_master_table_after_candidate_insert
+
+    if storage_root is None:
+        from config import Config
+        storage_root = Config.BASE_STORAGE_PATH
+
+    owns_conn = conn is None
+    if owns_conn:
+        conn = DatabaseConnection.get_connection()
+    promoted = []
+    replaced = []  # (target, previous) for files of an earlier save
+    candidate_dir = None
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(CANDIDATE_UPSERT_SQL, (
+                candidate_name, session_id, json.dumps(data),
+                json.dumps(ocr_data) if ocr_data else None
+            ))
+            candidate_id = cursor.fetchone()[0]
+
+            candidate_folder = f"CANDIDATE_{candidate_id}"
+            candidate_dir = os.path.join(storage_root, candidate_folder)
+            os.makedirs(candidate_dir, exist_ok=True)
+
+            upload_ids = []
+            if uploads:
+                params = []
+                for upload in uploads:
+                    params.extend((
+                        candidate_id, candidate_name, upload['file_name'], upload['file_type'],
+                        f"{candidate_folder}/{upload['stored_name']}", upload['mime_type'],
+                        upload['file_size'], upload['image_type']
+                    ))
+                cursor.execute(_insert_uploads_sql(len(uploads)), params)
+                upload_ids = [row[0] for row in cursor.fetchall()]
+
+            # The master table entry is best effort, as before: a failure
+            # there must not abort the candidate save
+            cursor.execute("SAVEPOINT master_table")
+            if update_master_table_after_candidate_insert(candidate_id, cursor=cursor):
+                cursor.execute("RELEASE SAVEPOINT master_table")
+            else:
+                cursor.execute("ROLLBACK TO SAVEPOINT master_table")
+
+            for upload in uploads:
+                target = os.path.join(candidate_dir, upload['stored_name'])
+                if os.path.exists(target):
+                    # Same directory, so this rename cannot fail half way
+                    previous = f"{target}.previous"
+                    os.replace(target, previous)
+                    replaced.append((target, previous))
+                promote_file(upload['source'], target)
+                promoted.append((upload['source'], target))
+
+        conn.commit()
+        for _, previous in replaced:
+            try:
+                os.remove(previous)
+            except OSError as e:
+                logger.warning(f"[CANDIDATE] Could not remove replaced file {previous}: {e}")
+        logger.info(f"[CANDIDATE] Saved candidate {candidate_name} (ID {candidate_id}) with {len(upload_ids)} files")
+        return {'candidate_id': candidate_id, 'upload_ids': upload_ids}
+
+    except Exception:
+        conn.rollback()
+        if candidate_dir:
+            _restore(promoted, candidate_dir, replaced)
+        raise
+    finally:
+        if owns_conn:
+            DatabaseConnection.return_connection(conn)
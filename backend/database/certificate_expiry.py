@@ -0,0 +1,117 @@
+"""
+Expiring certificates report across issued and legacy certificates
+
+certificate_selections (issued here) and legacy_certificates (imported) both
+keep expiry_date as a DATE (normalize_certificate_dates.sql), each with a
+B-tree index on (expiry_date, id). A page of "expiring between X and Y" is
+a UNION ALL of two range conditions on those indexes ordered by
+(expiry_date, id), which the planner answers with a merge of two index scans
+that stops at LIMIT, so the report never parses or sorts every certificate.
+Per-source totals are index-only counts over the same ranges.
+
+Usage:
+    from database.certificate_expiry import fetch_expiring
+
+    report = fetch_expiring(date(2026, 1, 1), date(2026, 3, 31), limit=100)
+    report['rows'], report['totals']   # totals: {'issued': n, 'legacy': m}
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+SOURCES = ('issued', 'legacy')
+
+# Columns of one report row, in output order
+EXPIRY_FIELDS = ('source', 'id', 'certificate_number', 'candidate_name', 'client_name', 'certificate_name',
+                 'issue_date', 'expiry_date', 'days_left')
+
+# Text columns are cast so both branches have identical types, which lets the
+# planner flatten the UNION ALL and merge the two ordered index scans
+_SELECTS = {
+    'issued': """
+        SELECT 'issued'::text AS source, id, certificate_number::text, candidate_name::text,
+               client_name::text, certificate_name::text, issue_date, expiry_date
+        FROM certificate_selections
+        WHERE expiry_date BETWEEN %s AND %s""",
+    'legacy': """
+        SELECT 'legacy'::text AS source, id, certificate_number::text, candidate_name::text,
+               NULL::text AS client_name, certificate_name::text, issue_date, expiry_date
+        FROM legacy_certificates
+        WHERE expiry_date BETWEEN %s AND %s""",
+}
+
+_TABLES = {'issued': 'certificate_selections', 'legacy': 'legacy_certificates'}
+
+
+def build_expiring_query(date_from, date_to, sources=SOURCES, limit=None, offset=0):
+    """
+    SQL and parameters for one page of certificates expiring in [date_from, date_to].
+
+    Args:
+        date_from (date): First expiry date included
+        date_to (date): Last expiry date included
+        sources (tuple): 'issued' and/or 'legacy'
+        limit (int): Rows per page (None for all)
+        offset (int): Rows to skip
+
+    Returns:
+        tuple: (query, params)
+    """
+    branches, params = [], []
+    for source in sources:
+        branches.append(_SELECTS[source])
+        params.extend([date_from, date_to])
+    page = ""
+    if limit is not None:
+        page = "LIMIT %s OFFSET %s"
+        params.extend([limit, offset])
+    elif offset:
+        page = "OFFSET %s"
+        params.append(offset)
+
+    query = f"""
+        SELECT source, id, certificate_number, candidate_name, client_name, certificate_name,
+               issue_date, expiry_date, expiry_date - CURRENT_DATE AS days_left
+        FROM ({' UNION ALL '.join(branches)}
+        ) expiring
+        ORDER BY expiry_date, id, source
+        {page}
+    """
+    return query, params
+
+
+def build_totals_query(date_from, date_to, sources=SOURCES):
+    """SQL and parameters counting each source's certificates in the range"""
+    counts, params = [], []
+    for source in sources:
+        counts.append(f"(SELECT COUNT(*) FROM {_TABLES[source]} WHERE expiry_date BETWEEN %s AND %s) AS {source}")
+        params.extend([date_from, date_to])
+    return f"SELECT {', '.join(counts)}", params
+
+
+def fetch_expiring(date_from, date_to, sources=SOURCES, limit=None, offset=0):
+    """
+    One page of certificates expiring between two dates, soonest first.
+
+    Args:
+        date_from (date): First expiry date included
+        date_to (date): Last expiry date included
+        sources (tuple): 'issued' and/or 'legacy'
+        limit (int): Rows per page (None for all)
+        offset (int): Rows to skip
+
+    Returns:
+        dict: rows (EXPIRY_FIELDS), totals per source, total
+    """
+    from database.db_connection import execute_query
+
+    query, params = build_expiring_query(date_from, date_to, sources, limit, offset)
+    rows = execute_query(query, params) or []
+    totals_query, totals_params = build_totals_query(date_from, date_to, sources)
+    counts = execute_query(totals_query, totals_params)
+    totals = {source: (counts[0][source] if counts else 0) for source in sources}
+
+    logger.info(f"[EXPIRY] {len(rows)} of {sum(totals.values())} certificates expiring "
+                f"{date_from.isoformat()}..{date_to.isoformat()}")
+    return {'rows': rows, 'totals': totals, 'total': sum(totals.values())}
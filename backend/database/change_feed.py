@@ -0,0 +1,256 @@
+"""
+Change feed: Postgres NOTIFY events fanned out to Server-Sent Events streams
+
+Triggers from create_change_feed.sql send a JSON payload on channel
+change_feed for every changed journal leg, candidate, candidate upload and
+certificate selection, with the key of the changed entity. Each worker
+process runs at most one listener thread on its own connection (outside
+the pool, since it stays in LISTEN); it starts with the first subscriber and
+stops, closing the connection, when the last one leaves. Events are copied
+to a bounded queue per subscriber filtered by topic, so a screen refetches
+only the entity that changed instead of polling whole lists. A subscriber
+that falls behind, or any subscriber after the listener reconnects, gets a
+'resync' event meaning "refetch everything".
+
+Usage:
+    from database.change_feed import get_change_feed, format_event
+
+    subscription = get_change_feed().subscribe(['ledger', 'certificates'])
+    try:
+        event = subscription.get(timeout=15)
+        chunk = format_event(event)
+    finally:
+        get_change_feed().unsubscribe(subscription)
+"""
+
+import itertools
+import json
+import logging
+import os
+import queue
+import select
+import threading
+
+from database.schema import install_once
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'create_change_feed.sql')
+
+# Serializes concurrent installs across processes
+_ADVISORY_LOCK_KEY = 7301048
+# True once the current script has run; ledger keys gained party_name, so
+# databases with the older trigger function are upgraded on first use
+_CHECK_SQL = """
+    SELECT to_regprocedure('change_feed_notify(text,text,jsonb)') IS NOT NULL
+       AND EXISTS (SELECT 1 FROM pg_proc WHERE proname = 'change_feed_journal' AND prosrc LIKE '%party_name%')
+"""
+
+CHANNEL = 'change_feed'
+TOPICS = ('ledger', 'candidates', 'certificates')
+# Sent to every subscriber regardless of topics: refetch everything
+RESYNC = 'resync'
+
+
+class SubscriberLimitReached(Exception):
+    """This worker already streams to the configured maximum of subscribers"""
+
+
+def ensure_change_feed(force=False):
+    """
+    Install the change feed triggers once per database (after the journal).
+
+    Args:
+        force (bool): Re-run the script even if the triggers exist
+
+    Returns:
+        bool: True if the script was run by this call
+    """
+    from database.journal import ensure_journal
+
+    ensure_journal()
+    ran = install_once(_CHECK_SQL, SCHEMA_FILE, _ADVISORY_LOCK_KEY, force=force)
+    if ran:
+        logger.info("[CHANGE FEED] Change feed triggers installed")
+    return ran
+
+
+def parse_notification(payload):
+    """Event dict from a NOTIFY payload, or None if it is not a change feed event"""
+    try:
+        event = json.loads(payload)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(event, dict) or event.get('topic') not in TOPICS:
+        return None
+    return {'topic': event['topic'], 'op': event.get('op'), 'key': event.get('key') or {}}
+
+
+def format_event(event):
+    """Server-Sent Events frame for one event"""
+    data = json.dumps({'op': event.get('op'), 'key': event.get('key')}, default=str)
+    return f"id: {event.get('id', '')}\nevent: {event['topic']}\ndata: {data}\n\n"
+
+
+class Subscription:
+    """Bounded queue of events for one stream, filtered by topic"""
+
+    def __init__(self, topics, max_pending=256):
+        self.topics = frozenset(topics)
+        self._queue = queue.Queue(maxsize=max_pending)
+
+    def deliver(self, event):
+        if event['topic'] != RESYNC and event['topic'] not in self.topics:
+            return
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            # Too far behind to catch up event by event: drop the backlog and resync
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            self._queue.put_nowait({'id': event.get('id'), 'topic': RESYNC, 'op': 'overflow', 'key': {}})
+
+    def get(self, timeout=None):
+        """Next event; raises queue.Empty after timeout seconds"""
+        return self._queue.get(timeout=timeout)
+
+
+class ChangeFeed:
+    """Per-process fan-out of change_feed notifications to subscriptions"""
+
+    def __init__(self, connect, max_subscribers=2, max_pending=256, poll_seconds=5, retry_seconds=5):
+        """
+        Args:
+            connect (callable): Returns a new psycopg2 connection for LISTEN
+            max_subscribers (int): Concurrent subscriptions in this process
+            max_pending (int): Queued events per subscription before it resyncs
+            poll_seconds (float): How often the listener checks for subscribers
+            retry_seconds (float): Wait before reconnecting after an error
+        """
+        self._connect = connect
+        self.max_subscribers = max_subscribers
+        self.max_pending = max_pending
+        self.poll_seconds = poll_seconds
+        self.retry_seconds = retry_seconds
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._wake = threading.Event()
+        self._ids = itertools.count(1)
+
+    def subscribe(self, topics):
+        """
+        Register a subscription and make sure the listener runs.
+
+        Raises:
+            ValueError: Unknown topic
+            SubscriberLimitReached: max_subscribers streams already open
+        """
+        unknown = set(topics) - set(TOPICS)
+        if unknown:
+            raise ValueError(f"Unknown topics: {', '.join(sorted(unknown))}")
+        subscription = Subscription(topics or TOPICS, self.max_pending)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise SubscriberLimitReached(f"{self.max_subscribers} change feed streams already open")
+            self._subscribers.add(subscription)
+            self._wake.clear()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='change-feed-listener', daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+            if not self._subscribers:
+                self._wake.set()
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, event):
+        """Number the event and deliver it to every matching subscription"""
+        event = dict(event, id=next(self._ids))
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.deliver(event)
+        return event
+
+    def _idle(self):
+        """True (and the listener is released) once no subscriber is left"""
+        with self._lock:
+            if self._subscribers:
+                return False
+            self._thread = None
+            return True
+
+    def _run(self):
+        connected_before = False
+        while not self._idle():
+            conn = None
+            try:
+                ensure_change_feed()
+                conn = self._connect()
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {CHANNEL}")
+                if connected_before:
+                    # Events sent while we were disconnected are lost
+                    self.publish({'topic': RESYNC, 'op': 'reconnect', 'key': {}})
+                connected_before = True
+                logger.info("[CHANGE FEED] Listening for changes")
+
+                while self.subscriber_count():
+                    if select.select([conn], [], [], self.poll_seconds) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        event = parse_notification(conn.notifies.pop(0).payload)
+                        if event:
+                            self.publish(event)
+            except Exception as e:
+                logger.warning(f"[CHANGE FEED] Listener failed, retrying in {self.retry_seconds}s: {e}")
+                self._wake.wait(self.retry_seconds)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+        logger.info("[CHANGE FEED] No subscribers left, listener stopped")
+
+
+def _listen_connection():
+    import psycopg2
+    from config import Config
+    return psycopg2.connect(
+        host=Config.DB_HOST,
+        port=Config.DB_PORT,
+        database=Config.DB_NAME,
+        user=Config.DB_USER,
+        password=Config.DB_PASSWORD,
+        sslmode=Config.DB_SSL_MODE,
+        connect_timeout=Config.DB_CONNECTION_TIMEOUT
+    )
+
+
+_feed = None
+_feed_lock = threading.Lock()
+
+
+def get_change_feed():
+    """Return the process-wide ChangeFeed configured from Config"""
+    global _feed
+    if _feed is None:
+        with _feed_lock:
+            if _feed is None:
+                from config import Config
+                _feed = ChangeFeed(_listen_connection, max_subscribers=Config.CHANGE_FEED_MAX_SUBSCRIBERS)
+    return _feed
@@ -0,0 +1,171 @@
+"""
+Maintained row counts
+
+row_counters (create_row_counters.sql) is kept up to date by triggers on the
+counted tables, so a total or a per-candidate/client/status count is a
+primary-key lookup instead of a COUNT(*) scan. Where the counters are not
+installed (or the lookup fails) count() falls back to COUNT(*), or to the
+planner's pg_class.reltuples estimate when the caller does not need an exact
+number. inserted() returns the monotonic insert counters pollers use to
+detect new rows.
+
+Usage:
+    from database.counters import count, inserted
+
+    total = count('certificate_selections')
+    pending = count('certificate_selections', 'status', 'pending')
+    uploads = count('candidate_uploads', 'candidate_name', 'Jane Doe_P123')
+    approx = count('master_database_table_a', exact=False)
+    seen = inserted(['candidates', 'certificate_selections'])
+"""
+
+import logging
+import os
+import time
+
+from database.schema import install_once
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'create_row_counters.sql')
+
+# Serializes concurrent installs across processes
+_ADVISORY_LOCK_KEY = 7301044
+# True once the schema exists
+_CHECK_SQL = "SELECT to_regclass('row_counters') IS NOT NULL"
+
+# Counted table -> columns with per-value counts
+COUNTED = {
+    'certificate_selections': ('candidate_id', 'client_name', 'status'),
+    'candidate_uploads': ('candidate_name',),
+    'candidates': (),
+    'receiptinvoicedata': (),
+    'master_database_table_a': (),
+}
+
+# Rows a table's counters include (the same condition the triggers apply)
+_PREDICATES = {
+    'candidate_uploads': "file_path IS NOT NULL AND file_path <> ''",
+}
+
+# After a failed install or lookup, use the fallbacks for this long
+RETRY_SECONDS = 60
+
+_unavailable_until = 0.0
+
+
+def ensure_counters(force=False):
+    """
+    Install the counters (table, triggers, backfill) once per database.
+
+    Args:
+        force (bool): Re-run the script even if the counters exist, e.g. to
+            recompute them after the triggers were disabled
+
+    Returns:
+        bool: True if the script was run by this call
+    """
+    ran = install_once(_CHECK_SQL, SCHEMA_FILE, _ADVISORY_LOCK_KEY, force=force)
+    if ran:
+        logger.info("[COUNTERS] Row counters installed and backfilled")
+    return ran
+
+
+def _check(table, dimension):
+    if table not in COUNTED:
+        raise ValueError(f"Table is not counted: {table}")
+    if dimension and dimension not in COUNTED[table]:
+        raise ValueError(f"{table} has no counter for {dimension}")
+
+
+def _maintained(query, params):
+    """Run a row_counters query, or return None while the counters are unavailable"""
+    global _unavailable_until
+    if time.monotonic() < _unavailable_until:
+        return None
+    from database.db_connection import execute_query
+    try:
+        ensure_counters()
+        return execute_query(query, params) or []
+    except Exception as e:
+        _unavailable_until = time.monotonic() + RETRY_SECONDS
+        logger.warning(f"[COUNTERS] Row counters unavailable, falling back to scans for {RETRY_SECONDS}s: {e}")
+        return None
+
+
+def scan_count(table, dimension=None, key=None):
+    """Exact COUNT(*) with the same row condition and key mapping as the counters"""
+    from database.db_connection import execute_query
+
+    _check(table, dimension)
+    conditions, params = [_PREDICATES.get(table, 'TRUE')], []
+    if dimension:
+        conditions.append(f"COALESCE({dimension}::TEXT, '') = %s")
+        params.append('' if key is None else str(key))
+    result = execute_query(f"SELECT COUNT(*) AS count FROM {table} WHERE {' AND '.join(conditions)}", params)
+    return result[0]['count'] if result else 0
+
+
+def estimate(table):
+    """
+    Planner row estimate from pg_class.reltuples (all rows, no predicate).
+
+    Falls back to scan_count() for tables that were never analyzed.
+    """
+    from database.db_connection import execute_query
+
+    _check(table, None)
+    result = execute_query("SELECT reltuples::BIGINT AS estimate FROM pg_class WHERE oid = to_regclass(%s)",
+                           (table,))
+    if result and result[0]['estimate'] is not None and result[0]['estimate'] >= 0:
+        return result[0]['estimate']
+    return scan_count(table)
+
+
+def count(table, dimension=None, key=None, exact=True):
+    """
+    Number of rows in a counted table, optionally for one column value.
+
+    Args:
+        table (str): Key of COUNTED (lower case)
+        dimension (str): Column with per-value counts (None for the total)
+        key: Column value; None and '' both mean NULL or empty
+        exact (bool): If the counters are unavailable, False accepts the
+            pg_class estimate for a total instead of a COUNT(*) scan
+
+    Returns:
+        int: Row count
+    """
+    _check(table, dimension)
+    rows = _maintained(
+        "SELECT count FROM row_counters WHERE table_name = %s AND dimension = %s AND key = %s",
+        (table, dimension or '', '' if key is None or not dimension else str(key)))
+    if rows is not None:
+        return rows[0]['count'] if rows else 0
+    if not exact and not dimension:
+        return estimate(table)
+    return scan_count(table, dimension, key)
+
+
+def inserted(tables):
+    """
+    Monotonic insert counters, for detecting new rows between polls.
+
+    Args:
+        tables (iterable): Keys of COUNTED
+
+    Returns:
+        dict or None: table -> rows inserted so far, None if the counters are unavailable
+    """
+    tables = list(tables)
+    for table in tables:
+        _check(table, None)
+    rows = _maintained(
+        "SELECT table_name, count FROM row_counters WHERE table_name = ANY(%s) AND dimension = 'inserted'",
+        (tables,))
+    if rows is None:
+        return None
+    seen = {table: 0 for table in tables}
+    seen.update({row['table_name']: row['count'] for row in rows})
+    return seen
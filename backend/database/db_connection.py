@@ -8,16 +8,25 @@ import json
 import os
 from datetime import datetime
 import logging
+import threading
+import time
 from config import Config
+from utils.metrics import metrics, current_endpoint
+from database.routing import ReplicaRouter, is_read_only, note_write, primary_required
+from database.slow_query import get_slow_query_log
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class DatabaseConnection:
-    """PostgreSQL database connection manager"""
+    """PostgreSQL database connection manager (primary pool, optional read replica pool)"""
 
     _pool = None
+    _replica_pool = None
+    _replica_router = None
+    _replica_conns = set()  # id() of connections checked out of the replica pool
+    _replica_lock = threading.Lock()
 
     @classmethod
     def get_pool(cls):
@@ -41,12 +50,50 @@ class DatabaseConnection:
                 raise
         return cls._pool
 
+    @classmethod
+    def get_replica_pool(cls):
+        """Get or create the read replica pool (Config.DB_REPLICA_HOST must be set)"""
+        if cls._replica_pool is None:
+            cls._replica_pool = SimpleConnectionPool(
+                minconn=1,
+                maxconn=10,
+                host=Config.DB_REPLICA_HOST,
+                port=Config.DB_REPLICA_PORT,
+                database=Config.DB_NAME,
+                user=Config.DB_USER,
+                password=Config.DB_PASSWORD,
+                sslmode=Config.DB_SSL_MODE,
+                connect_timeout=Config.DB_CONNECTION_TIMEOUT
+            )
+            logger.info(f"[DB] Read replica pool created ({Config.DB_REPLICA_HOST})")
+        return cls._replica_pool
+
+    @classmethod
+    def get_replica_router(cls):
+        """Lag and health tracking for the read replica"""
+        if cls._replica_router is None:
+            cls._replica_router = ReplicaRouter(Config.DB_REPLICA_MAX_LAG_SECONDS,
+                                                Config.DB_REPLICA_LAG_CHECK_SECONDS)
+        return cls._replica_router
+
     @classmethod
     def get_connection(cls):
-        """Get a database connection from the pool"""
+        """
+        Get a primary connection from the pool for a transaction
+
+        The caller may write through it, so the rest of the request reads
+        from the primary as well (database.routing.note_write).
+        """
+        note_write()
+        return cls._primary_connection()
+
+    @classmethod
+    def _primary_connection(cls):
         try:
             pool = cls.get_pool()
+            wait_start = time.perf_counter()
             conn = pool.getconn()
+            metrics.observe('db_pool_wait_seconds', time.perf_counter() - wait_start)
             conn.autocommit = False  # We'll manage transactions manually
             return conn
         except Exception as e:
@@ -54,10 +101,66 @@ class DatabaseConnection:
             raise
 
     @classmethod
-    def return_connection(cls, conn):
-        """Return connection to the pool"""
-        if cls._pool and conn:
-            cls._pool.putconn(conn)
+    def get_read_connection(cls):
+        """
+        Get a connection for read-only statements
+
+        Returns a replica connection when a replica is configured, reads may
+        go there in this context (database.routing.primary_required) and its
+        lag is within Config.DB_REPLICA_MAX_LAG_SECONDS; otherwise a primary
+        connection. Return it with return_connection() as usual.
+        """
+        if not Config.DB_REPLICA_HOST or primary_required():
+            metrics.inc('db_reads_total', target='primary')
+            return cls._primary_connection()
+
+        router = cls.get_replica_router()
+        due = router.needs_check()
+        if not due and not router.healthy():
+            metrics.inc('db_reads_total', target='primary_fallback')
+            return cls._primary_connection()
+
+        conn = None
+        try:
+            conn = cls.get_replica_pool().getconn()
+            conn.autocommit = False
+            if due:
+                router.measure(conn)
+        except Exception as e:
+            router.record_failure(e)
+            if conn is not None:
+                cls._replica_pool.putconn(conn, close=True)
+            metrics.inc('db_reads_total', target='primary_fallback')
+            return cls._primary_connection()
+
+        if not router.healthy():
+            cls._replica_pool.putconn(conn)
+            metrics.inc('db_reads_total', target='primary_fallback')
+            return cls._primary_connection()
+        with cls._replica_lock:
+            cls._replica_conns.add(id(conn))
+        metrics.inc('db_reads_total', target='replica')
+        return conn
+
+    @classmethod
+    def is_replica(cls, conn):
+        """True if conn was checked out of the replica pool"""
+        with cls._replica_lock:
+            return id(conn) in cls._replica_conns
+
+    @classmethod
+    def return_connection(cls, conn, close=False):
+        """Return connection to the pool it came from (close=True discards it)"""
+        if not conn:
+            return
+        with cls._replica_lock:
+            from_replica = id(conn) in cls._replica_conns
+            cls._replica_conns.discard(id(conn))
+        if from_replica:
+            if cls._replica_pool:
+                cls._replica_pool.putconn(conn, close=close)
+        elif cls._pool:
+            cls._pool.putconn(conn, close=close)
 
     @classmethod
     def close_all(cls):
@@ -65,41 +168,86 @@ class DatabaseConnection:
         if cls._pool:
             cls._pool.closeall()
             logger.info("[DB] All connections closed")
+        if cls._replica_pool:
+            cls._replica_pool.closeall()
+            with cls._replica_lock:
+                cls._replica_conns.clear()
+            logger.info("[DB] All read replica connections closed")
+
+def _execute(conn, query, params, fetch, slow_threshold_ms):
+    """Run one statement on conn, commit DML/DDL, record metrics and the slow-query log"""
+    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        # Detect DML/DDL statements that should be committed even when
+        # using RETURNING (which requires fetch=True). We commit for
+        # INSERT/UPDATE/DELETE/CREATE/DROP/ALTER statements.
+        first_token = query.strip().split()[0].lower() if isinstance(query, str) and query.strip() else ''
+        is_dml_or_ddl = first_token in ('insert', 'update', 'delete', 'create', 'drop', 'alter')
+
+        endpoint = current_endpoint()
+        statement_start = time.perf_counter()
+        cursor.execute(query, params or ())
+
+        if fetch:
+            results = cursor.fetchall()
+            row_count = len(results)
+            # Commit if this was a DML/DDL that used RETURNING
+            if is_dml_or_ddl:
+                conn.commit()
+        else:
+            # Non-fetching execution (e.g., plain INSERT/UPDATE/DELETE without RETURNING)
+            results = None
+            row_count = cursor.rowcount
+            conn.commit()
+
+        duration = time.perf_counter() - statement_start
+        metrics.observe('db_statement_duration_seconds', duration, endpoint=endpoint)
+        metrics.inc('db_statements_total', endpoint=endpoint, statement=first_token or 'unknown')
+        try:
+            get_slow_query_log().record(query, params, duration, row_count, conn, slow_threshold_ms)
+        except Exception as log_error:
+            logger.warning(f"[DB] Slow query logging failed: {log_error}")
 
-def execute_query(query, params=None, fetch=True):
+        return [dict(row) for row in results] if fetch else None
+
+
+def execute_query(query, params=None, fetch=True, slow_threshold_ms=None, readonly=None):
     """
     Execute a database query with proper connection management
 
+    Read-only statements may run on the read replica (see database.routing);
+    a replica connection error or recovery conflict retries them once on the
+    primary.
+
     Args:
         query (str): SQL query to execute
         params (tuple): Query parameters
         fetch (bool): Whether to fetch results
+        slow_threshold_ms (float): Override Config.SLOW_QUERY_THRESHOLD_MS for this call
+        readonly (bool): Route as a read (True) or a write (False);
+            None classifies the statement with is_read_only()
 
     Returns:
         list or None: Query results if fetch=True, None otherwise
     """
+    if readonly is None:
+        readonly = is_read_only(query)
+    if not readonly:
+        note_write()
+
     conn = None
     try:
-        conn = DatabaseConnection.get_connection()
-        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-            cursor.execute(query, params or ())
-
-            # Detect DML/DDL statements that should be committed even when
-            # using RETURNING (which requires fetch=True). We commit for
-            # INSERT/UPDATE/DELETE/CREATE/DROP/ALTER statements.
-            first_token = query.strip().split()[0].lower() if isinstance(query, str) and query.strip() else ''
-            is_dml_or_ddl = first_token in ('insert', 'update', 'delete', 'create', 'drop', 'alter')
-
-            if fetch:
-                results = cursor.fetchall()
-                # Commit if this was a DML/DDL that used RETURNING
-                if is_dml_or_ddl:
-                    conn.commit()
-                return [dict(row) for row in results]
-            else:
-                # Non-fetching execution (e.g., plain INSERT/UPDATE/DELETE without RETURNING)
-                conn.commit()
-                return None
+        if readonly:
+            conn = DatabaseConnection.get_read_connection()
+            if DatabaseConnection.is_replica(conn):
+                try:
+                    return _execute(conn, query, params, fetch, slow_threshold_ms)
+                except (psycopg2.OperationalError, psycopg2.extensions.TransactionRollbackError) as e:
+                    DatabaseConnection.get_replica_router().record_failure(e)
+                    DatabaseConnection.return_connection(conn, close=True)
+                    conn = None
+        if conn is None:
+            conn = DatabaseConnection._primary_connection()
+        return _execute(conn, query, params, fetch, slow_threshold_ms)
 
     except psycopg2.Error as e:
         if conn:
@@ -115,6 +263,59 @@ def execute_query(query, params=None, fetch=True):
         if conn:
             DatabaseConnection.return_connection(conn)
 
+def stream_rows(query, params=None, batch_size=500):
+    """
+    Yield rows of a read-only query through a server-side (named) cursor
+
+    Rows are fetched from PostgreSQL batch_size at a time instead of being
+    materialized with fetchall(), so a streamed response holds one batch in
+    memory. The pooled connection is held until the generator is exhausted
+    or closed (e.g. when the client disconnects) and is then rolled back
+    and returned.
+
+    Args:
+        query (str): SELECT statement
+        params (tuple): Query parameters
+        batch_size (int): Rows per network round trip
+
+    Yields:
+        dict: One row per result record
+    """
+    conn = DatabaseConnection.get_read_connection()
+    endpoint = current_endpoint()
+    db_seconds = 0.0   # time spent in PostgreSQL, not waiting on the client
+    row_count = 0
+    try:
+        with conn.cursor(name=f"stream_{id(conn):x}_{time.monotonic_ns():x}",
+                         cursor_factory=RealDictCursor) as cursor:
+            fetch_start = time.perf_counter()
+            cursor.execute(query, params or ())
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                db_seconds += time.perf_counter() - fetch_start
+                if not rows:
+                    break
+                row_count += len(rows)
+                for row in rows:
+                    yield row
+                fetch_start = time.perf_counter()
+    except psycopg2.Error as e:
+        logger.error(f"[DB] Database error while streaming: {e}")
+        if isinstance(e, psycopg2.OperationalError) and DatabaseConnection.is_replica(conn):
+            DatabaseConnection.get_replica_router().record_failure(e)
+        raise
+    finally:
+        try:
+            conn.rollback()
+        finally:
+            DatabaseConnection.return_connection(conn)
+        metrics.observe('db_statement_duration_seconds', db_seconds, endpoint=endpoint)
+        metrics.inc('db_statements_total', endpoint=endpoint, statement='select')
+        try:
+            get_slow_query_log().record(query, params, db_seconds, row_count)
+        except Exception as log_error:
+            logger.warning(f"[DB] Slow query logging failed: {log_error}")
+
 def insert_candidate_upload(candidate_name, file_name, file_type, file_path, json_data):
     """
     Insert a new candidate upload record into the database
@@ -307,7 +508,6 @@ def get_upload_stats():
         dict: Statistics about uploads and candidates
     """
     queries = {
-        'total_candidates': "SELECT COUNT(*) as count FROM candidates",
         'total_uploads': "SELECT COUNT(*) as count FROM candidate_uploads",
         'unique_candidate_names': "SELECT COUNT(DISTINCT candidate_name) as count FROM candidate_uploads",
         'recent_candidates': "SELECT COUNT(*) as count FROM candidates WHERE created_at >= CURRENT_TIMESTAMP - INTERVAL '24 hours'",
@@ -322,6 +522,8 @@ def get_upload_stats():
 
     stats = {}
     try:
+        from database.counters import count
+        stats['total_candidates'] = count('candidates')
         for key, query in queries.items():
             results = execute_query(query)
             if key == 'file_types':
@@ -451,21 +653,10 @@ def insert_image_blob(candidate_id, file_type, file_data, mime_type, file_size,
     """
     import os
     from config import Config
-
-    # Mapping from image_type to fixed filename
-    image_type_to_filename = {
-        'photo': 'photo.png',
-        'signature': 'signature.png',
-        'passport_front': 'passport_front.jpg',
-        'passport_back': 'passport_back.jpg',
-        'cdc': 'cdc.jpg',
-        'coc': 'coc.jpg',
-        'payment': 'payment.jpg',
-        'marksheet': 'marksheet.pdf'
-    }
+    from database.candidates import upload_filename
 
     # Determine fixed filename based on image_type
-    fixed_filename = image_type_to_filename.get(image_type, f"{image_type or 'unknown'}.{file_type}")
+    fixed_filename = upload_filename(image_type, file_type)
 
     # Create candidate folder path
     candidate_folder = f"CANDIDATE_{candidate_id}"
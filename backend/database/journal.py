@@ -0,0 +1,306 @@
+"""
+Unified double-entry journal
+
+journal_entries (create_journal_entries_table.sql) holds one append-only row
+per ledger leg, with a globally unique id, for every receivable, payable and
+bank posting. Triggers on the source tables write it, so every posting route
+- including database.posting and the bank statement import - is journaled in
+the same transaction as its source document. Ledger views read the
+journal_ledger view (live legs only) with a single indexed range scan per
+party or account; totals, count and running balance come from window
+functions in the same statement. Period ledgers (daily/monthly/yearly) get
+their page, period totals, count and opening balance from one statement too.
+
+Usage:
+    from database.journal import ensure_journal, fetch_ledger, delete_entry
+
+    ensure_journal()
+    page = fetch_ledger({'party_type': 'vendor', 'party_id': 7}, limit=50)
+    deleted = delete_entry(journal_id, sources=VENDOR_SOURCES)
+    period = fetch_period({'source_table': PERIOD_SOURCES}, start, end, limit=50)
+"""
+
+import logging
+import os
+
+from database.schema import install_once
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'create_journal_entries_table.sql')
+
+# Serializes concurrent installs across processes
+_ADVISORY_LOCK_KEY = 7301037
+
+# journal source_table -> source document table
+SOURCES = {
+    'client_ledger': 'ClientLedger',
+    'client_adjustment': 'client_adjustments',
+    'vendor_service': 'vendor_services',
+    'vendor_payment': 'vendor_payments',
+    'vendor_adjustment': 'vendor_adjustments',
+    'bank_ledger': 'bank_ledger',
+}
+CLIENT_SOURCES = ('client_ledger', 'client_adjustment')
+VENDOR_SOURCES = ('vendor_service', 'vendor_payment', 'vendor_adjustment')
+# Source documents shown in the daily, monthly and yearly ledgers
+PERIOD_SOURCES = ('client_ledger', 'client_adjustment', 'vendor_adjustment')
+
+# Relations the current schema script creates; a missing one triggers an upgrade run
+_SCHEMA_MARKERS = ('journal_ledger', 'idx_journal_entry_date')
+_CHECK_SQL = "SELECT " + " AND ".join(f"to_regclass('{name}') IS NOT NULL" for name in _SCHEMA_MARKERS)
+
+# Filters accepted by fetch_ledger: key -> SQL condition on journal_ledger
+_FILTERS = {
+    'party_type': "party_type = %s",
+    'party_id': "party_id = %s",
+    'party_name': "lower(party_name) = lower(%s)",
+    'account': "account = %s",
+    'company_id': "company_id = %s",
+    'start_date': "entry_date >= %s",
+    'end_date': "entry_date <= %s",
+    'candidate_name': "candidate_name ILIKE %s",
+    'voucher_type': "voucher_type ILIKE %s",
+    'source_table': "source_table = ANY(%s)",
+}
+_SUBSTRING_FILTERS = ('candidate_name', 'voucher_type')
+
+
+def ensure_journal(force=False):
+    """
+    Install the journal (table, triggers, backfill) once per database.
+
+    Args:
+        force (bool): Re-run the script even if the journal exists, e.g. to
+            backfill documents written while the triggers were disabled
+
+    Returns:
+        bool: True if the script was run by this call
+    """
+    ran = install_once(_CHECK_SQL, SCHEMA_FILE, _ADVISORY_LOCK_KEY, force=force)
+    if ran:
+        logger.info("[JOURNAL] Journal schema installed and backfilled")
+    return ran
+
+
+def _where(filters, allowed=None):
+    """WHERE clause and parameters for a dict of _FILTERS keys"""
+    allowed = _FILTERS if allowed is None else allowed
+    unknown = set(filters) - set(allowed)
+    if unknown:
+        raise ValueError(f"Unknown ledger filter(s): {', '.join(sorted(unknown))}")
+
+    conditions, params = [], []
+    for key, condition in allowed.items():
+        value = filters.get(key)
+        if value is None or value == '':
+            continue
+        conditions.append(condition)
+        if key == 'source_table':
+            value = list(value)
+        params.append(f"%{value}%" if key in _SUBSTRING_FILTERS else value)
+
+    return (" AND ".join(conditions) if conditions else "TRUE"), params
+
+
+def build_ledger_query(filters, limit=None, offset=0, descending=True):
+    """
+    One statement for a ledger page: rows plus count, totals and running balance.
+
+    Args:
+        filters (dict): Keys from _FILTERS; empty values are ignored
+        limit (int): Page size (None for all rows)
+        offset (int): Rows to skip
+        descending (bool): Newest first (the running balance is always
+            accumulated oldest first)
+
+    Returns:
+        tuple: (sql, params)
+    """
+    where, params = _where(filters)
+    direction = "DESC" if descending else "ASC"
+    sql = f"""
+        SELECT j.id, j.entry_date, j.account, j.party_type, j.party_id, j.party_name,
+               j.company_id, cd.company_name, j.source_table, j.source_id, j.voucher_no,
+               j.voucher_type, j.entry_type, j.particulars, j.remark, j.on_account_of,
+               j.transaction_id, j.debit, j.credit, j.balance,
+               j.total_entries, j.total_debit, j.total_credit
+        FROM (
+            SELECT *,
+                   SUM(debit - credit) OVER (ORDER BY entry_date, id ROWS UNBOUNDED PRECEDING) AS balance,
+                   COUNT(*) OVER () AS total_entries,
+                   SUM(debit) OVER () AS total_debit,
+                   SUM(credit) OVER () AS total_credit
+            FROM journal_ledger
+            WHERE {where}
+        ) j
+        LEFT JOIN company_details cd ON cd.id = j.company_id
+        ORDER BY j.entry_date {direction}, j.id {direction}
+    """
+    if limit is not None:
+        sql += " LIMIT %s OFFSET %s"
+        params.extend([limit, offset])
+    return sql, params
+
+
+def fetch_ledger(filters, limit=None, offset=0, descending=True):
+    """
+    Read one ledger page from the journal.
+
+    Returns:
+        dict: rows (list), total_entries, total_debit, total_credit - the
+        totals cover every row matching the filters, not just the page
+    """
+    from database.db_connection import execute_query
+
+    ensure_journal()
+    sql, params = build_ledger_query(filters, limit, offset, descending)
+    rows = execute_query(sql, params) or []
+    first = rows[0] if rows else None
+    if first is None and offset:
+        # Past the last page: still report the totals
+        totals_sql, totals_params = build_ledger_query(filters, limit=1, offset=0)
+        totals = execute_query(totals_sql, totals_params) or []
+        first = totals[0] if totals else None
+    return {
+        'rows': rows,
+        'total_entries': first['total_entries'] if first else 0,
+        'total_debit': float(first['total_debit'] or 0) if first else 0,
+        'total_credit': float(first['total_credit'] or 0) if first else 0,
+    }
+
+
+def build_period_query(filters, start_date, end_date, limit=None, offset=0, descending=True):
+    """
+    One statement for a period ledger page with its totals and opening balance.
+
+    The totals row aggregates every matching entry up to end_date (entries
+    before start_date form the opening balance) and is LEFT JOINed to the
+    page, so an empty page still returns one row carrying the totals. The
+    page itself is a top-N scan in (entry_date, id) order, so its cost does
+    not depend on how many entries the period holds.
+
+    Args:
+        filters (dict): Keys from _FILTERS other than start_date/end_date
+        start_date (date): First day of the period
+        end_date (date): Last day of the period
+        limit (int): Page size (None for all rows)
+        offset (int): Rows to skip
+        descending (bool): Newest first
+
+    Returns:
+        tuple: (sql, params)
+    """
+    where, filter_params = _where(filters, {key: condition for key, condition in _FILTERS.items()
+                                            if key not in ('start_date', 'end_date')})
+    direction = "DESC" if descending else "ASC"
+    page_limit = "LIMIT %s OFFSET %s" if limit is not None else ""
+    sql = f"""
+        SELECT t.opening_balance, t.total_entries, t.total_debit, t.total_credit,
+               p.id, p.entry_date, p.party_type, p.party_id, p.party_name, p.company_id,
+               cd.company_name, p.source_table, p.source_id, p.voucher_no, p.voucher_type,
+               p.entry_type, p.particulars, p.debit, p.credit
+        FROM (
+            SELECT COALESCE(SUM(debit - credit) FILTER (WHERE entry_date < %s), 0) AS opening_balance,
+                   COUNT(*) FILTER (WHERE entry_date >= %s) AS total_entries,
+                   COALESCE(SUM(debit) FILTER (WHERE entry_date >= %s), 0) AS total_debit,
+                   COALESCE(SUM(credit) FILTER (WHERE entry_date >= %s), 0) AS total_credit
+            FROM journal_ledger
+            WHERE {where} AND entry_date <= %s
+        ) t
+        LEFT JOIN LATERAL (
+            SELECT *
+            FROM journal_ledger
+            WHERE {where} AND entry_date BETWEEN %s AND %s
+            ORDER BY entry_date {direction}, id {direction}
+            {page_limit}
+        ) p ON TRUE
+        LEFT JOIN company_details cd ON cd.id = p.company_id
+        ORDER BY p.entry_date {direction}, p.id {direction}
+    """
+    params = [start_date] * 4 + filter_params + [end_date] + filter_params + [start_date, end_date]
+    if limit is not None:
+        params.extend([limit, offset])
+    return sql, params
+
+
+def fetch_period(filters, start_date, end_date, limit=None, offset=0, descending=True):
+    """
+    Read one period ledger page from the journal.
+
+    Returns:
+        dict: rows (list), total_entries, total_debit, total_credit for the
+        period, opening_balance (debit - credit of every matching entry
+        before start_date) and closing_balance (signed, debit positive)
+    """
+    from database.db_connection import execute_query
+
+    ensure_journal()
+    sql, params = build_period_query(filters, start_date, end_date, limit, offset, descending)
+    rows = execute_query(sql, params) or []
+    first = rows[0] if rows else {}
+    opening = float(first.get('opening_balance') or 0)
+    total_debit = float(first.get('total_debit') or 0)
+    total_credit = float(first.get('total_credit') or 0)
+    return {
+        # Without page rows the single totals row has no entry columns
+        'rows': [row for row in rows if row['id'] is not None],
+        'total_entries': first.get('total_entries') or 0,
+        'total_debit': total_debit,
+        'total_credit': total_credit,
+        'opening_balance': opening,
+        'closing_balance': opening + total_debit - total_credit,
+    }
+
+
+def delete_entry(journal_id, sources, conn=None):
+    """
+    Delete the source document behind a live journal entry.
+
+    The source delete fires the journal trigger, which appends the reversal
+    in the same transaction. Deleting a vendor payment also removes its
+    bank_ledger leg.
+
+    Args:
+        journal_id (int): journal_entries.id as returned by the ledger views
+        sources (iterable): source_table values the caller may delete
+        conn: Optional connection (own pooled connection if None)
+
+    Returns:
+        dict: the journal entry that was reversed, or None if no live entry
+        with that id belongs to one of the given sources
+    """
+    from psycopg2.extras import RealDictCursor
+
+    ensure_journal()
+    owns_conn = conn is None
+    if owns_conn:
+        from database.db_connection import DatabaseConnection
+        conn = DatabaseConnection.get_connection()
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            try:
+                cursor.execute("""
+                    SELECT id, source_table, source_id, party_type, party_name, transaction_id
+                    FROM journal_ledger
+                    WHERE id = %s AND source_table = ANY(%s)
+                """, (journal_id, list(sources)))
+                entry = cursor.fetchone()
+                if entry is None:
+                    conn.rollback()
+                    return None
+
+                cursor.execute(f"DELETE FROM {SOURCES[entry['source_table']]} WHERE id = %s",
+                               (entry['source_id'],))
+                if entry['source_table'] == 'vendor_payment' and entry['transaction_id']:
+                    cursor.execute("DELETE FROM bank_ledger WHERE transaction_id = %s",
+                                   (entry['transaction_id'],))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        return dict(entry)
+    finally:
+        if owns_conn:
+            DatabaseConnection.return_connection(conn)
@@ -0,0 +1,345 @@
+"""
+Receivables open items and aging
+
+client_open_items holds one row per invoice (debit) line in ClientLedger with
+the amount still unpaid. Whenever a client's ledger changes the client's
+items are re-allocated: credits that name an invoice (ClientLedger.reference_id,
+or the receipt's on_account_of, equal to the invoice voucher_no) are applied
+to it first, everything else is applied FIFO to the oldest invoices. Credit that is left over is kept as the
+client's unapplied (on-account) balance.
+
+Re-allocation is per client and runs inside the posting transaction where
+one exists, so the current aging report is an indexed read of open items
+only. Aging as of an earlier date re-allocates the ledger up to that date.
+
+Usage:
+    from database.open_items import refresh_client, aging_report
+
+    refresh_client(cursor, 'Ocean Lines')   # inside a posting transaction
+    aging_report(as_of=date.today())
+"""
+
+import logging
+import os
+from datetime import date
+from decimal import Decimal
+
+from database.schema import install_once
+
+logger = logging.getLogger(__name__)
+
+ZERO = Decimal('0')
+
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'create_client_open_items_table.sql')
+
+# Serializes concurrent installs across processes
+_ADVISORY_LOCK_KEY = 7301034
+# True once the schema exists
+_CHECK_SQL = """
+    SELECT to_regclass('client_unapplied_credit') IS NOT NULL
+       AND EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_name = 'clientledger' AND column_name = 'reference_id')
+"""
+
+# A client's ledger lines with the invoice each credit names, if any.
+# Receipts posted through ReceiptAmountReceived name their invoice in on_account_of
+_LEDGER_SQL = """
+    SELECT l.id, l.company_name, l.date, l.voucher_no, l.debit, l.credit,
+           COALESCE(NULLIF(l.reference_id, ''), NULLIF(TRIM(r.on_account_of), '')) AS reference_id
+    FROM ClientLedger l
+    LEFT JOIN ReceiptAmountReceived r
+        ON r.receipt_amount_id = CAST(substring(l.voucher_no FROM '^RCPT-([0-9]+)$') AS INTEGER)
+    WHERE {conditions}
+"""
+
+# Aging buckets: (label, min days, max days or None)
+AGING_BUCKETS = (
+    ('0-30', 0, 30),
+    ('31-60', 31, 60),
+    ('61-90', 61, 90),
+    ('90+', 91, None),
+)
+
+
+def allocate(entries):
+    """
+    Match a client's credits against its invoices.
+
+    Args:
+        entries (list): ClientLedger rows with id, date, voucher_no,
+            reference_id, debit and credit
+
+    Returns:
+        tuple: (open_items, unapplied_credit) - open_items are dicts with
+        ledger_id, voucher_no, invoice_date, amount, remaining for every
+        invoice line, in FIFO order
+    """
+    invoices = []
+    by_voucher = {}
+    credits = []
+
+    for entry in sorted(entries, key=lambda e: (e['date'], e['id'])):
+        net = Decimal(entry.get('debit') or 0) - Decimal(entry.get('credit') or 0)
+        if net > 0:
+            item = {
+                'ledger_id': entry['id'],
+                'voucher_no': entry.get('voucher_no'),
+                'invoice_date': entry['date'],
+                'amount': net,
+                'remaining': net
+            }
+            invoices.append(item)
+            if item['voucher_no']:
+                by_voucher.setdefault(item['voucher_no'], item)
+        elif net < 0:
+            credits.append((entry.get('reference_id'), -net))
+
+    # Credits that name an invoice are applied to it first
+    pool = ZERO
+    for reference, amount in credits:
+        target = by_voucher.get(reference) if reference else None
+        if target is not None:
+            applied = min(amount, target['remaining'])
+            target['remaining'] -= applied
+            amount -= applied
+        pool += amount
+
+    # Everything else pays the oldest invoices first
+    for item in invoices:
+        if pool <= 0:
+            break
+        applied = min(pool, item['remaining'])
+        item['remaining'] -= applied
+        pool -= applied
+
+    return invoices, pool
+
+
+def age_bucket(days):
+    for label, low, high in AGING_BUCKETS:
+        if days >= low and (high is None or days <= high):
+            return label
+    return AGING_BUCKETS[0][0]
+
+
+def ensure_schema(force=False):
+    """
+    Install the open item tables once per database, on their own transaction.
+
+    Call this before a posting transaction writes ClientLedger: the script's
+    ALTER TABLE ClientLedger would otherwise wait on that transaction's locks.
+
+    Returns:
+        bool: True if the script was run by this call
+    """
+    ran = install_once(_CHECK_SQL, SCHEMA_FILE, _ADVISORY_LOCK_KEY, force=force)
+    if ran:
+        logger.info("[OPEN_ITEMS] Open item tables installed")
+    return ran
+
+
+def refresh_client(cursor, company_name):
+    """
+    Re-allocate one client's open items using the caller's cursor/transaction.
+    The schema must already be installed (ensure_schema()).
+
+    Returns:
+        dict: open_items count, outstanding total and unapplied credit
+    """
+    cursor.execute(_LEDGER_SQL.format(conditions="l.company_name = %s"), (company_name,))
+    items, unapplied = allocate([dict(row) for row in cursor.fetchall()])
+
+    cursor.execute("DELETE FROM client_open_items WHERE company_name = %s", (company_name,))
+    if items:
+        values_sql = ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(items))
+        params = []
+        for item in items:
+            params.extend([item['ledger_id'], company_name, item['voucher_no'],
+                           item['invoice_date'], item['amount'], item['remaining']])
+        cursor.execute(f"""
+            INSERT INTO client_open_items
+                (ledger_id, company_name, voucher_no, invoice_date, amount, remaining)
+            VALUES {values_sql}
+        """, params)
+
+    cursor.execute("""
+        INSERT INTO client_unapplied_credit (company_name, amount, updated_at)
+        VALUES (%s, %s, CURRENT_TIMESTAMP)
+        ON CONFLICT (company_name) DO UPDATE SET amount = EXCLUDED.amount, updated_at = CURRENT_TIMESTAMP
+    """, (company_name, unapplied))
+
+    outstanding = sum((item['remaining'] for item in items), ZERO)
+    return {'open_items': sum(1 for item in items if item['remaining'] > 0),
+            'outstanding': outstanding, 'unapplied_credit': unapplied}
+
+
+def refresh_clients(company_names, conn=None):
+    """Re-allocate several clients in one transaction (own connection if none given)"""
+    from psycopg2.extras import RealDictCursor
+
+    names = sorted({name for name in company_names if name})
+    if not names:
+        return
+    ensure_schema()
+    owns_conn = conn is None
+    if owns_conn:
+        from database.db_connection import DatabaseConnection
+        conn = DatabaseConnection.get_connection()
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            try:
+                for name in names:
+                    refresh_client(cursor, name)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        logger.info(f"[OPEN_ITEMS] Refreshed open items for {len(names)} client(s)")
+    finally:
+        if owns_conn:
+            DatabaseConnection.return_connection(conn)
+
+
+def rebuild_all(conn=None):
+    """Backfill open items for every client in ClientLedger"""
+    from database.db_connection import execute_query
+
+    rows = execute_query("SELECT DISTINCT company_name FROM ClientLedger WHERE company_name IS NOT NULL")
+    names = [row['company_name'] for row in rows or []]
+    refresh_clients(names, conn=conn)
+    return len(names)
+
+
+def _allocate_as_of(as_of, company_name=None):
+    """
+    Open items as they stood at the end of as_of: every client's ledger lines
+    dated on or before it, re-allocated from scratch (a historical date cannot
+    use client_open_items, whose balances include later receipts).
+
+    Returns:
+        dict: company_name -> (open_items, unapplied_credit) as from allocate()
+    """
+    from database.db_connection import execute_query
+
+    conditions, params = ["l.date <= %s", "l.company_name IS NOT NULL"], [as_of]
+    if company_name:
+        conditions.append("l.company_name = %s")
+        params.append(company_name)
+    by_client = {}
+    for row in execute_query(_LEDGER_SQL.format(conditions=' AND '.join(conditions)), params) or []:
+        by_client.setdefault(row['company_name'], []).append(dict(row))
+    return {name: allocate(entries) for name, entries in by_client.items()}
+
+
+def _aging_row(company_name, items, unapplied, as_of):
+    """One aging_report entry from a client's open items"""
+    buckets = {label: 0.0 for label, _, _ in AGING_BUCKETS}
+    for item in items:
+        buckets[age_bucket((as_of - item['invoice_date']).days)] += float(item['remaining'])
+    oldest = min(item['invoice_date'] for item in items)
+    return {
+        'company_name': company_name,
+        'outstanding': float(sum((item['remaining'] for item in items), ZERO)),
+        'buckets': buckets,
+        'oldest_invoice_date': str(oldest),
+        'days_overdue': (as_of - oldest).days,
+        'open_invoices': len(items),
+        'unapplied_credit': float(unapplied or 0),
+    }
+
+
+def aging_report(company_name=None, as_of=None):
+    """
+    Outstanding receivables per client split into aging buckets.
+
+    Args:
+        company_name (str): Optional single client
+        as_of (date): Age invoices relative to this date (default today).
+            Today reads client_open_items; an earlier date re-allocates the
+            ledger lines dated up to it, so later receipts are not netted off
+
+    Returns:
+        list: one dict per client with outstanding, buckets, oldest invoice
+        date, days overdue and unapplied credit, largest balance first
+    """
+    from database.db_connection import execute_query
+
+    as_of = as_of or date.today()
+    if as_of < date.today():
+        report = []
+        for name, (items, unapplied) in _allocate_as_of(as_of, company_name).items():
+            items = [item for item in items if item['remaining'] > 0]
+            if items:
+                report.append(_aging_row(name, items, unapplied, as_of))
+        report.sort(key=lambda row: row['outstanding'], reverse=True)
+        return report
+
+    query = """
+        SELECT o.company_name,
+               SUM(o.remaining) AS outstanding,
+               SUM(o.remaining) FILTER (WHERE %(as_of)s::date - o.invoice_date <= 30) AS bucket_0_30,
+               SUM(o.remaining) FILTER (WHERE %(as_of)s::date - o.invoice_date BETWEEN 31 AND 60) AS bucket_31_60,
+               SUM(o.remaining) FILTER (WHERE %(as_of)s::date - o.invoice_date BETWEEN 61 AND 90) AS bucket_61_90,
+               SUM(o.remaining) FILTER (WHERE %(as_of)s::date - o.invoice_date > 90) AS bucket_90_plus,
+               MIN(o.invoice_date) AS oldest_invoice_date,
+               COUNT(*) AS open_invoices,
+               COALESCE(MAX(u.amount), 0) AS unapplied_credit
+        FROM client_open_items o
+        LEFT JOIN client_unapplied_credit u ON u.company_name = o.company_name
+        WHERE o.remaining > 0 AND o.invoice_date <= %(as_of)s
+    """
+    params = {'as_of': as_of}
+    if company_name:
+        query += " AND o.company_name = %(company_name)s"
+        params['company_name'] = company_name
+    query += " GROUP BY o.company_name ORDER BY outstanding DESC"
+
+    report = []
+    for row in execute_query(query, params) or []:
+        oldest = row['oldest_invoice_date']
+        report.append({
+            'company_name': row['company_name'],
+            'outstanding': float(row['outstanding'] or 0),
+            'buckets': {
+                '0-30': float(row['bucket_0_30'] or 0),
+                '31-60': float(row['bucket_31_60'] or 0),
+                '61-90': float(row['bucket_61_90'] or 0),
+                '90+': float(row['bucket_90_plus'] or 0),
+            },
+            'oldest_invoice_date': str(oldest) if oldest else None,
+            'days_overdue': (as_of - oldest).days if oldest else 0,
+            'open_invoices': row['open_invoices'],
+            'unapplied_credit': float(row['unapplied_credit'] or 0),
+        })
+    return report
+
+
+def open_items_for_client(company_name, as_of=None):
+    """Unpaid invoices for one client, oldest first, with their aging bucket"""
+    from database.db_connection import execute_query
+
+    as_of = as_of or date.today()
+    if as_of < date.today():
+        items, _ = _allocate_as_of(as_of, company_name).get(company_name, ([], ZERO))
+        rows = [item for item in items if item['remaining'] > 0]
+    else:
+        rows = execute_query("""
+            SELECT ledger_id, voucher_no, invoice_date, amount, remaining
+            FROM client_open_items
+            WHERE company_name = %s AND remaining > 0
+            ORDER BY invoice_date, ledger_id
+        """, (company_name,))
+    items = []
+    for row in rows or []:
+        days = (as_of - row['invoice_date']).days
+        items.append({
+            'ledger_id': row['ledger_id'],
+            'voucher_no': row['voucher_no'],
+            'invoice_date': str(row['invoice_date']),
+            'amount': float(row['amount']),
+            'remaining': float(row['remaining']),
+            'days_overdue': days,
+            'bucket': age_bucket(days)
+        })
+    return items
@@ -0,0 +1,484 @@
+"""
+Atomic posting engine for receipts, vendor payments and vendor services
+
+Each posting writes its source document and every ledger leg in a single
+data-modifying CTE, executed in one transaction on one connection, so a
+failure can never leave half-posted ledgers.
+
+Postings may carry a client-supplied idempotency key (the Idempotency-Key
+header or an `idempotency_key` body field). The key is recorded in
+posting_idempotency in the same statement; a repeated key returns the
+original document instead of posting again, including when two identical
+requests race (the loser hits the primary key and replays the winner).
+
+Receipts also re-allocate the customer's open items (database.open_items)
+before the commit, so the aging report never sees a half-applied receipt.
+The same holds for edits through update_receipt(), which re-allocate both
+the previous and the new customer.
+
+Usage:
+    from database.posting import post_entry
+
+    result = post_entry('receipt', values, idempotency_key=key)
+    result['document_id'], result['replayed']
+"""
+
+import logging
+
+from database.open_items import ensure_schema as ensure_open_items, refresh_client
+
+logger = logging.getLogger(__name__)
+
+# PostgreSQL unique_violation
+UNIQUE_VIOLATION = '23505'
+
+IDEMPOTENCY_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS posting_idempotency (
+        idempotency_key VARCHAR(128) PRIMARY KEY,
+        posting_kind VARCHAR(50) NOT NULL,
+        document_id INTEGER NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# Shared tail: record the key (if any) and report what was written
+_IDEMPOTENCY_CTE = """
+    idem AS (
+        INSERT INTO posting_idempotency (idempotency_key, posting_kind, document_id)
+        SELECT %(idempotency_key)s, %(posting_kind)s, doc.document_id
+        FROM doc
+        WHERE %(idempotency_key)s IS NOT NULL
+        RETURNING idempotency_key
+    )"""
+
+# Skip the document insert when the key has already been used
+_NOT_REPLAYED = """
+        WHERE NOT EXISTS (
+            SELECT 1 FROM posting_idempotency WHERE idempotency_key = %(idempotency_key)s
+        )"""
+
+POSTING_SQL = {
+    # ReceiptAmountReceived + ClientLedger credit + bank_ledger receipt
+    'receipt': f"""
+        WITH doc AS (
+            INSERT INTO ReceiptAmountReceived (
+                amount_received, payment_type, transaction_date,
+                remark, account_no, company_name,
+                tds_amount, gst_amount, customer_name, transaction_id, on_account_of
+            )
+            SELECT %(amount_received)s::numeric, %(payment_type)s, %(transaction_date)s::date,
+                   %(remark)s, %(account_no)s, %(company_name)s,
+                   %(tds_amount)s::numeric, %(gst_amount)s::numeric, %(customer_name)s,
+                   %(transaction_id)s, %(on_account_of)s
+            {_NOT_REPLAYED}
+            RETURNING receipt_amount_id AS document_id, customer_name, transaction_date,
+                      amount_received, transaction_id
+        ),
+        company AS (
+            SELECT id FROM company_details WHERE company_name = %(company_name)s LIMIT 1
+        ),
+        client_leg AS (
+            INSERT INTO ClientLedger (
+                company_name, date, particulars, voucher_no, voucher_type,
+                debit, credit, entry_type
+            )
+            SELECT doc.customer_name, doc.transaction_date, 'Receipt from ' || doc.customer_name,
+                   'RCPT-' || doc.document_id, 'Receipt', 0, doc.amount_received, 'Auto'
+            FROM doc
+            WHERE COALESCE(doc.customer_name, '') <> ''
+            RETURNING id
+        ),
+        bank_leg AS (
+            INSERT INTO bank_ledger (
+                payment_date, transaction_id, vendor_id, company_id, vendor_name,
+                amount, remark, transaction_type
+            )
+            SELECT doc.transaction_date, doc.transaction_id, NULL, company.id, doc.customer_name,
+                   doc.amount_received,
+                   'Receipt from ' || doc.customer_name || ' - ' || COALESCE(doc.transaction_id, ''),
+                   'receipt'
+            FROM doc CROSS JOIN company
+            WHERE COALESCE(doc.customer_name, '') <> ''
+            RETURNING id
+        ),
+        {_IDEMPOTENCY_CTE}
+        SELECT doc.document_id,
+               (SELECT COUNT(*) FROM client_leg) AS client_ledger_rows,
+               (SELECT COUNT(*) FROM bank_leg) AS bank_ledger_rows
+        FROM doc
+    """,
+
+    # vendor_payments + bank_ledger payment
+    'vendor_payment': f"""
+        WITH doc AS (
+            INSERT INTO vendor_payments (
+                vendor_id, company_id, payment_date, transaction_id, amount, on_account_of, remark
+            )
+            SELECT %(vendor_id)s::integer, %(company_id)s::integer, %(payment_date)s::date,
+                   %(transaction_id)s, %(amount)s::numeric, %(on_account_of)s, %(remark)s
+            {_NOT_REPLAYED}
+            RETURNING id AS document_id, vendor_id, company_id, payment_date, transaction_id, amount
+        ),
+        bank_leg AS (
+            INSERT INTO bank_ledger (
+                payment_date, transaction_id, vendor_id, company_id, vendor_name,
+                amount, remark, transaction_type
+            )
+            SELECT doc.payment_date, doc.transaction_id, doc.vendor_id, doc.company_id, v.vendor_name,
+                   doc.amount,
+                   'Payment to ' || v.vendor_name || ' - ' || COALESCE(doc.transaction_id, ''),
+                   'payment'
+            FROM doc JOIN vendors v ON v.id = doc.vendor_id
+            RETURNING id
+        ),
+        {_IDEMPOTENCY_CTE}
+        SELECT doc.document_id,
+               0 AS client_ledger_rows,
+               (SELECT COUNT(*) FROM bank_leg) AS bank_ledger_rows
+        FROM doc
+    """,
+
+    # vendor_services (the bill side of the vendor ledger; no bank leg)
+    'vendor_service': f"""
+        WITH doc AS (
+            INSERT INTO vendor_services (
+                vendor_id, company_id, service_date, particulars, amount, on_account_of, remark
+            )
+            SELECT %(vendor_id)s::integer, %(company_id)s::integer, %(service_date)s::date,
+                   %(particulars)s, %(amount)s::numeric, %(on_account_of)s, %(remark)s
+            {_NOT_REPLAYED}
+            RETURNING id AS document_id
+        ),
+        {_IDEMPOTENCY_CTE}
+        SELECT doc.document_id, 0 AS client_ledger_rows, 0 AS bank_ledger_rows
+        FROM doc
+    """,
+}
+
+_REPLAY_SQL = """
+    SELECT document_id FROM posting_idempotency
+    WHERE idempotency_key = %s AND posting_kind = %s
+"""
+
+_schema_ready = False
+
+
+class IdempotencyConflict(Exception):
+    """The idempotency key was already used for a different kind of posting"""
+
+
+def idempotency_key_from_request(req, data=None):
+    """Read the client-supplied idempotency key from the header or JSON body"""
+    key = req.headers.get('Idempotency-Key') or (data or {}).get('idempotency_key')
+    key = str(key).strip() if key is not None else ''
+    return key[:128] or None
+
+
+def _ensure_schema(conn, cursor):
+    global _schema_ready
+    if not _schema_ready:
+        cursor.execute(IDEMPOTENCY_TABLE_SQL)
+        conn.commit()
+        _schema_ready = True
+
+
+def _replay(cursor, kind, idempotency_key):
+    cursor.execute(_REPLAY_SQL, (idempotency_key, kind))
+    row = cursor.fetchone()
+    if row is None:
+        raise IdempotencyConflict(f"Idempotency key '{idempotency_key}' was used for a different posting")
+    return {
+        "document_id": row['document_id'],
+        "client_ledger_rows": 0,
+        "bank_ledger_rows": 0,
+        "replayed": True
+    }
+
+
+def post_entry(kind, values, idempotency_key=None, conn=None):
+    """
+    Post a document and all its ledger legs atomically.
+
+    Args:
+        kind (str): 'receipt', 'vendor_payment' or 'vendor_service'
+        values (dict): Named parameters for POSTING_SQL[kind]
+        idempotency_key (str): Optional client-supplied key
+        conn: Optional connection; by default one is taken from the pool
+
+    Returns:
+        dict: document_id, client_ledger_rows, bank_ledger_rows, replayed
+    """
+    from psycopg2.extras import RealDictCursor
+
+    query = POSTING_SQL[kind]
+    params = dict(values, idempotency_key=idempotency_key, posting_kind=kind)
+
+    owns_conn = conn is None
+    if owns_conn:
+        from database.db_connection import DatabaseConnection
+        conn = DatabaseConnection.get_connection()
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            _ensure_schema(conn, cursor)
+            if kind == 'receipt':
+                # Before this transaction locks ClientLedger (the install alters it)
+                ensure_open_items()
+            try:
+                cursor.execute(query, params)
+                row = cursor.fetchone()
+                if kind == 'receipt' and row is not None and row['client_ledger_rows']:
+                    refresh_client(cursor, values['customer_name'])
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                # Lost a race with an identical request - replay the winner
+                if idempotency_key and getattr(e, 'pgcode', None) == UNIQUE_VIOLATION \
+                        and 'posting_idempotency' in str(e):
+                    logger.info(f"[POSTING] Concurrent duplicate for key {idempotency_key}, replaying")
+                    return _replay(cursor, kind, idempotency_key)
+                raise
+
+            if row is None:
+                if not idempotency_key:
+                    raise RuntimeError(f"No ID returned from {kind} posting")
+                # Nothing inserted: the key had already been used
+                logger.info(f"[POSTING] Duplicate {kind} for key {idempotency_key}, replaying")
+                return _replay(cursor, kind, idempotency_key)
+
+            result = dict(row)
+            result['replayed'] = False
+            logger.info(f"[POSTING] Posted {kind} ID {result['document_id']} "
+                        f"(client ledger: {result['client_ledger_rows']}, bank ledger: {result['bank_ledger_rows']})")
+            return result
+    finally:
+        if owns_conn:
+            DatabaseConnection.return_connection(conn)
+
+
+# Bulk statement import: all matched lines are COPYed into a temp staging
+# table and posted set-based with the same legs as the single-entry kinds.
+# Lines whose reference is already in this company's bank ledger are skipped.
+STATEMENT_STAGE_SQL = """
+    CREATE TEMP TABLE statement_stage (
+        line_no INTEGER,
+        kind VARCHAR(20),
+        party_id INTEGER,
+        party_name TEXT,
+        txn_date DATE,
+        reference VARCHAR(100),
+        amount NUMERIC(15,2),
+        narration TEXT
+    ) ON COMMIT DROP
+"""
+
+STATEMENT_STAGE_COLUMNS = ('line_no', 'kind', 'party_id', 'party_name', 'txn_date', 'reference', 'amount', 'narration')
+
+STATEMENT_POST_SQL = """
+    WITH stage AS (
+        SELECT s.* FROM statement_stage s
+        WHERE NOT EXISTS (
+            SELECT 1 FROM bank_ledger b
+            WHERE b.company_id = %(company_id)s AND b.transaction_id = s.reference
+        )
+    ),
+    receipts AS (
+        INSERT INTO ReceiptAmountReceived (
+            amount_received, payment_type, transaction_date,
+            remark, account_no, company_name,
+            tds_amount, gst_amount, customer_name, transaction_id, on_account_of
+        )
+        SELECT amount, %(payment_type)s, txn_date, narration, %(account_no)s, %(company_name)s,
+               0, 0, party_name, reference, NULL
+        FROM stage WHERE kind = 'receipt'
+        ORDER BY line_no
+        RETURNING receipt_amount_id, customer_name, transaction_date, amount_received, transaction_id
+    ),
+    client_leg AS (
+        INSERT INTO ClientLedger (
+            company_name, date, particulars, voucher_no, voucher_type,
+            debit, credit, entry_type
+        )
+        SELECT customer_name, transaction_date, 'Receipt from ' || customer_name,
+               'RCPT-' || receipt_amount_id, 'Receipt', 0, amount_received, 'Auto'
+        FROM receipts
+        RETURNING id
+    ),
+    payments AS (
+        INSERT INTO vendor_payments (
+            vendor_id, company_id, payment_date, transaction_id, amount, on_account_of, remark
+        )
+        SELECT party_id, %(company_id)s, txn_date, reference, amount, NULL, narration
+        FROM stage WHERE kind = 'payment'
+        ORDER BY line_no
+        RETURNING id, vendor_id, payment_date, transaction_id, amount
+    ),
+    bank_leg AS (
+        INSERT INTO bank_ledger (
+            payment_date, transaction_id, vendor_id, company_id, vendor_name,
+            amount, remark, transaction_type
+        )
+        SELECT transaction_date, transaction_id, NULL::integer, %(company_id)s, customer_name, amount_received,
+               'Receipt from ' || customer_name || ' - ' || COALESCE(transaction_id, ''), 'receipt'
+        FROM receipts
+        UNION ALL
+        SELECT p.payment_date, p.transaction_id, p.vendor_id, %(company_id)s, v.vendor_name, p.amount,
+               'Payment to ' || v.vendor_name || ' - ' || COALESCE(p.transaction_id, ''), 'payment'
+        FROM payments p JOIN vendors v ON v.id = p.vendor_id
+        RETURNING id
+    )
+    SELECT (SELECT COUNT(*) FROM receipts) AS receipts,
+           (SELECT COUNT(*) FROM payments) AS vendor_payments,
+           (SELECT COUNT(*) FROM client_leg) AS client_ledger_rows,
+           (SELECT COUNT(*) FROM bank_leg) AS bank_ledger_rows,
+           (SELECT COUNT(*) FROM statement_stage) - (SELECT COUNT(*) FROM stage) AS skipped_duplicates
+"""
+
+
+def _copy_buffer(lines):
+    """Serialize staged lines as CSV for COPY ... FROM STDIN"""
+    import csv
+    import io
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for line in lines:
+        writer.writerow(['' if line.get(column) is None else line.get(column) for column in STATEMENT_STAGE_COLUMNS])
+    buffer.seek(0)
+    return buffer
+
+
+def post_statement_lines(company, lines, payment_type='Bank Transfer', conn=None):
+    """
+    Post matched bank statement lines in one transaction.
+
+    Args:
+        company (dict): company_details row (id, company_name, account_number)
+        lines (list): Matched lines from bookkeeping.statements.match_statement
+            (kind, party_id, party_name, date, reference, amount, description)
+        payment_type (str): payment_type recorded on imported receipts
+        conn: Optional connection; by default one is taken from the pool
+
+    Returns:
+        dict: receipts, vendor_payments, client_ledger_rows, bank_ledger_rows, skipped_duplicates
+    """
+    from psycopg2.extras import RealDictCursor
+
+    staged = [{
+        'line_no': line['line_no'],
+        'kind': line['kind'],
+        'party_id': line['party_id'],
+        'party_name': line['party_name'],
+        'txn_date': line['date'].isoformat(),
+        'reference': line['reference'],
+        'amount': line['amount'],
+        'narration': line.get('description'),
+    } for line in lines]
+
+    if any(line['kind'] == 'receipt' for line in lines):
+        # Before the posting transaction locks ClientLedger (the install alters it)
+        ensure_open_items()
+
+    owns_conn = conn is None
+    if owns_conn:
+        from database.db_connection import DatabaseConnection
+        conn = DatabaseConnection.get_connection()
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            try:
+                cursor.execute(STATEMENT_STAGE_SQL)
+                cursor.copy_expert(
+                    f"COPY statement_stage ({', '.join(STATEMENT_STAGE_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                    _copy_buffer(staged)
+                )
+                cursor.execute(STATEMENT_POST_SQL, {
+                    'company_id': company['id'],
+                    'company_name': company['company_name'],
+                    'account_no': company['account_number'],
+                    'payment_type': payment_type
+                })
+                result = dict(cursor.fetchone())
+                for customer_name in sorted({line['party_name'] for line in lines if line['kind'] == 'receipt'}):
+                    refresh_client(cursor, customer_name)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+        logger.info(f"[POSTING] Statement import for {company['account_number']}: {result}")
+        return result
+    finally:
+        if owns_conn:
+            DatabaseConnection.return_connection(conn)
+
+
+# Columns of ReceiptAmountReceived that update_receipt() may change
+RECEIPT_UPDATE_FIELDS = ('amount_received', 'payment_type', 'transaction_date', 'remark', 'account_no',
+                         'company_name', 'tds_percentage', 'gst', 'customer_name', 'transaction_id',
+                         'on_account_of')
+
+# Locks the receipt and reports the customer before and after the update
+_UPDATE_RECEIPT_SQL = """
+    WITH old AS (
+        SELECT receipt_amount_id, customer_name
+        FROM ReceiptAmountReceived
+        WHERE receipt_amount_id = %s
+        FOR UPDATE
+    )
+    UPDATE ReceiptAmountReceived r
+    SET {assignments}
+    FROM old
+    WHERE r.receipt_amount_id = old.receipt_amount_id
+    RETURNING old.customer_name AS old_customer_name, r.customer_name
+"""
+
+
+def update_receipt(receipt_id, fields, conn=None):
+    """
+    Update a receipt and re-allocate the open items of its customers in one transaction.
+
+    The receipt's on_account_of, customer and amount all feed the allocation,
+    so both the previous and the new customer are refreshed before the commit.
+
+    Args:
+        receipt_id (int): ReceiptAmountReceived.receipt_amount_id
+        fields (dict): Column -> new value, columns from RECEIPT_UPDATE_FIELDS
+        conn: Optional connection; by default one is taken from the pool
+
+    Returns:
+        dict or None: old_customer_name and customer_name, None if the receipt does not exist
+    """
+    from psycopg2.extras import RealDictCursor
+
+    unknown = set(fields) - set(RECEIPT_UPDATE_FIELDS)
+    if unknown:
+        raise ValueError(f"Cannot update receipt fields: {', '.join(sorted(unknown))}")
+    columns = [column for column in RECEIPT_UPDATE_FIELDS if column in fields]
+    query = _UPDATE_RECEIPT_SQL.format(assignments=', '.join(f"{column} = %s" for column in columns))
+    params = [receipt_id] + [fields[column] for column in columns]
+
+    # Before this transaction locks ClientLedger (the install alters it)
+    ensure_open_items()
+
+    owns_conn = conn is None
+    if owns_conn:
+        from database.db_connection import DatabaseConnection
+        conn = DatabaseConnection.get_connection()
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            try:
+                cursor.execute(query, params)
+                row = cursor.fetchone()
+                if row is not None:
+                    for customer_name in sorted({row['old_customer_name'], row['customer_name']} - {None, ''}):
+                        refresh_client(cursor, customer_name)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        if row is None:
+            return None
+        logger.info(f"[POSTING] Updated receipt ID {receipt_id} ({', '.join(columns)})")
+        return dict(row)
+    finally:
+        if owns_conn:
+            DatabaseConnection.return_connection(conn)
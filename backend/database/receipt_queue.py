@@ -0,0 +1,137 @@
+"""
+Receipt work queue: certificate selections not yet invoiced
+
+Pending selections (status NULL or not 'done') are grouped per candidate and
+client in SQL. The groups are paged first, using the partial index
+idx_certificate_selections_receipt_queue that holds only pending rows
+(add_receipt_queue_index_to_certificate_selections.sql). The certificate
+lists are then built with json_agg for the groups on the page only, so the
+invoicing screen reads just the slice it shows. Group and certificate totals
+come from window functions in the same statement.
+
+Usage:
+    from database.receipt_queue import fetch_receipt_queue
+
+    queue = fetch_receipt_queue(client_name='Ocean Lines', limit=50, offset=0)
+    queue['rows'], queue['total_candidates'], queue['total_certificates']
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Must match the partial index predicate for the planner to use it
+PENDING = "(status IS NULL OR status <> 'done')"
+
+# Columns of one queue entry, in output order; certificates is JSON text
+QUEUE_FIELDS = ('candidate_id', 'candidate_name', 'client_name', 'creation_date', 'certificate_count',
+                'has_verification_image', 'has_certificate_image', 'certificates')
+
+
+def build_queue_query(client_name=None, limit=None, offset=0):
+    """
+    SQL and parameters for one page of the receipt queue.
+
+    Args:
+        client_name (str): Only this client's selections (None for all)
+        limit (int): Groups per page (None for all)
+        offset (int): Groups to skip
+
+    Returns:
+        tuple: (query, params)
+    """
+    conditions, params = [PENDING], []
+    if client_name:
+        conditions.append("client_name = %s")
+        params.append(client_name)
+    page = ""
+    if limit is not None:
+        page = "LIMIT %s OFFSET %s"
+        params.extend([limit, offset])
+    elif offset:
+        page = "OFFSET %s"
+        params.append(offset)
+
+    query = f"""
+        WITH groups AS (
+            SELECT candidate_id, client_name,
+                   MIN(candidate_name) AS candidate_name,
+                   MAX(creation_date) AS creation_date,
+                   COUNT(*) AS certificate_count
+            FROM certificate_selections
+            WHERE {' AND '.join(conditions)}
+            GROUP BY candidate_id, client_name
+        ), page AS (
+            SELECT g.*,
+                   COUNT(*) OVER () AS total_candidates,
+                   SUM(g.certificate_count) OVER () AS total_certificates
+            FROM groups g
+            ORDER BY g.client_name, g.candidate_name, g.candidate_id
+            {page}
+        )
+        SELECT p.candidate_id, p.candidate_name, p.client_name, p.creation_date, p.certificate_count,
+               c.has_verification_image, c.has_certificate_image, c.certificates::text AS certificates,
+               p.total_candidates, p.total_certificates
+        FROM page p
+        CROSS JOIN LATERAL (
+            SELECT bool_or(cs.verification_file_path IS NOT NULL OR cs.verification_image IS NOT NULL)
+                       AS has_verification_image,
+                   bool_or(cs.certificate_file_path IS NOT NULL OR cs.certificate_image IS NOT NULL)
+                       AS has_certificate_image,
+                   json_agg(json_build_object(
+                       'id', cs.id,
+                       'certificate_name', cs.certificate_name,
+                       'creation_date', cs.creation_date,
+                       'status', cs.status,
+                       'has_verification_image', cs.verification_file_path IS NOT NULL OR cs.verification_image IS NOT NULL,
+                       'has_certificate_image', cs.certificate_file_path IS NOT NULL OR cs.certificate_image IS NOT NULL
+                   ) ORDER BY cs.creation_date DESC, cs.id DESC) AS certificates
+            FROM certificate_selections cs
+            WHERE cs.candidate_id = p.candidate_id
+              AND cs.client_name IS NOT DISTINCT FROM p.client_name
+              AND (cs.status IS NULL OR cs.status <> 'done')
+        ) c
+        ORDER BY p.client_name, p.candidate_name, p.candidate_id
+    """
+    return query, params
+
+
+def fetch_receipt_queue(client_name=None, limit=None, offset=0):
+    """
+    One page of pending certificate selections grouped by candidate and client.
+
+    Args:
+        client_name (str): Only this client's selections (None for all)
+        limit (int): Groups per page (None for all)
+        offset (int): Groups to skip
+
+    Returns:
+        dict: rows (QUEUE_FIELDS plus totals), total_candidates, total_certificates
+    """
+    from database.db_connection import execute_query
+
+    query, params = build_queue_query(client_name, limit, offset)
+    rows = execute_query(query, params) or []
+    if rows:
+        total_candidates = rows[0]['total_candidates']
+        total_certificates = rows[0]['total_certificates'] or 0
+    elif offset:
+        # Paged past the end: the window totals are not available, count directly
+        conditions, count_params = [PENDING], []
+        if client_name:
+            conditions.append("client_name = %s")
+            count_params.append(client_name)
+        totals = execute_query(f"""
+            SELECT COUNT(DISTINCT (candidate_id, client_name)) AS total_candidates,
+                   COUNT(*) AS total_certificates
+            FROM certificate_selections
+            WHERE {' AND '.join(conditions)}
+        """, count_params)
+        total_candidates = totals[0]['total_candidates'] if totals else 0
+        total_certificates = totals[0]['total_certificates'] if totals else 0
+    else:
+        total_candidates = total_certificates = 0
+
+    logger.info(f"[RECEIPT QUEUE] {len(rows)} of {total_candidates} candidate groups"
+                f"{f' for {client_name}' if client_name else ''}")
+    return {'rows': rows, 'total_candidates': total_candidates, 'total_certificates': total_certificates}
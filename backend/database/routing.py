@@ -0,0 +1,166 @@
+"""
+Read/write routing between the primary and an optional read replica
+
+With Config.DB_REPLICA_HOST set, DatabaseConnection keeps a second pool to
+the replica and execute_query()/stream_rows() send read-only statements
+there. Everything else stays on the primary:
+
+- statements that write, lock or call sequence/advisory functions
+  (is_read_only() is conservative: anything it cannot prove read-only is a write)
+- every read later in a request that already wrote (read-your-writes)
+- requests sent with the header "X-Consistency: strong", for a screen that
+  refetches right after its own write
+- code inside read_from_primary()
+- connections taken with DatabaseConnection.get_connection() (transactions),
+  and every read later in the same request
+
+ReplicaRouter measures replica lag at most every DB_REPLICA_LAG_CHECK_SECONDS
+(replay delay, 0 when the replica has replayed everything or is not in
+recovery, so two independent local servers work for testing). While lag
+exceeds DB_REPLICA_MAX_LAG_SECONDS, or after a replica connection error,
+reads go to the primary until the next check.
+
+Usage:
+    from database.routing import read_from_primary
+
+    with read_from_primary():
+        balance = execute_query("SELECT ...")
+"""
+
+import contextvars
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Request header that pins a whole request to the primary
+CONSISTENCY_HEADER = 'X-Consistency'
+
+_READ_STARTS = ('select', 'with', 'show', 'explain', 'values', 'table')
+# Anything that writes, locks, or has side effects outside the statement,
+# including this schema's own writing functions
+_NOT_READ_ONLY = re.compile(
+    r"\b(insert|update|delete|merge|truncate|create|drop|alter|grant|revoke|copy|lock|into|"
+    r"nextval|setval|pg_advisory\w*|pg_notify|set_config|txid_current|pg_current_xact_id|"
+    r"journal_reverse|delete_certificate_safe|\w+_bump|change_feed_notify)\b"
+    r"|\bfor\s+(update|share|no\s+key\s+update|key\s+share)\b",
+    re.IGNORECASE)
+
+LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END AS lag_seconds
+"""
+
+_primary_depth = contextvars.ContextVar('db_primary_depth', default=0)
+
+
+def is_read_only(query):
+    """True if query is a single statement that cannot write (conservative)"""
+    if not isinstance(query, str):
+        return False
+    text = query.strip().rstrip(';')
+    if not text or ';' in text:
+        return False
+    first_token = text.split(None, 1)[0].lower()
+    if first_token not in _READ_STARTS:
+        return False
+    return _NOT_READ_ONLY.search(text) is None
+
+
+def _request_state():
+    """flask.g of the active request, or None outside a request"""
+    try:
+        from flask import g, has_request_context
+    except ImportError:
+        return None
+    return g if has_request_context() else None
+
+
+def note_write():
+    """Pin the rest of the active request to the primary (read-your-writes)"""
+    state = _request_state()
+    if state is not None:
+        state.db_wrote = True
+
+
+def primary_required():
+    """True if reads must go to the primary in the current context"""
+    if _primary_depth.get():
+        return True
+    state = _request_state()
+    if state is None:
+        return False
+    if getattr(state, 'db_wrote', False):
+        return True
+    from flask import request
+    return request.headers.get(CONSISTENCY_HEADER, '').lower() == 'strong'
+
+
+@contextmanager
+def read_from_primary():
+    """Send every read inside the block to the primary"""
+    token = _primary_depth.set(_primary_depth.get() + 1)
+    try:
+        yield
+    finally:
+        _primary_depth.reset(token)
+
+
+class ReplicaRouter:
+    """Replica health from periodic lag checks and connection errors"""
+
+    def __init__(self, max_lag_seconds=5.0, check_interval=2.0, clock=time.monotonic):
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval = check_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+        self._healthy = True
+        self.lag_seconds = None
+
+    def needs_check(self):
+        """True for one caller once the check interval has passed"""
+        with self._lock:
+            now = self._clock()
+            if now < self._next_check:
+                return False
+            self._next_check = now + self.check_interval
+            return True
+
+    def record_lag(self, lag_seconds):
+        lag_seconds = float(lag_seconds)
+        healthy = lag_seconds <= self.max_lag_seconds
+        with self._lock:
+            if healthy != self._healthy:
+                if healthy:
+                    logger.info(f"[DB] Replica caught up ({lag_seconds:.1f}s lag), routing reads to it again")
+                else:
+                    logger.warning(f"[DB] Replica lag {lag_seconds:.1f}s exceeds {self.max_lag_seconds}s, "
+                                   f"reading from the primary")
+            self._healthy, self.lag_seconds = healthy, lag_seconds
+
+    def record_failure(self, error):
+        """Read from the primary until the next check"""
+        with self._lock:
+            if self._healthy:
+                logger.warning(f"[DB] Replica unavailable, reading from the primary: {error}")
+            self._healthy = False
+            self._next_check = self._clock() + self.check_interval
+
+    def healthy(self):
+        with self._lock:
+            return self._healthy
+
+    def measure(self, conn):
+        """Run the lag query on a replica connection and record the result"""
+        with conn.cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            row = cursor.fetchone()
+        conn.rollback()
+        self.record_lag(row['lag_seconds'] if isinstance(row, dict) else row[0])
@@ -0,0 +1,73 @@
+"""
+Install-once schema scripts
+
+Features that keep their schema in a .sql script (row counters, the journal,
+the candidate directory, the change feed, receivables open items) install it
+lazily on first use through install_once(). A cheap check query decides
+whether the script is needed; if it is, the script runs on its own pooled
+connection under a transaction-scoped advisory lock, with the check repeated
+once the lock is held so concurrent workers install it only once. The
+process remembers the script as installed only after that transaction has
+committed, so a failed install is retried by the next caller.
+
+Usage:
+    from database.schema import install_once
+
+    ran = install_once("SELECT to_regclass('row_counters') IS NOT NULL",
+                       SCHEMA_FILE, lock_key=7301044)
+"""
+
+import threading
+
+_installed = set()
+# Reentrant: one script's install may first install another it depends on
+_install_lock = threading.RLock()
+
+
+def _check(cursor, check_sql):
+    cursor.execute(check_sql)
+    row = cursor.fetchone()
+    return bool(row[0]) if row else False
+
+
+def install_once(check_sql, script_path, lock_key, force=False):
+    """
+    Run a schema script once per process and database.
+
+    Args:
+        check_sql (str): Query returning one boolean, true when the schema exists
+        script_path (str): SQL script to run when it does not
+        lock_key (int): pg_advisory_xact_lock key serializing installs across processes
+        force (bool): Run the script even if the check passes, e.g. to rebuild
+
+    Returns:
+        bool: True if the script was run by this call
+    """
+    if script_path in _installed and not force:
+        return False
+
+    from database.db_connection import DatabaseConnection
+
+    with _install_lock:
+        if script_path in _installed and not force:
+            return False
+        conn = DatabaseConnection.get_connection()
+        try:
+            with conn.cursor() as cursor:
+                try:
+                    ran = False
+                    if force or not _check(cursor, check_sql):
+                        cursor.execute("SELECT pg_advisory_xact_lock(%s)", (lock_key,))
+                        # Another process may have installed it while we waited
+                        if force or not _check(cursor, check_sql):
+                            with open(script_path, encoding='utf-8') as f:
+                                cursor.execute(f.read())
+                            ran = True
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+            _installed.add(script_path)
+            return ran
+        finally:
+            DatabaseConnection.return_connection(conn)
@@ -0,0 +1,258 @@
+"""
+Slow-query log with sampled EXPLAIN capture for execute_query
+
+Statements slower than Config.SLOW_QUERY_THRESHOLD_MS are logged with their
+normalized SQL, parameter shape, row count and duration, and appended to a
+rotating JSON-lines store under Config.SLOW_QUERY_LOG_DIR. At most once per
+statement fingerprint per cooldown window, the plan is captured with
+EXPLAIN (ANALYZE, BUFFERS) for statements the read router considers
+read-only, or plain EXPLAIN for everything else (writes, nextval(),
+advisory locks, counter bumps) so that nothing is executed twice.
+
+Each process writes and rotates its own store file (slow_queries.<pid>.jsonl),
+since log rotation is not safe across gunicorn workers sharing one file;
+top_offenders() reads all of them. Files not written for STORE_RETENTION_DAYS,
+left by workers that have exited, are removed when a process opens its store.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+from database.routing import is_read_only
+
+logger = logging.getLogger(__name__)
+
+STORE_PREFIX = 'slow_queries'
+STORE_RETENTION_DAYS = 7
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$%])\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))*\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+_EXPLAINABLE = re.compile(r"^\s*(select|with|insert|update|delete)\b", re.IGNORECASE)
+
+
+def normalize_sql(query):
+    """Collapse whitespace and replace literals so equivalent statements group together"""
+    if not isinstance(query, str):
+        query = str(query)
+    normalized = _STRING_LITERAL.sub('?', query)
+    normalized = _NUMBER_LITERAL.sub('?', normalized)
+    normalized = _IN_LIST.sub('IN (...)', normalized)
+    return _WHITESPACE.sub(' ', normalized).strip()
+
+
+def fingerprint(normalized_sql):
+    """Short stable identifier for a normalized statement"""
+    return hashlib.sha1(normalized_sql.encode('utf-8')).hexdigest()[:16]
+
+
+def params_shape(params):
+    """Describe parameters by type only, never by value"""
+    if params is None:
+        return []
+    if isinstance(params, dict):
+        return {key: type(value).__name__ for key, value in params.items()}
+    return [type(value).__name__ for value in params]
+
+
+class SlowQueryLog:
+    """Threshold-based slow statement recorder with a rotating local store"""
+
+    def __init__(self, store_dir, threshold_ms=500, explain_cooldown_seconds=300,
+                 max_bytes=5 * 1024 * 1024, backup_count=3):
+        self.store_dir = store_dir
+        self.threshold_ms = threshold_ms
+        self.explain_cooldown_seconds = explain_cooldown_seconds
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+
+        self._lock = threading.Lock()
+        self._last_explain = {}  # fingerprint -> monotonic time of last capture
+        self._writer = None
+
+    def _get_writer(self):
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    os.makedirs(self.store_dir, exist_ok=True)
+                    self._prune_stale_stores()
+                    handler = RotatingFileHandler(
+                        self._store_path(os.getpid()),
+                        maxBytes=self.max_bytes,
+                        backupCount=self.backup_count,
+                        encoding='utf-8'
+                    )
+                    handler.setFormatter(logging.Formatter('%(message)s'))
+                    # Standalone logger so store lines never reach the root handlers
+                    writer = logging.Logger('slow_query_store', level=logging.INFO)
+                    writer.addHandler(handler)
+                    self._writer = writer
+        return self._writer
+
+    def _store_path(self, pid):
+        return os.path.join(self.store_dir, f"{STORE_PREFIX}.{pid}.jsonl")
+
+    def _prune_stale_stores(self):
+        """Remove store files of exited workers that have not been written for a while"""
+        cutoff = time.time() - STORE_RETENTION_DAYS * 86400
+        for path in self._store_files():
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def _should_explain(self, fp):
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_explain.get(fp)
+            if last is not None and now - last < self.explain_cooldown_seconds:
+                return False
+            self._last_explain[fp] = now
+            return True
+
+    @staticmethod
+    def _explain(conn, query, params):
+        """Capture a plan on the caller's connection; never raises"""
+        analyze = is_read_only(query)
+        prefix = "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " if analyze else "EXPLAIN (FORMAT JSON) "
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(prefix + query, params or ())
+                plan = cursor.fetchone()[0]
+            conn.rollback()
+            return {"analyzed": analyze, "plan": plan}
+        except Exception as e:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            return {"analyzed": analyze, "error": str(e)}
+
+    def record(self, query, params, duration_seconds, row_count, conn=None, threshold_ms=None):
+        """
+        Record a statement if it crossed the slow threshold.
+
+        Args:
+            query (str): SQL as passed to execute_query
+            params: Query parameters (only their shape is stored)
+            duration_seconds (float): Execution time
+            row_count (int): Rows returned or affected
+            conn: Open connection used for EXPLAIN capture (optional)
+            threshold_ms (float): Per-call override of the threshold
+
+        Returns:
+            dict or None: The stored entry when the statement was slow
+        """
+        limit = self.threshold_ms if threshold_ms is None else threshold_ms
+        duration_ms = duration_seconds * 1000
+        if limit is None or limit < 0 or duration_ms < limit:
+            return None
+
+        normalized = normalize_sql(query)
+        fp = fingerprint(normalized)
+        entry = {
+            "timestamp": datetime.now().isoformat(),
+            "fingerprint": fp,
+            "sql": normalized,
+            "params_shape": params_shape(params),
+            "rows": row_count,
+            "duration_ms": round(duration_ms, 2)
+        }
+
+        logger.warning(f"[DB] 🐢 Slow query {fp} took {entry['duration_ms']}ms, rows={row_count}: {normalized[:300]}")
+
+        if conn is not None and _EXPLAINABLE.match(query) and self._should_explain(fp):
+            entry["explain"] = self._explain(conn, query, params)
+
+        try:
+            self._get_writer().info(json.dumps(entry, default=str))
+        except Exception as e:
+            logger.error(f"[DB] Failed to write slow query store: {e}")
+        return entry
+
+    def _store_files(self):
+        """Store files of every process, each process's rotated backups first"""
+        if not os.path.isdir(self.store_dir):
+            return []
+        pattern = re.compile(rf"^{STORE_PREFIX}\.(\d+)\.jsonl(?:\.(\d+))?$")
+        files = []
+        for name in os.listdir(self.store_dir):
+            match = pattern.match(name)
+            if match:
+                # Oldest first within a process: highest backup number, then the live file
+                files.append((int(match.group(1)), -int(match.group(2) or 0), name))
+        return [os.path.join(self.store_dir, name) for _, _, name in sorted(files)]
+
+    def top_offenders(self, limit=20, order_by='total_ms'):
+        """
+        Aggregate stored entries by fingerprint.
+
+        Args:
+            limit (int): Number of statements to return
+            order_by (str): 'total_ms', 'max_ms', 'mean_ms' or 'count'
+
+        Returns:
+            list: Aggregates sorted descending by `order_by`
+        """
+        aggregates = {}
+        for path in self._store_files():
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    agg = aggregates.get(entry['fingerprint'])
+                    if agg is None:
+                        agg = aggregates[entry['fingerprint']] = {
+                            "fingerprint": entry['fingerprint'],
+                            "sql": entry['sql'],
+                            "params_shape": entry.get('params_shape'),
+                            "count": 0,
+                            "total_ms": 0.0,
+                            "max_ms": 0.0,
+                            "last_rows": None,
+                            "last_seen": None,
+                            "explain": None
+                        }
+                    agg["count"] += 1
+                    agg["total_ms"] += entry['duration_ms']
+                    agg["max_ms"] = max(agg["max_ms"], entry['duration_ms'])
+                    agg["last_rows"] = entry.get('rows')
+                    agg["last_seen"] = entry.get('timestamp')
+                    if entry.get('explain'):
+                        agg["explain"] = entry['explain']
+
+        for agg in aggregates.values():
+            agg["total_ms"] = round(agg["total_ms"], 2)
+            agg["mean_ms"] = round(agg["total_ms"] / agg["count"], 2)
+
+        if order_by not in ('total_ms', 'max_ms', 'mean_ms', 'count'):
+            order_by = 'total_ms'
+        ranked = sorted(aggregates.values(), key=lambda a: a[order_by], reverse=True)
+        return ranked[:limit]
+
+
+_slow_log = None
+
+
+def get_slow_query_log():
+    """Return the process-wide SlowQueryLog configured from Config"""
+    global _slow_log
+    if _slow_log is None:
+        from config import Config
+        _slow_log = SlowQueryLog(
+            Config.SLOW_QUERY_LOG_DIR,
+            threshold_ms=Config.SLOW_QUERY_THRESHOLD_MS,
+            explain_cooldown_seconds=Config.SLOW_QUERY_EXPLAIN_COOLDOWN_SECONDS
+        )
+    return _slow_log
@@ -0,0 +1,19 @@
+"""
+Gunicorn settings for the production entry point (wsgi:application)
+
+preload_app runs wsgi.py - app factory and warm-up - once in the master, so
+workers fork with templates, fonts and preloaded modules already in shared
+memory. Each worker then opens its own connection pool in post_fork.
+"""
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("GUNICORN_WORKERS", "4"))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+preload_app = True
+
+
+def post_fork(server, worker):
+    from utils.startup import after_fork
+    after_fork()
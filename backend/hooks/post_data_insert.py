@@ -19,7 +19,7 @@ from database.db_connection import execute_query
 
 logger = logging.getLogger(__name__)
 
-def update_master_table_after_insert(table_name, candidate_id, invoice_no=None):
+def update_master_table_after_insert(table_name, candidate_id, invoice_no=None, cursor=None):
     """
     Update Master_Database_Table_A after inserting data into source tables.
     Creates separate entries for each certificate when multiple certificates exist.
@@ -28,6 +28,7 @@ def update_master_table_after_insert(table_name, candidate_id, invoice_no=None):
         table_name (str): Name of the table that was updated ('candidates', 'certificate_selections', or 'receiptinvoicedata')
         candidate_id (int): The candidate_id that was inserted/updated
         invoice_no (str): The invoice number (required for receiptinvoicedata updates)
+        cursor: Cursor of an open transaction to write with (default: a pooled connection)
     """
     try:
         logger.info(f"🔄 Updating Master_Database_Table_A after {table_name} insert for candidate_id: {candidate_id}")
@@ -51,17 +52,17 @@ def update_master_table_after_insert(table_name, candidate_id, invoice_no=None):
                     # Create individual entries for each selected course
                     for course in selected_courses:
                         certificate_name = course.get('certificate_name', 'Unknown Certificate') if isinstance(course, dict) else str(course)
-                        _insert_single_master_entry(candidate_id, certificate_name, invoice_no, receipt_result[0])
+                        _insert_single_master_entry(candidate_id, certificate_name, invoice_no, receipt_result[0], cursor)
                     return True
                 elif isinstance(selected_courses, list) and len(selected_courses) == 1:
                     # Single course in array - create one entry
                     course = selected_courses[0]
                     certificate_name = course.get('certificate_name', 'Unknown Certificate') if isinstance(course, dict) else str(course)
-                    _insert_single_master_entry(candidate_id, certificate_name, invoice_no, receipt_result[0])
+                    _insert_single_master_entry(candidate_id, certificate_name, invoice_no, receipt_result[0], cursor)
                     return True
 
         # Default behavior: create/update single entry (for certificate_selections or empty receipts)
-        _insert_single_master_entry(candidate_id, None, invoice_no)
+        _insert_single_master_entry(candidate_id, None, invoice_no, cursor=cursor)
         logger.info(f"✅ Master_Database_Table_A updated for candidate_id: {candidate_id}")
 
         return True
@@ -71,7 +72,7 @@ def update_master_table_after_insert(table_name, candidate_id, invoice_no=None):
         return False
 
 
-def _insert_single_master_entry(candidate_id, specific_certificate_name=None, invoice_no=None, receipt_data=None):
+def _insert_single_master_entry(candidate_id, specific_certificate_name=None, invoice_no=None, receipt_data=None, cursor=None):
     """
     Insert or update a single master table entry.
 
@@ -80,6 +81,7 @@ def _insert_single_master_entry(candidate_id, specific_certificate_name=None, in
         specific_certificate_name (str): Specific certificate name (for multi-course receipts)
         invoice_no (str): Invoice number if available
         receipt_data (dict): Receipt data if available
+        cursor: Cursor of an open transaction to write with
     """
     try:
         # Build the insert query based on whether we have specific certificate or need to aggregate
@@ -206,19 +208,23 @@ def _insert_single_master_entry(candidate_id, specific_certificate_name=None, in
             """
             params = (candidate_id,)
 
-        execute_query(insert_query, params, fetch=False)
+        if cursor is not None:
+            cursor.execute(insert_query, params)
+        else:
+            execute_query(insert_query, params, fetch=False)
         logger.info(f"✅ Master table entry inserted/updated for candidate_id: {candidate_id}, certificate: {specific_certificate_name or 'aggregated'}")
 
     except Exception as e:
         logger.error(f"❌ Failed to insert single master entry for candidate {candidate_id}: {e}")
         raise
 
-def update_master_table_after_candidate_insert(candidate_id):
+def update_master_table_after_candidate_insert(candidate_id, cursor=None):
     """
     Specialized hook for candidate insertions.
-    This should be called after a new candidate is inserted.
+    This should be called after a new candidate is inserted, with the
+    inserting transaction's cursor to make the update part of the same commit.
     """
-    return update_master_table_after_insert('candidates', candidate_id)
+    return update_master_table_after_insert('candidates', candidate_id, cursor=cursor)
 
 def update_master_table_after_certificate_insert(candidate_id):
     """
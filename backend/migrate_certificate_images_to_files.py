@@ -0,0 +1,37 @@
+"""
+Migration script to move certificate_selections.verification_image/certificate_image
+values into the certificate file store, in batches
+"""
+
+import argparse
+import sys
+from utils.certificate_files import migrate_legacy_images
+
+def main():
+    """Main migration function"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--batch-size', type=int, default=50, help='Rows per transaction (default: 50)')
+    args = parser.parse_args()
+
+    print("[MIGRATION] Certificate images to file storage")
+    print("=" * 50)
+
+    try:
+        report = migrate_legacy_images(batch_size=args.batch_size)
+    except Exception as e:
+        print(f"[MIGRATION] ❌ Migration failed: {e}")
+        sys.exit(1)
+
+    errors = 0
+    for kind, counts in report.items():
+        print(f"[MIGRATION] {kind}: {counts['migrated']} migrated, {counts['errors']} errors")
+        errors += counts['errors']
+
+    if errors:
+        print("[MIGRATION] ⚠️  Some rows could not be migrated - check the errors above and re-run")
+        sys.exit(1)
+    print("[MIGRATION] ✅ Migration completed successfully")
+    print("[MIGRATION] Run VACUUM FULL certificate_selections; to reclaim the space held by the old blobs")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+-- Typed certificate dates and expiry indexes
+-- certificate_selections stored its dates as whatever string the screen sent
+-- (DD-MM-YYYY from the certificate editor, YYYY-MM-DD from generation), and
+-- legacy_certificates rows may have been loaded from DD / MM / YYYY CSV text.
+-- This converts start_date, end_date, issue_date and expiry_date of both
+-- tables to DATE where they are still text, parsing every value with
+-- certificate_date() (the same formats as utils/dates.parse_date). Values that
+-- do not parse are copied to certificate_date_rejects and become NULL; in a
+-- NOT NULL column they abort the migration instead, so run
+-- run_normalize_certificate_dates.py --dry-run first to list them.
+-- The expiry indexes serve the expiring certificates report
+-- (database/certificate_expiry.py) with an index range scan per table.
+-- This script is idempotent and can be run multiple times safely
+
+CREATE OR REPLACE FUNCTION certificate_date(p_value TEXT)
+RETURNS DATE AS $$
+DECLARE
+    v TEXT := btrim(COALESCE(p_value, ''));
+    parts TEXT[];
+BEGIN
+    -- YYYY-MM-DD, optionally followed by a time
+    parts := regexp_match(v, '^(\d{4})-(\d{1,2})-(\d{1,2})([T\s].*)?$');
+    IF parts IS NOT NULL THEN
+        RETURN make_date(parts[1]::INT, parts[2]::INT, parts[3]::INT);
+    END IF;
+    -- DD-MM-YYYY, DD/MM/YYYY, DD.MM.YYYY, with any spacing around the separators
+    parts := regexp_match(regexp_replace(v, '\s+', '', 'g'), '^(\d{1,2})([-/.])(\d{1,2})\2(\d{4})$');
+    IF parts IS NOT NULL THEN
+        RETURN make_date(parts[4]::INT, parts[3]::INT, parts[1]::INT);
+    END IF;
+    RETURN NULL;
+EXCEPTION WHEN datetime_field_overflow OR invalid_datetime_format THEN
+    -- 31-02-2025 and the like
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+CREATE TABLE IF NOT EXISTS certificate_date_rejects (
+    id SERIAL PRIMARY KEY,
+    table_name TEXT NOT NULL,
+    row_id INTEGER,
+    column_name TEXT NOT NULL,
+    raw_value TEXT,
+    recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+DO $$
+DECLARE
+    target RECORD;
+    col_type TEXT;
+    col_nullable TEXT;
+    rejected BIGINT;
+    -- SET LOCAL certificate_dates.dry_run = 'on' lists NOT NULL rejects instead of failing
+    dry_run BOOLEAN := COALESCE(current_setting('certificate_dates.dry_run', TRUE), '') = 'on';
+BEGIN
+    FOR target IN
+        SELECT t.table_name, c.column_name
+        FROM (VALUES ('certificate_selections'), ('legacy_certificates')) AS t(table_name)
+        CROSS JOIN (VALUES ('start_date'), ('end_date'), ('issue_date'), ('expiry_date')) AS c(column_name)
+    LOOP
+        CONTINUE WHEN to_regclass(target.table_name) IS NULL;
+
+        SELECT data_type, is_nullable INTO col_type, col_nullable
+        FROM information_schema.columns
+        WHERE table_schema = current_schema()
+          AND table_name = target.table_name
+          AND column_name = target.column_name;
+
+        IF col_type IS NULL THEN
+            EXECUTE format('ALTER TABLE %I ADD COLUMN %I DATE', target.table_name, target.column_name);
+            RAISE NOTICE 'Added %.% as DATE', target.table_name, target.column_name;
+            CONTINUE;
+        END IF;
+        CONTINUE WHEN col_type = 'date';
+
+        EXECUTE format(
+            'INSERT INTO certificate_date_rejects (table_name, row_id, column_name, raw_value)
+             SELECT %L, id, %L, %I::TEXT FROM %I
+             WHERE btrim(COALESCE(%I::TEXT, '''')) <> '''' AND certificate_date(%I::TEXT) IS NULL',
+            target.table_name, target.column_name, target.column_name, target.table_name,
+            target.column_name, target.column_name);
+        GET DIAGNOSTICS rejected = ROW_COUNT;
+
+        IF rejected > 0 AND col_nullable = 'NO' THEN
+            IF dry_run THEN
+                RAISE NOTICE '% unparseable values in NOT NULL column %.%', rejected, target.table_name, target.column_name;
+                CONTINUE;
+            END IF;
+            RAISE EXCEPTION '% unparseable values in NOT NULL column %.%; correct them (see --dry-run) and run again',
+                rejected, target.table_name, target.column_name;
+        END IF;
+
+        EXECUTE format('ALTER TABLE %I ALTER COLUMN %I TYPE DATE USING certificate_date(%I::TEXT)',
+                       target.table_name, target.column_name, target.column_name);
+        RAISE NOTICE 'Converted %.% from % to DATE (% unparseable values kept in certificate_date_rejects)',
+            target.table_name, target.column_name, col_type, rejected;
+    END LOOP;
+END $$;
+
+-- Range scans on expiry_date in id order: the report merges both tables by (expiry_date, id)
+CREATE INDEX IF NOT EXISTS idx_certificate_selections_expiry_date
+ON certificate_selections (expiry_date, id)
+WHERE expiry_date IS NOT NULL;
+
+DO $$
+BEGIN
+    IF to_regclass('legacy_certificates') IS NOT NULL THEN
+        CREATE INDEX IF NOT EXISTS idx_legacy_certificates_expiry_date
+        ON legacy_certificates (expiry_date, id);
+        ANALYZE legacy_certificates;
+    END IF;
+END $$;
+
+ANALYZE certificate_selections;
+
+COMMENT ON FUNCTION certificate_date(TEXT) IS 'Parses a certificate date string (YYYY-MM-DD, DD-MM-YYYY, DD/MM/YYYY, DD.MM.YYYY); NULL if it does not parse';
+COMMENT ON TABLE certificate_date_rejects IS 'Date values that normalize_certificate_dates.sql could not parse, kept before the column was converted to DATE';
+
+-- Display success message
+DO $$
+BEGIN
+    RAISE NOTICE '✅ Certificate dates are typed DATE columns with expiry indexes';
+END $$;
@@ -1 +1,9 @@
-# OCR package
\ No newline at end of file
+# OCR package
+#
+# Imported only when OCR actually runs (routes import it lazily), so cv2,
+# numpy and pytesseract stay out of the web workers unless OCR is enabled.
+from config import TESSERACT_CMD
+
+if TESSERACT_CMD:
+    import pytesseract
+    pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
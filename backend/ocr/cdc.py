@@ -7,6 +7,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from ocr.preprocess import preprocess_image
 from config import Config
 from utils.chatgpt import filter_text_with_chatgpt
+from utils.metrics import timed
 
 def extract_cdc_data(image_path):
     """Extract CDC number and INDOS number from CDC image using OCR"""
@@ -14,7 +15,7 @@ def extract_cdc_data(image_path):
         print(f"[OCR] Processing CDC image: {image_path}")
 
         # Preprocess image in memory
-        original_path, processed_image = preprocess_image(image_path)
+        prepared = preprocess_image(image_path)
 
         # Perform OCR with multiple configurations
         configs = [
@@ -27,17 +28,20 @@ def extract_cdc_data(image_path):
         for config in configs:
             try:
                 # Use processed image if available, otherwise use original
-                if processed_image is not None:
-                    # Convert numpy array to PIL Image for OCR
-                    pil_image = Image.fromarray(processed_image)
-                    text = pytesseract.image_to_string(pil_image, config=config)
-                else:
-                    text = pytesseract.image_to_string(Image.open(original_path), config=config)
+                with timed('ocr_tesseract_duration_seconds', document='cdc', config=config):
+                    if prepared is not None:
+                        # Encoded once per image and piped to Tesseract from memory
+                        text = prepared.image_to_string(config)
+                    else:
+                        text = pytesseract.image_to_string(Image.open(image_path), config=config)
                 if len(text.strip()) > len(best_text.strip()):
                     best_text = text
             except:
                 continue
 
+        if prepared is not None:
+            print(f"[PREPROCESS] Stage timings: {prepared.timings}")
+
         text = best_text
         print(f"[OCR] CDC text length: {len(text)} characters")
         print(f"[OCR] CDC text preview: {text[:200]}...")
@@ -0,0 +1,275 @@
+"""
+Machine-readable zone (MRZ) engine for passport front pages
+
+Locates the two TD3 MRZ lines with OpenCV morphology, OCRs only that strip
+with an OCR-B friendly Tesseract configuration and parses the fields with
+ICAO 9303 check-digit validation. Full-page OCR in ocr/passport.py is only
+used when this fails.
+"""
+
+import re
+import time
+from datetime import datetime
+
+MRZ_LINE_LENGTH = 44
+MRZ_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789<"
+MRZ_TESSERACT_CONFIG = f"-c tessedit_char_whitelist={MRZ_ALPHABET} -c load_system_dawg=0 -c load_freq_dawg=0"
+
+# Common OCR confusions, applied only where the field type is known
+_TO_DIGIT = str.maketrans({'O': '0', 'Q': '0', 'D': '0', 'U': '0', 'I': '1', 'L': '1', 'T': '1',
+                           'Z': '2', 'S': '5', 'B': '8', 'G': '6'})
+_TO_ALPHA = str.maketrans({'0': 'O', '1': 'I', '2': 'Z', '5': 'S', '8': 'B', '6': 'G'})
+
+_CHECK_WEIGHTS = (7, 3, 1)
+
+
+def check_digit(value):
+    """ICAO 9303 check digit for an MRZ field"""
+    total = 0
+    for i, char in enumerate(value):
+        if char.isdigit():
+            n = int(char)
+        elif 'A' <= char <= 'Z':
+            n = ord(char) - 55
+        else:  # '<' filler (and anything unreadable)
+            n = 0
+        total += n * _CHECK_WEIGHTS[i % 3]
+    return str(total % 10)
+
+
+def _clean_line(line):
+    """Strip spaces/noise and pad or trim to the TD3 line length"""
+    line = re.sub(r'[^A-Z0-9<]', '', line.upper().replace(' ', ''))
+    if len(line) > MRZ_LINE_LENGTH:
+        line = line[:MRZ_LINE_LENGTH]
+    return line.ljust(MRZ_LINE_LENGTH, '<')
+
+
+def find_mrz_lines(text):
+    """
+    Pick the two TD3 lines out of OCR text.
+
+    Returns:
+        tuple or None: (line1, line2) cleaned to 44 characters
+    """
+    candidates = []
+    for raw in text.upper().splitlines():
+        line = re.sub(r'\s+', '', raw)
+        if len(line) >= 30 and '<' in line:
+            candidates.append(line)
+
+    # Line 1 starts with P (document code); line 2 follows it
+    for i in range(len(candidates) - 1):
+        if candidates[i].startswith('P'):
+            return _clean_line(candidates[i]), _clean_line(candidates[i + 1])
+    if len(candidates) >= 2:
+        return _clean_line(candidates[-2]), _clean_line(candidates[-1])
+    return None
+
+
+def _validated(field, check):
+    """Return (value, valid), retrying with digit substitutions on failure"""
+    if check_digit(field) == check:
+        return field, True
+    fixed_field = field.translate(_TO_DIGIT)
+    fixed_check = check.translate(_TO_DIGIT)
+    if check_digit(fixed_field) == fixed_check:
+        return fixed_field, True
+    return field, False
+
+
+def _mrz_date(yymmdd, future=False):
+    """Convert YYMMDD to DD/MM/YYYY; birth dates are never in the future"""
+    if not (len(yymmdd) == 6 and yymmdd.isdigit()):
+        return ""
+    yy, mm, dd = int(yymmdd[:2]), yymmdd[2:4], yymmdd[4:6]
+    current_yy = datetime.now().year % 100
+    if future:
+        year = 2000 + yy
+    else:
+        year = 1900 + yy if yy > current_yy else 2000 + yy
+    return f"{dd}/{mm}/{year}"
+
+
+def parse_td3(line1, line2):
+    """
+    Parse and check-digit-validate a TD3 (passport) MRZ.
+
+    Args:
+        line1 (str): First MRZ line (document code, issuing state, names)
+        line2 (str): Second MRZ line (numbers, dates, check digits)
+
+    Returns:
+        dict: Parsed fields plus per-field check results under "checks"
+    """
+    line1 = _clean_line(line1)
+    line2 = _clean_line(line2)
+
+    issuing_state = line1[2:5].translate(_TO_ALPHA).replace('<', '')
+    names = line1[5:].split('<<', 1)
+    surname = names[0].translate(_TO_ALPHA).replace('<', ' ').strip()
+    given_names = names[1].translate(_TO_ALPHA).replace('<', ' ').strip() if len(names) > 1 else ""
+    given_names = re.sub(r'\s+', ' ', given_names)
+
+    passport_no, passport_ok = _validated(line2[0:9], line2[9])
+    dob, dob_ok = _validated(line2[13:19].translate(_TO_DIGIT), line2[19])
+    expiry, expiry_ok = _validated(line2[21:27].translate(_TO_DIGIT), line2[27])
+    personal_no = line2[28:42]
+
+    composite = passport_no + line2[9] + dob + line2[19] + expiry + line2[27] + personal_no + line2[42]
+    composite_ok = check_digit(composite) == line2[43].translate(_TO_DIGIT)
+
+    sex = line2[20].replace('<', 'X')
+    if sex not in ('M', 'F', 'X'):
+        sex = ''
+
+    checks = {
+        "passport_no": passport_ok,
+        "date_of_birth": dob_ok,
+        "date_of_expiry": expiry_ok,
+        "composite": composite_ok
+    }
+
+    return {
+        "Passport No.": passport_no.replace('<', ''),
+        "Surname": surname,
+        "Given Name(s)": given_names,
+        "Nationality": line2[10:13].translate(_TO_ALPHA).replace('<', ''),
+        "Sex": sex,
+        "Date of Birth": _mrz_date(dob),
+        "Date of Expiry": _mrz_date(expiry, future=True),
+        "Issuing State": issuing_state,
+        "checks": checks,
+        "valid": passport_ok and dob_ok and expiry_ok,
+        "mrz_lines": [line1, line2]
+    }
+
+
+def locate_mrz(gray):
+    """
+    Find the MRZ band in a grayscale passport page.
+
+    Uses a blackhat transform to highlight dark text on light background,
+    a horizontal gradient to favour dense character rows and closing to
+    merge the two lines into one wide, short blob.
+
+    Returns:
+        numpy.ndarray or None: Cropped MRZ strip at original resolution
+    """
+    import cv2
+    import numpy as np
+
+    height, width = gray.shape[:2]
+    scale = 600.0 / height
+    small = cv2.resize(gray, (int(width * scale), 600), interpolation=cv2.INTER_AREA)
+
+    rect_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (13, 5))
+    square_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (21, 21))
+
+    small = cv2.GaussianBlur(small, (3, 3), 0)
+    blackhat = cv2.morphologyEx(small, cv2.MORPH_BLACKHAT, rect_kernel)
+
+    grad_x = np.absolute(cv2.Sobel(blackhat, cv2.CV_32F, 1, 0, ksize=-1))
+    min_val, max_val = np.min(grad_x), np.max(grad_x)
+    if max_val - min_val == 0:
+        return None
+    grad_x = (255 * ((grad_x - min_val) / (max_val - min_val))).astype("uint8")
+
+    grad_x = cv2.morphologyEx(grad_x, cv2.MORPH_CLOSE, rect_kernel)
+    _, thresh = cv2.threshold(grad_x, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    thresh = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, square_kernel)
+    thresh = cv2.erode(thresh, None, iterations=4)
+
+    # Page edges often produce long vertical gradients - ignore them
+    border = int(small.shape[1] * 0.05)
+    thresh[:, :border] = 0
+    thresh[:, small.shape[1] - border:] = 0
+
+    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    for contour in sorted(contours, key=cv2.contourArea, reverse=True):
+        x, y, w, h = cv2.boundingRect(contour)
+        aspect_ratio = w / float(h)
+        coverage = w / float(small.shape[1])
+        # MRZ is a wide band in the lower half of the page
+        if aspect_ratio > 5 and coverage > 0.6 and y > small.shape[0] * 0.4:
+            pad_x = int((x + w) * 0.03)
+            pad_y = int((y + h) * 0.03)
+            x0 = max(int((x - pad_x) / scale), 0)
+            y0 = max(int((y - pad_y) / scale), 0)
+            x1 = min(int((x + w + pad_x) / scale), width)
+            y1 = min(int((y + h + pad_y) / scale), height)
+            return gray[y0:y1, x0:x1]
+    return None
+
+
+def _prepare_strip(strip):
+    """Scale the MRZ strip so glyphs are ~32px tall and binarize it"""
+    import cv2
+
+    # Two text lines plus spacing: target roughly 110px for the whole strip
+    if strip.shape[0] < 110:
+        factor = 110.0 / strip.shape[0]
+        strip = cv2.resize(strip, None, fx=factor, fy=factor, interpolation=cv2.INTER_CUBIC)
+    _, binary = cv2.threshold(strip, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    return binary
+
+
+def _split_lines(binary):
+    """Split a binarized MRZ strip into individual text lines by row projection"""
+    import numpy as np
+
+    ink = (binary < 128).sum(axis=1)
+    rows = ink > max(ink.max() * 0.1, 1)
+    lines, start = [], None
+    for i, has_ink in enumerate(np.append(rows, False)):
+        if has_ink and start is None:
+            start = i
+        elif not has_ink and start is not None:
+            if i - start > 8:
+                lines.append(binary[max(start - 4, 0):i + 4, :])
+            start = None
+    return lines
+
+
+def extract_mrz(gray, lang='eng', timings=None):
+    """
+    Locate, OCR and parse the MRZ of a grayscale passport page.
+
+    Args:
+        gray (numpy.ndarray): Grayscale page
+        lang (str): Tesseract language; use 'ocrb'/'mrz' traineddata when installed
+        timings (dict): Optional dict receiving per-stage durations in seconds
+
+    Returns:
+        dict or None: parse_td3() result, or None when no MRZ could be read
+    """
+    from ocr.preprocess import encode_for_tesseract, tesseract_image_to_string
+
+    timings = timings if timings is not None else {}
+
+    start = time.perf_counter()
+    strip = locate_mrz(gray)
+    timings['mrz_locate'] = time.perf_counter() - start
+    if strip is None or strip.size == 0:
+        return None
+
+    binary = _prepare_strip(strip)
+
+    # Whole strip first (two lines, one block); then line by line
+    start = time.perf_counter()
+    text = tesseract_image_to_string(encode_for_tesseract(binary), config=f"--psm 6 {MRZ_TESSERACT_CONFIG}", lang=lang)
+    lines = find_mrz_lines(text)
+    result = parse_td3(*lines) if lines else None
+
+    if result is None or not result["valid"]:
+        line_images = _split_lines(binary)
+        if len(line_images) >= 2:
+            line_texts = [
+                tesseract_image_to_string(encode_for_tesseract(image), config=f"--psm 7 {MRZ_TESSERACT_CONFIG}", lang=lang)
+                for image in line_images[-2:]
+            ]
+            retry = parse_td3(*line_texts)
+            if result is None or retry["valid"] or sum(retry["checks"].values()) > sum(result["checks"].values()):
+                result = retry
+    timings['mrz_ocr'] = time.perf_counter() - start
+    return result
@@ -7,14 +7,70 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from ocr.preprocess import preprocess_image
 from config import Config
 from utils.chatgpt import filter_text_with_chatgpt
+from utils.metrics import timed
+from ocr.mrz import extract_mrz, find_mrz_lines, parse_td3
+
+def extract_passport_mrz(prepared):
+    """
+    Fast path: read the passport from its machine-readable zone only.
+
+    Args:
+        prepared (PreparedImage): Resolution-normalized page from preprocess_image
+
+    Returns:
+        tuple: (passport_data or None, raw MRZ parse result or None).
+        passport_data is only returned when the passport number, date of
+        birth and expiry check digits all validate.
+    """
+    try:
+        if prepared is None:
+            return None, None
+
+        timings = {}
+        with timed('ocr_extraction_duration_seconds', document='passport_mrz'):
+            mrz = extract_mrz(prepared.gray, lang=Config.MRZ_TESSERACT_LANG, timings=timings)
+
+        if not mrz:
+            print("[MRZ] No machine-readable zone found")
+            return None, None
+
+        print(f"[MRZ] Lines: {mrz['mrz_lines']} checks: {mrz['checks']} timings: {timings}")
+        if not mrz["valid"]:
+            return None, mrz
+
+        passport_data = {
+            "Passport No.": mrz["Passport No."],
+            "Surname": mrz["Surname"],
+            "Given Name(s)": mrz["Given Name(s)"],
+            "Nationality": mrz["Nationality"],
+            "Sex": mrz["Sex"],
+            "Date of Birth": mrz["Date of Birth"],
+            "Date of Expiry": mrz["Date of Expiry"],
+            "raw_text": "\n".join(mrz["mrz_lines"]),
+            "extraction_method": "mrz",
+            "mrz_checks": mrz["checks"]
+        }
+        return passport_data, mrz
+
+    except Exception as e:
+        print(f"[MRZ] MRZ extraction failed: {e}")
+        return None, None
 
 def extract_passport_front_data(image_path):
-    """Enhanced passport front data extraction with better accuracy"""
+    """Passport front data extraction: MRZ first, full-page OCR as fallback"""
     try:
         print(f"[OCR] Processing passport front image: {image_path}")
 
-        # Preprocess image in memory
-        original_path, processed_image = preprocess_image(image_path)
+        # Normalize resolution once; binary variants are only built if full-page OCR runs
+        prepared = preprocess_image(image_path)
+
+        # MRZ-first: OCR only the machine-readable strip and validate check digits
+        mrz_passport_data, partial_mrz = extract_passport_mrz(prepared)
+        if mrz_passport_data:
+            print("[MRZ] ✅ Check digits valid - skipping full-page OCR")
+            return mrz_passport_data
+
+        print("[OCR] MRZ unavailable or invalid, falling back to full-page OCR")
 
         # Try multiple OCR approaches for better accuracy
         print("[OCR] Running enhanced OCR extraction...")
@@ -32,18 +88,21 @@ def extract_passport_front_data(image_path):
         for i, config in enumerate(configs):
             try:
                 # Use processed image if available, otherwise use original
-                if processed_image is not None:
-                    # Convert numpy array to PIL Image for OCR
-                    pil_image = Image.fromarray(processed_image)
-                    text = pytesseract.image_to_string(pil_image, config=config)
-                else:
-                    text = pytesseract.image_to_string(Image.open(original_path), config=config)
+                with timed('ocr_tesseract_duration_seconds', document='passport_front', config=config):
+                    if prepared is not None:
+                        # Encoded once per image and piped to Tesseract from memory
+                        text = prepared.image_to_string(config)
+                    else:
+                        text = pytesseract.image_to_string(Image.open(image_path), config=config)
                 all_texts.append(text)
                 print(f"[OCR] Config {i+1} extracted {len(text)} characters")
             except Exception as e:
                 print(f"[OCR] Config {i+1} failed: {e}")
                 continue
 
+        if prepared is not None:
+            print(f"[PREPROCESS] Stage timings: {prepared.timings}")
+
         # Select best text based on quality indicators, not just length
         best_text = ""
         best_score = 0
@@ -93,7 +152,8 @@ def extract_passport_front_data(image_path):
             "Nationality": "",
             "Sex": "",
             "Date of Birth": "",
-            "raw_text": best_text
+            "raw_text": best_text,
+            "extraction_method": "full_page"
         }
 
         # Try ChatGPT filtering first
@@ -115,48 +175,29 @@ def extract_passport_front_data(image_path):
         combined_text = "\n".join(all_texts)
         text_upper = combined_text.upper()
 
-        # Extract MRZ lines (Machine Readable Zone)
+        # Extract MRZ lines (Machine Readable Zone) from the full-page text
         print("[OCR] Extracting MRZ lines...")
-        lines = combined_text.split('\n')
-        mrz_lines = []
-        for line in lines:
-            clean_line = line.strip()
-            # MRZ lines: 44 characters, contain < and alphanumeric
-            if len(clean_line) >= 40 and '<' in clean_line and any(c.isalnum() for c in clean_line):
-                mrz_lines.append(clean_line)
-
-        if len(mrz_lines) >= 2:
-            print(f"[OCR] Found MRZ lines: {mrz_lines}")
-
-            # Extract only essential data from MRZ
-            try:
-                mrz1 = mrz_lines[0]
-                mrz2 = mrz_lines[1]
-
-                # MRZ Line 1: P<COUNTRY<SURNAME<<GIVEN_NAMES<<<<<<<<<<<<<<<
-                if mrz1.startswith('P<'):
-                    # Extract surname and given names from MRZ
-                    name_part = mrz1[5:].split('<<')
-                    if len(name_part) >= 2:
-                        passport_data["Surname"] = name_part[0].replace('<', ' ').strip()
-                        passport_data["Given Name(s)"] = name_part[1].replace('<', ' ').strip()
-
-                # MRZ Line 2: PASSPORT_NO<COUNTRY<DOB<SEX<EXPIRY<PERSONAL_NO<CHECK
-                if len(mrz2) >= 28:
-                    passport_data["Passport No."] = mrz2[:9].replace('<', '').strip()
-                    passport_data["Nationality"] = mrz2[10:13]
-
-                    # Date of birth (YYMMDD)
-                    dob = mrz2[13:19]
-                    if dob.isdigit() and len(dob) == 6:
-                        year = "19" + dob[:2] if int(dob[:2]) > 30 else "20" + dob[:2]
-                        passport_data["Date of Birth"] = f"{dob[4:6]}/{dob[2:4]}/{year}"
-
-                    # Sex
-                    passport_data["Sex"] = mrz2[20]
-
-            except Exception as e:
-                print(f"[OCR] MRZ parsing error: {e}")
+        mrz_lines = find_mrz_lines(combined_text)
+        mrz = parse_td3(*mrz_lines) if mrz_lines else None
+
+        # Prefer whichever MRZ read validated more check digits
+        if partial_mrz and (mrz is None or sum(partial_mrz["checks"].values()) > sum(mrz["checks"].values())):
+            mrz = partial_mrz
+
+        if mrz:
+            print(f"[OCR] Found MRZ lines: {mrz['mrz_lines']} checks: {mrz['checks']}")
+            passport_data["mrz_checks"] = mrz["checks"]
+            if mrz["Surname"]:
+                passport_data["Surname"] = mrz["Surname"]
+                passport_data["Given Name(s)"] = mrz["Given Name(s)"]
+            if mrz["checks"]["passport_no"] or not passport_data["Passport No."]:
+                passport_data["Passport No."] = mrz["Passport No."]
+            if mrz["Nationality"]:
+                passport_data["Nationality"] = mrz["Nationality"]
+            if mrz["checks"]["date_of_birth"]:
+                passport_data["Date of Birth"] = mrz["Date of Birth"]
+            if mrz["Sex"]:
+                passport_data["Sex"] = mrz["Sex"]
 
         # Fallback: Extract from regular text if MRZ parsing failed
 
@@ -234,7 +275,7 @@ def extract_passport_back_data(image_path):
         print(f"[OCR] Processing passport back image: {image_path}")
 
         # Preprocess image in memory
-        original_path, processed_image = preprocess_image(image_path)
+        prepared = preprocess_image(image_path)
 
         # Perform OCR with multiple configurations
         configs = [
@@ -247,17 +288,20 @@ def extract_passport_back_data(image_path):
         for config in configs:
             try:
                 # Use processed image if available, otherwise use original
-                if processed_image is not None:
-                    # Convert numpy array to PIL Image for OCR
-                    pil_image = Image.fromarray(processed_image)
-                    text = pytesseract.image_to_string(pil_image, config=config)
-                else:
-                    text = pytesseract.image_to_string(Image.open(original_path), config=config)
+                with timed('ocr_tesseract_duration_seconds', document='passport_back', config=config):
+                    if prepared is not None:
+                        # Encoded once per image and piped to Tesseract from memory
+                        text = prepared.image_to_string(config)
+                    else:
+                        text = pytesseract.image_to_string(Image.open(image_path), config=config)
                 if len(text.strip()) > len(best_text.strip()):
                     best_text = text
             except:
                 continue
 
+        if prepared is not None:
+            print(f"[PREPROCESS] Stage timings: {prepared.timings}")
+
         text = best_text
         print(f"[OCR] Passport back text length: {len(text)} characters")
         print(f"[OCR] Passport back text preview: {text[:200]}...")
@@ -1,59 +1,145 @@
+import shlex
+import subprocess
+import time
 import cv2
-import numpy as np
-from PIL import Image
+import pytesseract
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config
+from utils.metrics import metrics
 
-def preprocess_image(image_path):
-    """Enhanced image preprocessing for better OCR results - processes in memory only"""
-    try:
-        print(f"[PREPROCESS] Processing image in memory: {image_path}")
+# Physical width of the scanned page, used to normalize resolution to
+# Config.OCR_TARGET_DPI: the ICAO ID-3 passport data page (125 mm). CDC
+# booklets are passport-sized, so one width serves every document we read.
+PAGE_WIDTH_INCHES = 4.92
+
+# Images within this ratio of the target width are left alone
+RESIZE_TOLERANCE = 0.15
+
+
+def encode_for_tesseract(image):
+    """Encode an image array once as PNG bytes that Tesseract can read from stdin"""
+    ok, buffer = cv2.imencode('.png', image, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+    if not ok:
+        raise ValueError("Could not encode image for OCR")
+    return buffer.tobytes()
+
+
+def tesseract_image_to_string(image_bytes, config='', lang='eng', dpi=None, timeout=60):
+    """
+    Run the Tesseract binary on an in-memory image.
+
+    Unlike pytesseract.image_to_string this does not write a temp file per
+    call; the already-encoded bytes are piped to `tesseract stdin stdout`.
+    """
+    command = [pytesseract.pytesseract.tesseract_cmd, 'stdin', 'stdout', '-l', lang]
+    if dpi:
+        command += ['--dpi', str(dpi)]
+    command += shlex.split(config)
+    result = subprocess.run(command, input=image_bytes, capture_output=True, timeout=timeout)
+    if result.returncode != 0:
+        raise RuntimeError(f"Tesseract failed: {result.stderr.decode(errors='replace').strip()}")
+    return result.stdout.decode('utf-8', errors='replace')
 
-        # Read image
-        img = cv2.imread(image_path)
-        if img is None:
-            print(f"[ERROR] Could not read image: {image_path}")
-            return image_path, None
 
-        print(f"[PREPROCESS] Original image size: {img.shape}")
+class PreparedImage:
+    """
+    A page normalized for OCR.
 
-        # Resize image if too small (OCR works better on larger images)
-        height, width = img.shape[:2]
-        if width < 1000:
-            scale_factor = 1000 / width
-            new_width = int(width * scale_factor)
-            new_height = int(height * scale_factor)
-            img = cv2.resize(img, (new_width, new_height), interpolation=cv2.INTER_CUBIC)
-            print(f"[PREPROCESS] Resized to: {img.shape}")
+    `gray` is the resolution-normalized grayscale page. The denoised/CLAHE/
+    Otsu `binary` variant and its encoded bytes are only computed the first
+    time they are used, so callers that stop at the MRZ never pay for them.
+    """
 
-        # Convert to grayscale
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    def __init__(self, image_path, gray, scale, dpi, timings):
+        self.image_path = image_path
+        self.gray = gray
+        self.scale = scale
+        self.dpi = dpi
+        self.timings = timings
+        self._binary = None
+        self._encoded = None
 
-        # Apply multiple preprocessing techniques
+    def _stage(self, name, start):
+        elapsed = time.perf_counter() - start
+        self.timings[name] = elapsed
+        metrics.observe('ocr_preprocess_duration_seconds', elapsed, stage=name)
 
-        # 1. Noise reduction
-        denoised = cv2.medianBlur(gray, 3)
+    @property
+    def binary(self):
+        if self._binary is None:
+            start = time.perf_counter()
+            denoised = cv2.medianBlur(self.gray, 3)
+            self._stage('denoise', start)
 
-        # 2. Contrast enhancement
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-        enhanced = clahe.apply(denoised)
+            start = time.perf_counter()
+            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+            enhanced = clahe.apply(denoised)
+            self._stage('clahe', start)
 
-        # 3. Morphological operations to clean up text
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, 1))
-        morph = cv2.morphologyEx(enhanced, cv2.MORPH_CLOSE, kernel)
+            start = time.perf_counter()
+            _, self._binary = cv2.threshold(enhanced, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            self._stage('threshold', start)
+        return self._binary
 
-        # 4. Adaptive thresholding for better text separation
-        adaptive_thresh = cv2.adaptiveThreshold(
-            morph, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
-        )
+    def tesseract_input(self):
+        """PNG bytes of the binary variant, encoded once per image"""
+        if self._encoded is None:
+            binary = self.binary
+            start = time.perf_counter()
+            self._encoded = encode_for_tesseract(binary)
+            self._stage('encode', start)
+        return self._encoded
+
+    def image_to_string(self, config='', lang='eng'):
+        """OCR the binary variant with the given Tesseract config"""
+        return tesseract_image_to_string(self.tesseract_input(), config=config, lang=lang, dpi=self.dpi)
+
+
+def preprocess_image(image_path):
+    """
+    Load an image and normalize it for OCR - processes in memory only.
+
+    The page is read straight to grayscale and scaled up or down so its
+    width matches Config.OCR_TARGET_DPI for the page's physical size:
+    small scans are upsampled with cubic interpolation, large phone photos
+    are downsampled with area interpolation.
+
+    Returns:
+        PreparedImage or None if the image could not be read
+    """
+    try:
+        print(f"[PREPROCESS] Processing image in memory: {image_path}")
+        timings = {}
+
+        start = time.perf_counter()
+        gray = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+        elapsed = time.perf_counter() - start
+        timings['read'] = elapsed
+        metrics.observe('ocr_preprocess_duration_seconds', elapsed, stage='read')
+        if gray is None:
+            print(f"[ERROR] Could not read image: {image_path}")
+            return None
 
-        # 5. Also create OTSU threshold version
-        _, otsu_thresh = cv2.threshold(morph, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        height, width = gray.shape[:2]
+        target_dpi = Config.OCR_TARGET_DPI
+        target_width = int(target_dpi * PAGE_WIDTH_INCHES)
+        scale = target_width / float(width)
 
-        # Process in memory only - no file saving
-        print(f"[PREPROCESS] Image processed in memory (no files saved)")
+        start = time.perf_counter()
+        if abs(scale - 1.0) > RESIZE_TOLERANCE:
+            interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_CUBIC
+            gray = cv2.resize(gray, (target_width, int(height * scale)), interpolation=interpolation)
+            print(f"[PREPROCESS] Resized {width}x{height} -> {gray.shape[1]}x{gray.shape[0]}")
+        else:
+            scale = 1.0
+        elapsed = time.perf_counter() - start
+        timings['resize'] = elapsed
+        metrics.observe('ocr_preprocess_duration_seconds', elapsed, stage='resize')
 
-        # Return the original path and processed image array for OCR
-        return image_path, otsu_thresh
+        return PreparedImage(image_path, gray, scale, target_dpi, timings)
 
     except Exception as e:
         print(f"[ERROR] Error preprocessing image: {e}")
-        return image_path, None
\ No newline at end of file
+        return None
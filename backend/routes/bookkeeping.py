@@ -1,16 +1,22 @@
-from flask import Blueprint, request, jsonify
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from bookkeeping.invoices import DOCUMENT_KINDS, get_reference_data, render_document, render_period_zip, resolve_courses, safe_filename
 from database import execute_query
+from database.db_connection import stream_rows
+from database.posting import (RECEIPT_UPDATE_FIELDS, post_entry, post_statement_lines, update_receipt,
+                              idempotency_key_from_request, IdempotencyConflict)
+from database.journal import CLIENT_SOURCES, PERIOD_SOURCES, VENDOR_SOURCES, delete_entry, fetch_ledger, fetch_period
+from database.open_items import AGING_BUCKETS, aging_report, open_items_for_client, rebuild_all, refresh_clients
+from utils.rate_limit import limiter
+from utils.serialization import ROWS, FieldSelectionError, list_response, requested_fields
+from datetime import date as date_type, datetime
+import calendar
+import itertools
 import logging
 
 logger = logging.getLogger(__name__)
 
 bookkeeping_bp = Blueprint('bookkeeping', __name__)
 
-# Initialize limiter for this blueprint
-limiter = Limiter(key_func=get_remote_address)
-
 @bookkeeping_bp.route('/get-all-companies', methods=['GET'])
 def get_all_companies():
     """Get all companies for dropdown"""
@@ -43,43 +49,45 @@ def get_all_companies():
             "status": "error"
         }), 500
 
+B2B_CUSTOMER_FIELDS = ('id', 'company_name', 'gst_number', 'contact_person', 'phone_number',
+                       'email', 'address', 'city', 'state', 'state_code', 'pincode')
+
 @bookkeeping_bp.route('/get-b2b-customers', methods=['GET'])
 def get_b2b_customers():
-    """Get all B2B customers for invoice generation"""
+    """
+    Get all B2B customers for invoice generation
+    Query params: fields (comma separated projection), format=ndjson
+    """
     try:
-        query = """
-            SELECT id, company_name, gst_number, contact_person, phone_number,
-                    email, address, city, state, state_code, pincode
+        fields = requested_fields(B2B_CUSTOMER_FIELDS)
+    except FieldSelectionError as e:
+        return jsonify({
+            "error": str(e),
+            "message": "Invalid fields parameter",
+            "status": "validation_error"
+        }), 400
+
+    try:
+        query = f"""
+            SELECT {', '.join(fields or B2B_CUSTOMER_FIELDS)}
             FROM b2bcustomersdetails
             ORDER BY company_name ASC
         """
 
-        results = execute_query(query)
-
-        if results:
-            customers = []
-            for row in results:
-                customers.append({
-                    'id': row['id'],
-                    'company_name': row['company_name'],
-                    'gst_number': row['gst_number'],
-                    'contact_person': row['contact_person'],
-                    'phone_number': row['phone_number'],
-                    'email': row['email'],
-                    'address': row['address'],
-                    'city': row['city'],
-                    'state': row['state'],
-                    'state_code': row['state_code'],
-                    'pincode': row['pincode']
-                })
+        rows = stream_rows(query)
+        first = next(rows, None)
 
-            logger.info(f"[B2B] Retrieved {len(customers)} B2B customers")
-            return jsonify({
-                "status": "success",
-                "data": customers,
-                "message": f"Retrieved {len(customers)} B2B customers successfully",
-                "total": len(customers)
-            }), 200
+        if first is not None:
+            return list_response(
+                itertools.chain([first], rows),
+                envelope={"status": "success", "data": ROWS},
+                trailer=lambda count: {
+                    "message": f"Retrieved {count} B2B customers successfully",
+                    "total": count
+                },
+                fields=fields,
+                label='B2B customers'
+            )
         else:
             # Return mock data if database is not available or empty
             mock_customers = [
@@ -683,6 +691,8 @@ def delete_company_details(company_id):
         delete_query = "DELETE FROM company_details WHERE id = %s"
         execute_query(delete_query, (company_id,), fetch=False)
 
+        get_reference_data().invalidate()
+
         logger.info(f"[COMPANY] Deleted company details record ID: {company_id}, Company: {company_name}")
         return jsonify({
             "status": "success",
@@ -783,6 +793,11 @@ def upload_to_ledger():
             ledger_id = result[0]['id']
             logger.info(f"[LEDGER] Created ledger entry ID: {ledger_id} for company: {data['company_name']}")
 
+            try:
+                refresh_clients([data['company_name']])
+            except Exception as oi_e:
+                logger.error(f"[OPEN_ITEMS] Failed to refresh open items for {data['company_name']}: {oi_e}")
+
             # If voucher_type is 'receipt', also save to bank_ledger table
             if data.get('voucher_type', '').lower() == 'receipt':
                 try:
@@ -967,136 +982,55 @@ def create_receipt_amount_received():
                     "status": "validation_error"
                 }), 400
 
-        query = """
-            INSERT INTO ReceiptAmountReceived (
-                amount_received, payment_type, transaction_date,
-                remark, account_no, company_name,
-                tds_amount, gst_amount, customer_name, transaction_id, on_account_of
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            RETURNING receipt_amount_id
-        """
-
-        result = execute_query(query, (
-            data['amount_received'],
-            data['payment_type'],
-            data['transaction_date'],
-            data.get('remark'),
-            data.get('account_no'),
-            data.get('company_name'),
-            data.get('tds_percentage', 0),  # This maps to tds_amount
-            data.get('gst', 0),  # This maps to gst_amount
-            data.get('customer_name'),
-            data.get('transaction_id'),
-            data.get('on_account_of')
-        ))
-
-        if result:
-            receipt_id = result[0]['receipt_amount_id']
-            logger.info(f"[RECEIPT] Created receipt amount received record ID: {receipt_id}")
-
-            # PDF generation will be handled by frontend autoSaveInvoice for exact visual replica
-            logger.info(f"[RECEIPT_INVOICE] Skipping backend PDF generation - frontend will handle exact visual replica for receipt ID: {receipt_id}")
-
-            # After creating receipt, insert into ClientLedger and Bank Ledger
-            try:
-                # Retrieve the receipt data we just inserted
-                receipt_query = """
-                    SELECT customer_name, transaction_date, account_no, amount_received, company_name, transaction_id
-                    FROM ReceiptAmountReceived
-                    WHERE receipt_amount_id = %s
-                """
-                receipt_result = execute_query(receipt_query, (receipt_id,))
-
-                if receipt_result and len(receipt_result) > 0:
-                    receipt_data = receipt_result[0]
-                    customer_name = receipt_data['customer_name']
-                    transaction_date = receipt_data['transaction_date']
-                    account_no = receipt_data['account_no']
-                    amount_received = receipt_data['amount_received']
-                    company_name = receipt_data['company_name']
-                    transaction_id = receipt_data['transaction_id']
-
-                    # Get company_id for bank ledger insertion
-                    company_id = None
-                    if company_name:
-                        company_query = "SELECT id FROM company_details WHERE company_name = %s LIMIT 1"
-                        company_result = execute_query(company_query, (company_name,))
-                        if company_result:
-                            company_id = company_result[0]['id']
-
-                    if customer_name:
-                        # Insert into ClientLedger (Client Ledger)
-                        ledger_query = """
-                            INSERT INTO ClientLedger (
-                                company_name, date, particulars, voucher_no, voucher_type,
-                                debit, credit, entry_type
-                            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                        """
-
-                        particulars = f"Receipt from {customer_name}"
-                        voucher_no = f"RCPT-{receipt_id}"  # Generate voucher number
-
-                        execute_query(ledger_query, (
-                            customer_name,  # company_name in ledger is the customer_name from receipt
-                            transaction_date,
-                            particulars,
-                            voucher_no,
-                            'Receipt',
-                            0,  # debit
-                            amount_received,  # credit
-                            'Auto'
-                        ), fetch=False)
-
-                        logger.info(f"[LEDGER] Auto-inserted client ledger entry for receipt ID: {receipt_id}, company: {customer_name}")
-
-                        # Insert into Bank Ledger table
-                        if company_id:
-                            bank_ledger_query = """
-                                INSERT INTO bank_ledger (
-                                    payment_date, transaction_id, vendor_id, company_id, vendor_name,
-                                    amount, remark, transaction_type
-                                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                            """
-
-                            bank_remark = f"Receipt from {customer_name} - {transaction_id or ''}"
-
-                            execute_query(bank_ledger_query, (
-                                transaction_date,  # payment_date
-                                transaction_id,  # transaction_id
-                                None,  # vendor_id (not applicable for receipts)
-                                company_id,  # company_id
-                                customer_name,  # vendor_name (customer paying)
-                                amount_received,  # amount
-                                bank_remark,  # remark
-                                'receipt'  # transaction_type
-                            ), fetch=False)
-
-                            logger.info(f"[BANK_LEDGER] Auto-inserted bank ledger entry for receipt ID: {receipt_id}, transaction: {transaction_id}")
-                        else:
-                            logger.warning(f"[BANK_LEDGER] No company_id found for company '{company_name}', skipping bank ledger insertion")
+        idempotency_key = idempotency_key_from_request(request, data)
+
+        # Receipt, client ledger credit and bank ledger leg are written in one statement/transaction
+        result = post_entry('receipt', {
+            'amount_received': data['amount_received'],
+            'payment_type': data['payment_type'],
+            'transaction_date': data['transaction_date'],
+            'remark': data.get('remark'),
+            'account_no': data.get('account_no'),
+            'company_name': data.get('company_name'),
+            'tds_amount': data.get('tds_percentage', 0),  # This maps to tds_amount
+            'gst_amount': data.get('gst', 0),  # This maps to gst_amount
+            'customer_name': data.get('customer_name'),
+            'transaction_id': data.get('transaction_id'),
+            'on_account_of': data.get('on_account_of')
+        }, idempotency_key=idempotency_key)
+
+        receipt_id = result['document_id']
+        if result['replayed']:
+            logger.info(f"[RECEIPT] Idempotent replay of receipt ID: {receipt_id}")
+            return jsonify({
+                "status": "success",
+                "data": {"receipt_amount_id": receipt_id},
+                "replayed": True,
+                "message": f"Receipt already recorded with ID: {receipt_id}"
+            }), 200
 
-                    else:
-                        logger.warning(f"[LEDGER] No customer_name found for receipt ID: {receipt_id}, skipping ledger insertions")
+        logger.info(f"[RECEIPT] Created receipt amount received record ID: {receipt_id}")
 
-                else:
-                    logger.error(f"[LEDGER] Could not retrieve receipt data for ID: {receipt_id}")
+        # PDF generation will be handled by frontend autoSaveInvoice for exact visual replica
+        logger.info(f"[RECEIPT_INVOICE] Skipping backend PDF generation - frontend will handle exact visual replica for receipt ID: {receipt_id}")
 
-            except Exception as ledger_e:
-                logger.error(f"[LEDGER] Failed to auto-insert ledger entries for receipt ID {receipt_id}: {ledger_e}")
-                # Don't fail the receipt creation if ledger insertion fails
+        if not result['client_ledger_rows']:
+            logger.warning(f"[LEDGER] No customer_name found for receipt ID: {receipt_id}, skipping ledger insertions")
+        elif not result['bank_ledger_rows']:
+            logger.warning(f"[BANK_LEDGER] No company_id found for company '{data.get('company_name')}', skipping bank ledger insertion")
 
-            return jsonify({
-                "status": "success",
-                "data": {"receipt_amount_id": receipt_id},
-                "message": f"Receipt amount received record created successfully with ID: {receipt_id}"
-            }), 201
-        else:
-            return jsonify({
-                "error": "Failed to create record",
-                "message": "No ID returned from insert operation",
-                "status": "error"
-            }), 500
+        return jsonify({
+            "status": "success",
+            "data": {"receipt_amount_id": receipt_id},
+            "message": f"Receipt amount received record created successfully with ID: {receipt_id}"
+        }), 201
 
+    except IdempotencyConflict as e:
+        return jsonify({
+            "error": str(e),
+            "message": "Idempotency key already used for a different entry",
+            "status": "conflict"
+        }), 409
     except Exception as e:
         logger.error(f"[RECEIPT] Failed to create receipt amount received: {e}")
         return jsonify({
@@ -1178,32 +1112,22 @@ def update_receipt_amount_received(receipt_id):
                 "status": "validation_error"
             }), 400
 
-        # Build dynamic update query
-        update_fields = []
-        params = []
-
-        allowed_fields = ['amount_received', 'payment_type', 'transaction_date', 'remark', 'account_no', 'company_name', 'tds_percentage', 'gst', 'customer_name', 'transaction_id', 'on_account_of']
-        for field in allowed_fields:
-            if field in data:
-                update_fields.append(f"{field} = %s")
-                params.append(data[field])
+        fields = {field: data[field] for field in RECEIPT_UPDATE_FIELDS if field in data}
 
-        if not update_fields:
+        if not fields:
             return jsonify({
                 "error": "No valid fields to update",
                 "message": "At least one valid field must be provided",
                 "status": "validation_error"
             }), 400
 
-        update_clause = ", ".join(update_fields)
-        query = f"""
-            UPDATE ReceiptAmountReceived
-            SET {update_clause}
-            WHERE receipt_amount_id = %s
-        """
-        params.append(receipt_id)
-
-        execute_query(query, params, fetch=False)
+        # Re-allocates the open items of the old and new customer in the same transaction
+        if update_receipt(receipt_id, fields) is None:
+            return jsonify({
+                "error": "Receipt not found",
+                "message": f"No receipt amount received record found with ID: {receipt_id}",
+                "status": "not_found"
+            }), 404
 
         logger.info(f"[RECEIPT] Updated receipt amount received record ID: {receipt_id}")
         return jsonify({
@@ -1224,7 +1148,7 @@ def delete_receipt_amount_received(receipt_id):
     """Delete a receipt amount received record and its corresponding ledger entries"""
     try:
         # First, get the receipt data to find transaction_id for bank ledger deletion
-        receipt_query = "SELECT transaction_id FROM ReceiptAmountReceived WHERE receipt_amount_id = %s"
+        receipt_query = "SELECT transaction_id, customer_name FROM ReceiptAmountReceived WHERE receipt_amount_id = %s"
         receipt_result = execute_query(receipt_query, (receipt_id,))
 
         if not receipt_result or len(receipt_result) == 0:
@@ -1253,6 +1177,12 @@ def delete_receipt_amount_received(receipt_id):
         execute_query(query, (receipt_id,), fetch=False)
 
         logger.info(f"[RECEIPT] Deleted receipt amount received record ID: {receipt_id}")
+
+        try:
+            refresh_clients([receipt_result[0]['customer_name']])
+        except Exception as oi_e:
+            logger.error(f"[OPEN_ITEMS] Failed to refresh open items after deleting receipt ID {receipt_id}: {oi_e}")
+
         return jsonify({
             "status": "success",
             "message": f"Receipt amount received record ID {receipt_id} and associated ledger entries deleted successfully"
@@ -1266,10 +1196,24 @@ def delete_receipt_amount_received(receipt_id):
             "status": "error"
         }), 500
 
+# Entry fields of the journal ledger views, for ?fields= projection
+COMPANY_LEDGER_FIELDS = ('date', 'particulars', 'voucher_type', 'voucher_no', 'debit', 'credit',
+                         'company_name', 'entry_type', 'id')
+VENDOR_LEDGER_FIELDS = ('id', 'date', 'vendor_name', 'company_name', 'type', 'particulars', 'remark',
+                        'on_account_of', 'dr', 'cr', 'balance', 'entry_type')
+BANK_LEDGER_FIELDS = ('id', 'entry_date', 'particulars', 'transaction_id', 'dr', 'cr', 'balance')
+
 @bookkeeping_bp.route('/company-ledger', methods=['GET'])
 def get_company_ledger():
-    """Get company ledger data from ClientLedger table with filtering and pagination"""
+    """
+    Get a client's ledger (ledger entries and adjustments) from the journal with filtering and pagination
+    Query params: company_name, start_date, end_date, candidate_name, voucher_type, limit, offset,
+    fields (comma separated projection of entries), format=ndjson
+    """
+    company_name = ''
     try:
+        fields = requested_fields(COMPANY_LEDGER_FIELDS)
+
         # Get query parameters
         company_name = request.args.get('company_name', '').strip()
         start_date = request.args.get('start_date', '')
@@ -1288,211 +1232,32 @@ def get_company_ledger():
 
         logger.info(f"[LEDGER] Fetching ledger data for company: {company_name}")
 
-        # Ensure all required tables exist
-        create_company_ledger_query = """
-            CREATE TABLE IF NOT EXISTS ClientLedger (
-                id SERIAL PRIMARY KEY,
-                company_name VARCHAR(255) NOT NULL,
-                date DATE NOT NULL,
-                particulars TEXT,
-                voucher_no VARCHAR(100),
-                voucher_type VARCHAR(50) DEFAULT 'Receipt',
-                debit DECIMAL(15,2) DEFAULT 0,
-                credit DECIMAL(15,2) DEFAULT 0,
-                candidate_name VARCHAR(255),
-                entry_type VARCHAR(50) DEFAULT 'Manual',
-                reference_id VARCHAR(100),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """
-        execute_query(create_company_ledger_query, fetch=False)
-
-        # Ensure client_adjustments table exists
-        create_client_adjustments_query = """
-            CREATE TABLE IF NOT EXISTS client_adjustments (
-                id SERIAL PRIMARY KEY,
-                company_id INTEGER NOT NULL,
-                customer_id INTEGER NOT NULL,
-                date_of_service DATE NOT NULL,
-                particular_of_service TEXT NOT NULL,
-                adjustment_amount DECIMAL(15,2) NOT NULL CHECK (adjustment_amount != 0),
-                on_account_of TEXT,
-                remark TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (company_id) REFERENCES company_details(id),
-                FOREIGN KEY (customer_id) REFERENCES b2bcustomersdetails(id)
-            )
-        """
-        execute_query(create_client_adjustments_query, fetch=False)
-
-        # Ensure vendor_adjustments table exists
-        create_vendor_adjustments_query = """
-            CREATE TABLE IF NOT EXISTS vendor_adjustments (
-                id SERIAL PRIMARY KEY,
-                company_id INTEGER NOT NULL,
-                vendor_id INTEGER NOT NULL,
-                date_of_service DATE NOT NULL,
-                particular_of_service TEXT NOT NULL,
-                adjustment_amount DECIMAL(15,2) NOT NULL CHECK (adjustment_amount != 0),
-                on_account_of TEXT,
-                remark TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (company_id) REFERENCES company_details(id),
-                FOREIGN KEY (vendor_id) REFERENCES vendors(id)
-            )
-        """
-        execute_query(create_vendor_adjustments_query, fetch=False)
-
-        # Create indexes if they don't exist
-        index_queries = [
-            "CREATE INDEX IF NOT EXISTS idx_company_ledger_company_name ON ClientLedger(company_name)",
-            "CREATE INDEX IF NOT EXISTS idx_company_ledger_date ON ClientLedger(date)",
-            "CREATE INDEX IF NOT EXISTS idx_company_ledger_voucher_no ON ClientLedger(voucher_no)"
-        ]
-        for index_query in index_queries:
-            try:
-                execute_query(index_query, fetch=False)
-            except Exception as idx_e:
-                logger.warning(f"[LEDGER] Could not create index: {idx_e}")
-
-        # Build UNION query for ClientLedger and adjustment entries
-        union_queries = []
-
-        # ClientLedger entries
-        ledger_query = """
-            SELECT
-                id,
-                company_name,
-                date,
-                particulars,
-                voucher_no,
-                voucher_type,
-                debit,
-                credit,
-                entry_type,
-                created_at,
-                'ledger' as source_table
-            FROM ClientLedger
-            WHERE company_name ILIKE %s
-        """
-        ledger_params = [f"%{company_name}%"]
-
-        if start_date:
-            ledger_query += " AND date >= %s"
-            ledger_params.append(start_date)
-        if end_date:
-            ledger_query += " AND date <= %s"
-            ledger_params.append(end_date)
-        if candidate_name:
-            ledger_query += " AND candidate_name ILIKE %s"
-            ledger_params.append(f"%{candidate_name}%")
-        if voucher_type:
-            ledger_query += " AND voucher_type ILIKE %s"
-            ledger_params.append(f"%{voucher_type}%")
-
-        union_queries.append(ledger_query)
-
-        # Client adjustments for this company
-        client_adjustment_query = """
-            SELECT
-                ca.id,
-                b2b.company_name,
-                ca.date_of_service as date,
-                ca.particular_of_service as particulars,
-                CONCAT('ADJ-', ca.id) as voucher_no,
-                'Adjustment' as voucher_type,
-                CASE WHEN ca.adjustment_amount < 0 THEN ABS(ca.adjustment_amount) ELSE 0 END as debit,
-                CASE WHEN ca.adjustment_amount > 0 THEN ca.adjustment_amount ELSE 0 END as credit,
-                'Adjustment' as entry_type,
-                ca.created_at,
-                'client_adjustment' as source_table
-            FROM client_adjustments ca
-            JOIN b2bcustomersdetails b2b ON ca.customer_id = b2b.id
-            WHERE b2b.company_name ILIKE %s
-        """
-        client_params = [f"%{company_name}%"]
-
-        if start_date:
-            client_adjustment_query += " AND ca.date_of_service >= %s"
-            client_params.append(start_date)
-        if end_date:
-            client_adjustment_query += " AND ca.date_of_service <= %s"
-            client_params.append(end_date)
-
-        union_queries.append(client_adjustment_query)
-        ledger_params.extend(client_params)
-
-        # Vendor adjustments for this company
-        vendor_adjustment_query = """
-            SELECT
-                va.id,
-                cd.company_name,
-                va.date_of_service as date,
-                va.particular_of_service as particulars,
-                CONCAT('ADJ-', va.id) as voucher_no,
-                'Adjustment' as voucher_type,
-                CASE WHEN va.adjustment_amount < 0 THEN ABS(va.adjustment_amount) ELSE 0 END as debit,
-                CASE WHEN va.adjustment_amount > 0 THEN va.adjustment_amount ELSE 0 END as credit,
-                'Adjustment' as entry_type,
-                va.created_at,
-                'vendor_adjustment' as source_table
-            FROM vendor_adjustments va
-            JOIN company_details cd ON va.company_id = cd.id
-            WHERE cd.company_name ILIKE %s
-        """
-        vendor_params = [f"%{company_name}%"]
-
-        if start_date:
-            vendor_adjustment_query += " AND va.date_of_service >= %s"
-            vendor_params.append(start_date)
-        if end_date:
-            vendor_adjustment_query += " AND va.date_of_service <= %s"
-            vendor_params.append(end_date)
-
-        union_queries.append(vendor_adjustment_query)
-        ledger_params.extend(vendor_params)
-
-        # Combine all queries
-        full_query = " UNION ALL ".join(union_queries)
-        full_query += " ORDER BY date DESC, created_at DESC"
-
-        logger.info(f"[LEDGER] Executing combined query with params: {ledger_params}")
-
-        ledger_results = execute_query(full_query, ledger_params)
-
-        entries = []
-        total_debit = 0
-        total_credit = 0
-
-        if ledger_results:
-            logger.info(f"[LEDGER] Found {len(ledger_results)} entries in ClientLedger")
-            for row in ledger_results:
-                debit_amount = float(row['debit']) if row['debit'] else 0
-                credit_amount = float(row['credit']) if row['credit'] else 0
-                entries.append({
-                    'date': str(row['date']) if row['date'] else None,
-                    'particulars': row['particulars'] or '',
-                    'voucher_type': row['voucher_type'] or 'Sales',
-                    'voucher_no': row['voucher_no'] or '',
-                    'debit': debit_amount,
-                    'credit': credit_amount,
-                    'company_name': row['company_name'],
-                    'entry_type': row['entry_type'] or 'Manual',
-                    'id': row['id']
-                })
-                total_debit += debit_amount
-                total_credit += credit_amount
-        else:
-            logger.info(f"[LEDGER] No entries found in ClientLedger for company: {company_name}")
-
-        # Sort entries by date descending
-        entries.sort(key=lambda x: x['date'] or '1900-01-01', reverse=True)
-
-        # Apply pagination
-        paginated_entries = entries[offset:offset + limit]
+        # Client legs (ledger entries and adjustments) from the journal, one range scan
+        ledger = fetch_ledger({
+            'party_type': 'client',
+            'party_name': company_name,
+            'start_date': start_date,
+            'end_date': end_date,
+            'candidate_name': candidate_name,
+            'voucher_type': voucher_type
+        }, limit=limit, offset=offset)
+
+        # Amounts stay Decimal and dates stay date; the encoder writes them directly
+        paginated_entries = ({
+            'date': row['entry_date'],
+            'particulars': row['particulars'] or '',
+            'voucher_type': row['voucher_type'] or 'Sales',
+            'voucher_no': row['voucher_no'] or '',
+            'debit': row['debit'] or 0,
+            'credit': row['credit'] or 0,
+            'company_name': row['party_name'],
+            'entry_type': row['entry_type'] or 'Manual',
+            'id': row['id']
+        } for row in ledger['rows'])
+
+        total_entries = ledger['total_entries']
+        total_debit = ledger['total_debit']
+        total_credit = ledger['total_credit']
 
         # Calculate summary
         opening_balance = 0  # Could be calculated from previous periods
@@ -1507,24 +1272,37 @@ def get_company_ledger():
             'balance_type': balance_type
         }
 
-        logger.info(f"[LEDGER] Returning {len(paginated_entries)} paginated entries for {company_name}")
+        logger.info(f"[LEDGER] Returning {len(ledger['rows'])} paginated entries for {company_name}")
 
-        return jsonify({
-            "status": "success",
-            "data": {
-                "entries": paginated_entries,
-                "summary": summary,
-                "total_entries": len(entries),
-                "pagination": {
-                    "limit": limit,
-                    "offset": offset,
-                    "has_more": (offset + limit) < len(entries)
+        return list_response(
+            paginated_entries,
+            envelope={
+                "status": "success",
+                "data": {
+                    "entries": ROWS,
+                    "summary": summary,
+                    "total_entries": total_entries,
+                    "pagination": {
+                        "limit": limit,
+                        "offset": offset,
+                        "has_more": (offset + limit) < total_entries
+                    }
                 }
             },
-            "message": f"Retrieved {len(paginated_entries)} ledger entries for {company_name}",
-            "total": len(paginated_entries)
-        }), 200
+            trailer=lambda count: {
+                "message": f"Retrieved {count} ledger entries for {company_name}",
+                "total": count
+            },
+            fields=fields,
+            label='company ledger'
+        )
 
+    except FieldSelectionError as e:
+        return jsonify({
+            "error": str(e),
+            "message": "Invalid fields parameter",
+            "status": "validation_error"
+        }), 400
     except Exception as e:
         logger.error(f"[LEDGER] Failed to retrieve company ledger for {company_name}: {e}")
         return jsonify({
@@ -1535,8 +1313,14 @@ def get_company_ledger():
 
 @bookkeeping_bp.route('/vendor-ledger/<int:vendor_id>', methods=['GET'])
 def get_vendor_ledger(vendor_id):
-    """Get vendor ledger data from VendorLedgerReport view with filtering and pagination"""
+    """
+    Get vendor ledger data (services, payments, adjustments) from the journal with filtering and pagination
+    Query params: start_date, end_date, limit, offset,
+    fields (comma separated projection of entries), format=ndjson
+    """
     try:
+        fields = requested_fields(VENDOR_LEDGER_FIELDS)
+
         # Get query parameters
         start_date = request.args.get('start_date', '')
         end_date = request.args.get('end_date', '')
@@ -1545,174 +1329,35 @@ def get_vendor_ledger(vendor_id):
 
         logger.info(f"[VENDOR_LEDGER] Fetching ledger data for vendor ID: {vendor_id}")
 
-        # Ensure VendorLedger table exists
-        create_vendor_ledger_query = """
-            CREATE TABLE IF NOT EXISTS VendorLedger (
-                id SERIAL PRIMARY KEY,
-                entry_date DATE NOT NULL,
-                vendor_id INTEGER NOT NULL REFERENCES vendors(id) ON DELETE CASCADE,
-                company_id INTEGER NOT NULL REFERENCES company_details(id) ON DELETE CASCADE,
-                type entry_type NOT NULL,
-                particulars TEXT,
-                remark TEXT,
-                on_account_of TEXT,
-                dr DECIMAL(15,2) CHECK (dr IS NULL OR dr > 0),
-                cr DECIMAL(15,2) CHECK (cr IS NULL OR cr > 0),
-                transaction_id VARCHAR(100) UNIQUE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """
-        execute_query(create_vendor_ledger_query, fetch=False)
-
-        # Build UNION query for vendor_services, vendor_payments, and vendor_adjustments
-        union_queries = []
-
-        # Vendor Services entries (debits)
-        services_query = """
-            SELECT
-                vs.id,
-                vs.service_date as entry_date,
-                v.vendor_name,
-                COALESCE(cd.company_name, 'N/A') as company_name,
-                'Service' as type,
-                vs.particulars,
-                vs.remark,
-                vs.on_account_of,
-                vs.amount as dr,
-                0 as cr,
-                NULL as transaction_id,
-                'vendor_service' as source_table
-            FROM vendor_services vs
-            JOIN vendors v ON vs.vendor_id = v.id
-            LEFT JOIN company_details cd ON vs.company_id = cd.id
-            WHERE vs.vendor_id = %s
-        """
-        services_params = [vendor_id]
-
-        if start_date:
-            services_query += " AND vs.service_date >= %s"
-            services_params.append(start_date)
-        if end_date:
-            services_query += " AND vs.service_date <= %s"
-            services_params.append(end_date)
-
-        union_queries.append(services_query)
-
-        # Vendor Payments entries (credits)
-        payments_query = """
-            SELECT
-                vp.id,
-                vp.payment_date as entry_date,
-                v.vendor_name,
-                COALESCE(cd.company_name, 'N/A') as company_name,
-                'Payment' as type,
-                CONCAT('Payment - ', vp.transaction_id) as particulars,
-                vp.remark,
-                vp.on_account_of,
-                0 as dr,
-                vp.amount as cr,
-                vp.transaction_id,
-                'vendor_payment' as source_table
-            FROM vendor_payments vp
-            JOIN vendors v ON vp.vendor_id = v.id
-            LEFT JOIN company_details cd ON vp.company_id = cd.id
-            WHERE vp.vendor_id = %s
-        """
-        payments_params = [vendor_id]
-
-        if start_date:
-            payments_query += " AND vp.payment_date >= %s"
-            payments_params.append(start_date)
-        if end_date:
-            payments_query += " AND vp.payment_date <= %s"
-            payments_params.append(end_date)
-
-        union_queries.append(payments_query)
-
-        # Vendor Adjustments entries
-        adjustments_query = """
-            SELECT
-                va.id,
-                va.date_of_service as entry_date,
-                v.vendor_name,
-                cd.company_name,
-                'Adjustment' as type,
-                va.particular_of_service as particulars,
-                va.remark,
-                va.on_account_of,
-                CASE WHEN va.adjustment_amount < 0 THEN ABS(va.adjustment_amount) ELSE 0 END as dr,
-                CASE WHEN va.adjustment_amount > 0 THEN va.adjustment_amount ELSE 0 END as cr,
-                CONCAT('ADJ-', va.id) as transaction_id,
-                'vendor_adjustment' as source_table
-            FROM vendor_adjustments va
-            JOIN vendors v ON va.vendor_id = v.id
-            JOIN company_details cd ON va.company_id = cd.id
-            WHERE va.vendor_id = %s
-        """
-        adjustments_params = [vendor_id]
-
-        if start_date:
-            adjustments_query += " AND va.date_of_service >= %s"
-            adjustments_params.append(start_date)
-        if end_date:
-            adjustments_query += " AND va.date_of_service <= %s"
-            adjustments_params.append(end_date)
-
-        union_queries.append(adjustments_query)
-
-        # Combine all queries with UNION ALL
-        full_query = " UNION ALL ".join(union_queries)
-
-        # Wrap in subquery for ordering and balance calculation
-        ordered_query = f"""
-            SELECT *,
-                SUM(COALESCE(dr, 0) - COALESCE(cr, 0))
-                    OVER (
-                        PARTITION BY vendor_name
-                        ORDER BY entry_date, id
-                        ROWS UNBOUNDED PRECEDING
-                    ) AS balance
-            FROM ({full_query}) as combined_entries
-            ORDER BY entry_date DESC, id DESC
-        """
-
-        # Combine all parameters
-        all_params = services_params + payments_params + adjustments_params
-
-        # Get total count first
-        count_query = f"SELECT COUNT(*) as total FROM ({full_query}) as subquery"
-        count_result = execute_query(count_query, all_params)
-        total_entries = count_result[0]['total'] if count_result else 0
-
-        # Apply pagination
-        paginated_query = ordered_query + " LIMIT %s OFFSET %s"
-        all_params.extend([limit, offset])
-
-        ledger_results = execute_query(paginated_query, all_params)
-
-        entries = []
-        if ledger_results:
-            logger.info(f"[VENDOR_LEDGER] Found {len(ledger_results)} entries for vendor ID: {vendor_id}")
-            for row in ledger_results:
-                entries.append({
-                    'id': row['id'],
-                    'date': str(row['entry_date']) if row['entry_date'] else None,
-                    'vendor_name': row['vendor_name'] or '',
-                    'company_name': row['company_name'] or '',
-                    'type': row['type'] or 'Service',
-                    'particulars': row['particulars'] or '',
-                    'remark': row['remark'] or '',
-                    'on_account_of': row['on_account_of'] or '',
-                    'dr': float(row['dr']) if row['dr'] else 0,
-                    'cr': float(row['cr']) if row['cr'] else 0,
-                    'balance': float(row['balance']) if row['balance'] else 0,
-                    'entry_type': row['type'] or 'service'
-                })
+        # Services, payments and adjustments from the journal, one range scan
+        ledger = fetch_ledger({
+            'party_type': 'vendor',
+            'party_id': vendor_id,
+            'start_date': start_date,
+            'end_date': end_date
+        }, limit=limit, offset=offset)
+        total_entries = ledger['total_entries']
+
+        if ledger['rows']:
+            logger.info(f"[VENDOR_LEDGER] Found {len(ledger['rows'])} entries for vendor ID: {vendor_id}")
+        entries = ({
+            'id': row['id'],
+            'date': row['entry_date'],
+            'vendor_name': row['party_name'] or '',
+            'company_name': row['company_name'] or 'N/A',
+            'type': row['entry_type'] or 'Service',
+            'particulars': row['particulars'] or '',
+            'remark': row['remark'] or '',
+            'on_account_of': row['on_account_of'] or '',
+            'dr': row['debit'] or 0,
+            'cr': row['credit'] or 0,
+            'balance': row['balance'] or 0,
+            'entry_type': row['entry_type'] or 'service'
+        } for row in ledger['rows'])
 
         # Calculate summary
-        total_dr = sum(entry['dr'] for entry in entries)
-        total_cr = sum(entry['cr'] for entry in entries)
+        total_dr = ledger['total_debit']
+        total_cr = ledger['total_credit']
         closing_balance = total_dr - total_cr
         balance_type = 'Outstanding' if closing_balance > 0 else 'Advance' if closing_balance < 0 else 'Settled'
 
@@ -1724,24 +1369,37 @@ def get_vendor_ledger(vendor_id):
             'balance_type': balance_type
         }
 
-        logger.info(f"[VENDOR_LEDGER] Returning {len(entries)} paginated entries for vendor ID: {vendor_id}")
+        logger.info(f"[VENDOR_LEDGER] Returning {len(ledger['rows'])} paginated entries for vendor ID: {vendor_id}")
+
+        return list_response(
+            entries,
+            envelope={
+                "status": "success",
+                "data": {
+                    "entries": ROWS,
+                    "summary": summary,
+                    "total_entries": total_entries,
+                    "pagination": {
+                        "limit": limit,
+                        "offset": offset,
+                        "has_more": (offset + limit) < total_entries
+                    }
+                }
+            },
+            trailer=lambda count: {
+                "message": f"Retrieved {count} vendor ledger entries for vendor ID: {vendor_id}",
+                "total": count
+            },
+            fields=fields,
+            label='vendor ledger'
+        )
 
+    except FieldSelectionError as e:
         return jsonify({
-            "status": "success",
-            "data": {
-                "entries": entries,
-                "summary": summary,
-                "total_entries": total_entries,
-                "pagination": {
-                    "limit": limit,
-                    "offset": offset,
-                    "has_more": (offset + limit) < total_entries
-                }
-            },
-            "message": f"Retrieved {len(entries)} vendor ledger entries for vendor ID: {vendor_id}",
-            "total": len(entries)
-        }), 200
-
+            "error": str(e),
+            "message": "Invalid fields parameter",
+            "status": "validation_error"
+        }), 400
     except Exception as e:
         logger.error(f"[VENDOR_LEDGER] Failed to retrieve vendor ledger for vendor ID {vendor_id}: {e}")
         return jsonify({
@@ -1752,71 +1410,19 @@ def get_vendor_ledger(vendor_id):
 
 @bookkeeping_bp.route('/vendor-ledger/<int:ledger_id>', methods=['DELETE'])
 def delete_vendor_ledger_entry(ledger_id):
-    """Delete a vendor ledger entry based on the source table"""
+    """Delete the vendor service, payment or adjustment behind a journal entry id"""
     try:
-        # First, check if this is a vendor service entry
-        service_query = """
-            SELECT id, vendor_id, company_id
-            FROM vendor_services
-            WHERE id = %s
-        """
-        service_results = execute_query(service_query, (ledger_id,))
-
-        if service_results and len(service_results) > 0:
-            # Delete from vendor_services
-            delete_query = "DELETE FROM vendor_services WHERE id = %s"
-            execute_query(delete_query, (ledger_id,), fetch=False)
-
-            logger.info(f"[VENDOR_LEDGER] Deleted vendor service entry ID: {ledger_id}")
-            return jsonify({
-                "status": "success",
-                "message": f"Vendor service entry ID {ledger_id} deleted successfully"
-            }), 200
-
-        # Check if this is a vendor payment entry
-        payment_query = """
-            SELECT id, vendor_id, company_id, transaction_id
-            FROM vendor_payments
-            WHERE id = %s
-        """
-        payment_results = execute_query(payment_query, (ledger_id,))
-
-        if payment_results and len(payment_results) > 0:
-            transaction_id = payment_results[0]['transaction_id']
-
-            # Delete associated bank ledger entry if transaction_id exists
-            if transaction_id:
-                bank_ledger_delete_query = "DELETE FROM bank_ledger WHERE transaction_id = %s"
-                execute_query(bank_ledger_delete_query, (transaction_id,), fetch=False)
-                logger.info(f"[BANK_LEDGER] Deleted associated bank ledger entry for vendor payment ID: {ledger_id}, transaction: {transaction_id}")
-
-            # Delete from vendor_payments
-            delete_query = "DELETE FROM vendor_payments WHERE id = %s"
-            execute_query(delete_query, (ledger_id,), fetch=False)
-
-            logger.info(f"[VENDOR_LEDGER] Deleted vendor payment entry ID: {ledger_id}")
-            return jsonify({
-                "status": "success",
-                "message": f"Vendor payment entry ID {ledger_id} deleted successfully"
-            }), 200
-
-        # Check if this is a vendor adjustment entry
-        adjustment_query = """
-            SELECT id, vendor_id, company_id
-            FROM vendor_adjustments
-            WHERE id = %s
-        """
-        adjustment_results = execute_query(adjustment_query, (ledger_id,))
+        entry = delete_entry(ledger_id, VENDOR_SOURCES)
 
-        if adjustment_results and len(adjustment_results) > 0:
-            # Delete from vendor_adjustments
-            delete_query = "DELETE FROM vendor_adjustments WHERE id = %s"
-            execute_query(delete_query, (ledger_id,), fetch=False)
+        if entry:
+            label = entry['source_table'].replace('vendor_', '')
+            if entry['source_table'] == 'vendor_payment' and entry['transaction_id']:
+                logger.info(f"[BANK_LEDGER] Deleted associated bank ledger entry for vendor payment ID: {entry['source_id']}, transaction: {entry['transaction_id']}")
 
-            logger.info(f"[VENDOR_LEDGER] Deleted vendor adjustment entry ID: {ledger_id}")
+            logger.info(f"[VENDOR_LEDGER] Deleted vendor {label} entry ID: {entry['source_id']} (journal ID: {ledger_id})")
             return jsonify({
                 "status": "success",
-                "message": f"Vendor adjustment entry ID {ledger_id} deleted successfully"
+                "message": f"Vendor {label} entry ID {ledger_id} deleted successfully"
             }), 200
 
         # If none found, return not found
@@ -2006,8 +1612,15 @@ def get_expense_ledger():
 
 @bookkeeping_bp.route('/bank-ledger-report', methods=['GET'])
 def get_bank_ledger_report():
-    """Get bank ledger report data from bank_ledger table with filtering and pagination"""
+    """
+    Get bank ledger report data from the journal with filtering and pagination
+    Query params: company_id, start_date, end_date, limit, offset,
+    fields (comma separated projection), format=ndjson
+    """
+    company_id = ''
     try:
+        fields = requested_fields(BANK_LEDGER_FIELDS)
+
         # Get query parameters
         company_id = request.args.get('company_id', '').strip()
         start_date = request.args.get('start_date', '')
@@ -2024,110 +1637,47 @@ def get_bank_ledger_report():
 
         logger.info(f"[BANK_LEDGER_REPORT] Fetching ledger data for company ID: {company_id}")
 
-        # Ensure bank_ledger table exists
-        create_bank_ledger_query = """
-            CREATE TABLE IF NOT EXISTS bank_ledger (
-                id SERIAL PRIMARY KEY,
-                payment_date DATE NOT NULL,
-                transaction_id VARCHAR(100),
-                vendor_id INTEGER,
-                company_id INTEGER REFERENCES company_details(id),
-                vendor_name VARCHAR(255),
-                amount DECIMAL(15,2) NOT NULL,
-                remark TEXT,
-                transaction_type VARCHAR(20) DEFAULT 'payment',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """
-        execute_query(create_bank_ledger_query, fetch=False)
-
-        # Create indexes if they don't exist
-        index_queries = [
-            "CREATE INDEX IF NOT EXISTS idx_bank_ledger_company_id ON bank_ledger(company_id)",
-            "CREATE INDEX IF NOT EXISTS idx_bank_ledger_payment_date ON bank_ledger(payment_date)",
-            "CREATE INDEX IF NOT EXISTS idx_bank_ledger_transaction_id ON bank_ledger(transaction_id)"
-        ]
-        for index_query in index_queries:
-            try:
-                execute_query(index_query, fetch=False)
-            except Exception as idx_e:
-                logger.warning(f"[BANK_LEDGER_REPORT] Could not create index: {idx_e}")
-
-        # Build query for bank_ledger entries with running balance
-        query = """
-            SELECT
-                id,
-                payment_date,
-                transaction_id,
-                vendor_name,
-                amount,
-                remark,
-                transaction_type,
-                created_at
-            FROM bank_ledger
-            WHERE company_id = %s
-        """
-        params = [company_id]
-
-        if start_date:
-            query += " AND payment_date >= %s"
-            params.append(start_date)
-        if end_date:
-            query += " AND payment_date <= %s"
-            params.append(end_date)
-
-        query += " ORDER BY payment_date DESC, created_at DESC"
-
-        # Get total count first
-        count_query = f"SELECT COUNT(*) as total FROM ({query}) as subquery"
-        count_result = execute_query(count_query, params)
-        total_entries = count_result[0]['total'] if count_result else 0
-
-        # Apply pagination
-        paginated_query = query + " LIMIT %s OFFSET %s"
-        params.extend([limit, offset])
-
-        ledger_results = execute_query(paginated_query, params)
-
-        entries = []
-        if ledger_results:
-            logger.info(f"[BANK_LEDGER_REPORT] Found {len(ledger_results)} entries for company ID: {company_id}")
-
-            # Calculate running balance
-            running_balance = 0
-            for row in ledger_results:
-                # For bank ledger: receipts are debits (money in), payments are credits (money out)
-                if row['transaction_type'] == 'receipt':
-                    dr = float(row['amount']) if row['amount'] else 0
-                    cr = 0
-                    running_balance += dr
-                else:  # payment
-                    dr = 0
-                    cr = float(row['amount']) if row['amount'] else 0
-                    running_balance -= cr
+        # Bank account legs from the journal; the running balance is computed in SQL
+        ledger = fetch_ledger({
+            'account': 'bank',
+            'company_id': company_id,
+            'start_date': start_date,
+            'end_date': end_date
+        }, limit=limit, offset=offset)
 
-                entries.append({
-                    'id': row['id'],
-                    'entry_date': str(row['payment_date']) if row['payment_date'] else None,
-                    'particulars': row['remark'] or f"{row['transaction_type'].title()} - {row['vendor_name'] or 'N/A'}",
-                    'transaction_id': row['transaction_id'] or '',
-                    'dr': dr,
-                    'cr': cr,
-                    'balance': running_balance
-                })
+        if ledger['rows']:
+            logger.info(f"[BANK_LEDGER_REPORT] Found {len(ledger['rows'])} entries for company ID: {company_id}")
         else:
             logger.info(f"[BANK_LEDGER_REPORT] No entries found in bank_ledger for company ID: {company_id}")
 
-        logger.info(f"[BANK_LEDGER_REPORT] Returning {len(entries)} paginated entries for company ID: {company_id}")
+        # For bank ledger: receipts are debits (money in), payments are credits (money out)
+        entries = ({
+            'id': row['id'],
+            'entry_date': row['entry_date'],
+            'particulars': row['particulars'] or '',
+            'transaction_id': row['transaction_id'] or '',
+            'dr': row['debit'] or 0,
+            'cr': row['credit'] or 0,
+            'balance': row['balance'] or 0
+        } for row in ledger['rows'])
+
+        return list_response(
+            entries,
+            envelope={"status": "success", "data": ROWS},
+            trailer=lambda count: {
+                "message": f"Retrieved {count} bank ledger entries for company ID: {company_id}",
+                "total": count
+            },
+            fields=fields,
+            label='bank ledger report'
+        )
 
+    except FieldSelectionError as e:
         return jsonify({
-            "status": "success",
-            "data": entries,
-            "message": f"Retrieved {len(entries)} bank ledger entries for company ID: {company_id}",
-            "total": len(entries)
-        }), 200
-
+            "error": str(e),
+            "message": "Invalid fields parameter",
+            "status": "validation_error"
+        }), 400
     except Exception as e:
         logger.error(f"[BANK_LEDGER_REPORT] Failed to retrieve bank ledger report for company ID {company_id}: {e}")
         return jsonify({
@@ -2138,63 +1688,25 @@ def get_bank_ledger_report():
 
 @bookkeeping_bp.route('/company-ledger/<int:ledger_id>', methods=['DELETE'])
 def delete_company_ledger_entry(ledger_id):
-    """Delete a company ledger entry or adjustment entry based on the source table"""
+    """Delete the client ledger entry or client adjustment behind a journal entry id"""
     try:
-        # First, check if this is a regular ClientLedger entry
-        select_query = """
-            SELECT id, voucher_no, company_name, entry_type
-            FROM ClientLedger
-            WHERE id = %s
-        """
-        ledger_results = execute_query(select_query, (ledger_id,))
-
-        if ledger_results and len(ledger_results) > 0:
-            # Delete from ClientLedger
-            delete_query = "DELETE FROM ClientLedger WHERE id = %s"
-            execute_query(delete_query, (ledger_id,), fetch=False)
-
-            logger.info(f"[LEDGER] Deleted ClientLedger entry ID: {ledger_id}")
-            return jsonify({
-                "status": "success",
-                "message": f"ClientLedger entry ID {ledger_id} deleted successfully"
-            }), 200
-
-        # Check if this is a client adjustment entry
-        client_adjustment_query = """
-            SELECT id, company_id, customer_id
-            FROM client_adjustments
-            WHERE id = %s
-        """
-        client_results = execute_query(client_adjustment_query, (ledger_id,))
-
-        if client_results and len(client_results) > 0:
-            # Delete from client_adjustments
-            delete_query = "DELETE FROM client_adjustments WHERE id = %s"
-            execute_query(delete_query, (ledger_id,), fetch=False)
-
-            logger.info(f"[CLIENT_ADJUSTMENT] Deleted client adjustment entry ID: {ledger_id}")
-            return jsonify({
-                "status": "success",
-                "message": f"Client adjustment entry ID {ledger_id} deleted successfully"
-            }), 200
+        entry = delete_entry(ledger_id, CLIENT_SOURCES)
 
-        # Check if this is a vendor adjustment entry
-        vendor_adjustment_query = """
-            SELECT id, company_id, vendor_id
-            FROM vendor_adjustments
-            WHERE id = %s
-        """
-        vendor_results = execute_query(vendor_adjustment_query, (ledger_id,))
-
-        if vendor_results and len(vendor_results) > 0:
-            # Delete from vendor_adjustments
-            delete_query = "DELETE FROM vendor_adjustments WHERE id = %s"
-            execute_query(delete_query, (ledger_id,), fetch=False)
+        if entry:
+            if entry['source_table'] == 'client_ledger':
+                logger.info(f"[LEDGER] Deleted ClientLedger entry ID: {entry['source_id']} (journal ID: {ledger_id})")
+                try:
+                    refresh_clients([entry['party_name']])
+                except Exception as oi_e:
+                    logger.error(f"[OPEN_ITEMS] Failed to refresh open items after deleting ledger ID {entry['source_id']}: {oi_e}")
+                label = 'ClientLedger'
+            else:
+                logger.info(f"[CLIENT_ADJUSTMENT] Deleted client adjustment entry ID: {entry['source_id']} (journal ID: {ledger_id})")
+                label = 'Client adjustment'
 
-            logger.info(f"[VENDOR_ADJUSTMENT] Deleted vendor adjustment entry ID: {ledger_id}")
             return jsonify({
                 "status": "success",
-                "message": f"Vendor adjustment entry ID {ledger_id} deleted successfully"
+                "message": f"{label} entry ID {ledger_id} deleted successfully"
             }), 200
 
         # If none found, return not found
@@ -3074,494 +2586,42 @@ def get_vendor_details(vendor_id):
         }), 500
 
 def generate_receipt_invoice_pdf(receipt_data, receipt_id):
-    """Generate a receipt invoice PDF that exactly matches the frontend ReceiptInvoicePreview.jsx layout"""
+    """Render a payment receipt server-side; returns the PDF as base64 (None on failure)"""
     try:
-        logger.info(f"[RECEIPT_INVOICE] Starting PDF generation for receipt ID: {receipt_id}")
-
-        # Import required modules for PDF generation
         import base64
-        from io import BytesIO
-        from reportlab.pdfgen import canvas
-        from reportlab.lib.pagesizes import A4
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-        from reportlab.lib import colors
-        from reportlab.lib.units import inch
-
-        # Get receipt details from the data passed
-        company_name = receipt_data.get('company_name', 'Company Name')
-        customer_name = receipt_data.get('customer_name', 'Customer Name')
-        transaction_date = str(receipt_data.get('transaction_date', ''))
-        payment_type = receipt_data.get('payment_type', '')
-        amount_received = float(receipt_data.get('amount_received', 0))
-        transaction_id = receipt_data.get('transaction_id', '-')
-        on_account_of = receipt_data.get('on_account_of', '-')
-        remark = receipt_data.get('remark', '-')
-
-        logger.info(f"[RECEIPT_INVOICE] Receipt details - company: {company_name}, customer: {customer_name}, amount: {amount_received}")
-
-        # Fetch additional company and customer details from database
-        company_data = {}
-        customer_data = {}
-
-        try:
-            # Get company details
-            if receipt_data.get('company_name'):
-                company_query = "SELECT company_name, company_gst_number, company_address FROM company_details WHERE company_name = %s LIMIT 1"
-                company_result = execute_query(company_query, (receipt_data.get('company_name'),))
-                if company_result:
-                    company_data = company_result[0]
-                    logger.info(f"[RECEIPT_INVOICE] Company data: {company_data}")
-
-            # Get customer details
-            if receipt_data.get('customer_name'):
-                customer_query = "SELECT company_name, gst_number, address, state_code FROM b2bcustomersdetails WHERE company_name = %s LIMIT 1"
-                customer_result = execute_query(customer_query, (receipt_data.get('customer_name'),))
-                if customer_result:
-                    customer_data = customer_result[0]
-                    logger.info(f"[RECEIPT_INVOICE] Customer data: {customer_data}")
-
-        except Exception as db_e:
-            logger.warning(f"[RECEIPT_INVOICE] Could not fetch company/customer details: {db_e}")
-
-        # Create PDF buffer
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4)
-        styles = getSampleStyleSheet()
-
-        # Create custom styles
-        title_style = ParagraphStyle(
-            'Title',
-            parent=styles['Heading1'],
-            fontSize=30,  # text-3xl equivalent
-            spaceAfter=30,
-            alignment=1  # Center
-        )
-
-        normal_style = styles['Normal']
-        normal_style.fontSize = 9  # text-xs equivalent
-
-        # Build PDF content
-        content = []
-
-        # Title - exactly matching frontend
-        content.append(Paragraph("PAYMENT RECEIPT", title_style))
-        content.append(Spacer(1, 12))
-
-        # Main 2-column layout exactly matching frontend
-        # Left side: Company and Customer details
-        left_content = []
-
-        # Company Details Section
-        left_content.append(Paragraph(f"<b>{company_data.get('company_name', company_name)}</b>", normal_style))
-        if company_data.get('company_address'):
-            address_lines = company_data['company_address'].split('\n')
-            for line in address_lines:
-                if line.strip():
-                    left_content.append(Paragraph(line, normal_style))
-        left_content.append(Paragraph(f"<b>GSTIN/UIN:</b> {company_data.get('company_gst_number', 'GST Number')}", normal_style))
-        left_content.append(Paragraph("<b>State Name:</b> Maharashtra, <b>Code:</b> 27", normal_style))
-        left_content.append(Spacer(1, 8))
-
-        # Separator line
-        left_content.append(Paragraph("<b>Received From</b>", normal_style))
-        left_content.append(Paragraph(f"<b>{customer_data.get('company_name', customer_name)}</b>", normal_style))
-        if customer_data.get('address'):
-            address_lines = customer_data['address'].split('\n')
-            for line in address_lines:
-                if line.strip():
-                    left_content.append(Paragraph(line, normal_style))
-        if customer_data.get('gst_number'):
-            left_content.append(Paragraph(f"<b>GSTIN/UIN:</b> {customer_data['gst_number']}", normal_style))
-        if customer_data.get('state_code'):
-            left_content.append(Paragraph(f"<b>State Name:</b> Maharashtra, <b>Code:</b> {customer_data['state_code']}", normal_style))
-
-        # Right side: Receipt details in 2-column grid (exactly like frontend)
-        right_content = []
-
-        # Left column of receipt details
-        receipt_left_data = [
-            ["Receipt No.", str(receipt_id)],
-            ["Transaction ID", transaction_id or '-'],
-            ["On Account of", on_account_of or '-']
-        ]
-
-        # Right column of receipt details
-        receipt_right_data = [
-            ["Dated", transaction_date],
-            ["Payment Type", payment_type],
-            ["Remarks", remark or '-']
-        ]
-
-        # Create receipt details table (2 columns side by side)
-        receipt_details_data = []
-        for i in range(len(receipt_left_data)):
-            row = receipt_left_data[i] + [""] + receipt_right_data[i]  # Add spacer column
-            receipt_details_data.append(row)
 
-        receipt_table = Table(receipt_details_data, colWidths=[70, 80, 20, 70, 80])
-        receipt_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ]))
-
-        right_content.append(receipt_table)
-
-        # Create main 2-column layout
-        main_data = []
-
-        # Add title row
-        main_data.append([left_content[0], "", right_content[0]])  # Title and receipt table
-
-        # Add company details rows
-        for i in range(1, len(left_content)):
-            if i < len(left_content):
-                main_data.append([left_content[i], "", ""])
-            else:
-                main_data.append(["", "", ""])
-
-        main_table = Table(main_data, colWidths=[200, 50, 250])
-        main_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ]))
-
-        content.append(main_table)
-        content.append(Spacer(1, 20))
-
-        # Table with Sl No, Particulars, Amount - exactly matching frontend
-        table_data = [
-            ['Sl No.', 'Particulars', 'Amount'],
-            ['1', f'Payment Received{f"\nOn Account of: {on_account_of}" if on_account_of and on_account_of != '-' else ""}', f"₹{amount_received:,.2f}"],
-            ['', 'Net Amount Received', f"₹{amount_received:,.2f}"]
-        ]
-
-        particulars_table = Table(table_data, colWidths=[40, 300, 80])
-        particulars_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('ALIGN', (1, 1), (1, -1), 'LEFT'),
-            ('ALIGN', (2, 1), (2, -1), 'RIGHT'),
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('BACKGROUND', (0, -1), (-1, -1), colors.lightgrey),
-            ('SPAN', (0, -1), (1, -1)),  # Merge last row first two columns
-        ]))
-
-        content.append(particulars_table)
-        content.append(Spacer(1, 15))
-
-        # Amount in words section - exactly matching frontend format
-        def number_to_words(num):
-            ones = ['', 'One', 'Two', 'Three', 'Four', 'Five', 'Six', 'Seven', 'Eight', 'Nine']
-            tens = ['', '', 'Twenty', 'Thirty', 'Forty', 'Fifty', 'Sixty', 'Seventy', 'Eighty', 'Ninety']
-            teens = ['Ten', 'Eleven', 'Twelve', 'Thirteen', 'Fourteen', 'Fifteen', 'Sixteen', 'Seventeen', 'Eighteen', 'Nineteen']
-
-            def convert_less_than_thousand(n):
-                if n == 0: return ''
-                result = ''
-                if n >= 100:
-                    result += ones[n // 100] + ' Hundred '
-                    n %= 100
-                if n >= 20:
-                    result += tens[n // 10] + ' '
-                    n %= 10
-                elif n >= 10:
-                    result += teens[n - 10] + ' '
-                    return result.strip()
-                if n > 0 and n < 10:
-                    result += ones[n] + ' '
-                return result.strip()
-
-            def convert(n):
-                if n == 0: return 'Zero'
-                result = ''
-                crore = n // 10000000
-                lakh = (n % 10000000) // 100000
-                thousand = (n % 100000) // 1000
-                remainder = n % 1000
-
-                if crore > 0:
-                    result += convert_less_than_thousand(crore) + ' Crore '
-                if lakh > 0:
-                    result += convert_less_than_thousand(lakh) + ' Lakh '
-                if thousand > 0:
-                    result += convert_less_than_thousand(thousand) + ' Thousand '
-                if remainder > 0:
-                    result += convert_less_than_thousand(remainder)
-
-                return result.strip()
-
-            rupees = int(num)
-            paise = round((num - rupees) * 100)
-            result = 'INR ' + convert(rupees)
-            if paise > 0:
-                result += ' and ' + convert(paise) + ' Paise'
-            result += ' Only'
-            return result
-
-        words = number_to_words(amount_received)
-        content.append(Paragraph(f"<b>Received Amount:</b> ₹{amount_received:,.2f}", normal_style))
-        content.append(Paragraph(f"<b>Amount Received (in words)</b>", normal_style))
-        content.append(Paragraph(words, normal_style))
-        content.append(Spacer(1, 15))
-
-        # Remarks section (only if present and not default)
-        if remark and remark != '-' and remark.strip():
-            content.append(Paragraph(f"<b>Remarks:</b> {remark}", normal_style))
-            content.append(Spacer(1, 15))
-
-        # Bank's Details section - exactly matching frontend
-        content.append(Paragraph("<b>Company's Bank Details</b>", normal_style))
-        content.append(Paragraph(f"A/c Holder's Name: {company_data.get('company_name', company_name)}", normal_style))
-        content.append(Paragraph("Bank Name: Bank Name - Branch Code", normal_style))
-        content.append(Paragraph("A/c No.: 1234567890", normal_style))
-        content.append(Paragraph("Branch & IFS Code: Branch Name & IFSC0001234", normal_style))
-        content.append(Spacer(1, 20))
-
-        # Signatures section - exactly matching frontend 2-column layout
-        signature_data = [
-            ['Customer\'s Seal and Signature', '', f'for {company_data.get('company_name', company_name)}'],
-            ['', '', 'Authorised Signatory']
-        ]
-
-        signature_table = Table(signature_data, colWidths=[150, 100, 150])
-        signature_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('LINEBELOW', (0, 0), (0, 0), 1, colors.black),
-            ('LINEBELOW', (2, 0), (2, 0), 1, colors.black),
-        ]))
-
-        content.append(Spacer(1, 30))
-        content.append(signature_table)
-
-        # Build PDF
-        doc.build(content)
-
-        # Get PDF data
-        pdf_data = buffer.getvalue()
-        buffer.close()
-
-        pdf_base64 = base64.b64encode(pdf_data).decode('utf-8')
-        logger.info(f"[RECEIPT_INVOICE] Successfully generated PDF using reportlab, size: {len(pdf_data)} bytes")
-        return pdf_base64
+        reference = get_reference_data()
+        receipt = dict(receipt_data, receipt_amount_id=receipt_id)
+        company, customer = reference.parties_for('receipt', receipt)
+        pdf_data = render_document('receipt', receipt, company, customer)
+        logger.info(f"[RECEIPT_INVOICE] Generated PDF for receipt ID: {receipt_id}, size: {len(pdf_data)} bytes")
+        return base64.b64encode(pdf_data).decode('utf-8')
 
     except Exception as e:
         logger.error(f"[RECEIPT_INVOICE] Failed to generate receipt invoice PDF: {e}")
-        import traceback
-        logger.error(f"[RECEIPT_INVOICE] Traceback: {traceback.format_exc()}")
         return None
 
 def generate_adjustment_invoice_pdf(adjustment_data, adjustment_id):
-    """Generate an adjustment invoice PDF using reportlab for reliability"""
+    """Render a client/vendor adjustment note server-side; returns the PDF as base64 (None on failure)"""
     try:
-        logger.info(f"[ADJUSTMENT_PDF] Starting PDF generation for adjustment ID: {adjustment_id}")
-
-        # Import required modules for PDF generation
         import base64
-        from io import BytesIO
-        from reportlab.pdfgen import canvas
-        from reportlab.lib.pagesizes import A4
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-        from reportlab.lib import colors
-        from reportlab.lib.units import inch
-
-        # Get adjustment details
-        adjustment_type = adjustment_data.get('adjustment_type', 'client')
-        date_of_service = adjustment_data.get('date_of_service', '')
-        particular_of_service = adjustment_data.get('particular_of_service', '')
-        adjustment_amount = float(adjustment_data.get('adjustment_amount', 0))
-        on_account_of = adjustment_data.get('on_account_of', '')
-        remark = adjustment_data.get('remark', '')
-
-        logger.info(f"[ADJUSTMENT_PDF] Adjustment type: {adjustment_type}, amount: {adjustment_amount}")
-
-        # Get company and customer/vendor details based on adjustment type
-        if adjustment_type == 'client':
-            # Fetch company and customer details
-            try:
-                company_id = adjustment_data.get('company_id')
-                customer_id = adjustment_data.get('customer_id')
-                logger.info(f"[ADJUSTMENT_PDF] Client adjustment - company_id: {company_id}, customer_id: {customer_id}")
-
-                company_query = "SELECT company_name, company_gst_number, company_address FROM company_details WHERE id = %s"
-                company_result = execute_query(company_query, (company_id,))
-                company_data = company_result[0] if company_result else {}
-                logger.info(f"[ADJUSTMENT_PDF] Company data: {company_data}")
-
-                customer_query = "SELECT company_name, gst_number, address, state_code FROM b2bcustomersdetails WHERE id = %s"
-                customer_result = execute_query(customer_query, (customer_id,))
-                customer_data = customer_result[0] if customer_result else {}
-                logger.info(f"[ADJUSTMENT_PDF] Customer data: {customer_data}")
-            except Exception as db_e:
-                logger.warning(f"[ADJUSTMENT_PDF] Could not fetch company/customer details: {db_e}")
-                company_data = {}
-                customer_data = {}
-        else:  # vendor adjustment
-            try:
-                company_id = adjustment_data.get('company_id')
-                vendor_id = adjustment_data.get('vendor_id')
-                logger.info(f"[ADJUSTMENT_PDF] Vendor adjustment - company_id: {company_id}, vendor_id: {vendor_id}")
-
-                company_query = "SELECT company_name, company_gst_number, company_address FROM company_details WHERE id = %s"
-                company_result = execute_query(company_query, (company_id,))
-                company_data = company_result[0] if company_result else {}
-                logger.info(f"[ADJUSTMENT_PDF] Company data: {company_data}")
-
-                vendor_query = "SELECT vendor_name, gst_number, address, state FROM vendors WHERE id = %s"
-                vendor_result = execute_query(vendor_query, (vendor_id,))
-                customer_data = vendor_result[0] if vendor_result else {}
-                if customer_data:
-                    customer_data['company_name'] = customer_data.pop('vendor_name', '')
-                    customer_data['state_code'] = customer_data.pop('state', '')
-                logger.info(f"[ADJUSTMENT_PDF] Vendor data: {customer_data}")
-            except Exception as db_e:
-                logger.warning(f"[ADJUSTMENT_PDF] Could not fetch company/vendor details: {db_e}")
-                company_data = {}
-                customer_data = {}
-
-        # Create PDF buffer
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4)
-        styles = getSampleStyleSheet()
-
-        # Create custom styles
-        title_style = ParagraphStyle(
-            'Title',
-            parent=styles['Heading1'],
-            fontSize=24,
-            spaceAfter=30,
-            alignment=1  # Center
-        )
-
-        normal_style = styles['Normal']
-        normal_style.fontSize = 10
-
-        # Build PDF content
-        content = []
-
-        # Title
-        invoice_title = "CLIENT ADJUSTMENT INVOICE" if adjustment_type == 'client' else "VENDOR ADJUSTMENT INVOICE"
-        content.append(Paragraph(invoice_title, title_style))
-        content.append(Paragraph(f"Adjustment Entry #{adjustment_id}", styles['Heading3']))
-        content.append(Spacer(1, 12))
-
-        # Company and Customer/Vendor details
-        company_info = [
-            ['Company:', company_data.get('company_name', 'Company Name')],
-            ['Address:', company_data.get('company_address', 'Company Address')],
-            ['GST:', company_data.get('company_gst_number', 'GST Number')],
-            ['', ''],
-            [f"{adjustment_type.title()}:", customer_data.get('company_name', f"{adjustment_type.title()} Name")],
-            ['Address:', customer_data.get('address', f"{adjustment_type.title()} Address")],
-            ['GST:', customer_data.get('gst_number', 'GST Number')],
-        ]
-
-        details_info = [
-            ['Adjustment No:', f'ADJ-{adjustment_id}'],
-            ['Date:', date_of_service],
-            ['Type:', f"{adjustment_type.title()} Adjustment"],
-        ]
-
-        if on_account_of:
-            details_info.append(['On Account of:', on_account_of])
-
-        # Create tables
-        company_table = Table(company_info, colWidths=[80, 300])
-        company_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ]))
-
-        details_table = Table(details_info, colWidths=[80, 300])
-        details_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ]))
-
-        content.append(company_table)
-        content.append(Spacer(1, 20))
-        content.append(details_table)
-        content.append(Spacer(1, 20))
-
-        # Particulars table
-        particulars_data = [
-            ['Sl No.', 'Particulars', 'Amount'],
-            ['1', particular_of_service, f"{'+' if adjustment_amount >= 0 else ''}₹{abs(adjustment_amount):,.2f}"],
-            ['', 'Adjustment Amount', f"{'+' if adjustment_amount >= 0 else ''}₹{abs(adjustment_amount):,.2f}"]
-        ]
 
-        particulars_table = Table(particulars_data, colWidths=[50, 350, 100])
-        particulars_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('ALIGN', (1, 1), (1, -1), 'LEFT'),
-            ('ALIGN', (2, 1), (2, -1), 'RIGHT'),
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('BACKGROUND', (0, -1), (-1, -1), colors.lightgrey),
-        ]))
-
-        content.append(particulars_table)
-        content.append(Spacer(1, 20))
-
-        # Remarks
-        if remark:
-            content.append(Paragraph(f"<b>Remarks:</b> {remark}", normal_style))
-            content.append(Spacer(1, 10))
-
-        # Signatures
-        signature_data = [
-            [f"{adjustment_type.title()}'s Seal and Signature", '', f'for {company_data.get('company_name', 'Company Name')}'],
-            ['', '', 'Authorised Signatory']
-        ]
-
-        signature_table = Table(signature_data, colWidths=[200, 100, 200])
-        signature_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('LINEBELOW', (0, 0), (0, 0), 1, colors.black),
-            ('LINEBELOW', (2, 0), (2, 0), 1, colors.black),
-        ]))
-
-        content.append(Spacer(1, 40))
-        content.append(signature_table)
-
-        # Build PDF
-        doc.build(content)
-
-        # Get PDF data
-        pdf_data = buffer.getvalue()
-        buffer.close()
-
-        pdf_base64 = base64.b64encode(pdf_data).decode('utf-8')
-        logger.info(f"[ADJUSTMENT_PDF] Successfully generated PDF using reportlab, size: {len(pdf_data)} bytes")
-        return pdf_base64
+        adjustment_type = adjustment_data.get('adjustment_type') or ('vendor' if adjustment_data.get('vendor_id') else 'client')
+        kind = f"{adjustment_type}_adjustment"
+        adjustment = dict(adjustment_data, id=adjustment_id)
+        company, party = get_reference_data().parties_for(kind, adjustment)
+        pdf_data = render_document(kind, adjustment, company, party)
+        logger.info(f"[ADJUSTMENT_PDF] Generated PDF for adjustment ID: {adjustment_id}, size: {len(pdf_data)} bytes")
+        return base64.b64encode(pdf_data).decode('utf-8')
 
     except Exception as e:
         logger.error(f"[ADJUSTMENT_INVOICE] Failed to generate adjustment invoice PDF: {e}")
-        import traceback
-        logger.error(f"[ADJUSTMENT_INVOICE] Traceback: {traceback.format_exc()}")
         return None
 
 def save_invoice_image_helper(data):
     """Helper function to save invoice image to file storage"""
     try:
-        import os
         import base64
-        from config import Config
 
         required_fields = ['invoice_no', 'image_data']
         for field in required_fields:
@@ -3580,8 +2640,24 @@ def save_invoice_image_helper(data):
                 "message": f"Failed to decode base64 image data: {str(decode_error)}"
             }
 
-        # Get voucher type and determine filename
-        voucher_type = data.get('voucher_type', 'Sales')
+        return store_invoice_file(data['invoice_no'], image_binary,
+                                  voucher_type=data.get('voucher_type', 'Sales'),
+                                  image_type=data.get('image_type', 'pdf'))
+
+    except Exception as e:
+        logger.error(f"[INVOICE_IMAGE] Failed to save invoice image: {e}")
+        return {
+            "status": "error",
+            "message": f"Failed to save invoice image: {str(e)}"
+        }
+
+def store_invoice_file(invoice_no, file_bytes, voucher_type='Sales', image_type='pdf'):
+    """Write an invoice PDF to invoice storage and upsert its invoice_images row"""
+    try:
+        import os
+        from config import Config
+
+        # Determine filename from voucher type
         voucher_type_to_filename = {
             'Sales': 'SALES_INVOICE.pdf',
             'Receipt': 'RECEIPT.pdf',
@@ -3590,7 +2666,7 @@ def save_invoice_image_helper(data):
         fixed_filename = voucher_type_to_filename.get(voucher_type, f"{voucher_type}_INVOICE.pdf")
 
         # Create invoice folder path
-        invoice_folder = f"INVOICE_{data['invoice_no']}"
+        invoice_folder = f"INVOICE_{invoice_no}"
         invoice_dir = os.path.join(Config.INVOICE_STORAGE_PATH, invoice_folder)
 
         # Ensure invoice directory exists
@@ -3602,7 +2678,7 @@ def save_invoice_image_helper(data):
         # Save file to disk
         try:
             with open(file_path, 'wb') as f:
-                f.write(image_binary)
+                f.write(file_bytes)
         except Exception as file_error:
             return {
                 "status": "error",
@@ -3611,7 +2687,7 @@ def save_invoice_image_helper(data):
 
         # Relative path for database
         relative_path = f"{invoice_folder}/{fixed_filename}"
-        file_size = len(image_binary)
+        file_size = len(file_bytes)
 
         # Auto-populate certificate_id based on invoice_no
         certificate_id = None
@@ -3620,7 +2696,7 @@ def save_invoice_image_helper(data):
             WHERE invoice_no = %s AND certificate_id IS NOT NULL
             LIMIT 1
         """
-        receipt_result = execute_query(receipt_query, (data['invoice_no'],), fetch=True)
+        receipt_result = execute_query(receipt_query, (invoice_no,), fetch=True)
         if receipt_result:
             certificate_id = receipt_result[0]['certificate_id']
 
@@ -3642,9 +2718,9 @@ def save_invoice_image_helper(data):
         """
 
         result = execute_query(query, (
-            data['invoice_no'],
+            invoice_no,
             relative_path,
-            data.get('image_type', 'pdf'),
+            image_type,
             fixed_filename,
             file_size,
             voucher_type,
@@ -3656,7 +2732,7 @@ def save_invoice_image_helper(data):
             return {
                 "status": "success",
                 "data": {"image_id": image_id, "file_size": file_size, "file_path": relative_path},
-                "message": f"Invoice image saved successfully for invoice: {data['invoice_no']}"
+                "message": f"Invoice image saved successfully for invoice: {invoice_no}"
             }
         else:
             return {
@@ -3680,6 +2756,126 @@ def save_invoice_image():
     else:
         return jsonify(result), 500
 
+@bookkeeping_bp.route('/invoices/pdf', methods=['GET'])
+def get_invoice_pdf():
+    """Render a tax invoice server-side (?invoice_no=...); ?store=true also saves it to invoice storage"""
+    invoice_no = request.args.get('invoice_no', '').strip()
+    try:
+        if not invoice_no:
+            return jsonify({
+                "error": "Invoice number is required",
+                "message": "Please provide an invoice_no parameter",
+                "status": "validation_error"
+            }), 400
+
+        rows = execute_query("SELECT * FROM ReceiptInvoiceData WHERE invoice_no = %s", (invoice_no,))
+        if not rows:
+            return jsonify({
+                "error": "Invoice not found",
+                "message": f"No invoice found with number: {invoice_no}",
+                "status": "not_found"
+            }), 404
+
+        invoice = resolve_courses([dict(rows[0])], execute_query)[0]
+        company, customer = get_reference_data().parties_for('sales', invoice)
+        pdf_data = render_document('sales', invoice, company, customer)
+
+        if request.args.get('store', 'false').lower() == 'true':
+            stored = store_invoice_file(invoice_no, pdf_data, voucher_type='Sales')
+            if stored['status'] != 'success':
+                logger.warning(f"[INVOICE_PDF] Rendered invoice {invoice_no} but could not store it: {stored['message']}")
+
+        logger.info(f"[INVOICE_PDF] Rendered invoice {invoice_no}, size: {len(pdf_data)} bytes")
+        return Response(pdf_data, mimetype='application/pdf', headers={
+            'Content-Disposition': f'inline; filename="{safe_filename(invoice_no)}.pdf"'
+        })
+
+    except Exception as e:
+        logger.error(f"[INVOICE_PDF] Failed to render invoice {invoice_no}: {e}")
+        return jsonify({
+            "error": str(e),
+            "message": "Failed to render invoice PDF",
+            "status": "error"
+        }), 500
+
+@bookkeeping_bp.route('/receipt-amount-received/<int:receipt_id>/pdf', methods=['GET'])
+def get_receipt_pdf(receipt_id):
+    """Render a payment receipt server-side"""
+    try:
+        rows = execute_query("SELECT * FROM ReceiptAmountReceived WHERE receipt_amount_id = %s", (receipt_id,))
+        if not rows:
+            return jsonify({
+                "error": "Receipt not found",
+                "message": f"No receipt found with ID: {receipt_id}",
+                "status": "not_found"
+            }), 404
+
+        receipt = dict(rows[0])
+        company, customer = get_reference_data().parties_for('receipt', receipt)
+        pdf_data = render_document('receipt', receipt, company, customer)
+
+        logger.info(f"[RECEIPT_INVOICE] Rendered receipt {receipt_id}, size: {len(pdf_data)} bytes")
+        return Response(pdf_data, mimetype='application/pdf', headers={
+            'Content-Disposition': f'inline; filename="RCPT-{receipt_id}.pdf"'
+        })
+
+    except Exception as e:
+        logger.error(f"[RECEIPT_INVOICE] Failed to render receipt {receipt_id}: {e}")
+        return jsonify({
+            "error": str(e),
+            "message": "Failed to render receipt PDF",
+            "status": "error"
+        }), 500
+
+@bookkeeping_bp.route('/invoices/batch', methods=['GET'])
+def get_invoice_batch():
+    """
+    Month-end run: every invoice, receipt and adjustment of a period as a streamed zip.
+
+    Query: month=YYYY-MM or start_date/end_date (YYYY-MM-DD), optional
+    kinds=sales,receipt,client_adjustment,vendor_adjustment
+    """
+    try:
+        month = request.args.get('month', '').strip()
+        try:
+            if month:
+                year, month_no = (int(part) for part in month.split('-'))
+                start_date = date_type(year, month_no, 1)
+                end_date = date_type(year, month_no, calendar.monthrange(year, month_no)[1])
+            else:
+                start_date = datetime.strptime(request.args['start_date'], '%Y-%m-%d').date()
+                end_date = datetime.strptime(request.args['end_date'], '%Y-%m-%d').date()
+        except (KeyError, ValueError):
+            return jsonify({
+                "error": "Invalid period",
+                "message": "Provide month=YYYY-MM or start_date and end_date as YYYY-MM-DD",
+                "status": "validation_error"
+            }), 400
+
+        kinds = [kind.strip() for kind in request.args.get('kinds', ','.join(DOCUMENT_KINDS)).split(',') if kind.strip()]
+        unknown = [kind for kind in kinds if kind not in DOCUMENT_KINDS]
+        if unknown or end_date < start_date:
+            return jsonify({
+                "error": "Invalid batch request",
+                "message": f"Unknown kinds: {', '.join(unknown)}" if unknown else "end_date must not be before start_date",
+                "status": "validation_error"
+            }), 400
+
+        chunks = render_period_zip(start_date, end_date, kinds)
+        filename = f"documents_{start_date:%Y%m%d}_{end_date:%Y%m%d}.zip"
+        logger.info(f"[INVOICE_PDF] Streaming batch {filename}")
+        return Response(stream_with_context(chunks), mimetype='application/zip', headers={
+            'Content-Disposition': f'attachment; filename="{filename}"'
+        })
+
+    except Exception as e:
+        logger.error(f"[INVOICE_PDF] Failed to start invoice batch: {e}")
+        return jsonify({
+            "error": str(e),
+            "message": "Failed to render invoice batch",
+            "status": "error"
+        }), 500
+
 @bookkeeping_bp.route('/certificate/update-certificate-status', methods=['POST'])
 def update_certificate_status():
     """Update certificate status to 'done' for finalized certificates"""
@@ -3782,76 +2978,43 @@ def create_vendor_payment_entry():
                 "status": "validation_error"
             }), 400
 
-        query = """
-            INSERT INTO vendor_payments (
-                vendor_id, company_id, payment_date, transaction_id, amount, on_account_of, remark
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s)
-            RETURNING id
-        """
-
-        result = execute_query(query, (
-            data['vendorId'],
-            data['companyId'],
-            data['dateOfPayment'],
-            data['transactionId'],
-            data['amount'],
-            data.get('onAccountOf'),
-            data.get('remark')
-        ))
-
-        if result:
-            payment_id = result[0]['id']
-            logger.info(f"[VENDOR_PAYMENT] Created vendor payment entry ID: {payment_id} for vendor: {data['vendorId']}")
-
-            # After creating vendor payment, insert into Bank Ledger table
-            try:
-                # Get vendor details for bank ledger insertion
-                vendor_query = "SELECT vendor_name FROM vendors WHERE id = %s"
-                vendor_result = execute_query(vendor_query, (data['vendorId'],))
-
-                if vendor_result and len(vendor_result) > 0:
-                    vendor_name = vendor_result[0]['vendor_name']
-
-                    bank_ledger_query = """
-                        INSERT INTO bank_ledger (
-                            payment_date, transaction_id, vendor_id, company_id, vendor_name,
-                            amount, remark, transaction_type
-                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                    """
-
-                    bank_remark = f"Payment to {vendor_name} - {data.get('transactionId', '')}"
-
-                    execute_query(bank_ledger_query, (
-                        data['dateOfPayment'],  # payment_date
-                        data['transactionId'],  # transaction_id
-                        data['vendorId'],  # vendor_id
-                        data['companyId'],  # company_id
-                        vendor_name,  # vendor_name
-                        data['amount'],  # amount
-                        bank_remark,  # remark
-                        'payment'  # transaction_type
-                    ), fetch=False)
-
-                    logger.info(f"[BANK_LEDGER] Auto-inserted bank ledger entry for vendor payment ID: {payment_id}, transaction: {data['transactionId']}")
-                else:
-                    logger.warning(f"[BANK_LEDGER] No vendor found with ID: {data['vendorId']}, skipping bank ledger insertion")
-
-            except Exception as bank_e:
-                logger.error(f"[BANK_LEDGER] Failed to auto-insert bank ledger entry for vendor payment ID {payment_id}: {bank_e}")
-                # Don't fail the payment creation if bank ledger insertion fails
-
+        # Payment and its bank ledger leg are written in one statement/transaction
+        result = post_entry('vendor_payment', {
+            'vendor_id': data['vendorId'],
+            'company_id': data['companyId'],
+            'payment_date': data['dateOfPayment'],
+            'transaction_id': data['transactionId'],
+            'amount': data['amount'],
+            'on_account_of': data.get('onAccountOf'),
+            'remark': data.get('remark')
+        }, idempotency_key=idempotency_key_from_request(request, data))
+
+        payment_id = result['document_id']
+        if result['replayed']:
+            logger.info(f"[VENDOR_PAYMENT] Idempotent replay of vendor payment ID: {payment_id}")
             return jsonify({
                 "status": "success",
                 "data": {"payment_id": payment_id},
-                "message": f"Vendor payment entry created successfully with ID: {payment_id}"
-            }), 201
-        else:
-            return jsonify({
-                "error": "Failed to create record",
-                "message": "No ID returned from insert operation",
-                "status": "error"
-            }), 500
+                "replayed": True,
+                "message": f"Vendor payment already recorded with ID: {payment_id}"
+            }), 200
+
+        logger.info(f"[VENDOR_PAYMENT] Created vendor payment entry ID: {payment_id} for vendor: {data['vendorId']}")
+        if not result['bank_ledger_rows']:
+            logger.warning(f"[BANK_LEDGER] No vendor found with ID: {data['vendorId']}, skipping bank ledger insertion")
+
+        return jsonify({
+            "status": "success",
+            "data": {"payment_id": payment_id},
+            "message": f"Vendor payment entry created successfully with ID: {payment_id}"
+        }), 201
 
+    except IdempotencyConflict as e:
+        return jsonify({
+            "error": str(e),
+            "message": "Idempotency key already used for a different entry",
+            "status": "conflict"
+        }), 409
     except Exception as e:
         logger.error(f"[VENDOR_PAYMENT] Failed to create vendor payment entry: {e}")
         return jsonify({
@@ -3883,39 +3046,40 @@ def create_vendor_service_entry():
                 "status": "validation_error"
             }), 400
 
-        query = """
-            INSERT INTO vendor_services (
-                vendor_id, company_id, service_date, particulars, amount, on_account_of, remark
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s)
-            RETURNING id
-        """
-
-        result = execute_query(query, (
-            data['vendorId'],
-            data['companyId'],
-            data['dateOfService'],
-            data['particularOfService'],
-            data['feesToBePaid'],
-            data.get('onAccountOf'),
-            data.get('remark')
-        ))
-
-        if result:
-            service_id = result[0]['id']
-            logger.info(f"[VENDOR_SERVICE] Created vendor service entry ID: {service_id} for vendor: {data['vendorId']}")
+        result = post_entry('vendor_service', {
+            'vendor_id': data['vendorId'],
+            'company_id': data['companyId'],
+            'service_date': data['dateOfService'],
+            'particulars': data['particularOfService'],
+            'amount': data['feesToBePaid'],
+            'on_account_of': data.get('onAccountOf'),
+            'remark': data.get('remark')
+        }, idempotency_key=idempotency_key_from_request(request, data))
 
+        service_id = result['document_id']
+        if result['replayed']:
+            logger.info(f"[VENDOR_SERVICE] Idempotent replay of vendor service ID: {service_id}")
             return jsonify({
                 "status": "success",
                 "data": {"service_id": service_id},
-                "message": f"Vendor service entry created successfully with ID: {service_id}"
-            }), 201
-        else:
-            return jsonify({
-                "error": "Failed to create record",
-                "message": "No ID returned from insert operation",
-                "status": "error"
-            }), 500
+                "replayed": True,
+                "message": f"Vendor service already recorded with ID: {service_id}"
+            }), 200
 
+        logger.info(f"[VENDOR_SERVICE] Created vendor service entry ID: {service_id} for vendor: {data['vendorId']}")
+
+        return jsonify({
+            "status": "success",
+            "data": {"service_id": service_id},
+            "message": f"Vendor service entry created successfully with ID: {service_id}"
+        }), 201
+
+    except IdempotencyConflict as e:
+        return jsonify({
+            "error": str(e),
+            "message": "Idempotency key already used for a different entry",
+            "status": "conflict"
+        }), 409
     except Exception as e:
         logger.error(f"[VENDOR_SERVICE] Failed to create vendor service entry: {e}")
         return jsonify({
@@ -3924,6 +3088,119 @@ def create_vendor_service_entry():
             "status": "error"
         }), 500
 
+@bookkeeping_bp.route('/bank-statement/import', methods=['POST'])
+@limiter.limit("10 per minute")  # Financial data submission
+def import_bank_statement():
+    """
+    Bulk-import receipts and vendor payments from a bank statement (CSV/XLSX).
+
+    Form fields:
+        file: Statement export
+        account_no: company_details account number the statement belongs to
+        dry_run: 'true' to only match and report without posting
+
+    Credits are matched to B2B customers and posted as receipts, debits are
+    matched to vendors and posted as vendor payments - all in one
+    transaction. Unmatched or ambiguous lines are returned for manual entry.
+    """
+    try:
+        from bookkeeping.statements import parse_statement, PartyIndex, match_statement
+
+        upload = request.files.get('file')
+        account_no = (request.form.get('account_no') or '').strip()
+        dry_run = (request.form.get('dry_run') or '').lower() == 'true'
+
+        if not upload or not upload.filename:
+            return jsonify({
+                "error": "Missing required field: file",
+                "message": "A CSV or XLSX bank statement is required",
+                "status": "validation_error"
+            }), 400
+        if not upload.filename.lower().endswith(('.csv', '.xlsx', '.xlsm')):
+            return jsonify({
+                "error": "Unsupported file type",
+                "message": "Upload the statement as CSV or XLSX",
+                "status": "validation_error"
+            }), 400
+        if not account_no:
+            return jsonify({
+                "error": "Missing required field: account_no",
+                "message": "Field 'account_no' is required",
+                "status": "validation_error"
+            }), 400
+
+        company_result = execute_query(
+            "SELECT id, company_name, account_number FROM company_details WHERE account_number = %s",
+            (account_no,)
+        )
+        if not company_result:
+            return jsonify({
+                "error": "Company not found",
+                "message": f"No company found for account number: {account_no}",
+                "status": "not_found"
+            }), 404
+        company = company_result[0]
+
+        try:
+            lines = parse_statement(upload.read(), upload.filename)
+        except ValueError as parse_error:
+            return jsonify({
+                "error": str(parse_error),
+                "message": "Could not read the bank statement",
+                "status": "validation_error"
+            }), 400
+
+        # Two queries build the in-memory match indexes for the whole file
+        customers = execute_query("SELECT id, company_name, gst_number FROM b2bcustomersdetails")
+        vendors = execute_query("SELECT id, vendor_name, account_number, gst_number FROM vendors")
+        index = PartyIndex(customers or [], vendors or [])
+        matched, unmatched = match_statement(lines, index, account_no=account_no)
+
+        posted = None
+        if matched and not dry_run:
+            posted = post_statement_lines(company, matched)
+
+        def report_line(line):
+            return {
+                "line_no": line['line_no'],
+                "date": line['date'].isoformat(),
+                "description": line['description'],
+                "reference": line['reference'],
+                "type": line['kind'],
+                "amount": float(line['amount']),
+                **({"reason": line['reason']} if 'reason' in line else {
+                    "party_id": line['party_id'],
+                    "party_name": line['party_name'],
+                    "match_reason": line['match_reason']
+                })
+            }
+
+        logger.info(f"[STATEMENT] {upload.filename}: {len(lines)} lines, {len(matched)} matched, "
+                    f"{len(unmatched)} unmatched, posted: {posted}")
+        return jsonify({
+            "status": "success",
+            "data": {
+                "company_name": company['company_name'],
+                "account_no": account_no,
+                "dry_run": dry_run,
+                "total_lines": len(lines),
+                "matched": len(matched),
+                "unmatched": len(unmatched),
+                "posted": posted,
+                "matched_lines": [report_line(line) for line in matched] if dry_run else [],
+                "unmatched_lines": [report_line(line) for line in unmatched]
+            },
+            "message": f"Matched {len(matched)} of {len(lines)} statement lines"
+        }), 200
+
+    except Exception as e:
+        logger.error(f"[STATEMENT] Failed to import bank statement: {e}")
+        return jsonify({
+            "error": str(e),
+            "message": "Failed to import bank statement",
+            "status": "error"
+        }), 500
+
 @bookkeeping_bp.route('/receipt-amount-received/<int:receipt_id>', methods=['GET'])
 def get_receipt_amount_received_by_id(receipt_id):
     """Get a specific receipt amount received record by ID"""
@@ -3971,14 +3248,89 @@ def get_receipt_amount_received_by_id(receipt_id):
 
 # Periodic Ledger Endpoints - Read-only aggregation from existing ledger tables
 
+# Entry fields of the daily/monthly/yearly ledgers, for ?fields= projection
+PERIODIC_LEDGER_FIELDS = ('id', 'date', 'particulars', 'voucher_type', 'voucher_no', 'debit', 'credit',
+                          'entry_type', 'company_name')
+
+def _periodic_ledger_response(tag, period_label, start_date, end_date):
+    """
+    Page, period totals, count and opening balance of the period ledger from one journal statement
+
+    Args:
+        tag (str): Log tag, e.g. DAILY_LEDGER
+        period_label (str): Period as shown in messages
+        start_date (date): First day of the period
+        end_date (date): Last day of the period
+
+    Returns:
+        Response: Streaming JSON response with transactions, summary and pagination
+    """
+    fields = requested_fields(PERIODIC_LEDGER_FIELDS)
+    limit = int(request.args.get('limit', 50))
+    offset = int(request.args.get('offset', 0))
+
+    logger.info(f"[{tag}] Fetching ledger data for {period_label}")
+
+    ledger = fetch_period({'source_table': PERIOD_SOURCES}, start_date, end_date, limit=limit, offset=offset)
+    total_entries = ledger['total_entries']
+
+    # Vendor adjustments are shown against the company, everything else against the client
+    transactions = ({
+        'id': row['id'],
+        'date': row['entry_date'],
+        'particulars': row['particulars'] or '',
+        'voucher_type': row['voucher_type'] or 'Sales',
+        'voucher_no': row['voucher_no'] or '',
+        'debit': row['debit'] or 0,
+        'credit': row['credit'] or 0,
+        'entry_type': row['entry_type'] or 'Manual',
+        'company_name': row['company_name'] if row['source_table'] == 'vendor_adjustment' else row['party_name']
+    } for row in ledger['rows'])
+
+    closing_balance = ledger['closing_balance']
+    balance_type = 'Outstanding' if closing_balance > 0 else 'Advance' if closing_balance < 0 else 'Settled'
+
+    summary = {
+        'opening_balance': ledger['opening_balance'],
+        'total_debit': ledger['total_debit'],
+        'total_credit': ledger['total_credit'],
+        'closing_balance': abs(closing_balance),
+        'balance_type': balance_type
+    }
+
+    logger.info(f"[{tag}] Returning {len(ledger['rows'])} of {total_entries} entries for {period_label}")
+
+    return list_response(
+        transactions,
+        envelope={
+            "status": "success",
+            "data": {
+                "transactions": ROWS,
+                "summary": summary,
+                "total_entries": total_entries,
+                "pagination": {
+                    "limit": limit,
+                    "offset": offset,
+                    "has_more": (offset + limit) < total_entries
+                }
+            }
+        },
+        trailer=lambda count: {
+            "message": f"Retrieved {count} ledger entries for {period_label}",
+            "total": count
+        },
+        fields=fields,
+        label=tag.lower()
+    )
+
 @bookkeeping_bp.route('/ledger/daily', methods=['GET'])
 def get_daily_ledger():
-    """Get daily ledger data showing all entries for the specified date"""
+    """
+    Get daily ledger data showing all entries for the specified date
+    Query params: date (YYYY-MM-DD), limit, offset, fields, format=ndjson
+    """
+    date = request.args.get('date', '')
     try:
-        date = request.args.get('date', '')
-        limit = int(request.args.get('limit', 50))
-        offset = int(request.args.get('offset', 0))
-
         if not date:
             return jsonify({
                 "error": "Date is required",
@@ -3986,227 +3338,23 @@ def get_daily_ledger():
                 "status": "validation_error"
             }), 400
 
-        logger.info(f"[DAILY_LEDGER] Fetching ledger data for date: {date}")
-
-        # Ensure all required tables exist
-        create_company_ledger_query = """
-            CREATE TABLE IF NOT EXISTS ClientLedger (
-                id SERIAL PRIMARY KEY,
-                company_name VARCHAR(255) NOT NULL,
-                date DATE NOT NULL,
-                particulars TEXT,
-                voucher_no VARCHAR(100),
-                voucher_type VARCHAR(50) DEFAULT 'Receipt',
-                debit DECIMAL(15,2) DEFAULT 0,
-                credit DECIMAL(15,2) DEFAULT 0,
-                candidate_name VARCHAR(255),
-                entry_type VARCHAR(50) DEFAULT 'Manual',
-                reference_id VARCHAR(100),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """
-        execute_query(create_company_ledger_query, fetch=False)
-
-        # Ensure client_adjustments table exists
-        create_client_adjustments_query = """
-            CREATE TABLE IF NOT EXISTS client_adjustments (
-                id SERIAL PRIMARY KEY,
-                company_id INTEGER NOT NULL,
-                customer_id INTEGER NOT NULL,
-                date_of_service DATE NOT NULL,
-                particular_of_service TEXT NOT NULL,
-                adjustment_amount DECIMAL(15,2) NOT NULL CHECK (adjustment_amount != 0),
-                on_account_of TEXT,
-                remark TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (company_id) REFERENCES company_details(id),
-                FOREIGN KEY (customer_id) REFERENCES b2bcustomersdetails(id)
-            )
-        """
-        execute_query(create_client_adjustments_query, fetch=False)
-
-        # Ensure vendor_adjustments table exists
-        create_vendor_adjustments_query = """
-            CREATE TABLE IF NOT EXISTS vendor_adjustments (
-                id SERIAL PRIMARY KEY,
-                company_id INTEGER NOT NULL,
-                vendor_id INTEGER NOT NULL,
-                date_of_service DATE NOT NULL,
-                particular_of_service TEXT NOT NULL,
-                adjustment_amount DECIMAL(15,2) NOT NULL CHECK (adjustment_amount != 0),
-                on_account_of TEXT,
-                remark TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (company_id) REFERENCES company_details(id),
-                FOREIGN KEY (vendor_id) REFERENCES vendors(id)
-            )
-        """
-        execute_query(create_vendor_adjustments_query, fetch=False)
-
-        # Create indexes if they don't exist
-        index_queries = [
-            "CREATE INDEX IF NOT EXISTS idx_company_ledger_date ON ClientLedger(date)",
-            "CREATE INDEX IF NOT EXISTS idx_client_adjustments_date ON client_adjustments(date_of_service)",
-            "CREATE INDEX IF NOT EXISTS idx_vendor_adjustments_date ON vendor_adjustments(date_of_service)"
-        ]
-        for index_query in index_queries:
-            try:
-                execute_query(index_query, fetch=False)
-            except Exception as idx_e:
-                logger.warning(f"[DAILY_LEDGER] Could not create index: {idx_e}")
-
-        # Build UNION query for ClientLedger and adjustment entries
-        union_queries = []
-
-        # ClientLedger entries
-        ledger_query = """
-            SELECT
-                id,
-                company_name,
-                date,
-                particulars,
-                voucher_no,
-                voucher_type,
-                debit,
-                credit,
-                entry_type,
-                created_at,
-                'ledger' as source_table
-            FROM ClientLedger
-            WHERE date = %s
-        """
-        ledger_params = [date]
-
-        union_queries.append(ledger_query)
-
-        # Client adjustments for this date
-        client_adjustment_query = """
-            SELECT
-                ca.id,
-                b2b.company_name,
-                ca.date_of_service as date,
-                ca.particular_of_service as particulars,
-                CONCAT('ADJ-', ca.id) as voucher_no,
-                'Adjustment' as voucher_type,
-                CASE WHEN ca.adjustment_amount < 0 THEN ABS(ca.adjustment_amount) ELSE 0 END as debit,
-                CASE WHEN ca.adjustment_amount > 0 THEN ca.adjustment_amount ELSE 0 END as credit,
-                'Adjustment' as entry_type,
-                ca.created_at,
-                'client_adjustment' as source_table
-            FROM client_adjustments ca
-            JOIN b2bcustomersdetails b2b ON ca.customer_id = b2b.id
-            WHERE ca.date_of_service = %s
-        """
-        client_params = [date]
-
-        union_queries.append(client_adjustment_query)
-        ledger_params.extend(client_params)
-
-        # Vendor adjustments for this date
-        vendor_adjustment_query = """
-            SELECT
-                va.id,
-                cd.company_name,
-                va.date_of_service as date,
-                va.particular_of_service as particulars,
-                CONCAT('ADJ-', va.id) as voucher_no,
-                'Adjustment' as voucher_type,
-                CASE WHEN va.adjustment_amount < 0 THEN ABS(va.adjustment_amount) ELSE 0 END as debit,
-                CASE WHEN va.adjustment_amount > 0 THEN va.adjustment_amount ELSE 0 END as credit,
-                'Adjustment' as entry_type,
-                va.created_at,
-                'vendor_adjustment' as source_table
-            FROM vendor_adjustments va
-            JOIN company_details cd ON va.company_id = cd.id
-            WHERE va.date_of_service = %s
-        """
-        vendor_params = [date]
-
-        union_queries.append(vendor_adjustment_query)
-        ledger_params.extend(vendor_params)
-
-        # Combine all queries
-        full_query = " UNION ALL ".join(union_queries)
-        full_query += " ORDER BY created_at DESC"
-
-        logger.info(f"[DAILY_LEDGER] Executing combined query with params: {ledger_params}")
-
-        ledger_results = execute_query(full_query, ledger_params)
-
-        entries = []
-        total_debit = 0
-        total_credit = 0
-
-        if ledger_results:
-            logger.info(f"[DAILY_LEDGER] Found {len(ledger_results)} entries for date: {date}")
-            for row in ledger_results:
-                debit_amount = float(row['debit']) if row['debit'] else 0
-                credit_amount = float(row['credit']) if row['credit'] else 0
-                entries.append({
-                    'date': str(row['date']) if row['date'] else None,
-                    'particulars': row['particulars'] or '',
-                    'voucher_type': row['voucher_type'] or 'Sales',
-                    'voucher_no': row['voucher_no'] or '',
-                    'debit': debit_amount,
-                    'credit': credit_amount,
-                    'company_name': row['company_name'],
-                    'entry_type': row['entry_type'] or 'Manual',
-                    'id': row['id']
-                })
-                total_debit += debit_amount
-                total_credit += credit_amount
-        else:
-            logger.info(f"[DAILY_LEDGER] No entries found for date: {date}")
-
-        # Sort entries by date descending
-        entries.sort(key=lambda x: x['date'] or '1900-01-01', reverse=True)
-
-        # Apply pagination
-        paginated_entries = entries[offset:offset + limit]
-
-        # Calculate summary
-        opening_balance = 0  # Could be calculated from previous periods
-        closing_balance = total_debit - total_credit
-        balance_type = 'Outstanding' if closing_balance > 0 else 'Advance' if closing_balance < 0 else 'Settled'
-
-        summary = {
-            'opening_balance': opening_balance,
-            'total_debit': total_debit,
-            'total_credit': total_credit,
-            'closing_balance': abs(closing_balance),
-            'balance_type': balance_type
-        }
+        try:
+            day = date_type.fromisoformat(date)
+        except ValueError:
+            return jsonify({
+                "error": f"Invalid date: {date}",
+                "message": "Date must be in YYYY-MM-DD format",
+                "status": "validation_error"
+            }), 400
 
-        logger.info(f"[DAILY_LEDGER] Returning {len(paginated_entries)} paginated entries for {date}")
-
-        # Return raw Client Ledger entries without transformation
-        transactions = []
-        for entry in paginated_entries:
-            transactions.append({
-                'id': entry['id'],
-                'date': entry['date'],
-                'particulars': entry['particulars'],
-                'voucher_type': entry['voucher_type'],
-                'voucher_no': entry['voucher_no'],
-                'debit': entry['debit'],
-                'credit': entry['credit'],
-                'entry_type': entry['entry_type'],
-                'company_name': entry['company_name']
-            })
+        return _periodic_ledger_response('DAILY_LEDGER', date, day, day)
 
+    except FieldSelectionError as e:
         return jsonify({
-            "status": "success",
-            "data": {
-                "transactions": transactions,
-                "summary": summary
-            },
-            "message": f"Retrieved {len(transactions)} ledger entries for {date}",
-            "total": len(transactions)
-        }), 200
-
+            "error": str(e),
+            "message": "Invalid fields parameter",
+            "status": "validation_error"
+        }), 400
     except Exception as e:
         logger.error(f"[DAILY_LEDGER] Failed to retrieve daily ledger for {date}: {e}")
         return jsonify({
@@ -4217,13 +3365,13 @@ def get_daily_ledger():
 
 @bookkeeping_bp.route('/ledger/monthly', methods=['GET'])
 def get_monthly_ledger():
-    """Get monthly ledger data showing all entries for the specified month and year"""
+    """
+    Get monthly ledger data showing all entries for the specified month and year
+    Query params: month (1-12), year, limit, offset, fields, format=ndjson
+    """
+    month = request.args.get('month', '')
+    year = request.args.get('year', '')
     try:
-        month = request.args.get('month', '')
-        year = request.args.get('year', '')
-        limit = int(request.args.get('limit', 50))
-        offset = int(request.args.get('offset', 0))
-
         if not month or not year:
             return jsonify({
                 "error": "Month and year are required",
@@ -4231,227 +3379,25 @@ def get_monthly_ledger():
                 "status": "validation_error"
             }), 400
 
-        logger.info(f"[MONTHLY_LEDGER] Fetching ledger data for month/year: {month}/{year}")
-
-        # Ensure all required tables exist
-        create_company_ledger_query = """
-            CREATE TABLE IF NOT EXISTS ClientLedger (
-                id SERIAL PRIMARY KEY,
-                company_name VARCHAR(255) NOT NULL,
-                date DATE NOT NULL,
-                particulars TEXT,
-                voucher_no VARCHAR(100),
-                voucher_type VARCHAR(50) DEFAULT 'Receipt',
-                debit DECIMAL(15,2) DEFAULT 0,
-                credit DECIMAL(15,2) DEFAULT 0,
-                candidate_name VARCHAR(255),
-                entry_type VARCHAR(50) DEFAULT 'Manual',
-                reference_id VARCHAR(100),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """
-        execute_query(create_company_ledger_query, fetch=False)
-
-        # Ensure client_adjustments table exists
-        create_client_adjustments_query = """
-            CREATE TABLE IF NOT EXISTS client_adjustments (
-                id SERIAL PRIMARY KEY,
-                company_id INTEGER NOT NULL,
-                customer_id INTEGER NOT NULL,
-                date_of_service DATE NOT NULL,
-                particular_of_service TEXT NOT NULL,
-                adjustment_amount DECIMAL(15,2) NOT NULL CHECK (adjustment_amount != 0),
-                on_account_of TEXT,
-                remark TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (company_id) REFERENCES company_details(id),
-                FOREIGN KEY (customer_id) REFERENCES b2bcustomersdetails(id)
-            )
-        """
-        execute_query(create_client_adjustments_query, fetch=False)
-
-        # Ensure vendor_adjustments table exists
-        create_vendor_adjustments_query = """
-            CREATE TABLE IF NOT EXISTS vendor_adjustments (
-                id SERIAL PRIMARY KEY,
-                company_id INTEGER NOT NULL,
-                vendor_id INTEGER NOT NULL,
-                date_of_service DATE NOT NULL,
-                particular_of_service TEXT NOT NULL,
-                adjustment_amount DECIMAL(15,2) NOT NULL CHECK (adjustment_amount != 0),
-                on_account_of TEXT,
-                remark TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (company_id) REFERENCES company_details(id),
-                FOREIGN KEY (vendor_id) REFERENCES vendors(id)
-            )
-        """
-        execute_query(create_vendor_adjustments_query, fetch=False)
-
-        # Create indexes if they don't exist
-        index_queries = [
-            "CREATE INDEX IF NOT EXISTS idx_company_ledger_date ON ClientLedger(date)",
-            "CREATE INDEX IF NOT EXISTS idx_client_adjustments_date ON client_adjustments(date_of_service)",
-            "CREATE INDEX IF NOT EXISTS idx_vendor_adjustments_date ON vendor_adjustments(date_of_service)"
-        ]
-        for index_query in index_queries:
-            try:
-                execute_query(index_query, fetch=False)
-            except Exception as idx_e:
-                logger.warning(f"[MONTHLY_LEDGER] Could not create index: {idx_e}")
-
-        # Build UNION query for ClientLedger and adjustment entries
-        union_queries = []
-
-        # ClientLedger entries
-        ledger_query = """
-            SELECT
-                id,
-                company_name,
-                date,
-                particulars,
-                voucher_no,
-                voucher_type,
-                debit,
-                credit,
-                entry_type,
-                created_at,
-                'ledger' as source_table
-            FROM ClientLedger
-            WHERE EXTRACT(MONTH FROM date) = %s AND EXTRACT(YEAR FROM date) = %s
-        """
-        ledger_params = [month, year]
-
-        union_queries.append(ledger_query)
-
-        # Client adjustments for this month
-        client_adjustment_query = """
-            SELECT
-                ca.id,
-                b2b.company_name,
-                ca.date_of_service as date,
-                ca.particular_of_service as particulars,
-                CONCAT('ADJ-', ca.id) as voucher_no,
-                'Adjustment' as voucher_type,
-                CASE WHEN ca.adjustment_amount < 0 THEN ABS(ca.adjustment_amount) ELSE 0 END as debit,
-                CASE WHEN ca.adjustment_amount > 0 THEN ca.adjustment_amount ELSE 0 END as credit,
-                'Adjustment' as entry_type,
-                ca.created_at,
-                'client_adjustment' as source_table
-            FROM client_adjustments ca
-            JOIN b2bcustomersdetails b2b ON ca.customer_id = b2b.id
-            WHERE EXTRACT(MONTH FROM ca.date_of_service) = %s AND EXTRACT(YEAR FROM ca.date_of_service) = %s
-        """
-        client_params = [month, year]
-
-        union_queries.append(client_adjustment_query)
-        ledger_params.extend(client_params)
-
-        # Vendor adjustments for this month
-        vendor_adjustment_query = """
-            SELECT
-                va.id,
-                cd.company_name,
-                va.date_of_service as date,
-                va.particular_of_service as particulars,
-                CONCAT('ADJ-', va.id) as voucher_no,
-                'Adjustment' as voucher_type,
-                CASE WHEN va.adjustment_amount < 0 THEN ABS(va.adjustment_amount) ELSE 0 END as debit,
-                CASE WHEN va.adjustment_amount > 0 THEN va.adjustment_amount ELSE 0 END as credit,
-                'Adjustment' as entry_type,
-                va.created_at,
-                'vendor_adjustment' as source_table
-            FROM vendor_adjustments va
-            JOIN company_details cd ON va.company_id = cd.id
-            WHERE EXTRACT(MONTH FROM va.date_of_service) = %s AND EXTRACT(YEAR FROM va.date_of_service) = %s
-        """
-        vendor_params = [month, year]
-
-        union_queries.append(vendor_adjustment_query)
-        ledger_params.extend(vendor_params)
-
-        # Combine all queries
-        full_query = " UNION ALL ".join(union_queries)
-        full_query += " ORDER BY date DESC, created_at DESC"
-
-        logger.info(f"[MONTHLY_LEDGER] Executing combined query with params: {ledger_params}")
-
-        ledger_results = execute_query(full_query, ledger_params)
-
-        entries = []
-        total_debit = 0
-        total_credit = 0
-
-        if ledger_results:
-            logger.info(f"[MONTHLY_LEDGER] Found {len(ledger_results)} entries for month/year: {month}/{year}")
-            for row in ledger_results:
-                debit_amount = float(row['debit']) if row['debit'] else 0
-                credit_amount = float(row['credit']) if row['credit'] else 0
-                entries.append({
-                    'date': str(row['date']) if row['date'] else None,
-                    'particulars': row['particulars'] or '',
-                    'voucher_type': row['voucher_type'] or 'Sales',
-                    'voucher_no': row['voucher_no'] or '',
-                    'debit': debit_amount,
-                    'credit': credit_amount,
-                    'company_name': row['company_name'],
-                    'entry_type': row['entry_type'] or 'Manual',
-                    'id': row['id']
-                })
-                total_debit += debit_amount
-                total_credit += credit_amount
-        else:
-            logger.info(f"[MONTHLY_LEDGER] No entries found for month/year: {month}/{year}")
-
-        # Sort entries by date descending
-        entries.sort(key=lambda x: x['date'] or '1900-01-01', reverse=True)
-
-        # Apply pagination
-        paginated_entries = entries[offset:offset + limit]
-
-        # Calculate summary
-        opening_balance = 0  # Could be calculated from previous periods
-        closing_balance = total_debit - total_credit
-        balance_type = 'Outstanding' if closing_balance > 0 else 'Advance' if closing_balance < 0 else 'Settled'
-
-        summary = {
-            'opening_balance': opening_balance,
-            'total_debit': total_debit,
-            'total_credit': total_credit,
-            'closing_balance': abs(closing_balance),
-            'balance_type': balance_type
-        }
+        try:
+            month_num, year_num = int(month), int(year)
+            start_date = date_type(year_num, month_num, 1)
+            end_date = date_type(year_num, month_num, calendar.monthrange(year_num, month_num)[1])
+        except ValueError:
+            return jsonify({
+                "error": f"Invalid month/year: {month}/{year}",
+                "message": "Month must be 1-12 and year a four digit number",
+                "status": "validation_error"
+            }), 400
 
-        logger.info(f"[MONTHLY_LEDGER] Returning {len(paginated_entries)} paginated entries for {month}/{year}")
-
-        # Return raw Client Ledger entries without transformation
-        transactions = []
-        for entry in paginated_entries:
-            transactions.append({
-                'id': entry['id'],
-                'date': entry['date'],
-                'particulars': entry['particulars'],
-                'voucher_type': entry['voucher_type'],
-                'voucher_no': entry['voucher_no'],
-                'debit': entry['debit'],
-                'credit': entry['credit'],
-                'entry_type': entry['entry_type'],
-                'company_name': entry['company_name']
-            })
+        return _periodic_ledger_response('MONTHLY_LEDGER', f"{month}/{year}", start_date, end_date)
 
+    except FieldSelectionError as e:
         return jsonify({
-            "status": "success",
-            "data": {
-                "transactions": transactions,
-                "summary": summary
-            },
-            "message": f"Retrieved {len(transactions)} ledger entries for {month}/{year}",
-            "total": len(transactions)
-        }), 200
-
+            "error": str(e),
+            "message": "Invalid fields parameter",
+            "status": "validation_error"
+        }), 400
     except Exception as e:
         logger.error(f"[MONTHLY_LEDGER] Failed to retrieve monthly ledger for {month}/{year}: {e}")
         return jsonify({
@@ -4462,12 +3408,12 @@ def get_monthly_ledger():
 
 @bookkeeping_bp.route('/ledger/yearly', methods=['GET'])
 def get_yearly_ledger():
-    """Get yearly ledger data showing all entries for the specified year"""
+    """
+    Get yearly ledger data showing all entries for the specified year
+    Query params: year, limit, offset, fields, format=ndjson
+    """
+    year = request.args.get('year', '')
     try:
-        year = request.args.get('year', '')
-        limit = int(request.args.get('limit', 50))
-        offset = int(request.args.get('offset', 0))
-
         if not year:
             return jsonify({
                 "error": "Year is required",
@@ -4475,227 +3421,24 @@ def get_yearly_ledger():
                 "status": "validation_error"
             }), 400
 
-        logger.info(f"[YEARLY_LEDGER] Fetching ledger data for year: {year}")
-
-        # Ensure all required tables exist
-        create_company_ledger_query = """
-            CREATE TABLE IF NOT EXISTS ClientLedger (
-                id SERIAL PRIMARY KEY,
-                company_name VARCHAR(255) NOT NULL,
-                date DATE NOT NULL,
-                particulars TEXT,
-                voucher_no VARCHAR(100),
-                voucher_type VARCHAR(50) DEFAULT 'Receipt',
-                debit DECIMAL(15,2) DEFAULT 0,
-                credit DECIMAL(15,2) DEFAULT 0,
-                candidate_name VARCHAR(255),
-                entry_type VARCHAR(50) DEFAULT 'Manual',
-                reference_id VARCHAR(100),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """
-        execute_query(create_company_ledger_query, fetch=False)
-
-        # Ensure client_adjustments table exists
-        create_client_adjustments_query = """
-            CREATE TABLE IF NOT EXISTS client_adjustments (
-                id SERIAL PRIMARY KEY,
-                company_id INTEGER NOT NULL,
-                customer_id INTEGER NOT NULL,
-                date_of_service DATE NOT NULL,
-                particular_of_service TEXT NOT NULL,
-                adjustment_amount DECIMAL(15,2) NOT NULL CHECK (adjustment_amount != 0),
-                on_account_of TEXT,
-                remark TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (company_id) REFERENCES company_details(id),
-                FOREIGN KEY (customer_id) REFERENCES b2bcustomersdetails(id)
-            )
-        """
-        execute_query(create_client_adjustments_query, fetch=False)
-
-        # Ensure vendor_adjustments table exists
-        create_vendor_adjustments_query = """
-            CREATE TABLE IF NOT EXISTS vendor_adjustments (
-                id SERIAL PRIMARY KEY,
-                company_id INTEGER NOT NULL,
-                vendor_id INTEGER NOT NULL,
-                date_of_service DATE NOT NULL,
-                particular_of_service TEXT NOT NULL,
-                adjustment_amount DECIMAL(15,2) NOT NULL CHECK (adjustment_amount != 0),
-                on_account_of TEXT,
-                remark TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (company_id) REFERENCES company_details(id),
-                FOREIGN KEY (vendor_id) REFERENCES vendors(id)
-            )
-        """
-        execute_query(create_vendor_adjustments_query, fetch=False)
-
-        # Create indexes if they don't exist
-        index_queries = [
-            "CREATE INDEX IF NOT EXISTS idx_company_ledger_date ON ClientLedger(date)",
-            "CREATE INDEX IF NOT EXISTS idx_client_adjustments_date ON client_adjustments(date_of_service)",
-            "CREATE INDEX IF NOT EXISTS idx_vendor_adjustments_date ON vendor_adjustments(date_of_service)"
-        ]
-        for index_query in index_queries:
-            try:
-                execute_query(index_query, fetch=False)
-            except Exception as idx_e:
-                logger.warning(f"[YEARLY_LEDGER] Could not create index: {idx_e}")
-
-        # Build UNION query for ClientLedger and adjustment entries
-        union_queries = []
-
-        # ClientLedger entries
-        ledger_query = """
-            SELECT
-                id,
-                company_name,
-                date,
-                particulars,
-                voucher_no,
-                voucher_type,
-                debit,
-                credit,
-                entry_type,
-                created_at,
-                'ledger' as source_table
-            FROM ClientLedger
-            WHERE EXTRACT(YEAR FROM date) = %s
-        """
-        ledger_params = [year]
-
-        union_queries.append(ledger_query)
-
-        # Client adjustments for this year
-        client_adjustment_query = """
-            SELECT
-                ca.id,
-                b2b.company_name,
-                ca.date_of_service as date,
-                ca.particular_of_service as particulars,
-                CONCAT('ADJ-', ca.id) as voucher_no,
-                'Adjustment' as voucher_type,
-                CASE WHEN ca.adjustment_amount < 0 THEN ABS(ca.adjustment_amount) ELSE 0 END as debit,
-                CASE WHEN ca.adjustment_amount > 0 THEN ca.adjustment_amount ELSE 0 END as credit,
-                'Adjustment' as entry_type,
-                ca.created_at,
-                'client_adjustment' as source_table
-            FROM client_adjustments ca
-            JOIN b2bcustomersdetails b2b ON ca.customer_id = b2b.id
-            WHERE EXTRACT(YEAR FROM ca.date_of_service) = %s
-        """
-        client_params = [year]
-
-        union_queries.append(client_adjustment_query)
-        ledger_params.extend(client_params)
-
-        # Vendor adjustments for this year
-        vendor_adjustment_query = """
-            SELECT
-                va.id,
-                cd.company_name,
-                va.date_of_service as date,
-                va.particular_of_service as particulars,
-                CONCAT('ADJ-', va.id) as voucher_no,
-                'Adjustment' as voucher_type,
-                CASE WHEN va.adjustment_amount < 0 THEN ABS(va.adjustment_amount) ELSE 0 END as debit,
-                CASE WHEN va.adjustment_amount > 0 THEN va.adjustment_amount ELSE 0 END as credit,
-                'Adjustment' as entry_type,
-                va.created_at,
-                'vendor_adjustment' as source_table
-            FROM vendor_adjustments va
-            JOIN company_details cd ON va.company_id = cd.id
-            WHERE EXTRACT(YEAR FROM va.date_of_service) = %s
-        """
-        vendor_params = [year]
-
-        union_queries.append(vendor_adjustment_query)
-        ledger_params.extend(vendor_params)
-
-        # Combine all queries
-        full_query = " UNION ALL ".join(union_queries)
-        full_query += " ORDER BY date DESC, created_at DESC"
-
-        logger.info(f"[YEARLY_LEDGER] Executing combined query with params: {ledger_params}")
-
-        ledger_results = execute_query(full_query, ledger_params)
-
-        entries = []
-        total_debit = 0
-        total_credit = 0
-
-        if ledger_results:
-            logger.info(f"[YEARLY_LEDGER] Found {len(ledger_results)} entries for year: {year}")
-            for row in ledger_results:
-                debit_amount = float(row['debit']) if row['debit'] else 0
-                credit_amount = float(row['credit']) if row['credit'] else 0
-                entries.append({
-                    'date': str(row['date']) if row['date'] else None,
-                    'particulars': row['particulars'] or '',
-                    'voucher_type': row['voucher_type'] or 'Sales',
-                    'voucher_no': row['voucher_no'] or '',
-                    'debit': debit_amount,
-                    'credit': credit_amount,
-                    'company_name': row['company_name'],
-                    'entry_type': row['entry_type'] or 'Manual',
-                    'id': row['id']
-                })
-                total_debit += debit_amount
-                total_credit += credit_amount
-        else:
-            logger.info(f"[YEARLY_LEDGER] No entries found for year: {year}")
-
-        # Sort entries by date descending
-        entries.sort(key=lambda x: x['date'] or '1900-01-01', reverse=True)
-
-        # Apply pagination
-        paginated_entries = entries[offset:offset + limit]
-
-        # Calculate summary
-        opening_balance = 0  # Could be calculated from previous periods
-        closing_balance = total_debit - total_credit
-        balance_type = 'Outstanding' if closing_balance > 0 else 'Advance' if closing_balance < 0 else 'Settled'
-
-        summary = {
-            'opening_balance': opening_balance,
-            'total_debit': total_debit,
-            'total_credit': total_credit,
-            'closing_balance': abs(closing_balance),
-            'balance_type': balance_type
-        }
+        try:
+            year_num = int(year)
+            start_date, end_date = date_type(year_num, 1, 1), date_type(year_num, 12, 31)
+        except ValueError:
+            return jsonify({
+                "error": f"Invalid year: {year}",
+                "message": "Year must be a four digit number",
+                "status": "validation_error"
+            }), 400
 
-        logger.info(f"[YEARLY_LEDGER] Returning {len(paginated_entries)} paginated entries for {year}")
-
-        # Return raw Client Ledger entries without transformation
-        transactions = []
-        for entry in paginated_entries:
-            transactions.append({
-                'id': entry['id'],
-                'date': entry['date'],
-                'particulars': entry['particulars'],
-                'voucher_type': entry['voucher_type'],
-                'voucher_no': entry['voucher_no'],
-                'debit': entry['debit'],
-                'credit': entry['credit'],
-                'entry_type': entry['entry_type'],
-                'company_name': entry['company_name']
-            })
+        return _periodic_ledger_response('YEARLY_LEDGER', year, start_date, end_date)
 
+    except FieldSelectionError as e:
         return jsonify({
-            "status": "success",
-            "data": {
-                "transactions": transactions,
-                "summary": summary
-            },
-            "message": f"Retrieved {len(transactions)} ledger entries for {year}",
-            "total": len(transactions)
-        }), 200
-
+            "error": str(e),
+            "message": "Invalid fields parameter",
+            "status": "validation_error"
+        }), 400
     except Exception as e:
         logger.error(f"[YEARLY_LEDGER] Failed to retrieve yearly ledger for {year}: {e}")
         return jsonify({
@@ -4706,65 +3449,59 @@ def get_yearly_ledger():
 
 @bookkeeping_bp.route('/outstanding-dues', methods=['GET'])
 def get_outstanding_dues():
-    """Get outstanding dues by aggregating pending amounts from existing ledgers"""
+    """Get outstanding dues per client with aging buckets from the open-items table"""
     try:
         period = request.args.get('period', 'daily')
         company_id = request.args.get('company_id', '')
 
-        # Query for outstanding amounts from ClientLedger (unpaid invoices)
-        query = """
-            SELECT
-                cl.company_name,
-                SUM(cl.debit - cl.credit) as amount_due,
-                cl.date as due_date,
-                COUNT(*) as overdue_count
-            FROM ClientLedger cl
-            WHERE cl.debit > cl.credit AND cl.date < CURRENT_DATE
-        """
-
-        params = []
-
-        if period == 'monthly':
-            month = request.args.get('month')
-            year = request.args.get('year')
-            if month and year:
-                query += " AND EXTRACT(MONTH FROM cl.date) = %s AND EXTRACT(YEAR FROM cl.date) = %s"
-                params.extend([month, year])
-        elif period == 'daily':
-            date = request.args.get('date')
-            if date:
-                query += " AND cl.date = %s"
-                params.append(date)
+        # Age open invoices as of the selected day / month end (default today)
+        as_of = datetime.now().date()
+        try:
+            if request.args.get('as_of'):
+                as_of = datetime.strptime(request.args['as_of'], '%Y-%m-%d').date()
+            elif period == 'monthly' and request.args.get('month') and request.args.get('year'):
+                month, year = int(request.args['month']), int(request.args['year'])
+                as_of = date_type(year, month, calendar.monthrange(year, month)[1])
+            elif period == 'daily' and request.args.get('date'):
+                as_of = datetime.strptime(request.args['date'], '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({
+                "error": "Invalid date",
+                "message": "Use YYYY-MM-DD for as_of/date and numeric month/year",
+                "status": "validation_error"
+            }), 400
 
+        company_name = None
         if company_id:
-            query += " AND cl.company_name IN (SELECT company_name FROM company_details WHERE id = %s)"
-            params.append(company_id)
-
-        query += " GROUP BY cl.company_name, cl.date HAVING SUM(cl.debit - cl.credit) > 0 ORDER BY cl.date ASC"
+            company_result = execute_query("SELECT company_name FROM company_details WHERE id = %s", (company_id,))
+            if not company_result:
+                return jsonify({"status": "success", "data": [], "message": "Retrieved 0 outstanding dues"}), 200
+            company_name = company_result[0]['company_name']
 
         try:
-            results = execute_query(query, params)
+            report = aging_report(company_name=company_name, as_of=as_of)
         except Exception as db_e:
             logger.warning(f"[OUTSTANDING_DUES] Database query failed, returning empty results: {db_e}")
-            results = []
+            report = []
 
-        dues = []
-        if results:
-            for row in results:
-                due_date = row['due_date']
-                days_overdue = (datetime.now().date() - due_date).days if due_date else 0
-
-                dues.append({
-                    'company': row['company_name'] or '',
-                    'amount_due': float(row['amount_due']) if row['amount_due'] else 0,
-                    'due_date': str(due_date) if due_date else None,
-                    'days_overdue': days_overdue,
-                    'contact_info': ''  # Could be extended to include contact info
-                })
+        dues = [{
+            'company': row['company_name'] or '',
+            'amount_due': row['outstanding'],
+            'due_date': row['oldest_invoice_date'],
+            'days_overdue': row['days_overdue'],
+            'buckets': row['buckets'],
+            'open_invoices': row['open_invoices'],
+            'unapplied_credit': row['unapplied_credit'],
+            'contact_info': ''  # Could be extended to include contact info
+        } for row in report]
+
+        totals = {label: round(sum(row['buckets'][label] for row in report), 2) for label, _, _ in AGING_BUCKETS}
 
         return jsonify({
             "status": "success",
             "data": dues,
+            "totals": totals,
+            "as_of": str(as_of),
             "message": f"Retrieved {len(dues)} outstanding dues"
         }), 200
 
@@ -4776,6 +3513,52 @@ def get_outstanding_dues():
             "status": "error"
         }), 500
 
+@bookkeeping_bp.route('/receivables/open-items', methods=['GET'])
+def get_receivable_open_items():
+    """Get a client's unpaid invoices, oldest first, with remaining balance and aging bucket"""
+    try:
+        company_name = request.args.get('company_name', '').strip()
+        if not company_name:
+            return jsonify({
+                "error": "Missing required parameter: company_name",
+                "message": "Parameter 'company_name' is required",
+                "status": "validation_error"
+            }), 400
+
+        items = open_items_for_client(company_name)
+        return jsonify({
+            "status": "success",
+            "data": items,
+            "message": f"Retrieved {len(items)} open items for {company_name}"
+        }), 200
+
+    except Exception as e:
+        logger.error(f"[OPEN_ITEMS] Failed to retrieve open items for {request.args.get('company_name')}: {e}")
+        return jsonify({
+            "error": str(e),
+            "message": "Failed to retrieve open items",
+            "status": "error"
+        }), 500
+
+@bookkeeping_bp.route('/receivables/rebuild', methods=['POST'])
+def rebuild_receivable_open_items():
+    """Re-allocate open items for every client (backfill or repair)"""
+    try:
+        clients = rebuild_all()
+        return jsonify({
+            "status": "success",
+            "data": {"clients": clients},
+            "message": f"Rebuilt open items for {clients} clients"
+        }), 200
+
+    except Exception as e:
+        logger.error(f"[OPEN_ITEMS] Failed to rebuild open items: {e}")
+        return jsonify({
+            "error": str(e),
+            "message": "Failed to rebuild open items",
+            "status": "error"
+        }), 500
+
 @bookkeeping_bp.route('/export', methods=['POST'])
 def export_data():
     """Export ledger data as PDF, CSV, or Excel"""
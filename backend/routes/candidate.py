@@ -1,6 +1,4 @@
 from flask import Blueprint, request, jsonify
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
 from datetime import datetime
 import json
 import os
@@ -8,19 +6,22 @@ import sys
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from config import Config
 from utils.file_ops import sanitize_folder_name, create_unique_candidate_folder, move_files_to_candidate_folder
+from utils.temp_sessions import get_session_manager, MANIFEST_FILENAME
+from utils.verification import invalidate_certificates
 from database import execute_query, get_candidate_by_name, save_candidate, Candidate
-from database.db_connection import DatabaseConnection
+from database.candidate_directory import search as search_directory
+from database.candidates import plan_uploads, save_candidate_from_session
+from database.counters import count as count_rows
+from database.db_connection import stream_rows
+from utils.serialization import ROWS, FieldSelectionError, list_response, requested_fields, select_list
+from utils.rate_limit import limiter
 
 candidate_bp = Blueprint('candidate', __name__)
 
-# Initialize limiter for this blueprint
-limiter = Limiter(key_func=get_remote_address)
-
 @candidate_bp.route('/save-candidate-data', methods=['POST'])
 @limiter.limit("5 per minute", override_defaults=False)  # Stricter limit for data submission
 def save_candidate_data():
     """Save candidate form data and images atomically to database"""
-    conn = None
     try:
         data = request.get_json()
 
@@ -80,6 +81,8 @@ def save_candidate_data():
         temp_files = []
         for filename in os.listdir(temp_session_folder):
             file_path = os.path.join(temp_session_folder, filename)
+            if filename == MANIFEST_FILENAME:
+                continue
             if os.path.isfile(file_path):
                 temp_files.append(filename)
 
@@ -100,184 +103,36 @@ def save_candidate_data():
         if not temp_files:
             return jsonify({"error": "No files found in session"}), 400
 
-        # Start atomic transaction
-        # DatabaseConnection and execute_query are now imported at the top
-        conn = DatabaseConnection.get_connection()
-        conn.autocommit = False  # Start transaction
-
-        try:
-            # Step 1: Insert candidate data FIRST to get candidate_id
-            candidate_query = """
-                INSERT INTO candidates (
-                    candidate_name, session_id, json_data, ocr_data, last_updated
-                ) VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP)
-                ON CONFLICT (candidate_name)
-                DO UPDATE SET
-                    session_id = EXCLUDED.session_id,
-                    json_data = EXCLUDED.json_data,
-                    ocr_data = EXCLUDED.ocr_data,
-                    last_updated = CURRENT_TIMESTAMP
-                RETURNING id
-            """
-
-            import json
-            candidate_result = execute_query(candidate_query, (
-                candidate_name, session_id, json.dumps(data),
-                json.dumps(ocr_data) if ocr_data else None
-            ), fetch=True)
-
-            if not candidate_result:
-                raise Exception("Failed to insert candidate record")
-
-            candidate_id = candidate_result[0]['id']
-            print(f"[DB] ✅ Inserted candidate {candidate_name} with ID: {candidate_id}")
-
-            # Step 2: Insert images into candidate_uploads table using candidate_id
-            image_ids = []
-            files_processed = 0
-
-            # Mapping from field keys to image_type names
-            field_to_type = {
-                'photo': 'photo',
-                'signature': 'signature',
-                'passport_front_img': 'passport_front',
-                'passport_back_img': 'passport_back',
-                'cdc_img': 'cdc',
-                'marksheet': 'marksheet',
-                'coc_img': 'coc'
-            }
-
-            # First, handle payment screenshot if payment status is PAID
-            if payment_status == 'PAID' and payment_screenshot_path:
-                # Read payment screenshot file data
-                with open(payment_screenshot_path, 'rb') as f:
-                    file_data = f.read()
-
-                file_size = len(file_data)
-                file_type = payment_proof.rsplit('.', 1)[1].lower() if '.' in payment_proof else ''
-
-                # Determine MIME type
-                import mimetypes
-                mime_type, _ = mimetypes.guess_type(payment_proof)
-                if not mime_type:
-                    mime_type = 'application/octet-stream'
-
-                # Insert payment screenshot using candidate_id
-                from database.db_connection import insert_image_blob  # Keep for now
-                result = insert_image_blob(
-                    candidate_id=candidate_id,
-                    file_type=file_type,
-                    file_data=file_data,
-                    mime_type=mime_type,
-                    file_size=file_size,
-                    file_name=payment_proof,
-                    image_type='payment',
-                    candidate_name=candidate_name
-                )
-
-                if result:
-                    image_ids.append(result)
-                    files_processed += 1
-                    print(f"[DB] ✅ Inserted payment screenshot {payment_proof} with ID: {result}")
-
-            # Then process other images (no artificial limit)
-            print(f"[DEBUG] Processing all remaining images from {len(temp_files)} total files")
-            processed_additional = 0
-            for filename in temp_files:  # Process all remaining images
-                file_path = os.path.join(temp_session_folder, filename)
-
-                # Skip the payment screenshot if it was already processed
-                if payment_screenshot_path and filename == payment_proof:
-                    print(f"[DEBUG] Skipping payment screenshot {filename} as already processed")
-                    continue
-
-                # Skip if we've already processed this file (avoid duplicates)
-                if filename in [payment_proof] if payment_proof else []:
-                    continue
-
-                # Read file data
-                with open(file_path, 'rb') as f:
-                    file_data = f.read()
-
-                file_size = len(file_data)
-                file_type = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
-
-                # Determine MIME type
-                import mimetypes
-                mime_type, _ = mimetypes.guess_type(filename)
-                if not mime_type:
-                    mime_type = 'application/octet-stream'
-
-                # Determine image_type from filename prefix
-                file_key = filename.split('.')[0]
-                image_type = field_to_type.get(file_key, None)
-
-                # Insert image using the new insert_image_blob function
-                from database.db_connection import insert_image_blob  # Keep this for now - will migrate later
-                result = insert_image_blob(
-                    candidate_id=candidate_id,
-                    file_type=file_type,
-                    file_data=file_data,
-                    mime_type=mime_type,
-                    file_size=file_size,
-                    file_name=filename,
-                    image_type=image_type,
-                    candidate_name=candidate_name
-                )
-
-                if result:
-                    image_ids.append(result)
-                    files_processed += 1
-                    processed_additional += 1
-                    print(f"[DB] ✅ Inserted image {filename} with image_type: {image_type}")
-
-            print(f"[DEBUG] Processed {processed_additional} additional images. Total files_processed: {files_processed}")
-            print(f"[DEBUG] Total images saved: {len(image_ids)} (should be {len(temp_files)} if no payment screenshot)")
-
-            record_id = candidate_id
-
-            # Commit transaction
-            conn.commit()
-
-            # Update Master_Database_Table_A automatically after candidate insertion
-            try:
-                from hooks.post_data_insert import update_master_table_after_candidate_insert
-                update_master_table_after_candidate_insert(record_id)
-                print(f"[MASTER_TABLE] Updated Master_Database_Table_A for candidate_id: {record_id}")
-            except Exception as update_e:
-                print(f"[MASTER_TABLE] Failed to update master table: {update_e}")
-                # Don't fail the candidate creation if master table update fails
-
-            # Step 3: Clean up temp folder
-            import shutil
-            shutil.rmtree(temp_session_folder)
-            print(f"[CLEANUP] Removed temp session folder: {temp_session_folder}")
+        # Save candidate, uploads and master table entry in one transaction;
+        # files are moved (not copied) from the session into CANDIDATE_<id>/
+        uploads = plan_uploads(temp_session_folder, temp_files,
+                               payment_proof if payment_screenshot_path else None)
+        result = save_candidate_from_session(candidate_name, session_id, data, ocr_data, uploads)
+        record_id = result['candidate_id']
+        image_ids = result['upload_ids']
 
-            print(f"[SUCCESS] ✅ Atomically saved candidate {candidate_name} with {len(image_ids)} images (including payment screenshot)")
+        # Clean up what is left of the temp session (the manifest)
+        import shutil
+        shutil.rmtree(temp_session_folder, ignore_errors=True)
+        get_session_manager().forget_session(session_id)
+        print(f"[CLEANUP] Removed temp session folder: {temp_session_folder}")
 
-            return jsonify({
-                "status": "success",
-                "message": "Candidate data and images saved atomically",
-                "candidate_name": candidate_name,
-                "record_id": record_id,
-                "files_count": len(image_ids),
-                "session_id": session_id,
-                "filename": candidate_name,  # For frontend compatibility
-                "storage_type": "separate_tables"
-            }), 200
+        print(f"[SUCCESS] ✅ Atomically saved candidate {candidate_name} with {len(image_ids)} images (including payment screenshot)")
 
-        except Exception as db_error:
-            if conn:
-                conn.rollback()
-            print(f"[DB] ❌ Transaction failed: {db_error}")
-            raise
+        return jsonify({
+            "status": "success",
+            "message": "Candidate data and images saved atomically",
+            "candidate_name": candidate_name,
+            "record_id": record_id,
+            "files_count": len(image_ids),
+            "session_id": session_id,
+            "filename": candidate_name,  # For frontend compatibility
+            "storage_type": "separate_tables"
+        }), 200
 
     except Exception as e:
         print(f"[ERROR] Save candidate data failed: {e}")
         return jsonify({"error": str(e)}), 500
-    finally:
-        if conn:
-            DatabaseConnection.return_connection(conn)
 
 @candidate_bp.route('/get-candidate-data/<filename>', methods=['GET'])
 def get_candidate_data(filename):
@@ -299,71 +154,66 @@ def get_candidate_data(filename):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Columns of /get-all-candidates; the first seven images are aggregated in SQL
+CANDIDATE_LIST_COLUMNS = {
+    'id': "c.id",
+    'candidate_name': "c.candidate_name",
+    'session_id': "c.session_id",
+    'candidate_data': "COALESCE(c.json_data, '{}'::jsonb)::text",
+    'ocr_data': "COALESCE(c.ocr_data, '{}'::jsonb)::text",
+    'files': """COALESCE((
+            SELECT json_agg(json_build_object(
+                       'id', u.id, 'file_name', u.file_name, 'file_type', u.file_type,
+                       'mime_type', u.mime_type, 'file_size', u.file_size,
+                       'image_num', u.image_num, 'upload_time', u.upload_time
+                   ) ORDER BY u.image_num)
+            FROM (
+                SELECT id, file_name, file_type, mime_type, file_size, upload_time,
+                       row_number() OVER (ORDER BY upload_time) AS image_num
+                FROM candidate_uploads
+                WHERE candidate_id = c.id AND file_path IS NOT NULL AND file_path != ''
+                ORDER BY upload_time
+                LIMIT 7
+            ) u
+        ), '[]'::json)::text""",
+    'created_at': "c.created_at",
+}
+CANDIDATE_JSON_COLUMNS = ('candidate_data', 'ocr_data', 'files')
+
 @candidate_bp.route('/get-all-candidates', methods=['GET'])
 def get_all_candidates():
-    """Get all candidates with their images from separate tables"""
+    """
+    Get all candidates with their images, streamed from the cursor
+    Query params: fields (comma separated projection), format=ndjson
+    """
     try:
-        # Query to get all candidates
-        query = """
-            SELECT
-                c.id, c.candidate_name, c.session_id, c.json_data, c.created_at,
-                c.ocr_data
+        fields = requested_fields(CANDIDATE_LIST_COLUMNS)
+    except FieldSelectionError as e:
+        return jsonify({
+            "error": str(e),
+            "message": "Invalid fields parameter",
+            "status": "validation_error"
+        }), 400
+
+    try:
+        query = f"""
+            SELECT {select_list(CANDIDATE_LIST_COLUMNS, fields)}
             FROM candidates c
             ORDER BY c.created_at DESC
             LIMIT 1000
         """
 
-        candidates = execute_query(query)
-
-        if not candidates:
-            return jsonify({
-                "status": "success",
-                "data": [],
-                "message": "No candidates found in database",
-                "total": 0
-            }), 200
-
-        # Format the results
-        result = []
-        for record in candidates:
-            # Get images for this candidate
-            files = []
-            if record['id']:
-                images_query = """
-                    SELECT id, file_name, file_type, mime_type, file_size, upload_time, image_type
-                    FROM candidate_uploads
-                    WHERE candidate_id = %s AND file_path IS NOT NULL AND file_path != ''
-                    ORDER BY upload_time
-                    LIMIT 7
-                """
-                images = execute_query(images_query, (record['id'],))
-                for i, img in enumerate(images):
-                    files.append({
-                        'id': img['id'],
-                        'file_name': img['file_name'],
-                        'file_type': img['file_type'],
-                        'mime_type': img['mime_type'],
-                        'file_size': img['file_size'],
-                        'image_num': i + 1,
-                        'upload_time': img['upload_time'].isoformat() if img['upload_time'] else None
-                    })
-
-            result.append({
-                'id': record['id'],
-                'candidate_name': record['candidate_name'],
-                'session_id': record['session_id'],
-                'candidate_data': record['json_data'] if record['json_data'] else {},
-                'ocr_data': record['ocr_data'] if record['ocr_data'] else {},
-                'files': files,
-                'created_at': record['created_at'].isoformat() if record['created_at'] else None
-            })
-
-        return jsonify({
-            "status": "success",
-            "data": result,
-            "message": f"Retrieved {len(result)} candidates from database",
-            "total": len(result)
-        }), 200
+        return list_response(
+            stream_rows(query),
+            envelope={"status": "success", "data": ROWS},
+            trailer=lambda count: {
+                "message": f"Retrieved {count} candidates from database" if count else "No candidates found in database",
+                "total": count
+            },
+            fields=fields,
+            raw=CANDIDATE_JSON_COLUMNS,
+            label='candidates'
+        )
 
     except Exception as e:
         print(f"[ERROR] Failed to get all candidates: {e}")
@@ -553,6 +403,7 @@ def update_candidate_data():
         """
 
         execute_query(query, (json.dumps(update_data), candidate_id), fetch=False)
+        invalidate_certificates(candidate_id=candidate_id)
 
         return jsonify({
             "status": "success",
@@ -623,8 +474,8 @@ def get_candidate_image(candidate_id, image_num):
 @candidate_bp.route('/get-combined-candidate-data/<candidate_name>', methods=['GET'])
 def get_combined_candidate_data(candidate_name):
     """
-    Get combined candidate data from all sources: master_database_table_a, candidate_uploads,
-    verification_image, and certificate_image from certificate_selections
+    Get combined candidate data from all sources: master_database_table_a, candidate_uploads
+    and certificate_selections (file references only, never the image data)
     """
     try:
         from database.db_connection import execute_query
@@ -653,9 +504,16 @@ def get_combined_candidate_data(candidate_name):
         """
         uploads_data = execute_query(uploads_query, (candidate_name,))
 
-        # 3. Get certificate selections with all columns
+        # 3. Get certificate selections; images are served by /verification-image and /certificate-image
         cert_query = """
-            SELECT cs.*
+            SELECT
+                cs.id, cs.candidate_id, cs.candidate_name, cs.client_name, cs.certificate_name,
+                cs.certificate_number, cs.creation_date, cs.start_date, cs.end_date, cs.issue_date,
+                cs.expiry_date, cs.serial_number, cs.status,
+                cs.verification_file_path, cs.verification_mime_type,
+                cs.certificate_file_path, cs.certificate_mime_type,
+                (cs.verification_file_path IS NOT NULL OR cs.verification_image IS NOT NULL) AS has_verification_image,
+                (cs.certificate_file_path IS NOT NULL OR cs.certificate_image IS NOT NULL) AS has_certificate_image
             FROM certificate_selections cs
             WHERE cs.candidate_name = %s
             ORDER BY cs.creation_date DESC
@@ -706,28 +564,11 @@ def get_combined_candidate_data(candidate_name):
 def get_unique_candidate_names():
     """
     Get unique candidate names from all relevant tables for dropdown population
+    Query params: prefix (optional, case-insensitive name or passport prefix)
     """
     try:
-        from database.db_connection import execute_query
-
-        # Get unique candidate names from all sources
-        query = """
-            SELECT DISTINCT candidate_name
-            FROM (
-                SELECT candidate_name FROM Master_Database_Table_A
-                UNION
-                SELECT candidate_name FROM candidate_uploads
-                UNION
-                SELECT candidate_name FROM certificate_selections
-                UNION
-                SELECT candidate_name FROM candidates
-            ) AS all_candidates
-            WHERE candidate_name IS NOT NULL AND candidate_name != ''
-            ORDER BY candidate_name
-        """
-        result = execute_query(query)
-
-        candidate_names = [row['candidate_name'] for row in result] if result else []
+        matches = search_directory(request.args.get('prefix'))
+        candidate_names = [row['candidate_name'] for row in matches]
 
         return jsonify({
             "status": "success",
@@ -748,27 +589,15 @@ def get_unique_candidate_names():
 def get_candidates_for_dropdown():
     """
     Get candidates with id, name, and passport for dropdown selection
+    Query params: prefix (optional, case-insensitive name or passport prefix)
     """
     try:
-        from database.db_connection import execute_query
-
-        query = """
-            SELECT id, candidate_name, TRIM(json_data->>'passport') as passport
-            FROM candidates
-            WHERE json_data->>'passport' IS NOT NULL AND TRIM(json_data->>'passport') != ''
-            ORDER BY candidate_name
-            LIMIT 1000
-        """
-        result = execute_query(query)
-
-        candidates = []
-        if result:
-            for row in result:
-                candidates.append({
-                    'id': row['id'],
-                    'candidate_name': row['candidate_name'],
-                    'passport': row['passport']
-                })
+        matches = search_directory(request.args.get('prefix'), limit=1000, with_passport=True)
+        candidates = [{
+            'id': row['candidate_id'],
+            'candidate_name': row['candidate_name'],
+            'passport': row['passport']
+        } for row in matches]
 
         return jsonify({
             "status": "success",
@@ -784,6 +613,43 @@ def get_candidates_for_dropdown():
             "message": "Failed to retrieve candidates for dropdown",
             "status": "error"
         }), 500
+
+@candidate_bp.route('/candidate-directory/search', methods=['GET'])
+def search_candidate_directory():
+    """
+    Top matches from the candidate directory for type-ahead dropdowns
+    Query params: prefix (case-insensitive name or passport prefix),
+    limit (default 20, max 100), with_passport (true to skip candidates without one)
+    """
+    try:
+        prefix = request.args.get('prefix', '').strip()
+        limit = request.args.get('limit', 20, type=int)
+        if limit < 1:
+            return jsonify({
+                "error": "limit must be positive",
+                "message": "Invalid limit parameter",
+                "status": "validation_error"
+            }), 400
+        with_passport = request.args.get('with_passport', 'false').lower() == 'true'
+
+        matches = search_directory(prefix, limit=min(limit, 100), with_passport=with_passport)
+
+        return jsonify({
+            "status": "success",
+            "data": matches,
+            "total": len(matches),
+            "prefix": prefix,
+            "message": f"Found {len(matches)} candidates matching '{prefix}'"
+        }), 200
+
+    except Exception as e:
+        print(f"[ERROR] Failed to search candidate directory: {e}")
+        return jsonify({
+            "error": str(e),
+            "message": "Failed to search candidate directory",
+            "status": "error"
+        }), 500
+
 @candidate_bp.route('/download-image/<int:image_id>', methods=['GET'])
 def download_image_by_id(image_id):
     """
@@ -876,16 +742,46 @@ def get_candidate_images(candidate_id):
             "status": "error"
         }), 500
 
+# Fields of /candidate-uploads; data_url (the inline image) is only read from disk when requested
+CANDIDATE_UPLOAD_FIELDS = ('id', 'file_name', 'file_type', 'image_type', 'file_url', 'data_url',
+                           'mime_type', 'file_size', 'upload_time')
+
+def _upload_rows(rows, with_data_url):
+    """Add file_url (and data_url when wanted) to candidate_uploads rows"""
+    import base64
+
+    for row in rows:
+        file_path = row.pop('file_path', None)
+        row['file_url'] = f"/candidate/download-image/{row['id']}"
+        if with_data_url and file_path:
+            try:
+                full_file_path = os.path.join(Config.BASE_STORAGE_PATH, file_path)
+                if os.path.exists(full_file_path):
+                    with open(full_file_path, 'rb') as f:
+                        base64_data = base64.b64encode(f.read()).decode('utf-8')
+                    # For drag and drop functionality
+                    row['data_url'] = f"data:{row['mime_type'] or 'application/octet-stream'};base64,{base64_data}"
+            except Exception as img_error:
+                print(f"[WARNING] Failed to encode image {row['id']}: {img_error}")
+        yield row
+
 @candidate_bp.route('/candidate-uploads', methods=['GET'])
 def get_candidate_uploads():
     """
     Get candidate uploads with filtering and search for certificate editor
-    Query params: candidate_id, candidate_name, search, limit, offset
+    Query params: candidate_id, candidate_name, search, limit, offset,
+    fields (comma separated projection), format=ndjson
     """
     try:
-        from database.db_connection import execute_query
-        import base64
+        fields = requested_fields(CANDIDATE_UPLOAD_FIELDS)
+    except FieldSelectionError as e:
+        return jsonify({
+            "error": str(e),
+            "message": "Invalid fields parameter",
+            "status": "validation_error"
+        }), 400
 
+    try:
         candidate_id = request.args.get('candidate_id', type=int)
         candidate_name = request.args.get('candidate_name', type=str)
         search = request.args.get('search', type=str)
@@ -912,14 +808,19 @@ def get_candidate_uploads():
 
         where_clause = " AND ".join(conditions)
 
-        # Get total count
-        count_query = f"SELECT COUNT(*) as total FROM candidate_uploads WHERE {where_clause}"
-        count_result = execute_query(count_query, params)
-        total = count_result[0]['total'] if count_result else 0
+        # Get total count; only free-text search needs a scan
+        if search:
+            count_query = f"SELECT COUNT(*) as total FROM candidate_uploads WHERE {where_clause}"
+            count_result = execute_query(count_query, params)
+            total = count_result[0]['total'] if count_result else 0
+        elif candidate_name:
+            total = count_rows('candidate_uploads', 'candidate_name', candidate_name)
+        else:
+            total = count_rows('candidate_uploads')
 
-        # Get images with pagination
+        # Get images with pagination; file_path is read in the same statement
         query = f"""
-            SELECT id, candidate_name, file_name, file_type, image_type, mime_type, file_size, upload_time
+            SELECT id, file_name, file_type, image_type, mime_type, file_size, upload_time, file_path
             FROM candidate_uploads
             WHERE {where_clause}
             ORDER BY upload_time DESC
@@ -927,82 +828,15 @@ def get_candidate_uploads():
         """
         params.extend([limit, offset])
 
-        results = execute_query(query, params)
+        results = execute_query(query, params) or []
 
-        # Format results with base64 encoded thumbnails for drag functionality
-        images = []
-        for row in results:
-            try:
-                # Get file path for loading image data
-                image_data = execute_query("SELECT file_path FROM candidate_uploads WHERE id = %s", (row['id'],))
-                if image_data and image_data[0]['file_path']:
-                    file_path = image_data[0]['file_path']
-                    from config import Config
-                    full_file_path = os.path.join(Config.BASE_STORAGE_PATH, file_path)
-                    if os.path.exists(full_file_path):
-                        with open(full_file_path, 'rb') as f:
-                            file_data = f.read()
-                        # Encode to base64
-                        base64_data = base64.b64encode(file_data).decode('utf-8')
-                        data_url = f"data:{row['mime_type'] or 'application/octet-stream'};base64,{base64_data}"
-
-                        images.append({
-                            'id': row['id'],
-                            'file_name': row['file_name'],
-                            'file_type': row['file_type'],
-                            'image_type': row['image_type'],
-                            'file_url': f"/candidate/download-image/{row['id']}",
-                            'data_url': data_url,  # For drag and drop functionality
-                            'mime_type': row['mime_type'],
-                            'file_size': row['file_size'],
-                            'upload_time': row['upload_time'].isoformat() if row['upload_time'] else None
-                        })
-                    else:
-                        # File not found, fallback without base64 data
-                        images.append({
-                            'id': row['id'],
-                            'file_name': row['file_name'],
-                            'file_type': row['file_type'],
-                            'image_type': row['image_type'],
-                            'file_url': f"/candidate/download-image/{row['id']}",
-                            'mime_type': row['mime_type'],
-                            'file_size': row['file_size'],
-                            'upload_time': row['upload_time'].isoformat() if row['upload_time'] else None
-                        })
-                else:
-                    # No file path, fallback without base64 data
-                    images.append({
-                        'id': row['id'],
-                        'file_name': row['file_name'],
-                        'file_type': row['file_type'],
-                        'image_type': row['image_type'],
-                        'file_url': f"/candidate/download-image/{row['id']}",
-                        'mime_type': row['mime_type'],
-                        'file_size': row['file_size'],
-                        'upload_time': row['upload_time'].isoformat() if row['upload_time'] else None
-                    })
-            except Exception as img_error:
-                print(f"[WARNING] Failed to encode image {row['id']}: {img_error}")
-                # Fallback without base64 data
-                images.append({
-                    'id': row['id'],
-                    'file_name': row['file_name'],
-                    'file_type': row['file_type'],
-                    'image_type': row['image_type'],
-                    'file_url': f"/candidate/download-image/{row['id']}",
-                    'mime_type': row['mime_type'],
-                    'file_size': row['file_size'],
-                    'upload_time': row['upload_time'].isoformat() if row['upload_time'] else None
-                })
-
-        return jsonify({
-            "status": "success",
-            "data": images,
-            "total": total,
-            "limit": limit,
-            "offset": offset,
-            "message": f"Retrieved {len(images)} images"
-        }), 200
+        return list_response(
+            _upload_rows(results, with_data_url=fields is None or 'data_url' in fields),
+            envelope={"status": "success", "data": ROWS, "total": total, "limit": limit, "offset": offset},
+            trailer=lambda count: {"message": f"Retrieved {count} images"},
+            fields=fields,
+            label='candidate uploads'
+        )
 
     except Exception as e:
         print(f"[ERROR] Failed to get candidate uploads: {e}")
@@ -1010,7 +844,8 @@ def get_candidate_uploads():
             "error": str(e),
             "message": "Failed to retrieve candidate uploads",
             "status": "error"
-        }), 500 
+        }), 500
+
 @candidate_bp.route('/delete-candidate/<int:candidate_id>', methods=['DELETE'])
 def delete_candidate(candidate_id):
     """Delete a candidate by ID"""
@@ -1033,6 +868,7 @@ def delete_candidate(candidate_id):
         # Delete the candidate
         delete_query = "DELETE FROM candidates WHERE id = %s"
         execute_query(delete_query, (candidate_id,), fetch=False)
+        invalidate_certificates(candidate_id=candidate_id)
 
         print(f"[DELETE] Successfully deleted candidate ID {candidate_id}")
 
@@ -1,14 +1,23 @@
 from flask import Blueprint, request, jsonify
-from datetime import datetime
+from datetime import date, datetime, timedelta
 import json
 import os
 import sys
-import base64
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from config import Config
 from database import execute_query
+from database.certificate_expiry import EXPIRY_FIELDS, SOURCES as EXPIRY_SOURCES, fetch_expiring
+from database.counters import count as count_rows
+from database.db_connection import DatabaseConnection
+from database.receipt_queue import QUEUE_FIELDS, fetch_receipt_queue
 from hooks.post_data_insert import update_master_table_after_certificate_insert
+from utils.certificate_files import (COLUMNS as CERTIFICATE_FILE_COLUMNS, EXTENSIONS as CERTIFICATE_EXTENSIONS,
+                                     decode_image_data, get_certificate_files, mime_type_for_path,
+                                     sniff_mime_type)
+from utils.dates import parse_date
 from utils.file_ops import sanitize_folder_name
+from utils.serialization import ROWS, FieldSelectionError, list_response, requested_fields
+from utils.verification import invalidate_certificates
 
 certificate_bp = Blueprint('certificate', __name__)
 
@@ -68,6 +77,17 @@ def save_certificate_data():
         if not all([first_name, last_name, passport, certificate_name]):
             return jsonify({"error": "Missing required fields: firstName, lastName, passport, certificateName"}), 400
 
+        # The editor sends DD-MM-YYYY; store DATE values, never the raw strings
+        for field, value in (('startDate', start_date), ('endDate', end_date)):
+            if value and parse_date(value) is None:
+                return jsonify({
+                    "error": f"Invalid {field}: {value}. Use DD-MM-YYYY or YYYY-MM-DD",
+                    "message": "Invalid date",
+                    "status": "validation_error"
+                }), 400
+        start_date, end_date = parse_date(start_date), parse_date(end_date)
+        issue_date = end_date
+
         # Get candidate data from candidates table
         # Database stores names with spaces preserved, only passport sanitized
         candidate_name = f"{first_name} {last_name}_{passport}"
@@ -97,160 +117,231 @@ def save_certificate_data():
                 "message": "Certificate already exists for this candidate"
             }), 200
 
-        # Convert base64 images to bytes
-        verification_image_bytes = None
-        certificate_image_bytes = None
-
-        if verification_image_data:
-            try:
-                # Remove data URL prefix if present
-                if verification_image_data.startswith('data:image/'):
-                    verification_image_data = verification_image_data.split(',')[1]
-                verification_image_bytes = base64.b64decode(verification_image_data)
-            except Exception as e:
-                # Silently handle image decoding errors
-                verification_image_bytes = None
-
-        if certificate_image_data:
-            try:
-                # Remove data URL prefix if present
-                if certificate_image_data.startswith('data:image/'):
-                    certificate_image_data = certificate_image_data.split(',')[1]
-                certificate_image_bytes = base64.b64decode(certificate_image_data)
-            except Exception as e:
-                # Silently handle image decoding errors
-                certificate_image_bytes = None
-
-        # Insert into certificate_selections table
+        # Decode the browser-rendered images; undecodable or unsupported images are skipped
+        images = {}
+        for kind, image_data in (('verification', verification_image_data), ('certificate', certificate_image_data)):
+            if image_data:
+                try:
+                    images[kind] = decode_image_data(image_data)
+                except ValueError:
+                    pass
+
+        # Insert the row and attach its files in one transaction
         insert_query = """
             INSERT INTO certificate_selections
-            (candidate_id, candidate_name, client_name, certificate_name, certificate_number, start_date, end_date, issue_date, verification_image, certificate_image)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            (candidate_id, candidate_name, client_name, certificate_name, certificate_number, start_date, end_date, issue_date)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
             RETURNING id
         """
 
-        insert_result = execute_query(insert_query, (
-            candidate_id,
-            candidate_name_db,
-            client_name,
-            certificate_name,
-            certificate_number,
-            start_date,
-            end_date,
-            issue_date,
-            verification_image_bytes,
-            certificate_image_bytes
-        ), fetch=True)
-
-        if insert_result:
-            certificate_selection_id = insert_result[0]['id']
-
-            # Get total count for response
-            count_query = "SELECT COUNT(*) as total FROM certificate_selections"
-            count_result = execute_query(count_query, fetch=True)
-            total_certificates = count_result[0]['total'] if count_result else 0
+        store = get_certificate_files()
+        saved_paths = []
+        conn = DatabaseConnection.get_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(insert_query, (
+                    candidate_id,
+                    candidate_name_db,
+                    client_name,
+                    certificate_name,
+                    certificate_number,
+                    start_date,
+                    end_date,
+                    issue_date
+                ))
+                certificate_selection_id = cursor.fetchone()[0]
+
+                for kind, (image_bytes, mime_type) in images.items():
+                    path_column, mime_column, _ = CERTIFICATE_FILE_COLUMNS[kind]
+                    rel_path, mime_type, _ = store.save(certificate_selection_id, kind, image_bytes, mime_type)
+                    saved_paths.append(rel_path)
+                    cursor.execute(
+                        f"UPDATE certificate_selections SET {path_column} = %s, {mime_column} = %s WHERE id = %s",
+                        (rel_path, mime_type, certificate_selection_id))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            for rel_path in saved_paths:
+                store.remove(rel_path)
+            raise
+        finally:
+            DatabaseConnection.return_connection(conn)
 
-            return jsonify({
-                "status": "success",
-                "message": "Certificate data saved successfully",
-                "data": {
-                    "id": certificate_selection_id,
-                    "candidate_id": candidate_id,
-                    "candidate_name": candidate_name_db,
-                    "client_name": client_name,
-                    "certificate_name": certificate_name,
-                    "has_images": bool(verification_image_bytes or certificate_image_bytes)
-                },
-                "total_certificates": total_certificates
-            }), 200
-        else:
-            return jsonify({"error": "Failed to insert certificate data"}), 500
+        invalidate_certificates([certificate_selection_id])
+
+        # Maintained by trigger in the insert's transaction - no scan
+        total_certificates = count_rows('certificate_selections')
+
+        return jsonify({
+            "status": "success",
+            "message": "Certificate data saved successfully",
+            "data": {
+                "id": certificate_selection_id,
+                "candidate_id": candidate_id,
+                "candidate_name": candidate_name_db,
+                "client_name": client_name,
+                "certificate_name": certificate_name,
+                "has_images": bool(images)
+            },
+            "total_certificates": total_certificates
+        }), 200
 
     except Exception as e:
         # Silently handle errors to prevent terminal output
         return jsonify({"error": str(e)}), 500
 
 
+def _receipt_queue_response(limit, offset, label):
+    """Stream one page of the receipt work queue (pending selections per candidate and client)"""
+    fields = requested_fields(QUEUE_FIELDS)
+    client_name = request.args.get('client_name', '').strip() or None
+
+    queue = fetch_receipt_queue(client_name=client_name, limit=limit, offset=offset)
+    total_candidates = queue['total_candidates']
+
+    envelope = {"status": "success", "data": ROWS}
+    if limit is not None:
+        envelope["pagination"] = {
+            "limit": limit,
+            "offset": offset,
+            "has_more": (offset + limit) < total_candidates
+        }
+    return list_response(
+        queue['rows'],
+        envelope=envelope,
+        trailer=lambda count: {
+            "total": total_candidates,
+            "total_certificates": queue['total_certificates']
+        },
+        fields=fields or QUEUE_FIELDS,
+        raw=('certificates',),
+        label=label
+    )
+
+
 @certificate_bp.route('/get-certificate-selections-for-receipt', methods=['GET'])
 def get_certificate_selections_for_receipt():
-    """Get all certificate selections for receipt processing, aggregated by candidate"""
+    """
+    Get all certificate selections for receipt processing, aggregated by candidate and client
+    Query params: client_name, fields (comma separated projection), format=ndjson
+    """
     try:
-        # First, get all certificate selections that are not marked as 'done'
-        query = """
-            SELECT
-                cs.id,
-                cs.candidate_id,
-                cs.candidate_name,
-                cs.client_name,
-                cs.certificate_name,
-                cs.creation_date,
-                cs.status,
-                CASE WHEN cs.verification_image IS NOT NULL THEN true ELSE false END as has_verification_image,
-                CASE WHEN cs.certificate_image IS NOT NULL THEN true ELSE false END as has_certificate_image
-            FROM certificate_selections cs
-            WHERE cs.status IS NULL OR cs.status != 'done'
-            ORDER BY cs.client_name, cs.candidate_name, cs.creation_date DESC
-        """
+        return _receipt_queue_response(None, 0, 'receipt certificates')
 
-        result = execute_query(query, fetch=True)
+    except FieldSelectionError as e:
+        return jsonify({
+            "error": str(e),
+            "message": "Invalid fields parameter",
+            "status": "validation_error"
+        }), 400
+    except Exception as e:
+        # Silently handle errors to prevent terminal output
+        return jsonify({"error": str(e)}), 500
 
-        if not result:
+
+@certificate_bp.route('/receipt-queue', methods=['GET'])
+def get_receipt_queue():
+    """
+    Paginated receipt work queue: pending certificate selections per candidate and client
+    Query params: client_name, limit (default 50, max 200), offset,
+    fields (comma separated projection), format=ndjson
+    """
+    try:
+        limit = request.args.get('limit', 50, type=int)
+        offset = request.args.get('offset', 0, type=int)
+        if limit < 1 or offset < 0:
             return jsonify({
-                "status": "success",
-                "data": [],
-                "total": 0
-            }), 200
+                "error": "limit must be positive and offset must not be negative",
+                "message": "Invalid pagination parameters",
+                "status": "validation_error"
+            }), 400
 
-        # Aggregate certificates by candidate_id
-        aggregated_data = {}
-        for row in result:
-            candidate_id = row['candidate_id']
-            if candidate_id not in aggregated_data:
-                aggregated_data[candidate_id] = {
-                    'candidate_id': candidate_id,
-                    'candidate_name': row['candidate_name'],
-                    'client_name': row['client_name'],
-                    'certificates': [],
-                    'creation_date': row['creation_date'],
-                    'has_verification_image': row['has_verification_image'],
-                    'has_certificate_image': row['has_certificate_image'],
-                    'certificate_count': 0
-                }
+        return _receipt_queue_response(min(limit, 200), offset, 'receipt queue')
 
-            # Add certificate to the list
-            aggregated_data[candidate_id]['certificates'].append({
-                'id': row['id'],
-                'certificate_name': row['certificate_name'],
-                'creation_date': row['creation_date'],
-                'status': row['status'],
-                'has_verification_image': row['has_verification_image'],
-                'has_certificate_image': row['has_certificate_image']
-            })
+    except FieldSelectionError as e:
+        return jsonify({
+            "error": str(e),
+            "message": "Invalid fields parameter",
+            "status": "validation_error"
+        }), 400
+    except Exception as e:
+        # Silently handle errors to prevent terminal output
+        return jsonify({"error": str(e)}), 500
 
-            # Update counts
-            aggregated_data[candidate_id]['certificate_count'] += 1
 
-        # Convert to list and sort by client_name, candidate_name
-        aggregated_list = list(aggregated_data.values())
-        aggregated_list.sort(key=lambda x: (x['client_name'], x['candidate_name']))
+@certificate_bp.route('/expiring-certificates', methods=['GET'])
+def get_expiring_certificates():
+    """
+    Issued and legacy certificates expiring between two dates, soonest first
+    Query params: from, to (default today .. today + 30 days), source (issued, legacy or all),
+    limit (default 100, max 500), offset, fields (comma separated projection), format=ndjson
+    """
+    try:
+        date_from = parse_date(request.args.get('from')) if request.args.get('from') else date.today()
+        date_to = parse_date(request.args.get('to')) if request.args.get('to') else None
+        if date_from is None or (request.args.get('to') and date_to is None):
+            return jsonify({
+                "error": "from and to must be dates (YYYY-MM-DD or DD-MM-YYYY)",
+                "message": "Invalid date range",
+                "status": "validation_error"
+            }), 400
+        date_to = date_to or date_from + timedelta(days=30)
+        if date_to < date_from:
+            return jsonify({
+                "error": "to must not be before from",
+                "message": "Invalid date range",
+                "status": "validation_error"
+            }), 400
 
-        # Debug: Log the structure of the first few results (commented out to prevent terminal output)
-        # print(f"[CERTIFICATE] Raw query results (first 3): {result[:3] if result else 'None'}")
+        source = request.args.get('source', 'all').strip().lower()
+        if source not in ('all',) + EXPIRY_SOURCES:
+            return jsonify({
+                "error": f"source must be one of: all, {', '.join(EXPIRY_SOURCES)}",
+                "message": "Invalid source",
+                "status": "validation_error"
+            }), 400
+        sources = EXPIRY_SOURCES if source == 'all' else (source,)
+
+        limit = request.args.get('limit', 100, type=int)
+        offset = request.args.get('offset', 0, type=int)
+        if limit < 1 or offset < 0:
+            return jsonify({
+                "error": "limit must be positive and offset must not be negative",
+                "message": "Invalid pagination parameters",
+                "status": "validation_error"
+            }), 400
+        limit = min(limit, 500)
+
+        fields = requested_fields(EXPIRY_FIELDS)
+        report = fetch_expiring(date_from, date_to, sources=sources, limit=limit, offset=offset)
+        return list_response(
+            report['rows'],
+            envelope={
+                "status": "success",
+                "data": ROWS,
+                "range": {"from": date_from.isoformat(), "to": date_to.isoformat()},
+                "pagination": {
+                    "limit": limit,
+                    "offset": offset,
+                    "has_more": (offset + limit) < report['total']
+                }
+            },
+            trailer=lambda count: {"total": report['total'], "totals": report['totals']},
+            fields=fields or EXPIRY_FIELDS,
+            label='expiring certificates'
+        )
 
+    except FieldSelectionError as e:
         return jsonify({
-            "status": "success",
-            "data": aggregated_list,
-            "total": len(aggregated_list),
-            "total_certificates": len(result)
-        }), 200
-
+            "error": str(e),
+            "message": "Invalid fields parameter",
+            "status": "validation_error"
+        }), 400
     except Exception as e:
         # Silently handle errors to prevent terminal output
         return jsonify({"error": str(e)}), 500
 
 
-
-
 @certificate_bp.route('/last-sequence', methods=['GET'])
 def get_last_sequence():
     """Get the last sequential number for certificate numbering"""
@@ -283,10 +374,11 @@ def delete_certificate_selection():
 
         certificate_id = data['id']
 
-        delete_query = "DELETE FROM certificate_selections WHERE id = %s RETURNING id"
+        delete_query = "DELETE FROM certificate_selections WHERE id = %s RETURNING id, certificate_number"
         result = execute_query(delete_query, (certificate_id,), fetch=True)
 
         if result:
+            invalidate_certificates(removed_numbers=[result[0]['certificate_number']])
             return jsonify({
                 "status": "success",
                 "message": "Certificate selection deleted successfully"
@@ -330,6 +422,7 @@ def update_certificate_selection():
         result = execute_query(update_query, tuple(values), fetch=True)
 
         if result:
+            invalidate_certificates([certificate_id])
             return jsonify({
                 "status": "success",
                 "message": "Certificate selection updated successfully"
@@ -388,6 +481,8 @@ def update_certificate_company_data():
             # print(f"[CERTIFICATE] Query execution error: {query_error}")  # Commented out to prevent terminal output
             raise
 
+        invalidate_certificates(certificate_ids)
+
         return jsonify({
             "status": "success",
             "message": f"Updated {len(certificate_ids)} certificates with company: {company_name}",
@@ -399,28 +494,76 @@ def update_certificate_company_data():
         return jsonify({"error": str(e)}), 500
 
 
-@certificate_bp.route('/verification-image/<int:certificate_id>', methods=['GET'])
-def get_verification_image(certificate_id):
-    """Serve verification image from certificate_selections table"""
-    try:
-        from database.db_connection import execute_query
-
-        result = execute_query("""
-            SELECT verification_image, certificate_name
-            FROM certificate_selections
-            WHERE id = %s AND verification_image IS NOT NULL
-        """, (certificate_id,))
+def _send_certificate_file(certificate_id, kind):
+    """
+    Stream a certificate selection's verification or certificate file.
+
+    Only the typed reference is read from the row; the legacy column is
+    fetched solely for rows that migrate_certificate_images_to_files.py has
+    not reached yet.
+
+    Args:
+        certificate_id (int): certificate_selections.id
+        kind (str): 'verification' or 'certificate'
+
+    Returns:
+        Response: The file, or a 404 JSON body
+    """
+    from flask import Response, send_file
+
+    path_column, mime_column, legacy_column = CERTIFICATE_FILE_COLUMNS[kind]
+    result = execute_query(f"""
+        SELECT {path_column} AS file_path, {mime_column} AS mime_type, certificate_name,
+               ({path_column} IS NULL AND {legacy_column} IS NOT NULL) AS legacy
+        FROM certificate_selections
+        WHERE id = %s
+    """, (certificate_id,))
+
+    not_found = jsonify({"error": f"{kind.capitalize()} image not found"}), 404
+    if not result or not (result[0]['file_path'] or result[0]['legacy']):
+        return not_found
+
+    row = result[0]
+    file_path, mime_type = row['file_path'], row['mime_type']
+    if row['legacy']:
+        legacy = execute_query(f"SELECT {legacy_column} AS value FROM certificate_selections WHERE id = %s",
+                               (certificate_id,))
+        value = legacy[0]['value'] if legacy else None
+        if value is None:
+            return not_found
+        if not isinstance(value, str):
+            data = bytes(value)
+            mime_type = sniff_mime_type(data)
+            response = Response(data, mimetype=mime_type)
+            response.headers['X-Content-Type-Options'] = 'nosniff'
+            response.headers['Content-Disposition'] = (
+                f'inline; filename="{kind}_{row["certificate_name"] or certificate_id}'
+                f'{CERTIFICATE_EXTENSIONS.get(mime_type, ".jpg")}"')
+            return response
+        file_path, mime_type = value, mime_type_for_path(value)
 
-        if not result:
-            return jsonify({"error": "Verification image not found"}), 404
+    try:
+        full_path = get_certificate_files().resolve(file_path)
+    except ValueError:
+        return not_found
+    if not os.path.isfile(full_path):
+        return jsonify({"error": f"{kind.capitalize()} file not found on disk"}), 404
+
+    certificate_name = row['certificate_name'] or f'certificate_{certificate_id}'
+    # Only allowlisted types are served inline; anything else goes out as octet-stream
+    if mime_type not in CERTIFICATE_EXTENSIONS:
+        mime_type = mime_type_for_path(full_path)
+    response = send_file(full_path, mimetype=mime_type, conditional=True,
+                         download_name=f"{kind}_{certificate_name}{os.path.splitext(full_path)[1]}")
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    return response
 
-        image_data = result[0]['verification_image']
-        certificate_name = result[0]['certificate_name'] or f'certificate_{certificate_id}'
 
-        from flask import Response
-        response = Response(image_data, mimetype='image/jpeg')
-        response.headers['Content-Disposition'] = f'inline; filename="verification_{certificate_name}.jpg"'
-        return response
+@certificate_bp.route('/verification-image/<int:certificate_id>', methods=['GET'])
+def get_verification_image(certificate_id):
+    """Serve the verification image of a certificate selection from file storage"""
+    try:
+        return _send_certificate_file(certificate_id, 'verification')
 
     except Exception as e:
         # Silently handle errors to prevent terminal output
@@ -428,26 +571,9 @@ def get_verification_image(certificate_id):
 
 @certificate_bp.route('/certificate-image/<int:certificate_id>', methods=['GET'])
 def get_certificate_image(certificate_id):
-    """Serve certificate image from certificate_selections table"""
+    """Serve the certificate image of a certificate selection from file storage"""
     try:
-        from database.db_connection import execute_query
-
-        result = execute_query("""
-            SELECT certificate_image, certificate_name
-            FROM certificate_selections
-            WHERE id = %s AND certificate_image IS NOT NULL
-        """, (certificate_id,))
-
-        if not result:
-            return jsonify({"error": "Certificate image not found"}), 404
-
-        image_data = result[0]['certificate_image']
-        certificate_name = result[0]['certificate_name'] or f'certificate_{certificate_id}'
-
-        from flask import Response
-        response = Response(image_data, mimetype='image/jpeg')
-        response.headers['Content-Disposition'] = f'inline; filename="certificate_{certificate_name}.jpg"'
-        return response
+        return _send_certificate_file(certificate_id, 'certificate')
 
     except Exception as e:
         # Silently handle errors to prevent terminal output
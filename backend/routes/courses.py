@@ -1,9 +1,11 @@
 from flask import Blueprint, jsonify, request
 from database import execute_query
+from utils.dates import parse_date
+from utils.verification import get_verification_service, invalidate_certificates, verification_payload
 import json
 import logging
 import os
-from datetime import datetime, timedelta
+from datetime import timedelta
 from dateutil.relativedelta import relativedelta
 
 logger = logging.getLogger(__name__)
@@ -162,22 +164,14 @@ def generate_certificate():
         serial_str = str(serial_number_int).zfill(4)  # 4-digit zero-padded
 
         # Calculate issue_date and expiry_date
-        end_date_str = data['end_date']
-        logger.info(f"Processing end_date: {end_date_str} (type: {type(end_date_str)})")
-
-        # Handle both YYYY-MM-DD and DD-MM-YYYY formats for end_date
-        try:
-            if len(end_date_str) == 10 and end_date_str[4] == '-':
-                # YYYY-MM-DD format
-                end_date = datetime.strptime(end_date_str, '%Y-%m-%d')
-                logger.info(f"Parsed end_date as YYYY-MM-DD: {end_date}")
-            else:
-                # DD-MM-YYYY format
-                end_date = datetime.strptime(end_date_str, '%d-%m-%Y')
-                logger.info(f"Parsed end_date as DD-MM-YYYY: {end_date}")
-        except ValueError as e:
-            logger.error(f"Invalid date format for end_date: {end_date_str}. Expected YYYY-MM-DD or DD-MM-YYYY")
-            return jsonify({'error': f'Invalid end_date format: {end_date_str}. Use YYYY-MM-DD format.'}), 400
+        # Dates arrive as YYYY-MM-DD or DD-MM-YYYY and are stored as DATE
+        start_date = parse_date(data['start_date'])
+        end_date = parse_date(data['end_date'])
+        logger.info(f"Processing start_date: {data['start_date']}, end_date: {data['end_date']} -> {start_date}, {end_date}")
+        for field, parsed in (('start_date', start_date), ('end_date', end_date)):
+            if parsed is None:
+                logger.error(f"Invalid date format for {field}: {data[field]}. Expected YYYY-MM-DD or DD-MM-YYYY")
+                return jsonify({'error': f'Invalid {field} format: {data[field]}. Use YYYY-MM-DD format.'}), 400
 
         # Generate issue_date in DDMMYY format for certificate number
         issue_date_ddmmyy = end_date.strftime('%d%m%y')  # DDMMYY format for certificate number
@@ -268,16 +262,6 @@ def generate_certificate():
                     # Get candidate name
                     candidate_name = candidate_row['candidate_name']
 
-                    # Convert expiry date from dd-mm-yyyy to YYYY-MM-DD
-                    if expiry_date_str and '-' in expiry_date_str:
-                        day, month, year = expiry_date_str.split('-')
-                        expiry_date_db = f"{year}-{month}-{day}"
-                    else:
-                        expiry_date_db = None
-
-                    # Convert issue_date from DDMMYY to YYYY-MM-DD for DB
-                    issue_date_db = f"20{issue_date_ddmmyy[4:6]}-{issue_date_ddmmyy[2:4]}-{issue_date_ddmmyy[0:2]}"
-
                     # File paths for storage (relative paths)
                     verification_file_path = f"uploads/certificates/{documents['verification_file']}"
                     certificate_file_path = f"uploads/certificates/{documents['certificate_file']}"
@@ -289,8 +273,9 @@ def generate_certificate():
                     insert_query = """
                         INSERT INTO certificate_selections
                         (candidate_id, candidate_name, client_name, certificate_name, certificate_number,
-                         start_date, end_date, issue_date, expiry_date, verification_image, certificate_image, serial_number)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                         start_date, end_date, issue_date, expiry_date, verification_file_path, verification_mime_type,
+                         certificate_file_path, certificate_mime_type, serial_number)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 'application/pdf', %s, 'application/pdf', %s)
                         RETURNING id
                     """
 
@@ -300,10 +285,10 @@ def generate_certificate():
                         client_name,
                         data['course_name'],
                         certificate_number,
-                        data['start_date'],
-                        data['end_date'],
-                        issue_date_db,
-                        expiry_date_db,
+                        start_date,
+                        end_date,
+                        end_date,
+                        expiry_date,
                         verification_file_path,
                         certificate_file_path,
                         serial_str
@@ -312,6 +297,7 @@ def generate_certificate():
                     if insert_result:
                         certificate_selection_id = insert_result[0]['id']
                         logger.info(f"Certificate selection saved with ID: {certificate_selection_id}")
+                        invalidate_certificates([certificate_selection_id])
                     else:
                         logger.error("Failed to save certificate data to database")
 
@@ -409,86 +395,19 @@ def verify_certificate():
 
         logger.info(f"Verifying certificate: {certificate_number}")
 
-        # Query certificate_selections table for the certificate
-        query = """
-            SELECT
-                cs.id,
-                cs.candidate_id,
-                cs.candidate_name,
-                cs.client_name,
-                cs.certificate_name,
-                cs.certificate_number,
-                cs.start_date,
-                cs.end_date,
-                cs.issue_date,
-                cs.expiry_date,
-                cs.serial_number,
-                cs.creation_date,
-                c.json_data
-            FROM certificate_selections cs
-            LEFT JOIN candidates c ON cs.candidate_id = c.id
-            WHERE cs.certificate_number = %s
-            LIMIT 1
-        """
-
-        result = execute_query(query, (certificate_number,), fetch=True)
+        # Precomputed record via the in-process LRU (unknown numbers are cached too)
+        record = get_verification_service().lookup(certificate_number)
 
-        if not result:
+        if record is None:
             return jsonify({
                 'error': 'Certificate not found',
                 'certificate_number': certificate_number,
                 'message': 'This certificate number does not exist in our records.'
             }), 404
 
-        certificate_data = result[0]
-
-        # Parse candidate JSON data
-        candidate_json = certificate_data.get('json_data', {}) or {}
-
-        # Check if certificate is expired
-        from datetime import datetime
-        current_date = datetime.now().date()
-
-        expiry_date = certificate_data.get('expiry_date')
-        is_expired = False
-        if expiry_date:
-            try:
-                # Handle different date formats
-                if isinstance(expiry_date, str):
-                    if len(expiry_date) == 10 and expiry_date[2] == '-' and expiry_date[5] == '-':
-                        # DD-MM-YYYY format
-                        expiry_date_obj = datetime.strptime(expiry_date, '%d-%m-%Y').date()
-                    else:
-                        # Assume YYYY-MM-DD format
-                        expiry_date_obj = datetime.strptime(expiry_date, '%Y-%m-%d').date()
-                else:
-                    expiry_date_obj = expiry_date.date() if hasattr(expiry_date, 'date') else expiry_date
-
-                is_expired = current_date > expiry_date_obj
-            except Exception as e:
-                logger.warning(f"Error parsing expiry date {expiry_date}: {e}")
-                is_expired = False
-
-        # Build verification response
-        verification_data = {
-            'certificate_number': certificate_data['certificate_number'],
-            'candidate_name': certificate_data['candidate_name'],
-            'client_name': certificate_data.get('client_name'),
-            'certificate_name': certificate_data['certificate_name'],
-            'passport': candidate_json.get('passport', ''),
-            'nationality': candidate_json.get('nationality', ''),
-            'start_date': certificate_data.get('start_date'),
-            'end_date': certificate_data.get('end_date'),
-            'issue_date': certificate_data.get('issue_date'),
-            'expiry_date': certificate_data.get('expiry_date'),
-            'serial_number': certificate_data.get('serial_number'),
-            'is_valid': not is_expired,
-            'is_expired': is_expired,
-            'verification_date': current_date.strftime('%Y-%m-%d'),
-            'status': 'EXPIRED' if is_expired else 'VALID'
-        }
+        verification_data = verification_payload(record)
 
-        logger.info(f"Certificate {certificate_number} verification: {'EXPIRED' if is_expired else 'VALID'}")
+        logger.info(f"Certificate {certificate_number} verification: {verification_data['status']}")
 
         return jsonify({
             'success': True,
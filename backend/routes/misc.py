@@ -1,12 +1,18 @@
-from flask import Blueprint, request, jsonify, send_from_directory
+from flask import Blueprint, Response, request, jsonify, send_from_directory, stream_with_context
 from datetime import datetime, timedelta
+import json
 import os
+import queue
 import shutil
 import sys
+import time
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from config import Config
-from utils.drive import upload_to_drive
-from utils.qr import generate_qr_code
+from utils.dates import parse_date
+from utils.temp_sessions import get_session_manager
+from database.slow_query import get_slow_query_log
+from database.change_feed import TOPICS, SubscriberLimitReached, format_event, get_change_feed
+from utils.serialization import ROWS, FieldSelectionError, list_response, requested_fields
 
 misc_bp = Blueprint('misc', __name__)
 
@@ -24,47 +30,113 @@ def cleanup_expired_sessions():
     """Clean up temporary session folders older than specified hours"""
     try:
         hours_old = request.json.get('hours_old', 24) if request.json else 24  # Default 24 hours
-        cutoff_time = datetime.now() - timedelta(hours=hours_old)
-
-        cleaned_folders = []
-        errors = []
-
-        if os.path.exists(Config.TEMP_FOLDER):
-            for session_folder in os.listdir(Config.TEMP_FOLDER):
-                session_path = f"{Config.TEMP_FOLDER}/{session_folder}"
-
-                if os.path.isdir(session_path):
-                    folder_mtime = datetime.fromtimestamp(os.path.getmtime(session_path))
-
-                    if folder_mtime < cutoff_time:
-                        # Check if folder contains PDF files - protect them from automatic deletion
-                        contains_pdf = False
-                        try:
-                            for filename in os.listdir(session_path):
-                                if filename.lower().endswith('.pdf'):
-                                    contains_pdf = True
-                                    break
-                        except Exception as e:
-                            print(f"[CLEANUP] Error checking folder contents {session_folder}: {e}")
-                            errors.append(f"Error checking {session_folder}: {str(e)}")
-                            continue
-
-                        if contains_pdf:
-                            print(f"[CLEANUP] Skipped session {session_folder} - contains PDF files")
-                            continue
-
-                        try:
-                            shutil.rmtree(session_path)
-                            cleaned_folders.append(session_folder)
-                            print(f"[CLEANUP] Removed expired session: {session_folder}")
-                        except Exception as e:
-                            errors.append(f"Failed to remove {session_folder}: {str(e)}")
+
+        # Sessions are indexed by expiry, so this only touches expired sessions
+        manager = get_session_manager()
+        result = manager.evict_older_than(hours_old)
+        for session_id in result["removed"]:
+            print(f"[CLEANUP] Removed expired session: {session_id}")
+        for session_id in result["skipped"]:
+            print(f"[CLEANUP] Skipped session {session_id} - contains PDF files")
+
+        return jsonify({
+            "status": "success",
+            "message": f"Cleanup completed. Removed {len(result['removed'])} expired sessions",
+            "cleaned_folders": result["removed"],
+            "errors": result["errors"],
+            "stats": manager.stats()
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@misc_bp.route('/slow-queries', methods=['GET'])
+def list_slow_queries():
+    """List the slowest statements recorded by execute_query, aggregated by fingerprint"""
+    try:
+        if not Config.METRICS_ALLOW_REMOTE and request.remote_addr not in ('127.0.0.1', '::1'):
+            return jsonify({"error": "Forbidden"}), 403
+
+        limit = min(int(request.args.get('limit', 20)), 200)
+        order_by = request.args.get('order_by', 'total_ms')
+        include_plans = request.args.get('include_plans', 'false').lower() == 'true'
+
+        slow_log = get_slow_query_log()
+        offenders = slow_log.top_offenders(limit=limit, order_by=order_by)
+        if not include_plans:
+            for offender in offenders:
+                offender['has_plan'] = offender.pop('explain') is not None
 
         return jsonify({
             "status": "success",
-            "message": f"Cleanup completed. Removed {len(cleaned_folders)} expired sessions",
-            "cleaned_folders": cleaned_folders,
-            "errors": errors
+            "threshold_ms": slow_log.threshold_ms,
+            "order_by": order_by,
+            "data": offenders,
+            "count": len(offenders)
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@misc_bp.route('/changes', methods=['GET'])
+def change_feed():
+    """
+    Server-Sent Events stream of changed entities, so screens refetch only what changed
+    Query params: topics (comma separated: ledger, candidates, certificates; default all)
+    Events: one per change with {"op", "key"}; 'resync' means refetch everything
+    """
+    topics = [t.strip() for t in request.args.get('topics', '').split(',') if t.strip()] or list(TOPICS)
+    feed = get_change_feed()
+    try:
+        subscription = feed.subscribe(topics)
+    except ValueError as e:
+        return jsonify({
+            "error": str(e),
+            "message": f"topics must be a subset of: {', '.join(TOPICS)}",
+            "status": "validation_error"
+        }), 400
+    except SubscriberLimitReached as e:
+        response = jsonify({"error": str(e), "message": "Change feed is busy, retry later", "status": "error"})
+        response.headers['Retry-After'] = str(Config.CHANGE_FEED_HEARTBEAT_SECONDS)
+        return response, 503
+
+    def generate():
+        # Ends after CHANGE_FEED_STREAM_SECONDS; EventSource reconnects after `retry` ms
+        deadline = time.monotonic() + Config.CHANGE_FEED_STREAM_SECONDS
+        try:
+            yield f"retry: 3000\nevent: ready\ndata: {json.dumps({'topics': sorted(subscription.topics)})}\n\n"
+            while time.monotonic() < deadline:
+                try:
+                    yield format_event(subscription.get(timeout=Config.CHANGE_FEED_HEARTBEAT_SECONDS))
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+        finally:
+            feed.unsubscribe(subscription)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@misc_bp.route('/file-gc', methods=['POST'])
+def run_file_gc():
+    """Run one incremental orphaned-file collection pass (quarantine, then purge after retention)"""
+    try:
+        if not Config.METRICS_ALLOW_REMOTE and request.remote_addr not in ('127.0.0.1', '::1'):
+            return jsonify({"error": "Forbidden"}), 403
+
+        data = request.get_json(silent=True) or {}
+        stores = data.get('stores') or None
+        dry_run = bool(data.get('dry_run', False))
+
+        from utils.file_gc import get_file_gc
+        try:
+            result = get_file_gc().run(stores, dry_run=dry_run)
+        except ValueError as e:
+            return jsonify({"status": "validation_error", "message": str(e)}), 400
+
+        return jsonify({
+            "status": "success",
+            "message": f"Quarantined {result['quarantined']} files, reclaimed {result['reclaimed_bytes']} bytes",
+            "data": result
         }), 200
 
     except Exception as e:
@@ -93,6 +165,10 @@ def save_pdf():
         pdf_file.save(pdf_path)
         print(f"[PDF SAVE] Successfully saved PDF: {pdf_path} ({os.path.getsize(pdf_path)} bytes)")
 
+        # Google API client and qrcode are only needed here
+        from utils.drive import upload_to_drive
+        from utils.qr import generate_qr_code
+
         try:
             # Upload to Google Drive
             drive_link = upload_to_drive(pdf_path, filename)
@@ -433,6 +509,21 @@ def get_company_details(account_number):
                 "error": "Company not found"
             }), 404
 
+
+def _legacy_certificate_dates(start_date, end_date, issue_date, expiry_date):
+    """Parsed (start, end, issue, expiry) dates and None, or None and a validation message"""
+    if not all([start_date, end_date, issue_date, expiry_date]):
+        return None, "All date fields are required"
+    dates = tuple(parse_date(value) for value in (start_date, end_date, issue_date, expiry_date))
+    if not all(dates):
+        return None, "Invalid date format"
+    if dates[0] > dates[1]:
+        return None, "start_date must be before or equal to end_date"
+    if dates[2] > dates[3]:
+        return None, "issue_date must be before or equal to expiry_date"
+    return dates, None
+
+
 @misc_bp.route('/legacy-certificates', methods=['POST'])
 def add_legacy_certificate():
     """Add or update legacy certificate records"""
@@ -459,24 +550,11 @@ def add_legacy_certificate():
         if not passport:
             return jsonify({"status": "error", "message": "passport is required"}), 400
 
-        # Validate dates
-        try:
-            from datetime import datetime
-            start_date_obj = datetime.fromisoformat(start_date) if start_date else None
-            end_date_obj = datetime.fromisoformat(end_date) if end_date else None
-            issue_date_obj = datetime.fromisoformat(issue_date) if issue_date else None
-            expiry_date_obj = datetime.fromisoformat(expiry_date) if expiry_date else None
-
-            if not all([start_date_obj, end_date_obj, issue_date_obj, expiry_date_obj]):
-                return jsonify({"status": "error", "message": "All date fields are required"}), 400
-
-            if start_date_obj > end_date_obj:
-                return jsonify({"status": "error", "message": "start_date must be before or equal to end_date"}), 400
-            if issue_date_obj > expiry_date_obj:
-                return jsonify({"status": "error", "message": "issue_date must be before or equal to expiry_date"}), 400
-
-        except ValueError:
-            return jsonify({"status": "error", "message": "Invalid date format"}), 400
+        # Validate dates (ISO, DD-MM-YYYY, or DD / MM / YYYY from legacy CSV exports)
+        dates, date_error = _legacy_certificate_dates(start_date, end_date, issue_date, expiry_date)
+        if date_error:
+            return jsonify({"status": "error", "message": date_error}), 400
+        start_date, end_date, issue_date, expiry_date = dates
 
         # Import execute_query
         from database import execute_query
@@ -518,21 +596,31 @@ def add_legacy_certificate():
         return jsonify({"status": "error", "message": f"Database error: {str(e)}"}), 500
 
 
+LEGACY_CERTIFICATE_FIELDS = ('id', 'candidate_name', 'passport', 'certificate_name', 'certificate_number',
+                             'start_date', 'end_date', 'issue_date', 'expiry_date', 'created_at', 'updated_at')
+
+
 @misc_bp.route('/legacy-certificates/search', methods=['GET'])
 def search_legacy_certificates():
-    """Search legacy certificates by candidate name, passport, or certificate number"""
+    """
+    Search legacy certificates by candidate name, passport, or certificate number
+    Query params: q, fields (comma separated projection), format=ndjson
+    """
     try:
         query = request.args.get('q', '').strip()
         if not query:
             return jsonify({"status": "error", "message": "Search query is required"}), 400
 
-        # Import execute_query
-        from database import execute_query
+        try:
+            fields = requested_fields(LEGACY_CERTIFICATE_FIELDS)
+        except FieldSelectionError as e:
+            return jsonify({"status": "validation_error", "message": str(e)}), 400
 
-        # Search query with ILIKE for case-insensitive search
-        search_query = """
-            SELECT id, candidate_name, passport, certificate_name, certificate_number,
-                   start_date, end_date, issue_date, expiry_date, created_at, updated_at
+        from database.db_connection import stream_rows
+
+        # Search query with ILIKE for case-insensitive search; dates are encoded as ISO 8601
+        search_query = f"""
+            SELECT {', '.join(fields or LEGACY_CERTIFICATE_FIELDS)}
             FROM legacy_certificates
             WHERE candidate_name ILIKE %s
                OR passport ILIKE %s
@@ -541,30 +629,14 @@ def search_legacy_certificates():
             LIMIT 100
         """
         search_pattern = f'%{query}%'
-        results = execute_query(search_query, (search_pattern, search_pattern, search_pattern), fetch=True)
-
-        # Format dates for JSON response
-        formatted_results = []
-        for row in results:
-            formatted_results.append({
-                'id': row['id'],
-                'candidate_name': row['candidate_name'],
-                'passport': row['passport'],
-                'certificate_name': row['certificate_name'],
-                'certificate_number': row['certificate_number'],
-                'start_date': row['start_date'].isoformat() if row['start_date'] else None,
-                'end_date': row['end_date'].isoformat() if row['end_date'] else None,
-                'issue_date': row['issue_date'].isoformat() if row['issue_date'] else None,
-                'expiry_date': row['expiry_date'].isoformat() if row['expiry_date'] else None,
-                'created_at': row['created_at'].isoformat() if row['created_at'] else None,
-                'updated_at': row['updated_at'].isoformat() if row['updated_at'] else None
-            })
 
-        return jsonify({
-            "status": "success",
-            "data": formatted_results,
-            "count": len(formatted_results)
-        }), 200
+        return list_response(
+            stream_rows(search_query, (search_pattern, search_pattern, search_pattern)),
+            envelope={"status": "success", "data": ROWS},
+            trailer=lambda count: {"count": count},
+            fields=fields,
+            label='legacy certificate search'
+        )
 
     except Exception as e:
         return jsonify({"status": "error", "message": f"Database error: {str(e)}"}), 500
@@ -634,24 +706,11 @@ def update_legacy_certificate(certificate_id):
         if not passport:
             return jsonify({"status": "error", "message": "passport is required"}), 400
 
-        # Validate dates
-        try:
-            from datetime import datetime
-            start_date_obj = datetime.fromisoformat(start_date) if start_date else None
-            end_date_obj = datetime.fromisoformat(end_date) if end_date else None
-            issue_date_obj = datetime.fromisoformat(issue_date) if issue_date else None
-            expiry_date_obj = datetime.fromisoformat(expiry_date) if expiry_date else None
-
-            if not all([start_date_obj, end_date_obj, issue_date_obj, expiry_date_obj]):
-                return jsonify({"status": "error", "message": "All date fields are required"}), 400
-
-            if start_date_obj > end_date_obj:
-                return jsonify({"status": "error", "message": "start_date must be before or equal to end_date"}), 400
-            if issue_date_obj > expiry_date_obj:
-                return jsonify({"status": "error", "message": "issue_date must be before or equal to expiry_date"}), 400
-
-        except ValueError:
-            return jsonify({"status": "error", "message": "Invalid date format"}), 400
+        # Validate dates (ISO, DD-MM-YYYY, or DD / MM / YYYY from legacy CSV exports)
+        dates, date_error = _legacy_certificate_dates(start_date, end_date, issue_date, expiry_date)
+        if date_error:
+            return jsonify({"status": "error", "message": date_error}), 400
+        start_date, end_date, issue_date, expiry_date = dates
 
         # Import execute_query
         from database import execute_query
@@ -1,23 +1,17 @@
 from flask import Blueprint, request, jsonify
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
 from datetime import datetime
-import pytesseract
-from PIL import Image
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from config import Config
 from database import execute_query
 from utils.file_ops import allowed_file, generate_session_id
-from ocr.passport import extract_passport_front_data, extract_passport_back_data
-from ocr.cdc import extract_cdc_data
+from utils.temp_sessions import get_session_manager
+from utils.metrics import timed
+from utils.rate_limit import limiter
 
 upload_bp = Blueprint('upload', __name__)
 
-# Initialize limiter for this blueprint
-limiter = Limiter(key_func=get_remote_address)
-
 @upload_bp.route('/upload-images', methods=['POST', 'OPTIONS'])
 @limiter.limit("10 per minute")  # Limit file uploads to prevent abuse
 def upload_images():
@@ -130,22 +124,35 @@ def upload_images():
                 os.rmdir(temp_session_folder)
             return jsonify({"error": f"File processing error: {str(file_error)}"}), 500
 
+        # Write the session manifest so the janitor can expire it later
+        try:
+            get_session_manager().register_session(session_id, uploaded_files)
+        except Exception as manifest_error:
+            print(f"[TEMP STORAGE] Failed to write session manifest for {session_id}: {manifest_error}")
+
         # Perform OCR on passport and CDC images (skip if disabled)
         ocr_data = {}
 
         if Config.ENABLE_OCR:
             try:
+                # OCR stack (cv2, numpy, pytesseract) is loaded on first use only
+                from ocr.passport import extract_passport_front_data, extract_passport_back_data
+                from ocr.cdc import extract_cdc_data
+
                 # Extract passport front data
                 if 'passport_front_img' in temp_file_paths:
-                    ocr_data['passport_front'] = extract_passport_front_data(temp_file_paths['passport_front_img'])
+                    with timed('ocr_extraction_duration_seconds', document='passport_front'):
+                        ocr_data['passport_front'] = extract_passport_front_data(temp_file_paths['passport_front_img'])
 
                 # Extract passport back data
                 if 'passport_back_img' in temp_file_paths:
-                    ocr_data['passport_back'] = extract_passport_back_data(temp_file_paths['passport_back_img'])
+                    with timed('ocr_extraction_duration_seconds', document='passport_back'):
+                        ocr_data['passport_back'] = extract_passport_back_data(temp_file_paths['passport_back_img'])
 
                 # Extract CDC data if provided
                 if 'cdc_img' in temp_file_paths:
-                    ocr_data['cdc'] = extract_cdc_data(temp_file_paths['cdc_img'])
+                    with timed('ocr_extraction_duration_seconds', document='cdc'):
+                        ocr_data['cdc'] = extract_cdc_data(temp_file_paths['cdc_img'])
                 else:
                     ocr_data['cdc'] = {"cdc_no": "", "indos_no": ""}
 
@@ -220,6 +227,11 @@ def upload_payment_screenshot():
 
         print(f"[PAYMENT UPLOAD] Saved payment screenshot: {filename} to session {session_id}")
 
+        try:
+            get_session_manager().touch_session(session_id)
+        except Exception as manifest_error:
+            print(f"[PAYMENT UPLOAD] Failed to refresh session manifest for {session_id}: {manifest_error}")
+
         return jsonify({
             "status": "success",
             "message": "Payment screenshot uploaded successfully",
@@ -298,7 +310,10 @@ def test_ocr():
         temp_path = f"{Config.UPLOAD_FOLDER}/temp_{filename}"
         file.save(temp_path)
 
-        # Perform OCR
+        # Perform OCR (importing the ocr package applies the configured tesseract path)
+        import ocr  # noqa: F401
+        import pytesseract
+        from PIL import Image
         text = pytesseract.image_to_string(Image.open(temp_path))
 
         # Clean up - but protect PDF files
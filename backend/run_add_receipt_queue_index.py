@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Script to add the receipt queue index to certificate_selections table
+"""
+
+import psycopg2
+from config import Config
+
+def run_sql_file():
+    """Execute the SQL file to create the receipt queue index"""
+    try:
+        # Connect to database
+        conn = psycopg2.connect(
+            host=Config.DB_HOST,
+            port=Config.DB_PORT,
+            database=Config.DB_NAME,
+            user=Config.DB_USER,
+            password=Config.DB_PASSWORD
+        )
+
+        cursor = conn.cursor()
+
+        # Read and execute SQL file
+        with open('add_receipt_queue_index_to_certificate_selections.sql', 'r') as f:
+            sql = f.read()
+
+        print("Executing SQL to create receipt queue index...")
+        cursor.execute(sql)
+        conn.commit()
+
+        print("✅ Successfully created receipt queue index on certificate_selections table")
+
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        if 'conn' in locals():
+            conn.rollback()
+        raise
+    finally:
+        if 'cursor' in locals():
+            cursor.close()
+        if 'conn' in locals():
+            conn.close()
+
+if __name__ == "__main__":
+    run_sql_file()
@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+"""
+Script to install the candidate directory (candidate_directory, triggers) and rebuild it from the source tables
+"""
+import sys
+from database.candidate_directory import ensure_directory
+
+def main():
+    """Main function to install and backfill the candidate directory"""
+    try:
+        print("\n📇 Installing candidate_directory and rebuilding it...")
+        ensure_directory(force=True)
+        print("✅ Candidate directory is up to date")
+    except Exception as e:
+        print(f"❌ Failed to install candidate directory: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
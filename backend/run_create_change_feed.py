@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+"""
+Script to install the change feed triggers (NOTIFY change_feed on journal, candidate and certificate changes)
+"""
+import sys
+from database.change_feed import ensure_change_feed
+
+def main():
+    """Main function to install the change feed triggers"""
+    try:
+        print("\n📣 Installing change feed triggers...")
+        ensure_change_feed(force=True)
+        print("✅ Change feed triggers are installed")
+    except Exception as e:
+        print(f"❌ Failed to install change feed triggers: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
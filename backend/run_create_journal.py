@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+"""
+Script to install the unified journal (journal_entries, source triggers) and backfill existing ledger documents
+"""
+import sys
+from database.journal import ensure_journal
+
+def main():
+    """Main function to install and backfill the journal"""
+    try:
+        print("\n📒 Installing journal_entries and backfilling ledger documents...")
+        ensure_journal(force=True)
+        print("✅ Journal is up to date")
+    except Exception as e:
+        print(f"❌ Failed to install journal: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
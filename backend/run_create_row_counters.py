@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+"""
+Script to install the row counters (row_counters, triggers) and recompute them from the counted tables
+"""
+import sys
+from database.counters import ensure_counters
+
+def main():
+    """Main function to install and backfill the row counters"""
+    try:
+        print("\n🔢 Installing row_counters and recomputing counts...")
+        ensure_counters(force=True)
+        print("✅ Row counters are up to date")
+    except Exception as e:
+        print(f"❌ Failed to install row counters: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Script to collect orphaned candidate, certificate and invoice files (one incremental pass per store)
+
+Usage:
+    python run_file_gc.py [--dry-run] [candidates] [certificates] [certificate_files] [invoices]
+"""
+import sys
+from utils.file_gc import get_file_gc
+
+def main():
+    """Main function to run the file garbage collector"""
+    args = sys.argv[1:]
+    dry_run = '--dry-run' in args
+    stores = [arg for arg in args if not arg.startswith('--')]
+    try:
+        print(f"\n🧹 Collecting orphaned files{' (dry run)' if dry_run else ''}...")
+        result = get_file_gc().run(stores or None, dry_run=dry_run)
+        for report in result['stores']:
+            if report.get('skipped'):
+                print(f"⏭️  {report['store']}: skipped ({report['skipped']})")
+                continue
+            print(f"✅ {report['store']}: scanned {report['scanned']}, referenced {report['referenced']}, "
+                  f"quarantined {report['quarantined']} ({report['quarantined_bytes']} bytes), "
+                  f"purged {report['purged']} ({report['reclaimed_bytes']} bytes reclaimed)"
+                  f"{'' if report['complete'] else ', resumes at ' + report['resume_after']}")
+        print(f"✅ Reclaimed {result['reclaimed_bytes']} bytes, quarantined {result['quarantined_bytes']} bytes")
+    except Exception as e:
+        print(f"❌ File garbage collection failed: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
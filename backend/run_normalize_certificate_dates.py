@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Script to convert certificate dates to DATE columns and add the expiry indexes
+(normalize_certificate_dates.sql). With --dry-run the script runs in a
+transaction that is rolled back, listing the values that would not parse.
+"""
+
+import argparse
+import os
+import sys
+import psycopg2
+from config import Config
+
+SQL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'normalize_certificate_dates.sql')
+
+def run_sql_file(dry_run=False):
+    """Execute the SQL file; returns the rejected values as (table, row id, column, value)"""
+    conn = psycopg2.connect(
+        host=Config.DB_HOST,
+        port=Config.DB_PORT,
+        database=Config.DB_NAME,
+        user=Config.DB_USER,
+        password=Config.DB_PASSWORD
+    )
+    try:
+        with conn.cursor() as cursor:
+            if dry_run:
+                cursor.execute("SET LOCAL certificate_dates.dry_run = 'on'")
+
+            with open(SQL_FILE, 'r', encoding='utf-8') as f:
+                sql = f.read()
+
+            print("Executing SQL to normalize certificate dates...")
+            cursor.execute(sql)
+
+            # Rows recorded by this run share its transaction timestamp
+            cursor.execute("""
+                SELECT table_name, row_id, column_name, raw_value
+                FROM certificate_date_rejects
+                WHERE recorded_at = CURRENT_TIMESTAMP
+                ORDER BY table_name, column_name, row_id
+            """)
+            rejects = cursor.fetchall()
+
+        if dry_run:
+            conn.rollback()
+        else:
+            conn.commit()
+        return rejects
+
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--dry-run', action='store_true', help='Report unparseable values and roll back')
+    args = parser.parse_args()
+
+    try:
+        rejects = run_sql_file(dry_run=args.dry_run)
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+    for table_name, row_id, column_name, raw_value in rejects:
+        print(f"   {table_name}.{column_name} id={row_id}: {raw_value!r}")
+
+    if args.dry_run:
+        print(f"Dry run: {len(rejects)} values would not parse; nothing was changed")
+    else:
+        print(f"✅ Certificate dates normalized ({len(rejects)} unparseable values kept in certificate_date_rejects)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+"""
+Script to backfill precomputed certificate verification records (and signed static JSON when enabled)
+"""
+import sys
+from utils.verification import get_verification_service
+
+def main():
+    """Main function to rebuild all verification records"""
+    try:
+        print("\n📄 Rebuilding certificate verification records...")
+        count = get_verification_service().rebuild_all()
+        print(f"✅ Rebuilt {count} verification records")
+    except Exception as e:
+        print(f"❌ Failed to rebuild verification records: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
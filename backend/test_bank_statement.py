@@ -0,0 +1,103 @@
+from datetime import date
+from decimal import Decimal
+
+from bookkeeping.statements import PartyIndex, match_statement, parse_amount, parse_statement
+
+CUSTOMERS = [
+    {'id': 1, 'company_name': 'Ocean Lines Pvt Ltd', 'gst_number': '27AAACO1234F1Z5'},
+    {'id': 2, 'company_name': 'Blue Ocean Lines Shipping', 'gst_number': None},
+    {'id': 3, 'company_name': 'Seahawk Marine Services', 'gst_number': None},
+]
+VENDORS = [
+    {'id': 10, 'vendor_name': 'Harbour Printers', 'account_number': '50100234567', 'gst_number': None},
+]
+
+STATEMENT = """Account Statement
+Account No:,0012345
+Date,Narration,Chq/Ref No,Withdrawal Amt,Deposit Amt,Balance
+01/04/2025,NEFT-OCEAN LINES PVT LTD,UTR001,,"1,50,000.00",150000
+02/04/2025,NEFT CR BLUE OCEAN LINES SHIPPING,UTR002,,25000,175000
+03/04/2025,IMPS-SEAHAWKMARINE,UTR003,,5000,180000
+04/04/2025,NEFT DR 50100234567 PRINT JOB,UTR004,12000,,168000
+05/04/2025,CASH DEPOSIT,,,800,168800
+,Closing balance,,,,168800
+"""
+
+
+class TestBankStatementImport:
+    """Unit tests for bank statement parsing and party matching"""
+
+    def test_parse_amount(self):
+        assert parse_amount("1,23,456.50") == Decimal("123456.50")
+        assert parse_amount("(500)") == Decimal("-500")
+        assert parse_amount("750 Cr") == Decimal("750")
+        assert parse_amount("") is None
+
+    def test_parse_skips_preamble_and_footer(self):
+        lines = parse_statement(STATEMENT.encode(), 'statement.csv')
+
+        assert len(lines) == 5
+        assert lines[0]['line_no'] == 4
+        assert lines[0]['date'] == date(2025, 4, 1)
+        assert lines[0]['credit'] == Decimal("150000.00")
+        assert lines[3]['debit'] == Decimal("12000")
+
+    def test_single_amount_column_with_direction(self):
+        text = "Txn Date,Description,Amount,Dr/Cr\n2025-04-01,NEFT OCEAN LINES,100,CR\n2025-04-02,FEES,40,DR\n"
+        lines = parse_statement(text.encode(), 'statement.csv')
+
+        assert lines[0]['credit'] == Decimal("100")
+        assert lines[1]['debit'] == Decimal("40")
+
+    def test_match_report(self):
+        lines = parse_statement(STATEMENT.encode(), 'statement.csv')
+        matched, unmatched = match_statement(lines, PartyIndex(CUSTOMERS, VENDORS), account_no='0012345')
+
+        by_ref = {line['reference']: line for line in matched}
+        # Most specific name wins over the shorter "Ocean Lines"
+        assert by_ref['UTR001']['party_id'] == 1
+        assert by_ref['UTR002']['party_id'] == 2
+        assert by_ref['UTR003']['party_id'] == 3
+        assert by_ref['UTR004']['kind'] == 'payment'
+        assert by_ref['UTR004']['match_reason'] == 'account'
+
+        assert len(unmatched) == 1
+        assert unmatched[0]['reason'] == 'no_match'
+        assert unmatched[0]['reference'].startswith('STMT-0012345-20250405-C800.00-')
+
+    def test_gst_number_and_duplicate_reference(self):
+        lines = [
+            {'line_no': 2, 'date': date(2025, 4, 1), 'description': 'RTGS 27AAACO1234F1Z5 PAYMENT',
+             'reference': 'R1', 'debit': None, 'credit': Decimal('10')},
+            {'line_no': 3, 'date': date(2025, 4, 1), 'description': 'RTGS 27AAACO1234F1Z5 PAYMENT',
+             'reference': 'R1', 'debit': None, 'credit': Decimal('10')},
+        ]
+        matched, unmatched = match_statement(lines, PartyIndex(CUSTOMERS, VENDORS))
+
+        assert matched[0]['match_reason'] == 'gst'
+        assert unmatched[0]['reason'] == 'duplicate_reference'
+
+    def test_overlapping_exports_give_unreferenced_lines_the_same_reference(self):
+        first = """Date,Narration,Chq/Ref No,Withdrawal Amt,Deposit Amt
+04/04/2025,BANK CHARGES,,50,
+05/04/2025,CASH DEPOSIT,,,800
+05/04/2025,CASH DEPOSIT,,,800
+"""
+        # Another date range, with the bank's preamble this time
+        second = """Account Statement
+Account No:,0012345
+Date,Narration,Chq/Ref No,Withdrawal Amt,Deposit Amt
+05/04/2025,Cash  deposit,,,800
+05/04/2025,CASH DEPOSIT,,,800
+06/04/2025,CASH DEPOSIT,,,800
+"""
+        index = PartyIndex(CUSTOMERS, VENDORS)
+        _, first_lines = match_statement(parse_statement(first.encode(), 'a.csv'), index, account_no='0012345')
+        _, second_lines = match_statement(parse_statement(second.encode(), 'b.csv'), index, account_no='0012345')
+        first_refs = [line['reference'] for line in first_lines]
+        second_refs = [line['reference'] for line in second_lines]
+
+        # Both 800 deposits of 5 April are already known; only 6 April is new
+        assert len(set(first_refs)) == 3
+        assert second_refs[:2] == first_refs[1:]
+        assert second_refs[2] not in first_refs
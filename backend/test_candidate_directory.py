@@ -0,0 +1,50 @@
+import pytest
+
+import database.candidate_directory as directory
+
+
+def directory_rows(directory_available=True):
+    def answer(query, params):
+        if 'FROM candidate_directory' in query and not directory_available:
+            raise RuntimeError('relation "candidate_directory" does not exist')
+        return [{'candidate_name': 'JANE_DOE_P123', 'candidate_id': 4, 'passport': 'P123',
+                 'sources': ['candidates', 'master']}]
+    return answer
+
+
+@pytest.fixture
+def db(install_fake_database):
+    return lambda **kwargs: install_fake_database(directory, 'ensure_directory', directory_rows(**kwargs))
+
+
+class TestCandidateDirectory:
+    """Unit tests for the candidate directory prefix search"""
+
+    def test_prefix_escapes_like_wildcards(self):
+        assert directory.like_prefix('jane_d') == 'jane\\_d%'
+        assert directory.like_prefix('50%') == '50\\%%'
+
+    def test_search_is_a_limited_prefix_lookup_on_the_directory(self, db):
+        fake = db()
+
+        matches = directory.search(' Jane ', limit=20, with_passport=True)
+
+        assert matches[0]['candidate_name'] == 'JANE_DOE_P123'
+        query, params = fake.queries[-1]
+        assert 'FROM candidate_directory' in query and 'UNION' not in query
+        assert 'passport IS NOT NULL' in query
+        assert query.endswith('LIMIT %s')
+        assert params == ['jane%', 'JANE%', 20]
+
+    def test_without_directory_the_source_tables_are_searched(self, db):
+        fake = db(directory_available=False)
+
+        directory.search('ja')
+        directory.search('ja')
+
+        queries = [query for query, _ in fake.queries]
+        # Later calls skip the directory until the retry interval has passed
+        assert sum('FROM candidate_directory' in query for query in queries) == 1
+        assert all('UNION' in query for query in queries[1:])
+        assert fake.queries[-1][1] == ['ja%', 'JA%']
+        assert 'LIMIT' not in queries[-1]
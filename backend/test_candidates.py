@@ -0,0 +1,105 @@
+import os
+from unittest.mock import MagicMock
+
+import pytest
+
+import hooks.post_data_insert as post_data_insert
+from database.candidates import plan_uploads, save_candidate_from_session
+
+
+def make_session(tmp_path, files):
+    session = tmp_path / 'temp' / 'session'
+    session.mkdir(parents=True)
+    for name, content in files.items():
+        (session / name).write_bytes(content)
+    return str(session)
+
+
+def make_conn(candidate_id=42):
+    conn = MagicMock()
+    cursor = conn.cursor.return_value.__enter__.return_value
+    cursor.fetchone.return_value = (candidate_id,)
+    cursor.fetchall.side_effect = lambda: [(100 + i,) for i in range(3)]
+    return conn, cursor
+
+
+class TestCandidateSave:
+    """Unit tests for the single-transaction candidate save"""
+
+    def test_uploads_are_planned_payment_first_without_name_collisions(self, tmp_path):
+        session = make_session(tmp_path, {'photo.png': b'p' * 5, 'pay.jpg': b'x' * 3,
+                                          'extra.jpg': b'e', 'other.jpg': b'o'})
+
+        uploads = plan_uploads(session, ['photo.png', 'pay.jpg', 'extra.jpg', 'other.jpg'], payment_proof='pay.jpg')
+
+        assert [(u['file_name'], u['image_type'], u['stored_name']) for u in uploads] == [
+            ('pay.jpg', 'payment', 'payment.jpg'),
+            ('photo.png', 'photo', 'photo.png'),
+            ('extra.jpg', None, 'unknown.jpg'),
+            ('other.jpg', None, 'unknown_1.jpg'),
+        ]
+        assert (uploads[0]['file_size'], uploads[0]['mime_type']) == (3, 'image/jpeg')
+
+    def test_rows_files_and_master_entry_are_saved_in_one_commit(self, tmp_path, monkeypatch):
+        session = make_session(tmp_path, {'photo.png': b'p', 'cdc_img.jpg': b'c', 'marksheet.pdf': b'm'})
+        uploads = plan_uploads(session, ['photo.png', 'cdc_img.jpg', 'marksheet.pdf'])
+        conn, cursor = make_conn()
+        master_cursors = []
+        monkeypatch.setattr(post_data_insert, 'update_master_table_after_candidate_insert',
+                            lambda candidate_id, cursor=None: master_cursors.append(cursor) or True)
+        storage = str(tmp_path / 'storage')
+
+        result = save_candidate_from_session('Jane Doe_P123', 'sid', {'firstName': 'Jane'}, None,
+                                             uploads, storage_root=storage, conn=conn)
+
+        assert result == {'candidate_id': 42, 'upload_ids': [100, 101, 102]}
+        upload_inserts = [c for c in cursor.execute.call_args_list if 'candidate_uploads' in c.args[0]]
+        assert len(upload_inserts) == 1
+        assert upload_inserts[0].args[0].count('CURRENT_TIMESTAMP') == 3
+        assert upload_inserts[0].args[1][4] == 'CANDIDATE_42/photo.png'
+        assert master_cursors == [cursor]
+        conn.commit.assert_called_once()
+        assert sorted(os.listdir(os.path.join(storage, 'CANDIDATE_42'))) == ['cdc.jpg', 'marksheet.pdf', 'photo.png']
+        assert os.listdir(session) == []
+
+    def test_failed_commit_rolls_back_and_returns_files_to_the_session(self, tmp_path, monkeypatch):
+        session = make_session(tmp_path, {'photo.png': b'p', 'signature.png': b's'})
+        uploads = plan_uploads(session, ['photo.png', 'signature.png'])
+        conn, cursor = make_conn()
+        conn.commit.side_effect = RuntimeError('connection lost')
+        monkeypatch.setattr(post_data_insert, 'update_master_table_after_candidate_insert',
+                            lambda candidate_id, cursor=None: False)
+        storage = str(tmp_path / 'storage')
+
+        with pytest.raises(RuntimeError):
+            save_candidate_from_session('Jane Doe_P123', 'sid', {}, None, uploads, storage_root=storage, conn=conn)
+
+        conn.rollback.assert_called_once()
+        assert 'ROLLBACK TO SAVEPOINT master_table' in [c.args[0] for c in cursor.execute.call_args_list]
+        assert sorted(os.listdir(session)) == ['photo.png', 'signature.png']
+        assert not os.path.exists(os.path.join(storage, 'CANDIDATE_42'))
+
+    def test_failed_resave_keeps_the_existing_files(self, tmp_path, monkeypatch):
+        storage = tmp_path / 'storage'
+        existing = storage / 'CANDIDATE_42'
+        existing.mkdir(parents=True)
+        (existing / 'photo.png').write_bytes(b'old photo')
+        session = make_session(tmp_path, {'photo.png': b'new photo', 'signature.png': b's'})
+        uploads = plan_uploads(session, ['photo.png', 'signature.png'])
+        conn, cursor = make_conn()
+        conn.commit.side_effect = RuntimeError('connection lost')
+        monkeypatch.setattr(post_data_insert, 'update_master_table_after_candidate_insert',
+                            lambda candidate_id, cursor=None: True)
+
+        with pytest.raises(RuntimeError):
+            save_candidate_from_session('Jane Doe_P123', 'sid', {}, None, uploads, storage_root=str(storage), conn=conn)
+
+        assert os.listdir(existing) == ['photo.png']
+        assert (existing / 'photo.png').read_bytes() == b'old photo'
+        assert sorted(os.listdir(session)) == ['photo.png', 'signature.png']
+
+        # A successful re-save replaces the file and leaves no backup behind
+        conn.commit.side_effect = None
+        save_candidate_from_session('Jane Doe_P123', 'sid', {}, None, uploads, storage_root=str(storage), conn=conn)
+        assert sorted(os.listdir(existing)) == ['photo.png', 'signature.png']
+        assert (existing / 'photo.png').read_bytes() == b'new photo'
@@ -0,0 +1,53 @@
+import os
+from datetime import date, datetime
+
+import database.db_connection as db_connection
+from database.certificate_expiry import build_expiring_query, fetch_expiring
+from utils.dates import parse_date
+
+NORMALIZE_SQL = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'normalize_certificate_dates.sql')
+
+
+class TestCertificateDates:
+    """Unit tests for typed certificate dates and the expiring certificates report"""
+
+    def test_parse_date_accepts_every_stored_spelling(self):
+        expected = date(2026, 1, 31)
+        for value in ('2026-01-31', '31-01-2026', '31/01/2026', '31 / 01 / 2026', '31.01.2026',
+                      '2026-01-31T00:00:00', '2026-01-31 10:15:00', expected, datetime(2026, 1, 31, 9)):
+            assert parse_date(value) == expected, value
+
+        assert parse_date('05-06-2026') == date(2026, 6, 5)  # day first, never MM-DD
+        for value in ('31-02-2026', '2026/01/31', 'soon', '', '   ', None):
+            assert parse_date(value) is None, value
+
+    def test_report_merges_both_sources_in_index_order(self):
+        query, params = build_expiring_query(date(2026, 1, 1), date(2026, 3, 31), limit=50, offset=100)
+
+        assert params == [date(2026, 1, 1), date(2026, 3, 31), date(2026, 1, 1), date(2026, 3, 31), 50, 100]
+        assert 'FROM certificate_selections' in query and 'FROM legacy_certificates' in query
+        assert query.count('WHERE expiry_date BETWEEN %s AND %s') == 2
+        assert query.index('ORDER BY expiry_date, id') < query.index('LIMIT %s OFFSET %s')
+
+        legacy_query, legacy_params = build_expiring_query(date(2026, 1, 1), date(2026, 3, 31), sources=('legacy',))
+        assert legacy_params == [date(2026, 1, 1), date(2026, 3, 31)]
+        assert 'certificate_selections' not in legacy_query and 'LIMIT' not in legacy_query
+
+        # Both tables get the (expiry_date, id) index the report is ordered by
+        with open(NORMALIZE_SQL, encoding='utf-8') as f:
+            sql = f.read()
+        assert 'ON certificate_selections (expiry_date, id)' in sql
+        assert 'ON legacy_certificates (expiry_date, id)' in sql
+
+    def test_totals_are_counted_per_source(self, monkeypatch):
+        def execute_query(query, params=None, fetch=True):
+            if 'COUNT(*)' in query:
+                return [{'issued': 3, 'legacy': 2}]
+            return [{'source': 'legacy', 'id': 7, 'expiry_date': date(2026, 2, 1)}]
+        monkeypatch.setattr(db_connection, 'execute_query', execute_query)
+
+        report = fetch_expiring(date(2026, 1, 1), date(2026, 3, 31), limit=1)
+
+        assert report['totals'] == {'issued': 3, 'legacy': 2}
+        assert report['total'] == 5
+        assert report['rows'][0]['id'] == 7
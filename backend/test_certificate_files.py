@@ -0,0 +1,62 @@
+import base64
+import os
+
+import pytest
+
+from utils.certificate_files import CertificateFileStore, decode_image_data
+
+JPEG = b'\xff\xd8\xff\xe0' + b'\x00' * 32
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 32
+
+
+def make_store(tmp_path):
+    return CertificateFileStore(str(tmp_path / 'storage'), str(tmp_path / 'uploads' / 'certificates'))
+
+
+class TestCertificateFiles:
+    """Unit tests for the certificate artifact file store"""
+
+    def test_data_urls_and_bare_base64_are_decoded_with_their_type(self):
+        data_url = 'data:image/png;base64,' + base64.b64encode(PNG).decode()
+
+        assert decode_image_data(data_url) == (PNG, 'image/png')
+        assert decode_image_data(base64.b64encode(JPEG).decode()) == (JPEG, 'image/jpeg')
+        with pytest.raises(ValueError):
+            decode_image_data('data:image/jpeg;base64,')
+
+    def test_only_sniffed_allowlisted_types_are_accepted(self):
+        html = base64.b64encode(b'<html><script>alert(1)</script></html>').decode()
+
+        # The declared type is never trusted, in either direction
+        with pytest.raises(ValueError):
+            decode_image_data('data:text/html;base64,' + html)
+        with pytest.raises(ValueError):
+            decode_image_data('data:image/png;base64,' + html)
+        assert decode_image_data('data:text/html;base64,' + base64.b64encode(PNG).decode()) == (PNG, 'image/png')
+
+    def test_saved_files_are_referenced_relative_to_the_store(self, tmp_path):
+        store = make_store(tmp_path)
+
+        rel_path, mime_type, size = store.save(12, 'verification', PNG)
+
+        assert (rel_path, mime_type, size) == ('CERTIFICATE_12/verification.png', 'image/png', len(PNG))
+        with open(store.resolve(rel_path), 'rb') as f:
+            assert f.read() == PNG
+        assert os.listdir(tmp_path / 'storage' / 'CERTIFICATE_12') == ['verification.png']
+        assert store.resolve('uploads/certificates/CERT_1.pdf') == str(tmp_path / 'uploads' / 'certificates' / 'CERT_1.pdf')
+        with pytest.raises(ValueError):
+            store.resolve('../../etc/passwd')
+
+    def test_legacy_values_become_references(self, tmp_path):
+        store = make_store(tmp_path)
+
+        # Image bytes from a BYTEA column are written to the store
+        assert store.reference_for_legacy(3, 'certificate', memoryview(JPEG)) == \
+            ('CERTIFICATE_3/certificate.jpg', 'image/jpeg')
+        assert os.path.exists(store.resolve('CERTIFICATE_3/certificate.jpg'))
+        # Generated PDF paths are kept, whether stored as VARCHAR or as text in BYTEA
+        assert store.reference_for_legacy(4, 'verification', 'uploads/certificates/VER_4.pdf') == \
+            ('uploads/certificates/VER_4.pdf', 'application/pdf')
+        assert store.reference_for_legacy(4, 'verification', b'uploads/certificates/VER_4.pdf') == \
+            ('uploads/certificates/VER_4.pdf', 'application/pdf')
+        assert not os.path.exists(tmp_path / 'storage' / 'CERTIFICATE_4')
@@ -0,0 +1,141 @@
+import json
+import os
+import queue
+import re
+import socket
+import time
+
+import pytest
+
+import database.change_feed as change_feed
+from database.change_feed import (RESYNC, ChangeFeed, Subscription, SubscriberLimitReached, format_event,
+                                  parse_notification)
+
+SCHEMA_SQL = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'create_change_feed.sql')
+
+
+class FakeNotify:
+    def __init__(self, payload):
+        self.payload = payload
+
+
+class FakeCursor:
+    def __init__(self, executed):
+        self.executed = executed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query):
+        self.executed.append(query)
+
+
+class FakeListenConnection:
+    """Readable through a socket pair whenever a notification is pending"""
+
+    def __init__(self):
+        self._reader, self._writer = socket.socketpair()
+        self._pending = []
+        self.notifies = []
+        self.executed = []
+        self.autocommit = False
+        self.closed = False
+
+    def fileno(self):
+        return self._reader.fileno()
+
+    def cursor(self):
+        return FakeCursor(self.executed)
+
+    def notify(self, topic, key, op='INSERT'):
+        self._pending.append(FakeNotify(json.dumps({'topic': topic, 'op': op, 'key': key})))
+        self._writer.send(b'x')
+
+    def poll(self):
+        self._reader.recv(1024)
+        self.notifies.extend(self._pending)
+        self._pending = []
+
+    def close(self):
+        self.closed = True
+        self._reader.close()
+        self._writer.close()
+
+
+def _wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def feed(monkeypatch):
+    monkeypatch.setattr(change_feed, 'ensure_change_feed', lambda: False)
+    conn = FakeListenConnection()
+    return ChangeFeed(lambda: conn, max_subscribers=2, poll_seconds=0.05), conn
+
+
+class TestChangeFeed:
+    """Unit tests for the NOTIFY to Server-Sent Events fan-out"""
+
+    def test_notifications_reach_subscribers_of_their_topic(self, feed):
+        feed, conn = feed
+        ledger = feed.subscribe(['ledger'])
+        certificates = feed.subscribe(['certificates'])
+        _wait_for(lambda: conn.executed)
+
+        conn.notify('certificates', {'id': 9, 'candidate_id': 4})
+        conn.notify('ledger', {'party_type': 'client', 'party_id': 3})
+
+        event = ledger.get(timeout=2)
+        assert (event['topic'], event['key']) == ('ledger', {'party_type': 'client', 'party_id': 3})
+        assert certificates.get(timeout=2)['key'] == {'id': 9, 'candidate_id': 4}
+        with pytest.raises(queue.Empty):
+            ledger.get(timeout=0.1)
+        assert conn.executed == ['LISTEN change_feed'] and conn.autocommit
+
+        # The listener closes its connection once the last subscriber leaves
+        feed.unsubscribe(ledger)
+        feed.unsubscribe(certificates)
+        _wait_for(lambda: conn.closed)
+
+    def test_subscriptions_are_validated_and_capped_per_worker(self, feed):
+        feed, _ = feed
+        with pytest.raises(ValueError):
+            feed.subscribe(['ledger', 'vendors'])
+        first, second = feed.subscribe(['ledger']), feed.subscribe(['candidates'])
+        with pytest.raises(SubscriberLimitReached):
+            feed.subscribe(['ledger'])
+        feed.unsubscribe(first)
+        feed.unsubscribe(second)
+
+    def test_a_subscriber_that_falls_behind_is_told_to_resync(self):
+        subscription = Subscription(['candidates'], max_pending=2)
+        for n in range(3):
+            subscription.deliver({'id': n, 'topic': 'candidates', 'op': 'UPDATE', 'key': {'candidate_id': n}})
+
+        event = subscription.get(timeout=0)
+        assert event['topic'] == RESYNC
+        with pytest.raises(queue.Empty):
+            subscription.get(timeout=0)
+        assert format_event(event) == 'id: 2\nevent: resync\ndata: {"op": "overflow", "key": {}}\n\n'
+
+    def test_client_ledger_events_name_the_client(self):
+        with open(SCHEMA_SQL, encoding='utf-8') as f:
+            sql = f.read()
+        trigger = sql[sql.index('FUNCTION change_feed_journal()'):sql.index('FUNCTION change_feed_candidates()')]
+        key_columns = re.findall(r"'(\w+)', r\.(\w+)", trigger)
+
+        # A client_ledger leg as the journal stores it: party_id is NULL
+        leg = {'party_type': 'client', 'party_id': None, 'party_name': 'Ocean Lines', 'company_id': 2,
+               'account': 'receivable', 'period': '2025-04'}
+        payload = json.dumps({'topic': 'ledger', 'op': 'INSERT',
+                              'key': {name: leg[column] for name, column in key_columns}})
+        event = parse_notification(payload)
+
+        assert event['key']['party_name'] == 'Ocean Lines'
+        assert '"party_name": "Ocean Lines"' in format_event(dict(event, id=1))
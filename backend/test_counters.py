@@ -0,0 +1,65 @@
+import pytest
+
+import database.counters as counters
+
+
+def counter_rows(counters_available=True, reltuples=1200):
+    def answer(query, params):
+        if 'row_counters' in query:
+            if not counters_available:
+                raise RuntimeError('relation "row_counters" does not exist')
+            if "dimension = 'inserted'" in query:
+                return [{'table_name': 'candidates', 'count': 41}]
+            return [{'count': 7}] if params[1] != 'status' else []
+        if 'pg_class' in query:
+            return [{'estimate': reltuples}]
+        return [{'count': 3}]
+    return answer
+
+
+@pytest.fixture
+def db(install_fake_database):
+    return lambda **kwargs: install_fake_database(counters, 'ensure_counters', counter_rows(**kwargs))
+
+
+class TestCounters:
+    """Unit tests for maintained row counts and their fallbacks"""
+
+    def test_maintained_counts_are_key_lookups(self, db):
+        fake = db()
+
+        assert counters.count('certificate_selections') == 7
+        assert counters.count('certificate_selections', 'candidate_id', 12) == 7
+        assert counters.count('certificate_selections', 'status', 'done') == 0
+        assert [params for _, params in fake.queries] == [
+            ('certificate_selections', '', ''),
+            ('certificate_selections', 'candidate_id', '12'),
+            ('certificate_selections', 'status', 'done'),
+        ]
+        assert not any('COUNT(*)' in query for query, _ in fake.queries)
+        assert counters.inserted(['candidates', 'receiptinvoicedata']) == {'candidates': 41, 'receiptinvoicedata': 0}
+
+    def test_unknown_tables_and_dimensions_are_rejected(self, db):
+        db()
+
+        with pytest.raises(ValueError):
+            counters.count('vendors')
+        with pytest.raises(ValueError):
+            counters.count('candidate_uploads', 'file_type', 'pdf')
+
+    def test_without_counters_exact_counts_scan_and_totals_may_use_estimates(self, db):
+        fake = db(counters_available=False)
+
+        assert counters.count('candidate_uploads', 'candidate_name', 'Jane Doe_P1') == 3
+        scan, params = fake.queries[-1]
+        assert scan.startswith('SELECT COUNT(*) AS count FROM candidate_uploads WHERE file_path IS NOT NULL')
+        assert params == ['Jane Doe_P1']
+        assert counters.count('master_database_table_a', exact=False) == 1200
+        # Later calls skip the counters until the retry interval has passed
+        assert sum('row_counters' in query for query, _ in fake.queries) == 1
+        assert counters.inserted(['candidates']) is None
+
+    def test_estimate_falls_back_to_a_scan_for_tables_never_analyzed(self, db):
+        db(counters_available=False, reltuples=-1)
+
+        assert counters.count('candidates', exact=False) == 3
@@ -0,0 +1,86 @@
+import threading
+
+from utils.extraction import ExtractionCache, ExtractionService, FakeBackend, cache_key, fields_valid
+
+CDC_FIELDS = {"cdc_no": "MUM123456", "indos_no": "08NL1234"}
+
+
+def no_regex(raw_text, document_type):
+    return None
+
+
+class TestExtractionService:
+    """Unit tests for the cached, coalesced OCR field extraction service"""
+
+    def test_cache_key_ignores_whitespace_and_case(self):
+        assert cache_key("cdc", "CDC No:  MUM123456\n") == cache_key("cdc", "cdc no: mum123456")
+        assert cache_key("cdc", "x") != cache_key("passport_back", "x")
+
+    def test_fields_valid(self):
+        assert fields_valid(CDC_FIELDS, "cdc")
+        assert not fields_valid({"cdc_no": "MUM123456", "indos_no": ""}, "cdc")
+        assert not fields_valid({"Passport No.": "A1234567", "Surname": "SMITH",
+                                 "Given Name(s)": "JOHN", "Date of Birth": "31/02/1990"}, "passport_front")
+
+    def test_valid_regex_result_skips_backend(self):
+        backend = FakeBackend({"cdc": {"cdc_no": "WRONG"}})
+        service = ExtractionService(lambda text, doc: dict(CDC_FIELDS), backend=backend)
+
+        assert service.extract("CDC text", "cdc") == CDC_FIELDS
+        assert backend.calls == []
+        assert service.stats["regex_fast_path"] == 1
+
+    def test_backend_result_is_cached(self, tmp_path):
+        backend = FakeBackend({"cdc": CDC_FIELDS})
+        cache = ExtractionCache(str(tmp_path / "cache.sqlite3"))
+        service = ExtractionService(no_regex, backend=backend, cache=cache)
+
+        assert service.extract("CDC NO MUM123456", "cdc") == CDC_FIELDS
+        assert service.extract("cdc no   mum123456", "cdc") == CDC_FIELDS
+        assert len(backend.calls) == 1
+        assert cache.get(cache_key("cdc", "CDC NO MUM123456")) == (CDC_FIELDS, "fake")
+        service.close()
+
+    def test_identical_concurrent_texts_are_coalesced(self):
+        backend = FakeBackend({"cdc": CDC_FIELDS}, delay=0.2)
+        service = ExtractionService(no_regex, backend=backend)
+        results = []
+
+        threads = [threading.Thread(target=lambda: results.append(service.extract("same text", "cdc")))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results == [CDC_FIELDS] * 5
+        assert len(backend.calls) == 1
+        assert service.stats["coalesced"] == 4
+        service.close()
+
+    def test_deadline_falls_back_to_regex(self):
+        partial = {"cdc_no": "MUM123456"}
+        backend = FakeBackend({"cdc": CDC_FIELDS}, delay=1.0)
+        service = ExtractionService(lambda text, doc: dict(partial), backend=backend, deadline=0.1)
+
+        assert service.extract("slow text", "cdc") == partial
+        assert service.stats["llm_failures"] == 1
+        service.close()
+
+    def test_invalid_backend_result_is_merged_over_regex_and_not_cached(self, tmp_path):
+        partial = {"cdc_no": "MUM123456"}
+        cache = ExtractionCache(str(tmp_path / "cache.sqlite3"))
+        service = ExtractionService(lambda text, doc: dict(partial), backend=FakeBackend(), cache=cache)
+
+        # The default fake backend answers {} - the regex fields must survive
+        assert service.extract("x", "cdc") == partial
+        assert service.stats["llm_invalid"] == 1
+        assert cache.get(cache_key("cdc", "x")) is None
+        service.close()
+
+        service = ExtractionService(lambda text, doc: dict(partial), backend=FakeBackend({"cdc": {"indos_no": "08NL1234"}}),
+                                    cache=cache)
+        assert service.extract("y", "cdc") == CDC_FIELDS
+        # Validated once merged, so it is cached
+        assert cache.get(cache_key("cdc", "y")) == (CDC_FIELDS, "fake+regex")
+        service.close()
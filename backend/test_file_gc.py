@@ -0,0 +1,121 @@
+import os
+import time
+
+from utils.file_gc import QUARANTINE_DIRNAME, FileGarbageCollector, FileStore
+
+DAY = 86400
+
+
+def write(root, rel, age_days=0, size=10):
+    path = os.path.join(root, rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    mtime = time.time() - age_days * DAY
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+class FakeDatabase:
+    def __init__(self, paths):
+        self.paths = list(paths)
+        self.verified = []
+
+    def stream(self, sql, params):
+        for path in self.paths:
+            yield {'path': path}
+
+    def query(self, sql, params):
+        self.verified.append(params[0])
+        return [{'path': path} for path in self.paths if path in params[0]]
+
+
+def make_gc(store, db, **kwargs):
+    kwargs.setdefault('files_per_second', 0)
+    return FileGarbageCollector([store], stream=db.stream, query=db.query, **kwargs)
+
+
+class TestFileGarbageCollector:
+    """Unit tests for the orphaned file mark-and-sweep"""
+
+    def test_unreferenced_old_files_are_quarantined(self, tmp_path):
+        root = str(tmp_path)
+        write(root, 'CANDIDATE_1/photo.png', age_days=3)
+        write(root, 'CANDIDATE_2/photo.png', age_days=3, size=40)
+        write(root, 'CANDIDATE_2/cdc.jpg', age_days=3, size=2)
+        write(root, 'CANDIDATE_3/photo.png', age_days=0)      # inside the grace period
+        write(root, 'notes/readme.txt', age_days=3)           # not managed by the store
+        store = FileStore('candidates', root, 'SELECT file_path AS path FROM candidate_uploads',
+                          folder_prefix='CANDIDATE_')
+
+        report = make_gc(store, FakeDatabase(['CANDIDATE_1/photo.png'])).run()['stores'][0]
+
+        assert report['quarantined'] == 2
+        assert report['quarantined_bytes'] == 42
+        assert report['recent'] == 1
+        assert report['complete'] is True
+        assert os.path.exists(os.path.join(root, 'CANDIDATE_1/photo.png'))
+        assert not os.path.exists(os.path.join(root, 'CANDIDATE_2'))
+        assert os.path.exists(os.path.join(root, 'CANDIDATE_3/photo.png'))
+        assert os.path.exists(os.path.join(root, 'notes/readme.txt'))
+        quarantined = [os.path.join(d, f) for d, _, files in os.walk(os.path.join(root, QUARANTINE_DIRNAME))
+                       for f in files if f.endswith(('.png', '.jpg'))]
+        assert len(quarantined) == 2
+
+    def test_paths_referenced_after_the_mark_are_rescued(self, tmp_path):
+        root = str(tmp_path)
+        write(root, 'VERIFICATION_7_ab.pdf', age_days=5)
+        store = FileStore('certificates', root, 'SELECT ...', suffixes=('.pdf',),
+                          strip_prefixes=('uploads/certificates/',))
+        db = FakeDatabase([])
+        gc = make_gc(store, db)
+        original_mark = gc.mark
+
+        def mark_then_insert(s):
+            referenced = original_mark(s)
+            db.paths.append('uploads/certificates/VERIFICATION_7_ab.pdf')
+            return referenced
+        gc.mark = mark_then_insert
+
+        report = gc.run()['stores'][0]
+
+        assert report['quarantined'] == 0
+        assert 'uploads/certificates/VERIFICATION_7_ab.pdf' in db.verified[0]
+        assert os.path.exists(os.path.join(root, 'VERIFICATION_7_ab.pdf'))
+
+    def test_runs_resume_where_the_budget_ran_out(self, tmp_path):
+        root = str(tmp_path)
+        for i in range(5):
+            write(root, f'INVOICE_{i}/SALES_INVOICE.pdf', age_days=2)
+        store = FileStore('invoices', root, 'SELECT ...', folder_prefix='INVOICE_')
+        gc = make_gc(store, FakeDatabase(['INVOICE_1/SALES_INVOICE.pdf']), max_files_per_run=2)
+
+        first = gc.run()['stores'][0]
+        second = gc.run()['stores'][0]
+        third = gc.run()['stores'][0]
+
+        assert (first['scanned'], first['quarantined'], first['complete']) == (2, 1, False)
+        assert first['resume_after'] == 'INVOICE_1/SALES_INVOICE.pdf'
+        assert (second['scanned'], second['quarantined'], second['complete']) == (2, 2, False)
+        assert (third['scanned'], third['quarantined'], third['complete']) == (1, 1, True)
+        assert sorted(os.listdir(root)) == [QUARANTINE_DIRNAME, 'INVOICE_1']
+
+    def test_purge_reclaims_space_after_retention_and_restore_brings_files_back(self, tmp_path):
+        root = str(tmp_path)
+        write(root, 'CANDIDATE_4/photo.png', age_days=3, size=100)
+        write(root, 'CANDIDATE_5/photo.png', age_days=3, size=7)
+        store = FileStore('candidates', root, 'SELECT ...', folder_prefix='CANDIDATE_')
+        now = [time.time()]
+        gc = make_gc(store, FakeDatabase([]), quarantine_days=14, clock=lambda: now[0])
+        gc.run()
+
+        assert gc.restore('candidates', 'CANDIDATE_5/photo.png') is True
+        assert os.path.exists(os.path.join(root, 'CANDIDATE_5/photo.png'))
+        assert gc.run(dry_run=True)['stores'][0]['quarantined'] == 1
+
+        now[0] += 15 * DAY
+        report = gc.run()['stores'][0]
+
+        assert report['purged'] == 1
+        assert report['reclaimed_bytes'] == 100
+        assert gc.restore('candidates', 'CANDIDATE_4/photo.png') is False
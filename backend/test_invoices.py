@@ -0,0 +1,77 @@
+import io
+import zipfile
+from datetime import date
+from decimal import Decimal
+
+import bookkeeping.invoices as invoices
+from bookkeeping.invoices import (ReferenceData, amount_in_words, document_filename, gst_lines,
+                                  render_batch, resolve_courses, stream_zip)
+
+COMPANIES = [{'id': 1, 'company_name': 'Angel Maritime Academy', 'company_gst_number': '27AAAAA0000A1Z5',
+              'account_number': '001', 'company_address': 'Mumbai'}]
+CUSTOMERS = [{'id': 4, 'company_name': 'Ocean Lines', 'gst_number': '29BBBBB1111B1Z5', 'state_code': None}]
+VENDORS = [{'id': 7, 'vendor_name': 'Harbour Printers', 'gst_number': None,
+            'vendor_address': 'Pune', 'state_code': '27'}]
+
+
+def fake_query(sql, params=None):
+    if 'company_details' in sql:
+        return COMPANIES
+    if 'b2bcustomersdetails' in sql:
+        return CUSTOMERS
+    if 'vendors' in sql:
+        return VENDORS
+    return [{'id': 11, 'certificate_name': 'BST', 'candidate_name': 'JOHN_DOE_SMITH'}]
+
+
+class TestInvoiceRendering:
+    """Unit tests for server-side invoice helpers, reference data and batch zips"""
+
+    def test_amount_in_words_indian_numbering(self):
+        assert amount_in_words(123450.50) == 'INR One Lakh Twenty Three Thousand Four Hundred Fifty and Fifty Paise Only'
+        assert amount_in_words(0) == 'INR Zero Only'
+        assert amount_in_words(15000000000) == 'INR One Thousand Five Hundred Crore Only'
+
+    def test_gst_split_by_place_of_supply(self):
+        assert gst_lines(Decimal('1000'), Decimal('180'), '27', '27') == [
+            ('CGST 9%', Decimal('90.00')), ('SGST 9%', Decimal('90.00'))]
+        assert gst_lines(Decimal('1000'), Decimal('180'), '27', '29') == [('IGST 18%', Decimal('180'))]
+        assert gst_lines(Decimal('1000'), 0, '27', '29') == []
+
+    def test_reference_data_is_loaded_once_and_matches_parties(self):
+        calls = []
+        reference = ReferenceData(ttl_seconds=60, query=lambda sql: calls.append(sql) or fake_query(sql))
+
+        company, customer = reference.parties_for('sales', {'company_account_number': '001',
+                                                            'party_name': ' ocean lines '})
+        _, vendor = reference.parties_for('vendor_adjustment', {'company_id': 1, 'vendor_id': 7})
+
+        assert company['company_name'] == 'Angel Maritime Academy'
+        assert customer['id'] == 4
+        assert vendor['company_name'] == 'Harbour Printers'
+        assert len(calls) == 3
+        reference.invalidate()
+        reference.customer(customer_id=4)
+        assert len(calls) == 6
+
+    def test_resolve_courses_uses_one_query(self):
+        rows = resolve_courses([{'selected_courses': [11, {'certificate_name': 'AFF', 'candidate_name': 'A B'}]}],
+                               fake_query)
+        assert rows[0]['selected_courses'][0]['certificate_name'] == 'BST'
+        assert invoices.course_particulars(rows[0]['selected_courses']) == 'JOHN DOE (BST)\nA B (AFF)'
+
+    def test_batch_streams_a_valid_zip_and_reports_failures(self, monkeypatch):
+        def fake_render(kind, document, company, party):
+            if document['receipt_amount_id'] == 2:
+                raise ValueError('bad receipt')
+            return b'%PDF-' + str(document['receipt_amount_id']).encode()
+
+        monkeypatch.setattr(invoices, 'render_document', fake_render)
+        jobs = [('receipt', {'receipt_amount_id': n, 'transaction_date': date(2025, 4, n)}, None, None)
+                for n in (1, 2, 3)]
+
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(stream_zip(render_batch(jobs, workers=0)))))
+
+        assert archive.namelist() == ['receipts/RCPT-1.pdf', 'receipts/RCPT-2.pdf.error.txt', 'receipts/RCPT-3.pdf']
+        assert archive.read('receipts/RCPT-3.pdf') == b'%PDF-3'
+        assert document_filename('sales', {'invoice_no': 'AMA/FY-25-26/0009'}) == 'invoices/AMA_FY-25-26_0009.pdf'
@@ -0,0 +1,82 @@
+from datetime import date
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+
+import database.journal as journal
+from database.journal import (CLIENT_SOURCES, PERIOD_SOURCES, VENDOR_SOURCES, build_ledger_query,
+                              build_period_query, delete_entry, fetch_period)
+
+
+class TestJournal:
+    """Unit tests for ledger reads and deletes through the unified journal"""
+
+    @pytest.fixture(autouse=True)
+    def journal_installed(self, monkeypatch):
+        monkeypatch.setattr(journal, 'ensure_journal', lambda force=False: False)
+
+    def test_ledger_query_is_one_statement_over_live_legs(self):
+        sql, params = build_ledger_query({
+            'party_type': 'client', 'party_name': 'Ocean Lines',
+            'start_date': '2025-04-01', 'end_date': '', 'voucher_type': 'Sales'
+        }, limit=50, offset=100)
+
+        assert "FROM journal_ledger" in sql
+        assert "lower(party_name) = lower(%s)" in sql
+        assert "entry_date <= %s" not in sql
+        assert "COUNT(*) OVER ()" in sql
+        assert sql.rstrip().endswith("LIMIT %s OFFSET %s")
+        assert params == ['client', 'Ocean Lines', '2025-04-01', '%Sales%', 50, 100]
+
+    def test_unknown_filter_is_rejected(self):
+        with pytest.raises(ValueError):
+            build_ledger_query({'company_name': 'ACME'})
+
+    def test_vendor_payment_delete_is_keyed_and_removes_bank_leg(self, make_conn):
+        conn, cursor = make_conn({'id': 41, 'source_table': 'vendor_payment', 'source_id': 9,
+                                  'party_type': 'vendor', 'party_name': 'Harbour Printers',
+                                  'transaction_id': 'UTR9'})
+
+        entry = delete_entry(41, VENDOR_SOURCES, conn=conn)
+
+        assert entry['source_id'] == 9
+        statements = [(call[0][0].strip(), call[0][1]) for call in cursor.execute.call_args_list]
+        assert statements[1] == ("DELETE FROM vendor_payments WHERE id = %s", (9,))
+        assert statements[2] == ("DELETE FROM bank_ledger WHERE transaction_id = %s", ('UTR9',))
+        conn.commit.assert_called_once()
+
+    def test_entry_outside_sources_is_not_found(self, make_conn):
+        conn, cursor = make_conn(None)
+
+        assert delete_entry(41, CLIENT_SOURCES, conn=conn) is None
+        assert cursor.execute.call_count == 1
+        assert cursor.execute.call_args[0][1] == (41, ['client_ledger', 'client_adjustment'])
+        conn.commit.assert_not_called()
+
+    def test_period_query_returns_page_totals_and_opening_balance_in_one_statement(self):
+        sql, params = build_period_query({'source_table': PERIOD_SOURCES},
+                                         date(2025, 4, 1), date(2025, 4, 30), limit=50, offset=50)
+
+        assert sql.count("FROM journal_ledger") == 2
+        assert "FILTER (WHERE entry_date < %s)" in sql
+        assert "LEFT JOIN LATERAL" in sql
+        assert "LIMIT %s OFFSET %s" in sql
+        sources = list(PERIOD_SOURCES)
+        assert params == [date(2025, 4, 1)] * 4 + [sources, date(2025, 4, 30)] + \
+            [sources, date(2025, 4, 1), date(2025, 4, 30), 50, 50]
+        with pytest.raises(ValueError):
+            build_period_query({'start_date': '2025-01-01'}, date(2025, 4, 1), date(2025, 4, 30))
+
+    def test_empty_period_page_still_reports_totals(self):
+        totals_only = {'opening_balance': Decimal('1200.00'), 'total_entries': 3,
+                       'total_debit': Decimal('500.00'), 'total_credit': Decimal('2000.00'), 'id': None}
+
+        with patch('database.db_connection.execute_query', return_value=[totals_only]):
+            period = fetch_period({'source_table': PERIOD_SOURCES}, date(2025, 4, 1), date(2025, 4, 30),
+                                  limit=50, offset=100)
+
+        assert period['rows'] == []
+        assert period['total_entries'] == 3
+        assert period['opening_balance'] == 1200.0
+        assert period['closing_balance'] == -300.0
@@ -0,0 +1,71 @@
+import multiprocessing
+
+import pytest
+
+from utils.metrics import MetricsRegistry, metrics, timed
+
+
+class TestMetricsRegistry:
+    """Unit tests for the in-process metrics registry"""
+
+    def test_counter_renders_with_labels(self):
+        registry = MetricsRegistry()
+        registry.inc('http_requests_total', endpoint='misc.health_check', method='GET', status=200)
+        registry.inc('http_requests_total', endpoint='misc.health_check', method='GET', status=200)
+
+        text = registry.render_prometheus()
+
+        assert '# TYPE http_requests_total counter' in text
+        assert 'http_requests_total{endpoint="misc.health_check",method="GET",status="200"} 2' in text
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry(buckets=(0.1, 1.0))
+        registry.observe('db_statement_duration_seconds', 0.05, endpoint='x')
+        registry.observe('db_statement_duration_seconds', 0.5, endpoint='x')
+        registry.observe('db_statement_duration_seconds', 5.0, endpoint='x')
+
+        text = registry.render_prometheus()
+
+        assert 'db_statement_duration_seconds_bucket{endpoint="x",le="0.1"} 1' in text
+        assert 'db_statement_duration_seconds_bucket{endpoint="x",le="1.0"} 2' in text
+        assert 'db_statement_duration_seconds_bucket{endpoint="x",le="+Inf"} 3' in text
+        assert 'db_statement_duration_seconds_count{endpoint="x"} 3' in text
+
+    def test_label_values_are_escaped(self):
+        registry = MetricsRegistry()
+        registry.inc('ocr_passes', config='--psm "6"')
+
+        assert 'config="--psm \\"6\\""' in registry.render_prometheus()
+
+    def test_timed_records_into_global_registry(self):
+        metrics.reset()
+        with timed('pdf_render_duration_seconds', template='certificate'):
+            pass
+
+        snapshot = metrics.snapshot()
+        series = snapshot['histograms']['pdf_render_duration_seconds']
+        assert series[(('template', 'certificate'),)]['count'] == 1
+
+    @pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason='needs fork')
+    def test_store_sums_series_of_every_process(self, tmp_path):
+        registry = MetricsRegistry(buckets=(0.1, 1.0), store_dir=str(tmp_path))
+        registry.inc('http_requests_total', endpoint='x')
+        registry.observe('db_statement_duration_seconds', 0.05, endpoint='x')
+
+        def worker():
+            # Starts empty: the parent's series are not counted twice
+            registry.inc('http_requests_total', 2, endpoint='x')
+            registry.observe('db_statement_duration_seconds', 0.5, endpoint='x')
+            registry.flush()
+
+        child = multiprocessing.get_context('fork').Process(target=worker)
+        child.start()
+        child.join(10)
+        assert child.exitcode == 0
+
+        text = registry.render_prometheus()
+
+        assert 'http_requests_total{endpoint="x"} 3' in text
+        assert 'db_statement_duration_seconds_bucket{endpoint="x",le="0.1"} 1' in text
+        assert 'db_statement_duration_seconds_count{endpoint="x"} 2' in text
+        assert len(list(tmp_path.glob('metrics.*.json'))) == 2
@@ -0,0 +1,51 @@
+from ocr.mrz import check_digit, find_mrz_lines, parse_td3
+
+# ICAO 9303 specimen passport
+LINE1 = "P<UTOERIKSSON<<ANNA<MARIA<<<<<<<<<<<<<<<<<<<"
+LINE2 = "L898902C36UTO7408122F1204159ZE184226B<<<<<10"
+
+
+class TestMRZ:
+    """Unit tests for MRZ parsing and check-digit validation"""
+
+    def test_check_digit(self):
+        assert check_digit("L898902C3") == "6"
+        assert check_digit("740812") == "2"
+        assert check_digit("120415") == "9"
+        assert check_digit("ZE184226B<<<<<") == "1"
+
+    def test_parse_specimen(self):
+        data = parse_td3(LINE1, LINE2)
+
+        assert data["valid"] is True
+        assert data["checks"]["composite"] is True
+        assert data["Passport No."] == "L898902C3"
+        assert data["Surname"] == "ERIKSSON"
+        assert data["Given Name(s)"] == "ANNA MARIA"
+        assert data["Nationality"] == "UTO"
+        assert data["Sex"] == "F"
+        assert data["Date of Birth"] == "12/08/1974"
+        assert data["Date of Expiry"] == "15/04/2012"
+
+    def test_ocr_confusions_in_numeric_fields_are_repaired(self):
+        noisy = LINE2.replace("7408122", "74O8l22")
+        data = parse_td3(LINE1, noisy)
+
+        assert data["checks"]["date_of_birth"] is True
+        assert data["Date of Birth"] == "12/08/1974"
+
+    def test_corrupted_number_fails_validation(self):
+        data = parse_td3(LINE1, "L898903C36" + LINE2[10:])
+
+        assert data["checks"]["passport_no"] is False
+        assert data["valid"] is False
+
+    def test_find_mrz_lines_in_noisy_text(self):
+        text = "REPUBLIC OF UTOPIA\nPASSPORT\n" + LINE1.replace("<<ANNA", " <<ANNA") + "\n" + LINE2 + "\n"
+        lines = find_mrz_lines(text)
+
+        assert lines == (LINE1, LINE2)
+
+    def test_short_lines_are_padded(self):
+        data = parse_td3(LINE1.rstrip('<'), LINE2)
+        assert data["mrz_lines"][0] == LINE1
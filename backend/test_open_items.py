@@ -0,0 +1,78 @@
+from datetime import date
+from decimal import Decimal
+
+import database.db_connection as db_connection
+from database.open_items import age_bucket, aging_report, allocate
+
+
+def ledger(id, day, debit=0, credit=0, voucher_no=None, reference_id=None):
+    return {'id': id, 'date': date(2025, 4, day), 'voucher_no': voucher_no,
+            'reference_id': reference_id, 'debit': Decimal(debit), 'credit': Decimal(credit)}
+
+
+class TestOpenItems:
+    """Unit tests for receipt-to-invoice allocation and aging buckets"""
+
+    def test_receipts_pay_oldest_invoices_first(self):
+        items, unapplied = allocate([
+            ledger(3, 10, debit=300, voucher_no='INV-3'),
+            ledger(1, 1, debit=100, voucher_no='INV-1'),
+            ledger(2, 5, debit=200, voucher_no='INV-2'),
+            ledger(4, 12, credit=250, voucher_no='RCPT-1'),
+        ])
+
+        assert [item['voucher_no'] for item in items] == ['INV-1', 'INV-2', 'INV-3']
+        assert [item['remaining'] for item in items] == [0, 50, 300]
+        assert unapplied == 0
+
+    def test_receipt_naming_an_invoice_is_applied_to_it_first(self):
+        items, unapplied = allocate([
+            ledger(1, 1, debit=100, voucher_no='INV-1'),
+            ledger(2, 5, debit=200, voucher_no='INV-2'),
+            ledger(3, 12, credit=250, voucher_no='RCPT-1', reference_id='INV-2'),
+        ])
+
+        # 200 settles INV-2, the other 50 goes FIFO to INV-1
+        assert [item['remaining'] for item in items] == [50, 0]
+        assert unapplied == 0
+
+    def test_receipt_on_an_earlier_row_is_not_ignored(self):
+        # The old dues query treated each debit row as unpaid on its own
+        items, unapplied = allocate([
+            ledger(1, 1, credit=500),
+            ledger(2, 3, debit=400, voucher_no='INV-1'),
+        ])
+
+        assert items[0]['remaining'] == 0
+        assert unapplied == Decimal('100')
+
+    def test_row_with_debit_and_credit_uses_net(self):
+        items, _ = allocate([ledger(1, 1, debit=100, credit=40, voucher_no='INV-1')])
+
+        assert items[0]['amount'] == Decimal('60')
+        assert items[0]['remaining'] == Decimal('60')
+
+    def test_age_buckets(self):
+        assert age_bucket(0) == '0-30'
+        assert age_bucket(30) == '0-30'
+        assert age_bucket(31) == '31-60'
+        assert age_bucket(90) == '61-90'
+        assert age_bucket(91) == '90+'
+
+    def test_past_aging_ignores_receipts_dated_later(self, monkeypatch):
+        rows = [dict(ledger(1, 1, debit=100, voucher_no='INV-1'), company_name='Ocean Lines'),
+                dict(ledger(2, 20, credit=100, voucher_no='RCPT-1'), company_name='Ocean Lines')]
+        queries = []
+
+        def execute_query(query, params=None, fetch=True):
+            queries.append(query)
+            return [row for row in rows if row['date'] <= params[0]]
+        monkeypatch.setattr(db_connection, 'execute_query', execute_query)
+
+        # On 10 April the receipt of 20 April had not come in yet
+        report = aging_report(as_of=date(2025, 4, 10))
+
+        assert 'l.date <= %s' in queries[0] and 'client_open_items' not in queries[0]
+        assert report[0]['outstanding'] == 100.0
+        assert report[0]['buckets']['0-30'] == 100.0
+        assert aging_report(as_of=date(2025, 4, 25)) == []
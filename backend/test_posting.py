@@ -0,0 +1,110 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+import database.posting as posting
+from database.posting import POSTING_SQL, IdempotencyConflict, post_entry, update_receipt
+
+RECEIPT = {
+    'amount_received': 1500, 'payment_type': 'NEFT', 'transaction_date': '2025-04-01',
+    'remark': None, 'account_no': '001', 'company_name': 'ACME', 'tds_amount': 0,
+    'gst_amount': 0, 'customer_name': 'Ocean Lines', 'transaction_id': 'UTR1', 'on_account_of': None
+}
+
+
+class UniqueViolation(Exception):
+    pgcode = '23505'
+
+
+class TestPostingEngine:
+    """Unit tests for atomic, idempotent ledger posting"""
+
+    @pytest.fixture(autouse=True)
+    def schema_ready(self, monkeypatch):
+        monkeypatch.setattr(posting, '_schema_ready', True)
+        monkeypatch.setattr(posting, 'ensure_open_items', lambda force=False: False)
+
+    def test_every_kind_is_a_single_statement(self):
+        for sql in POSTING_SQL.values():
+            assert sql.strip().startswith("WITH doc AS (")
+            assert "INSERT INTO posting_idempotency" in sql
+
+    def test_receipt_posts_all_legs_in_one_commit(self, make_conn):
+        conn, cursor = make_conn({'document_id': 7, 'client_ledger_rows': 1, 'bank_ledger_rows': 1})
+
+        result = post_entry('receipt', RECEIPT, idempotency_key='abc', conn=conn)
+
+        assert result == {'document_id': 7, 'client_ledger_rows': 1, 'bank_ledger_rows': 1, 'replayed': False}
+        # One posting statement, then the customer's open items are re-allocated
+        # in the same transaction before the single commit
+        statements = [call[0][0] for call in cursor.execute.call_args_list]
+        assert statements[0] == POSTING_SQL['receipt']
+        assert cursor.execute.call_args_list[0][0][1]['idempotency_key'] == 'abc'
+        assert not any('INSERT INTO ReceiptAmountReceived' in sql for sql in statements[1:])
+        assert any('client_unapplied_credit' in sql for sql in statements[1:])
+        conn.commit.assert_called_once()
+
+    def test_open_items_schema_is_installed_before_the_posting_statement(self, make_conn, monkeypatch):
+        conn, cursor = make_conn({'document_id': 7, 'client_ledger_rows': 1, 'bank_ledger_rows': 1})
+        events = []
+        monkeypatch.setattr(posting, 'ensure_open_items', lambda force=False: events.append('install'))
+        cursor.execute.side_effect = lambda *args: events.append('execute')
+
+        post_entry('receipt', RECEIPT, conn=conn)
+
+        assert events[0] == 'install'
+
+    def test_repeated_key_replays_original(self, make_conn):
+        conn, cursor = make_conn(None, {'document_id': 7})
+
+        result = post_entry('receipt', RECEIPT, idempotency_key='abc', conn=conn)
+
+        assert result['replayed'] is True
+        assert result['document_id'] == 7
+
+    def test_concurrent_duplicate_rolls_back_and_replays(self, make_conn):
+        conn, cursor = make_conn({'document_id': 9})
+        cursor.execute.side_effect = [UniqueViolation('duplicate key value violates "posting_idempotency_pkey"'), None]
+
+        result = post_entry('vendor_payment', {}, idempotency_key='k1', conn=conn)
+
+        conn.rollback.assert_called_once()
+        assert result == {'document_id': 9, 'client_ledger_rows': 0, 'bank_ledger_rows': 0, 'replayed': True}
+
+    def test_key_reused_for_other_kind_conflicts(self, make_conn):
+        conn, cursor = make_conn(None, None)
+
+        with pytest.raises(IdempotencyConflict):
+            post_entry('vendor_service', {}, idempotency_key='abc', conn=conn)
+
+    def test_failure_rolls_back(self, make_conn):
+        conn, cursor = make_conn()
+        cursor.execute.side_effect = RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            post_entry('receipt', RECEIPT, conn=conn)
+        conn.rollback.assert_called_once()
+        conn.commit.assert_not_called()
+
+    def test_receipt_update_refreshes_old_and_new_customer_before_commit(self, make_conn):
+        conn, cursor = make_conn({'old_customer_name': 'Ocean Lines', 'customer_name': 'Bay Shipping'})
+        refreshed = []
+        cursor.execute.side_effect = lambda sql, params=None: refreshed.append(params[0]) \
+            if 'FROM ClientLedger l' in sql else None
+
+        result = update_receipt(12, {'customer_name': 'Bay Shipping', 'on_account_of': 'INV-7'}, conn=conn)
+
+        assert result == {'old_customer_name': 'Ocean Lines', 'customer_name': 'Bay Shipping'}
+        update_sql, update_params = cursor.execute.call_args_list[0][0]
+        assert 'FOR UPDATE' in update_sql and 'customer_name = %s, on_account_of = %s' in update_sql
+        assert update_params == [12, 'Bay Shipping', 'INV-7']
+        assert refreshed == ['Bay Shipping', 'Ocean Lines']
+        conn.commit.assert_called_once()
+
+    def test_receipt_update_rejects_unknown_fields_and_reports_missing_receipts(self, make_conn):
+        with pytest.raises(ValueError):
+            update_receipt(12, {'receipt_amount_id': 1}, conn=MagicMock())
+
+        conn, cursor = make_conn(None)
+        assert update_receipt(12, {'remark': 'x'}, conn=conn) is None
+        assert cursor.execute.call_count == 1
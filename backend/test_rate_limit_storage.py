@@ -0,0 +1,56 @@
+import multiprocessing
+import time
+
+import pytest
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+
+from utils.rate_limit import SQLiteStorage
+
+
+def _hit_in_child(uri, key, hits):
+    storage = storage_from_string(uri)
+    for _ in range(hits):
+        storage.incr(key, 60)
+
+
+@pytest.fixture
+def uri(tmp_path):
+    return f"sqlite://{tmp_path / 'rate_limits.sqlite3'}"
+
+
+class TestRateLimitStorage:
+    """Unit tests for the SQLite rate limit storage shared across workers"""
+
+    def test_uri_scheme_selects_sqlite_storage(self, uri):
+        assert isinstance(storage_from_string(uri), SQLiteStorage)
+
+    def test_counts_are_shared_between_processes(self, uri):
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=_hit_in_child, args=(uri, 'upload/10.0.0.1', 25)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(10)
+
+        storage = storage_from_string(uri)
+        assert storage.get('upload/10.0.0.1') == 100
+        assert storage.incr('upload/10.0.0.1', 60) == 101
+
+    def test_windows_expire_and_limits_apply_across_instances(self, uri):
+        storage = SQLiteStorage(uri)
+        storage.incr('short', 1, amount=3)
+        assert storage.get('short') == 3
+        time.sleep(1.1)
+        assert storage.get('short') == 0
+        assert storage.incr('short', 1) == 1
+
+        limit = parse("5 per minute")
+        first, second = FixedWindowRateLimiter(SQLiteStorage(uri)), FixedWindowRateLimiter(SQLiteStorage(uri))
+        assert all(first.hit(limit, '10.0.0.2') for _ in range(3))
+        assert all(second.hit(limit, '10.0.0.2') for _ in range(2))
+        assert not first.hit(limit, '10.0.0.2')
+
+        storage.clear(limit.key_for('10.0.0.2'))
+        assert second.hit(limit, '10.0.0.2')
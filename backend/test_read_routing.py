@@ -0,0 +1,153 @@
+import psycopg2
+import pytest
+from flask import Flask, g
+
+import database.db_connection as db_connection
+from config import Config
+from database.db_connection import DatabaseConnection, execute_query
+from database.routing import ReplicaRouter, is_read_only, note_write, read_from_primary
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.conn.executed.append(' '.join(query.split()))
+        if self.conn.fail_with:
+            raise self.conn.fail_with
+
+    def fetchone(self):
+        return (self.conn.pool.lag_seconds,)
+
+    def fetchall(self):
+        return [{'served_by': self.conn.pool.name}]
+
+
+class FakeConnection:
+    def __init__(self, pool):
+        self.pool = pool
+        self.executed = []
+        self.fail_with = None
+        self.autocommit = False
+
+    def cursor(self, cursor_factory=None, name=None):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class FakePool:
+    def __init__(self, name, lag_seconds=0.0):
+        self.name = name
+        self.lag_seconds = lag_seconds
+        self.fail_next = None
+        self.closed = 0
+
+    def getconn(self):
+        conn = FakeConnection(self)
+        conn.fail_with, self.fail_next = self.fail_next, None
+        return conn
+
+    def putconn(self, conn, close=False):
+        self.closed += close
+
+
+class Clock:
+    now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def pools(monkeypatch):
+    primary, replica, clock = FakePool('primary'), FakePool('replica'), Clock()
+    monkeypatch.setattr(Config, 'DB_REPLICA_HOST', 'replica.local')
+    monkeypatch.setattr(DatabaseConnection, '_pool', primary)
+    monkeypatch.setattr(DatabaseConnection, '_replica_pool', replica)
+    monkeypatch.setattr(DatabaseConnection, '_replica_router', ReplicaRouter(5.0, 2.0, clock))
+    monkeypatch.setattr(DatabaseConnection, '_replica_conns', set())
+    monkeypatch.setattr(db_connection, 'get_slow_query_log', lambda: type('Log', (), {'record': lambda *a: None})())
+    return primary, replica, clock
+
+
+def served_by(query, **kwargs):
+    return execute_query(query, **kwargs)[0]['served_by']
+
+
+class TestReadRouting:
+    """Unit tests for read/write splitting between the primary and a read replica"""
+
+    def test_only_provably_read_only_statements_are_reads(self):
+        assert is_read_only("SELECT * FROM candidates WHERE candidate_name = %s")
+        assert is_read_only("WITH t AS (SELECT 1) SELECT * FROM t;")
+        assert is_read_only("SELECT created_at, updated_at FROM certificate_selections")
+        assert not is_read_only("INSERT INTO candidates (candidate_name) VALUES (%s) RETURNING id")
+        assert not is_read_only("WITH moved AS (DELETE FROM t RETURNING *) SELECT * FROM moved")
+        assert not is_read_only("SELECT * FROM journal_entries WHERE id = %s FOR UPDATE")
+        assert not is_read_only("SELECT nextval('certificate_serial_seq')")
+        assert not is_read_only("SELECT journal_reverse(%s, %s)")
+        assert not is_read_only("SELECT 1; DELETE FROM candidates")
+
+    def test_reads_go_to_the_replica_and_writes_to_the_primary(self, pools):
+        primary, replica, clock = pools
+
+        assert served_by("SELECT * FROM candidates") == 'replica'
+        assert served_by("INSERT INTO candidates (candidate_name) VALUES ('x') RETURNING id") == 'primary'
+        assert served_by("SELECT * FROM candidates", readonly=False) == 'primary'
+        with read_from_primary():
+            assert served_by("SELECT * FROM candidates") == 'primary'
+
+        # Lag above the limit sends reads to the primary until a later check sees it caught up
+        replica.lag_seconds = 30
+        clock.now += 3
+        assert served_by("SELECT * FROM candidates") == 'primary'
+        assert served_by("SELECT * FROM candidates") == 'primary'
+        replica.lag_seconds = 0.5
+        clock.now += 3
+        assert served_by("SELECT * FROM candidates") == 'replica'
+
+    def test_replica_errors_retry_on_the_primary(self, pools):
+        primary, replica, clock = pools
+        replica.fail_next = psycopg2.OperationalError("server closed the connection unexpectedly")
+
+        assert served_by("SELECT * FROM candidates") == 'primary'
+        assert replica.closed == 1
+        assert not DatabaseConnection.get_replica_router().healthy()
+        assert DatabaseConnection._replica_conns == set()
+
+    def test_requests_read_their_own_writes(self, pools):
+        app = Flask(__name__)
+        with app.test_request_context('/'):
+            assert served_by("SELECT 1") == 'replica'
+            note_write()
+            assert g.db_wrote and served_by("SELECT 1") == 'primary'
+        with app.test_request_context('/', headers={'X-Consistency': 'strong'}):
+            assert served_by("SELECT 1") == 'primary'
+
+    def test_transaction_connections_pin_the_request_to_the_primary(self, pools):
+        primary, replica, clock = pools
+        app = Flask(__name__)
+        with app.test_request_context('/'):
+            # A primary fallback for a read is not a write
+            replica.fail_next = psycopg2.OperationalError("server closed the connection unexpectedly")
+            assert served_by("SELECT 1") == 'primary'
+            assert not getattr(g, 'db_wrote', False)
+
+        clock.now += 3
+        with app.test_request_context('/'):
+            assert served_by("SELECT 1") == 'replica'
+            DatabaseConnection.return_connection(DatabaseConnection.get_connection())
+            assert served_by("SELECT 1") == 'primary'
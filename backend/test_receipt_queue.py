@@ -0,0 +1,46 @@
+import os
+
+import database.db_connection as db_connection
+from database.receipt_queue import PENDING, build_queue_query, fetch_receipt_queue
+
+INDEX_SQL = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         'add_receipt_queue_index_to_certificate_selections.sql')
+
+
+class TestReceiptQueue:
+    """Unit tests for the paginated receipt work queue"""
+
+    def test_query_filters_by_client_and_pages_groups_before_aggregating(self):
+        query, params = build_queue_query(client_name='Ocean Lines', limit=25, offset=50)
+
+        assert params == ['Ocean Lines', 25, 50]
+        assert f"WHERE {PENDING} AND client_name = %s" in query
+        # json_agg runs in the lateral join, after LIMIT has picked the page
+        assert query.index('LIMIT %s OFFSET %s') < query.index('json_agg')
+        assert 'COUNT(*) OVER ()' in query
+
+        all_query, all_params = build_queue_query()
+        assert all_params == [] and 'LIMIT' not in all_query
+
+    def test_pending_predicate_matches_the_partial_index(self):
+        with open(INDEX_SQL, encoding='utf-8') as f:
+            assert f"WHERE {PENDING};" in f.read()
+
+    def test_totals_come_from_the_page_or_a_count_past_the_end(self, monkeypatch):
+        calls = []
+
+        def execute_query(query, params=None, fetch=True):
+            calls.append(params)
+            if 'COUNT(DISTINCT' in query:
+                return [{'total_candidates': 3, 'total_certificates': 7}]
+            if params and params[-1] == 0:
+                return [{'candidate_id': 1, 'total_candidates': 3, 'total_certificates': 7}]
+            return []
+        monkeypatch.setattr(db_connection, 'execute_query', execute_query)
+
+        first = fetch_receipt_queue(limit=2, offset=0)
+        past_end = fetch_receipt_queue(client_name='Ocean Lines', limit=2, offset=10)
+
+        assert (first['total_candidates'], first['total_certificates']) == (3, 7)
+        assert past_end == {'rows': [], 'total_candidates': 3, 'total_certificates': 7}
+        assert calls[-1] == ['Ocean Lines']
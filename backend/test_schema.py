@@ -0,0 +1,88 @@
+import pytest
+
+import database.schema as schema
+from database.db_connection import DatabaseConnection
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.db.statements.append(query)
+        if query.startswith('CREATE') and self.db.fail_script:
+            raise RuntimeError('script failed')
+
+    def fetchone(self):
+        return (self.db.exists,)
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self):
+        return FakeCursor(self.db)
+
+    def commit(self):
+        self.db.commits += 1
+        if self.db.statements and self.db.statements[-1].startswith('CREATE'):
+            self.db.exists = True
+
+    def rollback(self):
+        self.db.rollbacks += 1
+
+
+class FakeDatabase:
+    def __init__(self, exists=False, fail_script=False):
+        self.exists = exists
+        self.fail_script = fail_script
+        self.statements = []
+        self.commits = self.rollbacks = 0
+
+
+@pytest.fixture
+def db(monkeypatch, tmp_path):
+    script = tmp_path / 'create_thing.sql'
+    script.write_text('CREATE TABLE thing ()', encoding='utf-8')
+    fake = FakeDatabase()
+    fake.script = str(script)
+    monkeypatch.setattr(schema, '_installed', set())
+    monkeypatch.setattr(DatabaseConnection, 'get_connection', classmethod(lambda cls: FakeConnection(fake)))
+    monkeypatch.setattr(DatabaseConnection, 'return_connection', classmethod(lambda cls, conn, close=False: None))
+    return fake
+
+
+class TestInstallOnce:
+    """Unit tests for the shared install-once schema helper"""
+
+    def test_script_runs_under_the_lock_after_a_second_check(self, db):
+        assert schema.install_once('SELECT true', db.script, lock_key=42) is True
+
+        assert db.statements == ['SELECT true', 'SELECT pg_advisory_xact_lock(%s)', 'SELECT true',
+                                 'CREATE TABLE thing ()']
+        assert db.commits == 1
+        # Remembered for the process: no further round trips
+        assert schema.install_once('SELECT true', db.script, lock_key=42) is False
+        assert len(db.statements) == 4
+
+    def test_existing_schema_is_only_checked(self, db):
+        db.exists = True
+
+        assert schema.install_once('SELECT true', db.script, lock_key=42) is False
+        assert db.statements == ['SELECT true']
+
+    def test_failed_install_is_not_remembered(self, db):
+        db.fail_script = True
+        with pytest.raises(RuntimeError):
+            schema.install_once('SELECT true', db.script, lock_key=42)
+        assert db.rollbacks == 1
+
+        db.fail_script = False
+        assert schema.install_once('SELECT true', db.script, lock_key=42) is True
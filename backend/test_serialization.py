@@ -0,0 +1,73 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+import pytest
+
+import database.db_connection as db_connection
+from utils.serialization import (ROWS, FieldSelectionError, encode_row, iter_json_array, iter_ndjson,
+                                 parse_fields, select_list)
+
+
+class TestSerialization:
+    """Unit tests for the compact, streaming JSON layer used by list endpoints"""
+
+    def test_row_types_are_encoded_without_copying(self):
+        row = {'id': 7, 'created_at': datetime(2025, 4, 1, 9, 30), 'date': date(2025, 4, 1),
+               'debit': Decimal('1500.00'), 'credit': Decimal('12.50'), 'json_data': '{"a": [1, 2]}'}
+
+        text = encode_row(row, raw=('json_data',))
+
+        assert text == ('{"id":7,"created_at":"2025-04-01T09:30:00","date":"2025-04-01",'
+                        '"debit":1500,"credit":12.5,"json_data":{"a": [1, 2]}}')
+        assert json.loads(text)['json_data'] == {'a': [1, 2]}
+
+    def test_projection_keeps_requested_order_and_rejects_unknown_fields(self):
+        allowed = ('id', 'company_name', 'gst_number')
+
+        assert parse_fields('', allowed) is None
+        assert parse_fields('gst_number, id,id', allowed) == ('gst_number', 'id')
+        assert encode_row({'id': 1, 'company_name': 'ACME', 'gst_number': None},
+                          fields=('gst_number', 'id')) == '{"gst_number":null,"id":1}'
+        with pytest.raises(FieldSelectionError):
+            parse_fields('id,password', allowed)
+        assert select_list({'id': 'c.id', 'files': "'[]'"}, ('files',)) == "'[]' AS files"
+
+    def test_chunked_array_keeps_the_envelope_and_appends_the_trailer(self):
+        rows = ({'id': i} for i in range(450))
+        envelope = {'status': 'success', 'data': {'entries': ROWS, 'summary': {'total_debit': 0}}}
+
+        chunks = list(iter_json_array(rows, envelope, trailer=lambda count: {'total': count}))
+        body = json.loads(''.join(chunks))
+
+        assert len(chunks) == 3
+        assert body['status'] == 'success'
+        assert [e['id'] for e in body['data']['entries']] == list(range(450))
+        assert body['data']['summary'] == {'total_debit': 0}
+        assert body['total'] == 450
+        assert json.loads(''.join(iter_json_array([], {'data': ROWS})))['data'] == []
+
+    def test_ndjson_writes_one_object_per_line(self):
+        lines = ''.join(iter_ndjson([{'id': 1}, {'id': 2}], fields=('id',))).splitlines()
+
+        assert [json.loads(line) for line in lines] == [{'id': 1}, {'id': 2}]
+
+    def test_stream_rows_uses_a_named_cursor_and_returns_the_connection(self, monkeypatch):
+        conn = MagicMock()
+        cursor = conn.cursor.return_value.__enter__.return_value
+        cursor.fetchmany.side_effect = [[{'id': 1}, {'id': 2}], [{'id': 3}], []]
+        returned = []
+        monkeypatch.setattr(db_connection.DatabaseConnection, 'get_read_connection', classmethod(lambda cls: conn))
+        monkeypatch.setattr(db_connection.DatabaseConnection, 'return_connection',
+                            classmethod(lambda cls, c: returned.append(c)))
+
+        rows = db_connection.stream_rows("SELECT id FROM candidates", batch_size=2)
+        assert next(rows) == {'id': 1}
+        assert returned == []
+        assert list(rows) == [{'id': 2}, {'id': 3}]
+
+        assert conn.cursor.call_args.kwargs['name'].startswith('stream_')
+        cursor.fetchmany.assert_called_with(2)
+        conn.rollback.assert_called_once()
+        assert returned == [conn]
@@ -0,0 +1,95 @@
+import json
+import os
+from unittest.mock import MagicMock
+
+from database.slow_query import SlowQueryLog, normalize_sql, params_shape, is_read_only
+
+
+class TestSlowQueryLog:
+    """Unit tests for the slow-query log used by execute_query"""
+
+    def test_normalize_sql_strips_literals_and_whitespace(self):
+        sql = """
+            SELECT * FROM ClientLedger
+            WHERE company_name = 'ACME'   AND debit > 100
+            AND id IN (%s, %s, %s)
+        """
+        assert normalize_sql(sql) == "SELECT * FROM ClientLedger WHERE company_name = ? AND debit > ? AND id IN (...)"
+
+    def test_params_shape_hides_values(self):
+        assert params_shape(('ACME', 5, None)) == ['str', 'int', 'NoneType']
+        assert params_shape({'name': 'x'}) == {'name': 'str'}
+
+    def test_is_read_only(self):
+        assert is_read_only("SELECT 1")
+        assert is_read_only("WITH x AS (SELECT 1) SELECT * FROM x")
+        assert not is_read_only("WITH x AS (DELETE FROM t RETURNING *) SELECT * FROM x")
+        assert not is_read_only("UPDATE t SET a = 1")
+        assert not is_read_only("SELECT nextval('certificate_serial_seq')")
+        assert not is_read_only("SELECT pg_advisory_xact_lock(%s)")
+
+    def test_fast_queries_are_ignored(self, tmp_path):
+        log = SlowQueryLog(str(tmp_path), threshold_ms=100)
+        assert log.record("SELECT 1", None, 0.01, 1) is None
+        assert log.top_offenders() == []
+
+    def test_slow_select_captures_analyze_plan_once(self, tmp_path):
+        log = SlowQueryLog(str(tmp_path), threshold_ms=100, explain_cooldown_seconds=3600)
+        conn = MagicMock()
+        cursor = conn.cursor.return_value.__enter__.return_value
+        cursor.fetchone.return_value = [[{"Plan": {"Node Type": "Seq Scan"}}]]
+
+        first = log.record("SELECT * FROM vendors WHERE id = %s", (1,), 0.5, 1, conn)
+        second = log.record("SELECT * FROM vendors WHERE id = %s", (2,), 0.7, 1, conn)
+
+        executed = cursor.execute.call_args_list[0][0][0]
+        assert executed.startswith("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) ")
+        assert first["explain"]["analyzed"] is True
+        assert "explain" not in second
+        assert cursor.execute.call_count == 1
+
+    def test_writes_are_explained_without_analyze(self, tmp_path):
+        log = SlowQueryLog(str(tmp_path), threshold_ms=0)
+        conn = MagicMock()
+        cursor = conn.cursor.return_value.__enter__.return_value
+        cursor.fetchone.return_value = [[{}]]
+
+        entry = log.record("DELETE FROM vendor_payments WHERE id = %s", (1,), 0.2, 1, conn)
+
+        assert cursor.execute.call_args[0][0].startswith("EXPLAIN (FORMAT JSON) DELETE")
+        assert entry["explain"]["analyzed"] is False
+
+    def test_top_offenders_ranks_by_total_time(self, tmp_path):
+        log = SlowQueryLog(str(tmp_path), threshold_ms=0)
+        log.record("SELECT * FROM a WHERE id = 1", None, 0.3, 1)
+        log.record("SELECT * FROM a WHERE id = 2", None, 0.3, 1)
+        log.record("SELECT * FROM b", None, 0.5, 10)
+
+        offenders = log.top_offenders()
+
+        assert offenders[0]["sql"] == "SELECT * FROM a WHERE id = ?"
+        assert offenders[0]["count"] == 2
+        assert offenders[0]["total_ms"] == 600.0
+        assert offenders[1]["max_ms"] == 500.0
+
+    def test_side_effecting_selects_are_explained_without_analyze(self, tmp_path):
+        log = SlowQueryLog(str(tmp_path), threshold_ms=0)
+        conn = MagicMock()
+        cursor = conn.cursor.return_value.__enter__.return_value
+        cursor.fetchone.return_value = [[{}]]
+
+        entry = log.record("SELECT nextval('certificate_serial_seq')", None, 0.2, 1, conn)
+
+        # EXPLAIN ANALYZE would run nextval() again and burn a serial number
+        assert cursor.execute.call_args[0][0] == "EXPLAIN (FORMAT JSON) SELECT nextval('certificate_serial_seq')"
+        assert entry["explain"]["analyzed"] is False
+
+    def test_each_process_writes_its_own_store(self, tmp_path):
+        log = SlowQueryLog(str(tmp_path), threshold_ms=0)
+        log.record("SELECT * FROM a", None, 0.3, 1)
+        # An entry written by another worker into its own file
+        with open(os.path.join(str(tmp_path), 'slow_queries.999999.jsonl'), 'w', encoding='utf-8') as f:
+            f.write(json.dumps({"fingerprint": "other", "sql": "SELECT * FROM b", "duration_ms": 100.0}) + "\n")
+
+        assert os.path.exists(os.path.join(str(tmp_path), f'slow_queries.{os.getpid()}.jsonl'))
+        assert {agg["sql"] for agg in log.top_offenders()} == {"SELECT * FROM a", "SELECT * FROM b"}
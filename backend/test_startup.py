@@ -0,0 +1,29 @@
+import subprocess
+import sys
+import os
+
+from utils.startup import StartupReport
+
+
+class TestStartup:
+    """Unit tests for startup timing and import hygiene"""
+
+    def test_phases_record_time_and_new_modules(self):
+        report = StartupReport()
+
+        with report.phase('json'):
+            import json  # noqa: F401
+        report.import_modules(['colorsys', 'module_that_does_not_exist'])
+
+        names = [phase['name'] for phase in report.as_dict()['phases']]
+        assert names == ['json', 'import colorsys']
+        assert 'import colorsys' in report.format()
+
+    def test_config_does_not_import_ocr_or_openai(self):
+        code = ("import sys, config; "
+                "print('loaded:' + ','.join(m for m in ('pytesseract', 'cv2', 'numpy', 'openai') if m in sys.modules))")
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip().splitlines()[-1] == 'loaded:'
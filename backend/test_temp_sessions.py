@@ -0,0 +1,180 @@
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+from utils.temp_sessions import TempSessionManager, MANIFEST_FILENAME
+
+
+def _make_session(root, session_id, files):
+    folder = os.path.join(root, session_id)
+    os.makedirs(folder, exist_ok=True)
+    for name, size in files.items():
+        with open(os.path.join(folder, name), 'wb') as f:
+            f.write(b'x' * size)
+    return folder
+
+
+class TestTempSessionManager:
+    """Unit tests for the temp upload session janitor"""
+
+    def test_register_writes_manifest(self, tmp_path):
+        root = str(tmp_path)
+        _make_session(root, 'abc', {'photo.png': 10, 'signature.png': 5})
+        manager = TempSessionManager(root, ttl_hours=1)
+
+        manifest = manager.register_session('abc', {'photo': 'photo.png'})
+
+        with open(os.path.join(root, 'abc', MANIFEST_FILENAME)) as f:
+            on_disk = json.load(f)
+        assert on_disk['total_bytes'] == 15
+        assert manifest['files'] == {'photo.png': 10, 'signature.png': 5}
+        assert manager.stats()['sessions'] == 1
+
+    def test_evict_expired_only_touches_due_sessions(self, tmp_path):
+        root = str(tmp_path)
+        _make_session(root, 'old', {'photo.png': 10})
+        _make_session(root, 'new', {'photo.png': 10})
+        manager = TempSessionManager(root, ttl_hours=1)
+        manager.register_session('old')
+        manager.register_session('new')
+
+        # Push "old" into the past by rewriting its manifest and index entry
+        manager._sessions['old']['expires_at'] = time.time() - 10
+        manager._write_manifest(manager._sessions['old'])
+        manager._heap.append((manager._sessions['old']['expires_at'], 'old'))
+        manager._heap.sort()
+
+        result = manager.evict_expired()
+
+        assert result['removed'] == ['old']
+        assert not os.path.exists(os.path.join(root, 'old'))
+        assert os.path.exists(os.path.join(root, 'new'))
+
+    def test_batch_size_bounds_eviction(self, tmp_path):
+        root = str(tmp_path)
+        manager = TempSessionManager(root, ttl_hours=1, batch_size=2)
+        for i in range(5):
+            _make_session(root, f's{i}', {'a.png': 1})
+            manager.register_session(f's{i}')
+
+        result = manager.evict_expired(now=datetime.now() + timedelta(hours=2))
+
+        assert len(result['removed']) == 2
+        assert manager.stats()['sessions'] == 3
+
+    def test_pdf_sessions_are_protected(self, tmp_path):
+        root = str(tmp_path)
+        _make_session(root, 'pdf', {'invoice.pdf': 10})
+        manager = TempSessionManager(root, ttl_hours=1)
+        manager.register_session('pdf')
+
+        result = manager.evict_expired(now=datetime.now() + timedelta(hours=2))
+
+        assert result['skipped'] == ['pdf']
+        assert os.path.exists(os.path.join(root, 'pdf'))
+        # Still on disk, so still indexed and counted against the quota
+        assert manager.stats()['sessions'] == 1
+        assert manager.stats()['total_bytes'] == 10
+
+    def test_failed_removals_stay_indexed_and_are_retried(self, tmp_path, monkeypatch):
+        root = str(tmp_path)
+        _make_session(root, 'stuck', {'photo.png': 10})
+        manager = TempSessionManager(root, ttl_hours=1, quota_bytes=5)
+        manager.register_session('stuck')
+        later = datetime.now() + timedelta(hours=2)
+
+        def fail(path):
+            raise PermissionError('in use')
+        monkeypatch.setattr('utils.temp_sessions.shutil.rmtree', fail)
+
+        assert len(manager.evict_expired(now=later)['errors']) == 1
+        assert len(manager.enforce_quota()['errors']) == 1
+        assert manager.stats()['total_bytes'] == 10
+
+        monkeypatch.undo()
+        result = manager.evict_expired(now=later)
+
+        assert result['removed'] == ['stuck']
+        assert not os.path.exists(os.path.join(root, 'stuck'))
+        assert manager.stats()['sessions'] == 0
+        assert manager.stats()['total_bytes'] == 0
+
+    def test_quota_evicts_oldest_first(self, tmp_path):
+        root = str(tmp_path)
+        manager = TempSessionManager(root, ttl_hours=1, quota_bytes=25)
+        for name in ('first', 'second', 'third'):
+            _make_session(root, name, {'a.png': 10})
+            manager.register_session(name)
+            manager._sessions[name]['created_at'] -= {'first': 30, 'second': 20, 'third': 10}[name]
+
+        result = manager.enforce_quota()
+
+        assert result['removed'] == ['first']
+        assert manager.stats()['total_bytes'] == 20
+
+    def test_legacy_folders_are_indexed_on_startup(self, tmp_path):
+        root = str(tmp_path)
+        folder = _make_session(root, 'legacy', {'photo.png': 7})
+        old = time.time() - 3 * 3600
+        os.utime(folder, (old, old))
+
+        manager = TempSessionManager(root, ttl_hours=1)
+        result = manager.evict_expired()
+
+        assert result['removed'] == ['legacy']
+
+    def test_sessions_refreshed_by_another_worker_are_kept(self, tmp_path):
+        root = str(tmp_path)
+        _make_session(root, 'active', {'photo.png': 10})
+        worker_a = TempSessionManager(root, ttl_hours=1)
+        worker_b = TempSessionManager(root, ttl_hours=3)
+        first = worker_a.register_session('active')
+        # Worker B sees more files arrive and refreshes the manifest
+        refreshed = worker_b.touch_session('active')
+
+        assert refreshed['created_at'] == first['created_at']
+        result = worker_a.evict_expired(now=datetime.now() + timedelta(hours=2))
+
+        assert result['removed'] == []
+        assert os.path.exists(os.path.join(root, 'active'))
+        assert worker_a._sessions['active']['expires_at'] == refreshed['expires_at']
+
+    def test_refresh_between_sync_and_delete_is_detected(self, tmp_path):
+        root = str(tmp_path)
+        _make_session(root, 'active', {'photo.png': 10})
+        manager = TempSessionManager(root, ttl_hours=1)
+        manifest = manager.register_session('active')
+        on_disk = dict(manifest, expires_at=manifest['expires_at'] + 3600)
+        manager._write_manifest(on_disk)
+
+        result = manager._remove_batch([manifest], requeue=True)
+
+        assert result['removed'] == []
+        assert os.path.exists(os.path.join(root, 'active'))
+        assert manager._sessions['active']['expires_at'] == on_disk['expires_at']
+
+    def test_quota_counts_sessions_of_every_worker(self, tmp_path):
+        root = str(tmp_path)
+        worker_a = TempSessionManager(root, ttl_hours=1, quota_bytes=15)
+        worker_b = TempSessionManager(root, ttl_hours=1, quota_bytes=15)
+        _make_session(root, 'from_a', {'a.png': 10})
+        worker_a.register_session('from_a')
+        _make_session(root, 'from_b', {'a.png': 10})
+        worker_b.register_session('from_b')
+        os.utime(os.path.join(root, 'from_b', MANIFEST_FILENAME), (time.time() + 5, time.time() + 5))
+
+        result = worker_a.enforce_quota()
+
+        assert result['removed'] == ['from_a']
+        assert worker_a.stats()['total_bytes'] == 10
+
+    def test_only_one_process_holds_the_janitor_lock(self, tmp_path):
+        worker_a = TempSessionManager(str(tmp_path))
+        worker_b = TempSessionManager(str(tmp_path))
+
+        assert worker_a.acquire_janitor_lock()
+        assert not worker_b.acquire_janitor_lock()
+        worker_a.release_janitor_lock()
+        assert worker_b.acquire_janitor_lock()
+        worker_b.release_janitor_lock()
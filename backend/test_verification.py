@@ -0,0 +1,123 @@
+import json
+import os
+from datetime import date
+
+import utils.verification as verification
+from utils.verification import LRUCache, VerificationService, build_record, sign_record, verification_payload
+
+ROW = {
+    'id': 5, 'candidate_id': 9, 'candidate_name': 'JOHN DOE', 'client_name': 'Ocean Lines',
+    'certificate_name': 'Basic Safety', 'certificate_number': 'BST-001', 'start_date': '2025-01-01',
+    'end_date': '2025-01-05', 'issue_date': '2025-01-06', 'expiry_date': '06-01-2030',
+    'serial_number': '001', 'json_data': {'passport': 'P123', 'nationality': 'INDIAN'}
+}
+
+
+class FakeDatabase:
+    """execute_query stand-in that answers the verification service's queries"""
+
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.records = {}
+        self.calls = []
+
+    def __call__(self, sql, params=None, fetch=True):
+        self.calls.append(sql)
+        if 'FROM certificate_verifications WHERE certificate_number' in sql:
+            record = self.records.get(params[0])
+            return [{'record': record}] if record else []
+        if 'FROM certificate_selections cs' in sql:
+            return [row for row in self.rows if params is None or params[0] == row['certificate_number']]
+        if 'INSERT INTO certificate_verifications' in sql:
+            self.records[params[0]] = json.loads(params[3])
+        return []
+
+
+class TestVerification:
+    """Unit tests for the cached QR verification path"""
+
+    def test_record_normalizes_expiry_once(self):
+        record = build_record(ROW)
+
+        assert record['expiry_date_iso'] == '2030-01-06'
+        assert record['passport'] == 'P123'
+        assert verification_payload(record, today=date(2029, 1, 1))['status'] == 'VALID'
+        expired = verification_payload(record, today=date(2030, 1, 7))
+        assert expired['status'] == 'EXPIRED'
+        assert 'expiry_date_iso' not in expired
+
+    def test_lookup_precomputes_then_serves_from_cache(self):
+        db = FakeDatabase([ROW])
+        service = VerificationService(query=db)
+        service._schema_ready = True
+
+        first = service.lookup('BST-001')
+        calls_after_first = len(db.calls)
+        second = service.lookup('BST-001')
+
+        assert first == second
+        assert db.records['BST-001']['certificate_number'] == 'BST-001'
+        assert len(db.calls) == calls_after_first
+
+    def test_unknown_numbers_are_negatively_cached(self):
+        db = FakeDatabase()
+        service = VerificationService(query=db)
+        service._schema_ready = True
+
+        assert service.lookup('NOPE') is None
+        calls = len(db.calls)
+        assert service.lookup('NOPE') is None
+        assert len(db.calls) == calls
+        assert service.cache.stats['negative_hits'] == 1
+
+    def test_lru_evicts_least_recently_used(self):
+        cache = LRUCache(max_entries=2)
+        cache.put('a', {'n': 1})
+        cache.put('b', {'n': 2})
+        cache.get('a')
+        cache.put('c', {'n': 3})
+
+        assert 'b' not in cache._entries
+        assert cache.get('a') == {'n': 1}
+
+    def test_static_record_is_signed(self, tmp_path):
+        db = FakeDatabase([ROW])
+        service = VerificationService(query=db, static_dir=str(tmp_path), signing_key='secret')
+        service._schema_ready = True
+
+        service.lookup('BST-001')
+
+        with open(os.path.join(tmp_path, 'BST-001.json')) as f:
+            document = json.load(f)
+        assert document['signature'] == sign_record(document['verification'], 'secret')
+
+    def test_failed_refresh_discards_records_so_the_next_scan_rebuilds(self, monkeypatch):
+        db = FakeDatabase([ROW])
+        service = VerificationService(query=db)
+        service._schema_ready = True
+        service.lookup('BST-001')
+        monkeypatch.setattr(verification, 'get_verification_service', lambda: service)
+
+        # The candidate's passport changes, but the refresh query fails
+        updated = dict(ROW, json_data={'passport': 'P999', 'nationality': 'INDIAN'})
+        fail = {'on': True}
+
+        def query(sql, params=None, fetch=True):
+            if fail['on'] and 'FROM certificate_selections cs' in sql:
+                raise RuntimeError('connection lost')
+            if 'DELETE FROM certificate_verifications' in sql and 'RETURNING' in sql:
+                gone = list(db.records) if params[1] == ROW['candidate_id'] else []
+                for number in gone:
+                    del db.records[number]
+                return [{'certificate_number': number} for number in gone]
+            if 'DELETE FROM certificate_verifications' in sql:
+                return None
+            return db(sql, params, fetch)
+        service._query = query
+        db.rows = [updated]
+
+        verification.invalidate_certificates(candidate_id=9)
+
+        assert 'BST-001' not in db.records
+        fail['on'] = False
+        assert service.lookup('BST-001')['passport'] == 'P999'
@@ -0,0 +1,290 @@
+"""
+File storage for certificate selection artifacts
+
+Verification and certificate images used to be kept in certificate_selections
+itself (BYTEA on older installs, a path string on newer ones), so any wide
+SELECT dragged TOASTed blobs over the wire. Artifacts now live on disk under
+CERTIFICATE_STORAGE_PATH/CERTIFICATE_<id>/ and the row only keeps a typed
+reference: <kind>_file_path and <kind>_mime_type. PDFs generated by
+/generate-certificate stay in uploads/certificates and are referenced by their
+existing 'uploads/certificates/<file>.pdf' path.
+
+Rows written before this change are moved over in batches by
+migrate_legacy_images() (see migrate_certificate_images_to_files.py); until
+then the image routes fall back to the legacy column.
+
+Usage:
+    from utils.certificate_files import get_certificate_files, decode_image_data
+
+    data, mime_type = decode_image_data(payload['verificationImageData'])
+    rel_path = get_certificate_files().save(certificate_id, 'verification', data, mime_type)
+    full_path = get_certificate_files().resolve(rel_path)
+"""
+
+import base64
+import binascii
+import logging
+import os
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+KINDS = ('verification', 'certificate')
+
+# Reference columns per kind: (path column, mime type column, legacy column)
+COLUMNS = {
+    'verification': ('verification_file_path', 'verification_mime_type', 'verification_image'),
+    'certificate': ('certificate_file_path', 'certificate_mime_type', 'certificate_image'),
+}
+
+# Stored paths of generated PDFs, relative to the backend directory
+GENERATED_PREFIXES = ('backend/uploads/certificates/', 'uploads/certificates/')
+
+EXTENSIONS = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/webp': '.webp',
+    'image/gif': '.gif',
+    'application/pdf': '.pdf',
+}
+
+_SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF8', 'image/gif'),
+    (b'%PDF', 'application/pdf'),
+)
+
+# Legacy values no longer than this may be a path stored as text
+_MAX_PATH_LENGTH = 500
+
+
+def sniff_mime_type(data):
+    """MIME type from the leading bytes of a file"""
+    head = bytes(data[:12])
+    for signature, mime_type in _SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'application/octet-stream'
+
+
+def mime_type_for_path(path):
+    """MIME type from a file name's extension"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.jpeg':
+        return 'image/jpeg'
+    for mime_type, known in EXTENSIONS.items():
+        if ext == known:
+            return mime_type
+    return 'application/octet-stream'
+
+
+def decode_image_data(value):
+    """
+    Decode a browser-rendered image sent as base64 or a data: URL.
+
+    Args:
+        value (str): 'data:image/png;base64,...' or bare base64
+
+    The type is sniffed from the bytes; the type a data: URL declares is
+    ignored, since it would be stored and served back as Content-Type.
+
+    Returns:
+        tuple: (bytes, mime_type), mime_type one of EXTENSIONS
+
+    Raises:
+        ValueError: If the value is not valid base64 or not an allowed file type
+    """
+    if value.startswith('data:'):
+        value = value.partition(',')[2]
+    try:
+        data = base64.b64decode(value, validate=False)
+    except (binascii.Error, ValueError) as e:
+        raise ValueError(f"Invalid image data: {e}")
+    if not data:
+        raise ValueError("Invalid image data: empty")
+    mime_type = sniff_mime_type(data)
+    if mime_type not in EXTENSIONS:
+        raise ValueError("Invalid image data: not a JPEG, PNG, WebP, GIF or PDF file")
+    return data, mime_type
+
+
+class CertificateFileStore:
+    """Certificate artifacts on disk, addressed by paths relative to the store"""
+
+    def __init__(self, root, generated_root):
+        self.root = root
+        self.generated_root = generated_root
+
+    def relative_path(self, certificate_id, kind, mime_type):
+        """Stored path for one artifact, e.g. CERTIFICATE_12/verification.jpg"""
+        if kind not in COLUMNS:
+            raise ValueError(f"Unknown certificate file kind: {kind}")
+        return f"CERTIFICATE_{int(certificate_id)}/{kind}{EXTENSIONS.get(mime_type, '.bin')}"
+
+    def resolve(self, rel_path):
+        """
+        Absolute path of a stored reference.
+
+        Raises:
+            ValueError: If the reference points outside its store
+        """
+        rel_path = rel_path.replace('\\', '/')
+        root = self.root
+        for prefix in GENERATED_PREFIXES:
+            if rel_path.startswith(prefix):
+                root, rel_path = self.generated_root, rel_path[len(prefix):]
+                break
+        root = os.path.abspath(root)
+        full_path = os.path.abspath(os.path.join(root, rel_path))
+        if os.path.commonpath([root, full_path]) != root or full_path == root:
+            raise ValueError(f"Certificate file path escapes its store: {rel_path}")
+        return full_path
+
+    def save(self, certificate_id, kind, data, mime_type=None):
+        """
+        Write one artifact atomically and return its stored path.
+
+        Args:
+            certificate_id (int): certificate_selections.id
+            kind (str): 'verification' or 'certificate'
+            data (bytes): File content
+            mime_type (str): Content type (sniffed from data when omitted)
+
+        Returns:
+            tuple: (relative path, mime type, size in bytes)
+        """
+        mime_type = mime_type or sniff_mime_type(data)
+        rel_path = self.relative_path(certificate_id, kind, mime_type)
+        full_path = self.resolve(rel_path)
+        folder = os.path.dirname(full_path)
+        os.makedirs(folder, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=folder, prefix='.tmp_')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, full_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return rel_path, mime_type, len(data)
+
+    def remove(self, rel_path):
+        """Delete a stored artifact, ignoring files that are already gone"""
+        try:
+            os.remove(self.resolve(rel_path))
+        except FileNotFoundError:
+            pass
+
+    def reference_for_legacy(self, certificate_id, kind, value):
+        """
+        Turn a legacy verification_image/certificate_image value into a reference.
+
+        Depending on the install the column held image bytes (BYTEA), a
+        generated PDF's path (VARCHAR), or that path written into a BYTEA
+        column as text. Bytes are written to the store; paths are kept.
+
+        Returns:
+            tuple: (relative path, mime type)
+        """
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            data = bytes(value)
+            if len(data) <= _MAX_PATH_LENGTH and data.startswith(tuple(p.encode() for p in GENERATED_PREFIXES)):
+                value = data.decode('utf-8')
+            else:
+                rel_path, mime_type, _ = self.save(certificate_id, kind, data)
+                return rel_path, mime_type
+        return value, mime_type_for_path(value)
+
+
+def _legacy_batch(cursor, kind, after_id, batch_size):
+    path_column, _, legacy_column = COLUMNS[kind]
+    cursor.execute(f"""
+        SELECT id, {legacy_column} AS value
+        FROM certificate_selections
+        WHERE id > %s AND {legacy_column} IS NOT NULL AND {path_column} IS NULL
+        ORDER BY id
+        LIMIT %s
+    """, (after_id, batch_size))
+    return cursor.fetchall()
+
+
+def migrate_legacy_images(store=None, batch_size=50, kinds=KINDS):
+    """
+    Move legacy column values into the file store, one committed batch at a time.
+
+    Each batch writes its files first and then sets the reference columns and
+    clears the legacy value in one transaction, so an interrupted run can be
+    started again. Files left behind by a failed batch are picked up by the
+    orphaned file GC.
+
+    Args:
+        store (CertificateFileStore): Target store (default from Config)
+        batch_size (int): Rows per transaction
+        kinds (tuple): Artifact kinds to migrate
+
+    Returns:
+        dict: kind -> {'migrated': int, 'errors': int}
+    """
+    from psycopg2.extras import RealDictCursor
+    from database.db_connection import DatabaseConnection
+
+    store = store or get_certificate_files()
+    report = {}
+    conn = DatabaseConnection.get_connection()
+    try:
+        for kind in kinds:
+            path_column, mime_column, legacy_column = COLUMNS[kind]
+            migrated = errors = 0
+            after_id = 0
+            while True:
+                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                    rows = _legacy_batch(cursor, kind, after_id, batch_size)
+                    if not rows:
+                        conn.rollback()
+                        break
+                    for row in rows:
+                        try:
+                            rel_path, mime_type = store.reference_for_legacy(row['id'], kind, row['value'])
+                        except (OSError, ValueError) as e:
+                            errors += 1
+                            logger.error(f"[CERT FILES] Could not migrate {kind} of certificate {row['id']}: {e}")
+                            continue
+                        cursor.execute(f"""
+                            UPDATE certificate_selections
+                            SET {path_column} = %s, {mime_column} = %s, {legacy_column} = NULL
+                            WHERE id = %s
+                        """, (rel_path, mime_type, row['id']))
+                        migrated += 1
+                    conn.commit()
+                    after_id = rows[-1]['id']
+                logger.info(f"[CERT FILES] {kind}: migrated {migrated} rows (up to id {after_id})")
+            report[kind] = {'migrated': migrated, 'errors': errors}
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        DatabaseConnection.return_connection(conn)
+    return report
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_certificate_files():
+    """Return the process-wide CertificateFileStore configured from Config"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                from config import Config
+                _store = CertificateFileStore(
+                    Config.CERTIFICATE_STORAGE_PATH,
+                    os.path.join(Config.UPLOAD_FOLDER, 'certificates')
+                )
+    return _store
@@ -2,7 +2,6 @@ import json
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import openai_client, Config
 
 def enhanced_regex_filtering(raw_text, document_type="passport_front"):
     """Enhanced regex-based text filtering as fallback"""
@@ -130,19 +129,44 @@ def enhanced_regex_filtering(raw_text, document_type="passport_front"):
                 print(f"[REGEX] Found date of birth: {result['Date of Birth']}")
                 break
 
+    elif document_type == "cdc":
+        # Match on the raw upper-cased text; the O->0 cleanup above mangles labels like INDOS
+        raw_upper = raw_text.upper()
+
+        cdc_patterns = [
+            r'CDC\s*NO[.:]?\s*([A-Z0-9]{6,})',
+            r'CDC[:\s]*([A-Z0-9]{6,})',
+            r'CERTIFICATE\s*NO[.:]?\s*([A-Z0-9]{6,})',
+        ]
+
+        for pattern in cdc_patterns:
+            match = re.search(pattern, raw_upper)
+            if match:
+                result["cdc_no"] = match.group(1)
+                print(f"[REGEX] Found CDC number: {result['cdc_no']}")
+                break
+
+        indos_patterns = [
+            r'INDOS\s*NO[.:]?\s*([A-Z0-9]{6,})',
+            r'INDOS[:\s]*([A-Z0-9]{6,})',
+        ]
+
+        for pattern in indos_patterns:
+            match = re.search(pattern, raw_upper)
+            if match:
+                result["indos_no"] = match.group(1)
+                print(f"[REGEX] Found INDOS number: {result['indos_no']}")
+                break
+
     return result if result else None
 
-def filter_text_with_chatgpt(raw_text, document_type="passport_front"):
-    """Use ChatGPT to filter and extract structured data from OCR text"""
-    if not openai_client or not Config.OPENAI_API_KEY:
-        print("[CHATGPT] API key not configured, using enhanced regex filtering")
-        return enhanced_regex_filtering(raw_text, document_type)
+SYSTEM_PROMPT = "You are an expert at extracting structured data from passport and certificate documents. Always return valid JSON."
 
-    try:
-        print(f"[CHATGPT] Processing {document_type} with AI...")
 
-        if document_type == "passport_front":
-            prompt = f"""Extract passport information from this OCR text. The text may contain errors and noise.
+def build_extraction_prompt(raw_text, document_type="passport_front"):
+    """Build the field-extraction prompt for a document type"""
+    if document_type == "passport_front":
+        return f"""Extract passport information from this OCR text. The text may contain errors and noise.
 Please extract only the following fields and return as JSON:
 - "Passport No.": passport number
 - "Surname": last name/family name
@@ -156,8 +180,8 @@ OCR Text:
 
 Return only valid JSON with the extracted fields. If a field cannot be found, use empty string."""
 
-        elif document_type == "passport_back":
-            prompt = f"""Extract address information from this passport back page OCR text.
+    elif document_type == "passport_back":
+        return f"""Extract address information from this passport back page OCR text.
 Please extract only the Address field and return as JSON:
 - "Address": complete address
 
@@ -166,8 +190,8 @@ OCR Text:
 
 Return only valid JSON. If address cannot be found, use empty string."""
 
-        elif document_type == "cdc":
-            prompt = f"""Extract CDC certificate information from this OCR text.
+    elif document_type == "cdc":
+        return f"""Extract CDC certificate information from this OCR text.
 Please extract only the following fields and return as JSON:
 - "cdc_no": CDC number/certificate number
 - "indos_no": INDOS number
@@ -177,29 +201,37 @@ OCR Text:
 
 Return only valid JSON. If a field cannot be found, use empty string."""
 
-        response = openai_client.chat.completions.create(
-            model=Config.OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": "You are an expert at extracting structured data from passport and certificate documents. Always return valid JSON."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=Config.OPENAI_MAX_TOKENS,
-            temperature=Config.OPENAI_TEMPERATURE
-        )
-
-        # Parse the JSON response
-        content = response.choices[0].message.content.strip()
-        # Remove markdown code blocks if present
-        if content.startswith("```json"):
-            content = content[7:-3]
-        elif content.startswith("```"):
-            content = content[3:-3]
-
-        extracted_data = json.loads(content)
-        print(f"[CHATGPT] Successfully extracted data: {extracted_data}")
+    raise ValueError(f"Unsupported document type: {document_type}")
+
+
+def parse_json_response(content):
+    """Parse the model's JSON reply, tolerating markdown code fences"""
+    content = content.strip()
+    # Remove markdown code blocks if present
+    if content.startswith("```json"):
+        content = content[7:-3]
+    elif content.startswith("```"):
+        content = content[3:-3]
+    return json.loads(content)
+
+
+def filter_text_with_chatgpt(raw_text, document_type="passport_front"):
+    """
+    Extract structured data from OCR text.
+
+    Delegates to the extraction service: cached results and validated regex
+    results are returned without calling the API; otherwise ChatGPT is
+    called with a deadline and regex filtering is the fallback.
+    """
+    from utils.extraction import get_extraction_service
+
+    try:
+        print(f"[CHATGPT] Processing {document_type}...")
+        extracted_data = get_extraction_service().extract(raw_text, document_type)
+        print(f"[CHATGPT] Extracted data: {extracted_data}")
         return extracted_data
 
     except Exception as e:
         print(f"[CHATGPT] Error filtering text: {e}")
         print("[CHATGPT] Falling back to enhanced regex filtering")
-        return enhanced_regex_filtering(raw_text, document_type)
\ No newline at end of file
+        return enhanced_regex_filtering(raw_text, document_type)
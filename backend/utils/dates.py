@@ -0,0 +1,46 @@
+"""
+Certificate date parsing
+
+Certificate dates reach the backend in several spellings: DD-MM-YYYY from the
+certificate editor, YYYY-MM-DD from date inputs and the API, and DD/MM/YYYY
+or 'DD / MM / YYYY' from legacy CSV exports. parse_date() turns any of them
+into a date before it is written, so certificate_selections and
+legacy_certificates hold typed DATE columns (normalize_certificate_dates.sql
+converted the old text values with certificate_date(), which accepts the
+same formats) and nothing re-parses strings when reading them back.
+
+Usage:
+    from utils.dates import parse_date
+
+    expiry = parse_date('31 / 12 / 2026')   # date(2026, 12, 31)
+    parse_date('2026-02-30')                # None
+"""
+
+import re
+from datetime import date, datetime
+
+# Day-first formats; ISO is tried first so YYYY-MM-DD is never read as DD-MM
+DATE_FORMATS = ('%Y-%m-%d', '%d-%m-%Y', '%d/%m/%Y', '%d.%m.%Y')
+
+# ISO date, optionally followed by a time ('2026-01-31T00:00:00')
+_ISO_PREFIX = re.compile(r'^(\d{4}-\d{1,2}-\d{1,2})(?:[T\s].*)?$')
+
+
+def parse_date(value):
+    """date from a date/datetime or a string in DATE_FORMATS (None if blank or unparseable)"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value or '').strip()
+    match = _ISO_PREFIX.match(text)
+    # 'DD / MM / YYYY' from CSV exports: spacing around separators is ignored
+    text = match.group(1) if match else re.sub(r'\s+', '', text)
+    if not text:
+        return None
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
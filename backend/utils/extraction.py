@@ -0,0 +1,368 @@
+"""
+Field extraction service for OCR text
+
+Sits between the OCR modules and the LLM so routine documents never wait on
+a remote API:
+
+1. Persistent cache keyed by (document_type, hash of normalized OCR text)
+2. Regex fast path - if every required field validates, the LLM is skipped
+3. Bounded async LLM client with a per-request deadline; identical texts
+   that arrive while a request is in flight share its result
+4. Regex result as the fallback when the LLM is unavailable, slow or wrong:
+   an LLM answer that does not validate only fills in fields over the regex
+   result, and only validated results are cached
+
+Backends are pluggable: OpenAIBackend for production and FakeBackend for
+tests/local development (LLM_EXTRACTION_BACKEND=fake).
+
+Usage:
+    from utils.extraction import get_extraction_service
+
+    fields = get_extraction_service().extract(raw_text, "cdc")
+"""
+
+import asyncio
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Fields that must validate for the regex result to be trusted as-is
+REQUIRED_FIELDS = {
+    "passport_front": {
+        "Passport No.": r'^(?=.*\d)[A-Z0-9]{6,12}$',
+        "Surname": r"^[A-Z][A-Z '\-]{1,40}$",
+        "Given Name(s)": r"^[A-Z][A-Z '\-]{1,60}$",
+        "Date of Birth": r'^\d{2}[/.-]\d{2}[/.-]\d{4}$',
+    },
+    "passport_back": {
+        "Address": r'^.{10,}$',
+    },
+    "cdc": {
+        "cdc_no": r'^(?=.*\d)[A-Z0-9]{6,15}$',
+        "indos_no": r'^\d{2}[A-Z]{2}\d{4}$',
+    },
+}
+
+
+def normalize_text(raw_text):
+    """Collapse whitespace and case so re-OCRs of the same page share a cache key"""
+    return re.sub(r'\s+', ' ', (raw_text or '').upper()).strip()
+
+
+def cache_key(document_type, raw_text):
+    digest = hashlib.sha256(normalize_text(raw_text).encode('utf-8')).hexdigest()
+    return f"{document_type}:{digest}"
+
+
+def fields_valid(fields, document_type):
+    """True when every required field for the document type is present and well-formed"""
+    required = REQUIRED_FIELDS.get(document_type)
+    if not fields or not required:
+        return False
+    for field, pattern in required.items():
+        value = str(fields.get(field) or '').strip().upper()
+        if not re.match(pattern, value):
+            return False
+        if 'Date' in field:
+            try:
+                datetime.strptime(re.sub(r'[.-]', '/', value), '%d/%m/%Y')
+            except ValueError:
+                return False
+    return True
+
+
+class ExtractionCache:
+    """SQLite-backed cache of extracted fields, shared by all workers on the host"""
+
+    def __init__(self, path, ttl_days=None):
+        self.path = path
+        self.ttl_seconds = ttl_days * 86400 if ttl_days else None
+        self._lock = threading.Lock()
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        with self._lock:
+            if path != ':memory:':
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS extraction_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    document_type TEXT NOT NULL,
+                    fields TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fields, source, created_at FROM extraction_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        fields, source, created_at = row
+        if self.ttl_seconds and time.time() - created_at > self.ttl_seconds:
+            return None
+        return json.loads(fields), source
+
+    def set(self, key, document_type, fields, source):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extraction_cache (cache_key, document_type, fields, source, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, document_type, json.dumps(fields), source, time.time())
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class FakeBackend:
+    """
+    Local stand-in for the LLM.
+
+    Args:
+        responses (dict or callable): document_type -> fields, or
+            callable(document_type, raw_text) -> fields. Defaults to echoing
+            nothing, so callers fall back to regex results.
+        delay (float): Simulated latency in seconds
+    """
+
+    name = 'fake'
+
+    def __init__(self, responses=None, delay=0.0):
+        self.responses = responses or {}
+        self.delay = delay
+        self.calls = []
+
+    async def extract(self, document_type, raw_text):
+        self.calls.append((document_type, raw_text))
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if callable(self.responses):
+            return self.responses(document_type, raw_text)
+        return dict(self.responses.get(document_type, {}))
+
+
+class OpenAIBackend:
+    """Chat-completions backend using the async OpenAI client"""
+
+    name = 'openai'
+
+    def __init__(self, api_key, model, max_tokens, temperature, timeout):
+        from openai import AsyncOpenAI
+        self.client = AsyncOpenAI(api_key=api_key, timeout=timeout, max_retries=0)
+        self.model = model
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+
+    async def extract(self, document_type, raw_text):
+        from utils.chatgpt import SYSTEM_PROMPT, build_extraction_prompt, parse_json_response
+
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": build_extraction_prompt(raw_text, document_type)}
+            ],
+            max_tokens=self.max_tokens,
+            temperature=self.temperature
+        )
+        return parse_json_response(response.choices[0].message.content)
+
+
+class ExtractionService:
+    """
+    Cache -> regex fast path -> bounded, coalesced LLM call -> regex fallback.
+
+    The LLM runs on a private asyncio loop in a daemon thread; a semaphore
+    caps concurrent requests and every call is bounded by `deadline`.
+    """
+
+    def __init__(self, regex_extractor, backend=None, cache=None, max_concurrency=4, deadline=20.0):
+        self.regex_extractor = regex_extractor
+        self.backend = backend
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self.deadline = deadline
+
+        self._lock = threading.Lock()
+        self._inflight = {}  # cache_key -> concurrent.futures.Future
+        self._loop = None
+        self._semaphore = None
+        self.stats = {'cache_hits': 0, 'regex_fast_path': 0, 'llm_calls': 0,
+                      'coalesced': 0, 'llm_failures': 0, 'llm_invalid': 0}
+
+    def extract(self, raw_text, document_type="passport_front"):
+        """
+        Extract structured fields from OCR text.
+
+        Returns:
+            dict or None: Extracted fields (same shape as filter_text_with_chatgpt)
+        """
+        key = cache_key(document_type, raw_text)
+
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.stats['cache_hits'] += 1
+                logger.info(f"[EXTRACT] Cache hit for {document_type} ({cached[1]})")
+                return cached[0]
+
+        regex_fields = self.regex_extractor(raw_text, document_type)
+        if fields_valid(regex_fields, document_type):
+            self.stats['regex_fast_path'] += 1
+            logger.info(f"[EXTRACT] Regex fields validated for {document_type}, skipping LLM")
+            self._store(key, document_type, regex_fields, 'regex')
+            return regex_fields
+
+        if self.backend is None:
+            return regex_fields
+
+        future, owner = self._join_or_start(key, document_type, raw_text)
+        try:
+            llm_fields = future.result(timeout=self.deadline)
+        except Exception as e:
+            if owner:
+                self.stats['llm_failures'] += 1
+                logger.warning(f"[EXTRACT] LLM extraction failed for {document_type}: {e!r}")
+            return regex_fields
+
+        if fields_valid(llm_fields, document_type):
+            if owner:
+                self._store(key, document_type, llm_fields, self.backend.name)
+            return llm_fields
+
+        # Keep whatever the regex found; the LLM only fills in the values it has
+        merged = dict(regex_fields or {})
+        merged.update({field: value for field, value in llm_fields.items() if value not in (None, '')})
+        if owner:
+            self.stats['llm_invalid'] += 1
+            logger.warning(f"[EXTRACT] LLM fields did not validate for {document_type}, merged over regex fields")
+            if fields_valid(merged, document_type):
+                self._store(key, document_type, merged, f"{self.backend.name}+regex")
+        return merged
+
+    def _join_or_start(self, key, document_type, raw_text):
+        """Return (future, owner); identical in-flight texts share one future"""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.stats['coalesced'] += 1
+                return future, False
+            loop = self._ensure_loop()
+            future = asyncio.run_coroutine_threadsafe(self._call_backend(document_type, raw_text), loop)
+            self._inflight[key] = future
+            self.stats['llm_calls'] += 1
+
+        def _done(_):
+            with self._lock:
+                self._inflight.pop(key, None)
+        future.add_done_callback(_done)
+        return future, True
+
+    async def _call_backend(self, document_type, raw_text):
+        async with self._semaphore:
+            fields = await asyncio.wait_for(self.backend.extract(document_type, raw_text), self.deadline)
+        if not isinstance(fields, dict):
+            raise ValueError(f"Backend returned {type(fields).__name__}, expected dict")
+        return fields
+
+    def _ensure_loop(self):
+        if self._loop is None:
+            ready = threading.Event()
+
+            def _run():
+                self._loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(self._loop)
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                ready.set()
+                self._loop.run_forever()
+
+            threading.Thread(target=_run, name='llm-extraction', daemon=True).start()
+            ready.wait()
+        return self._loop
+
+    def _store(self, key, document_type, fields, source):
+        if self.cache is None or not fields:
+            return
+        try:
+            self.cache.set(key, document_type, fields, source)
+        except sqlite3.Error as e:
+            logger.warning(f"[EXTRACT] Could not write extraction cache: {e}")
+
+    def close(self):
+        with self._lock:
+            pending = list(self._inflight.values())
+        for future in pending:
+            future.cancel()
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = None
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def create_backend(name):
+    """Build the configured LLM backend, or None when the LLM is disabled"""
+    from config import Config
+
+    if name == 'fake':
+        return FakeBackend()
+    if name != 'openai' or not Config.ENABLE_CHATGPT_FILTERING:
+        return None
+    if not Config.OPENAI_API_KEY or Config.OPENAI_API_KEY == "your_openai_api_key_here":
+        logger.warning("[EXTRACT] OpenAI API key not configured, using regex extraction only")
+        return None
+    try:
+        return OpenAIBackend(
+            Config.OPENAI_API_KEY,
+            Config.OPENAI_MODEL,
+            Config.OPENAI_MAX_TOKENS,
+            Config.OPENAI_TEMPERATURE,
+            timeout=Config.LLM_DEADLINE_SECONDS
+        )
+    except Exception as e:
+        logger.error(f"[EXTRACT] Could not initialize OpenAI backend: {e}")
+        return None
+
+
+def get_extraction_service():
+    """Return the process-wide ExtractionService configured from Config"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                from config import Config
+                from utils.chatgpt import enhanced_regex_filtering
+
+                cache = None
+                if Config.EXTRACTION_CACHE_PATH:
+                    try:
+                        cache = ExtractionCache(Config.EXTRACTION_CACHE_PATH, ttl_days=Config.EXTRACTION_CACHE_TTL_DAYS)
+                    except sqlite3.Error as e:
+                        logger.warning(f"[EXTRACT] Extraction cache disabled: {e}")
+
+                _service = ExtractionService(
+                    enhanced_regex_filtering,
+                    backend=create_backend(Config.LLM_EXTRACTION_BACKEND),
+                    cache=cache,
+                    max_concurrency=Config.LLM_MAX_CONCURRENCY,
+                    deadline=Config.LLM_DEADLINE_SECONDS
+                )
+    return _service
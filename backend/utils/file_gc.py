@@ -0,0 +1,476 @@
+"""
+Mark-and-sweep garbage collection for orphaned storage files
+
+Deleting a candidate, a certificate selection or replacing an invoice removes
+the database row but leaves its file behind. For each store the collector
+marks every path still referenced in the database (streamed through a
+server-side cursor), walks the storage tree in a stable sorted order and moves
+unreferenced files older than a grace period into a dated quarantine folder
+inside the store. Quarantined files can be restored until they are purged
+after FILE_GC_QUARANTINE_DAYS, which is when disk space is actually reclaimed.
+
+Runs are incremental: each run examines at most FILE_GC_MAX_FILES_PER_RUN
+files at FILE_GC_FILES_PER_SECOND and records where it stopped, so the next
+run resumes there and a full cycle never competes with request I/O.
+
+Usage:
+    from utils.file_gc import get_file_gc
+
+    report = get_file_gc().run()                  # all stores
+    report = get_file_gc().run(['invoices'], dry_run=True)
+    get_file_gc().restore('candidates', 'CANDIDATE_12/photo.png')
+"""
+
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+QUARANTINE_DIRNAME = '.quarantine'
+STATE_FILENAME = 'gc_state.json'
+LOCK_FILENAME = 'gc.lock'
+
+# A lock file older than this is left over from a crashed run
+STALE_LOCK_SECONDS = 6 * 3600
+
+# Candidate paths re-checked against the database per statement before quarantine
+VERIFY_BATCH_SIZE = 500
+
+
+class FileStore:
+    """A storage root and the SQL that lists the paths the database still references"""
+
+    def __init__(self, name, root, reference_sql, folder_prefix=None, suffixes=None, strip_prefixes=()):
+        """
+        Args:
+            name (str): Store name used in reports and the admin endpoint
+            root (str): Absolute storage directory
+            reference_sql (str): SELECT returning one "path" column
+            folder_prefix (str): Only files inside top-level folders with this
+                prefix are collected (None for files directly in root)
+            suffixes (tuple): Only collect files with one of these extensions
+            strip_prefixes (tuple): Prefixes of stored paths relative to the
+                backend directory rather than to root
+        """
+        self.name = name
+        self.root = os.path.abspath(root)
+        self.reference_sql = reference_sql
+        self.folder_prefix = folder_prefix
+        self.suffixes = tuple(s.lower() for s in suffixes) if suffixes else None
+        self.strip_prefixes = strip_prefixes
+
+    @property
+    def quarantine_root(self):
+        return os.path.join(self.root, QUARANTINE_DIRNAME)
+
+    def normalize(self, value):
+        """Stored path -> 'a/b' relative to root, or None if it lies outside the store"""
+        if not value:
+            return None
+        value = str(value).strip()
+        if os.path.isabs(value):
+            rel = os.path.relpath(os.path.normpath(value), self.root)
+        else:
+            rel = value.replace('\\', '/')
+            for prefix in self.strip_prefixes:
+                if rel.startswith(prefix):
+                    rel = rel[len(prefix):]
+                    break
+            rel = os.path.normpath(rel)
+        rel = rel.replace(os.sep, '/')
+        if rel == '.' or rel.startswith('../') or rel == '..':
+            return None
+        return rel
+
+    def stored_forms(self, rel):
+        """Spellings a relative path may have in the database"""
+        return [rel, os.path.join(self.root, rel)] + [prefix + rel for prefix in self.strip_prefixes]
+
+    def includes(self, parts):
+        """True if the file at these path components is managed by this store"""
+        if self.folder_prefix is None:
+            if len(parts) != 1:
+                return False
+        elif len(parts) < 2 or not parts[0].startswith(self.folder_prefix):
+            return False
+        return self.suffixes is None or parts[-1].lower().endswith(self.suffixes)
+
+
+# Typed references plus legacy columns not yet migrated. The legacy columns are
+# BYTEA or VARCHAR depending on the install; short values are paths either way.
+CERTIFICATE_REFERENCE_SQL = """
+    SELECT verification_file_path AS path FROM certificate_selections WHERE verification_file_path IS NOT NULL
+    UNION ALL
+    SELECT certificate_file_path FROM certificate_selections WHERE certificate_file_path IS NOT NULL
+    UNION ALL
+    SELECT encode(verification_image::bytea, 'escape') FROM certificate_selections
+    WHERE verification_file_path IS NULL AND octet_length(verification_image) <= 500
+    UNION ALL
+    SELECT encode(certificate_image::bytea, 'escape') FROM certificate_selections
+    WHERE certificate_file_path IS NULL AND octet_length(certificate_image) <= 500
+"""
+
+
+def default_stores():
+    """Candidate uploads, certificate files and generated PDFs, and invoice PDFs"""
+    from config import Config
+
+    return [
+        FileStore(
+            'candidates', Config.BASE_STORAGE_PATH,
+            "SELECT file_path AS path FROM candidate_uploads WHERE file_path IS NOT NULL AND file_path <> ''",
+            folder_prefix='CANDIDATE_'
+        ),
+        FileStore(
+            'certificates', os.path.join(Config.UPLOAD_FOLDER, 'certificates'),
+            CERTIFICATE_REFERENCE_SQL,
+            suffixes=('.pdf',),
+            strip_prefixes=('backend/uploads/certificates/', 'uploads/certificates/')
+        ),
+        FileStore(
+            'certificate_files', Config.CERTIFICATE_STORAGE_PATH,
+            CERTIFICATE_REFERENCE_SQL,
+            folder_prefix='CERTIFICATE_'
+        ),
+        FileStore(
+            'invoices', Config.INVOICE_STORAGE_PATH,
+            "SELECT file_path AS path FROM invoice_images WHERE file_path IS NOT NULL AND file_path <> ''",
+            folder_prefix='INVOICE_'
+        ),
+    ]
+
+
+def _walk(root, resume_after=None, parts=()):
+    """
+    Yield (parts, DirEntry) for every file below root in sorted depth-first order.
+
+    Hidden entries (the quarantine among them) are skipped. Files whose
+    component tuple is <= resume_after were handled by an earlier run;
+    directories that only contain such files are not entered at all.
+    """
+    try:
+        with os.scandir(os.path.join(root, *parts)) as it:
+            entries = sorted((e for e in it if not e.name.startswith('.')), key=lambda e: e.name)
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        entry_parts = parts + (entry.name,)
+        if entry.is_dir(follow_symlinks=False):
+            if resume_after is not None and entry_parts < resume_after[:len(entry_parts)]:
+                continue
+            yield from _walk(root, resume_after, entry_parts)
+        elif entry.is_file(follow_symlinks=False):
+            if resume_after is not None and entry_parts <= resume_after:
+                continue
+            yield entry_parts, entry
+
+
+class FileGarbageCollector:
+    """Incremental, rate-limited mark-and-sweep over a set of FileStores"""
+
+    def __init__(self, stores, grace_hours=24, quarantine_days=14, max_files_per_run=5000,
+                 files_per_second=500, stream=None, query=None, clock=time.time, sleep=time.sleep):
+        """
+        Args:
+            stores (list): FileStore instances
+            grace_hours (float): Files younger than this are never collected,
+                which covers files written before their row is committed
+            quarantine_days (int): Days a quarantined file can be restored
+            max_files_per_run (int): Files examined per store per run
+            files_per_second (int): Scan rate limit (0 disables throttling)
+            stream: Row generator (query, params) (database.db_connection.stream_rows)
+            query: Query function (database.db_connection.execute_query)
+        """
+        self.stores = {store.name: store for store in stores}
+        self.grace_seconds = grace_hours * 3600
+        self.quarantine_days = quarantine_days
+        self.max_files_per_run = max_files_per_run
+        self.files_per_second = files_per_second
+        self._stream = stream
+        self._query = query
+        self._clock = clock
+        self._sleep = sleep
+
+    def _db(self):
+        if self._stream is None or self._query is None:
+            from database.db_connection import execute_query, stream_rows
+            self._stream = self._stream or stream_rows
+            self._query = self._query or execute_query
+        return self._stream, self._query
+
+    # ------------------------------------------------------------------
+    # State and locking (inside the quarantine folder of each store)
+    # ------------------------------------------------------------------
+    def _load_state(self, store):
+        try:
+            with open(os.path.join(store.quarantine_root, STATE_FILENAME), encoding='utf-8') as f:
+                state = json.load(f)
+            resume = state.get('resume_after')
+            return tuple(resume) if resume else None
+        except (OSError, ValueError):
+            return None
+
+    def _save_state(self, store, resume_after):
+        os.makedirs(store.quarantine_root, exist_ok=True)
+        path = os.path.join(store.quarantine_root, STATE_FILENAME)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'resume_after': list(resume_after) if resume_after else None,
+                       'updated_at': datetime.fromtimestamp(self._clock()).isoformat()}, f)
+        os.replace(path + '.tmp', path)
+
+    def _acquire(self, store):
+        """Create the store's lock file; False if another run holds it"""
+        os.makedirs(store.quarantine_root, exist_ok=True)
+        lock_path = os.path.join(store.quarantine_root, LOCK_FILENAME)
+        for _ in range(2):
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    if self._clock() - os.path.getmtime(lock_path) > STALE_LOCK_SECONDS:
+                        os.remove(lock_path)
+                        continue
+                except OSError:
+                    continue
+                return False
+            with os.fdopen(fd, 'w') as f:
+                f.write(str(os.getpid()))
+            return True
+        return False
+
+    def _release(self, store):
+        try:
+            os.remove(os.path.join(store.quarantine_root, LOCK_FILENAME))
+        except OSError:
+            pass
+
+    # ------------------------------------------------------------------
+    # Mark
+    # ------------------------------------------------------------------
+    def mark(self, store):
+        """Set of root-relative paths the database references, streamed from a server-side cursor"""
+        stream, _ = self._db()
+        referenced = set()
+        for row in stream(store.reference_sql, None):
+            rel = store.normalize(row['path'])
+            if rel is not None:
+                referenced.add(rel)
+        return referenced
+
+    def _still_referenced(self, store, rels):
+        """Re-check sweep candidates against the database just before moving them"""
+        _, query = self._db()
+        referenced = set()
+        for i in range(0, len(rels), VERIFY_BATCH_SIZE):
+            batch = rels[i:i + VERIFY_BATCH_SIZE]
+            forms = [form for rel in batch for form in store.stored_forms(rel)]
+            rows = query(f"SELECT path FROM ({store.reference_sql}) refs WHERE path = ANY(%s)", (forms,)) or []
+            referenced.update(store.normalize(row['path']) for row in rows)
+        return referenced
+
+    # ------------------------------------------------------------------
+    # Sweep
+    # ------------------------------------------------------------------
+    def _throttle(self, started, examined):
+        if self.files_per_second and examined % 50 == 0:
+            ahead = examined / self.files_per_second - (self._clock() - started)
+            if ahead > 0:
+                self._sleep(ahead)
+
+    def _quarantine(self, store, rel, day):
+        """Move one file into quarantine/<day>/<rel> and prune emptied folders"""
+        source = os.path.join(store.root, rel)
+        target = os.path.join(store.quarantine_root, day, rel)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.move(source, target)
+
+        parent = os.path.dirname(source)
+        while os.path.normpath(parent) != store.root:
+            try:
+                os.rmdir(parent)
+            except OSError:
+                break
+            parent = os.path.dirname(parent)
+
+    def purge(self, store, dry_run=False):
+        """
+        Delete quarantine days older than the retention period.
+
+        Returns:
+            tuple: (files, bytes) removed (or that would be removed)
+        """
+        cutoff = (datetime.fromtimestamp(self._clock()) - timedelta(days=self.quarantine_days)).strftime('%Y%m%d')
+        files = reclaimed = 0
+        try:
+            days = sorted(name for name in os.listdir(store.quarantine_root) if name.isdigit())
+        except FileNotFoundError:
+            return 0, 0
+        for day in days:
+            if day >= cutoff:
+                break
+            day_dir = os.path.join(store.quarantine_root, day)
+            for dirpath, _, filenames in os.walk(day_dir):
+                for filename in filenames:
+                    try:
+                        reclaimed += os.path.getsize(os.path.join(dirpath, filename))
+                        files += 1
+                    except OSError:
+                        pass
+            if not dry_run:
+                shutil.rmtree(day_dir, ignore_errors=True)
+        return files, reclaimed
+
+    def collect(self, store, dry_run=False):
+        """
+        One incremental pass over a store.
+
+        Returns:
+            dict: scanned, referenced, recent (inside the grace period),
+            quarantined, quarantined_bytes, purged, reclaimed_bytes,
+            complete (the walk reached the end of the tree) and resume_after
+        """
+        report = {'store': store.name, 'scanned': 0, 'referenced': 0, 'recent': 0, 'quarantined': 0,
+                  'quarantined_bytes': 0, 'purged': 0, 'reclaimed_bytes': 0, 'complete': True,
+                  'resume_after': None, 'dry_run': dry_run}
+        if not os.path.isdir(store.root):
+            return report
+
+        resume_after = self._load_state(store)
+        referenced = self.mark(store)
+        report['referenced'] = len(referenced)
+
+        started = self._clock()
+        cutoff = started - self.grace_seconds
+        last_parts = None
+        garbage = []   # (rel, size)
+        for parts, entry in _walk(store.root, resume_after):
+            if report['scanned'] >= self.max_files_per_run:
+                report['complete'] = False
+                break
+            report['scanned'] += 1
+            last_parts = parts
+            self._throttle(started, report['scanned'])
+
+            rel = '/'.join(parts)
+            if not store.includes(parts) or rel in referenced:
+                continue
+            try:
+                stat = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            if stat.st_mtime > cutoff:
+                report['recent'] += 1
+                continue
+            garbage.append((rel, stat.st_size))
+
+        if garbage:
+            rescued = self._still_referenced(store, [rel for rel, _ in garbage])
+            garbage = [(rel, size) for rel, size in garbage if rel not in rescued]
+
+        day = datetime.fromtimestamp(started).strftime('%Y%m%d')
+        for rel, size in garbage:
+            if not dry_run:
+                try:
+                    self._quarantine(store, rel, day)
+                except OSError as e:
+                    logger.warning(f"[FILE_GC] Could not quarantine {store.name}:{rel}: {e}")
+                    continue
+            report['quarantined'] += 1
+            report['quarantined_bytes'] += size
+
+        report['purged'], report['reclaimed_bytes'] = self.purge(store, dry_run)
+
+        if not report['complete']:
+            report['resume_after'] = '/'.join(last_parts) if last_parts else None
+        if not dry_run:
+            self._save_state(store, last_parts if not report['complete'] else None)
+        return report
+
+    def run(self, store_names=None, dry_run=False):
+        """
+        Collect the named stores (all if None).
+
+        Returns:
+            dict: stores (per-store reports), quarantined, quarantined_bytes,
+            reclaimed_bytes
+        """
+        names = list(store_names) if store_names else list(self.stores)
+        unknown = [name for name in names if name not in self.stores]
+        if unknown:
+            raise ValueError(f"Unknown store(s): {', '.join(unknown)}")
+
+        reports = []
+        for name in names:
+            store = self.stores[name]
+            if not self._acquire(store):
+                logger.info(f"[FILE_GC] {name}: another run is in progress, skipped")
+                reports.append({'store': name, 'skipped': 'locked'})
+                continue
+            try:
+                report = self.collect(store, dry_run)
+            finally:
+                self._release(store)
+            logger.info(f"[FILE_GC] {name}: scanned {report['scanned']}, quarantined {report['quarantined']} "
+                        f"({report['quarantined_bytes']} bytes), reclaimed {report['reclaimed_bytes']} bytes"
+                        f"{'' if report['complete'] else ', resuming at ' + str(report['resume_after'])}")
+            reports.append(report)
+
+        return {
+            'stores': reports,
+            'quarantined': sum(r.get('quarantined', 0) for r in reports),
+            'quarantined_bytes': sum(r.get('quarantined_bytes', 0) for r in reports),
+            'reclaimed_bytes': sum(r.get('reclaimed_bytes', 0) for r in reports),
+        }
+
+    def restore(self, store_name, rel):
+        """
+        Move the most recently quarantined copy of a file back into the store.
+
+        Returns:
+            bool: True if a copy was found and restored
+        """
+        store = self.stores[store_name]
+        rel = store.normalize(rel)
+        if rel is None:
+            return False
+        try:
+            days = sorted((name for name in os.listdir(store.quarantine_root) if name.isdigit()), reverse=True)
+        except FileNotFoundError:
+            return False
+        for day in days:
+            source = os.path.join(store.quarantine_root, day, rel)
+            if os.path.isfile(source):
+                target = os.path.join(store.root, rel)
+                if os.path.exists(target):
+                    return False
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.move(source, target)
+                logger.info(f"[FILE_GC] Restored {store_name}:{rel} from quarantine {day}")
+                return True
+        return False
+
+
+_collector = None
+_collector_lock = threading.Lock()
+
+
+def get_file_gc():
+    """Return the process-wide FileGarbageCollector configured from Config"""
+    global _collector
+    if _collector is None:
+        with _collector_lock:
+            if _collector is None:
+                from config import Config
+                _collector = FileGarbageCollector(
+                    default_stores(),
+                    grace_hours=Config.FILE_GC_GRACE_HOURS,
+                    quarantine_days=Config.FILE_GC_QUARANTINE_DAYS,
+                    max_files_per_run=Config.FILE_GC_MAX_FILES_PER_RUN,
+                    files_per_second=Config.FILE_GC_FILES_PER_SECOND
+                )
+    return _collector
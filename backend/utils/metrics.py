@@ -0,0 +1,383 @@
+"""
+Lightweight metrics with Prometheus text exposition
+
+Records request latency, DB statements, pool waits, OCR passes, PDF renders
+and bytes served, labelled per endpoint, without pulling in prometheus_client.
+
+Series are recorded in process memory. With a store directory
+(Config.METRICS_DIR) every process also writes its series to
+metrics.<pid>.json - a background thread flushes them at most once per
+FLUSH_INTERVAL_SECONDS - and /metrics sums the files of all processes, so a
+scrape served by any gunicorn worker reports the whole server. Files of
+exited workers are kept so counters never go backwards; the store is
+cleared when the app is created, once per server start with preload_app.
+A forked child drops the series inherited from its parent, which stay
+accounted in the parent's file.
+
+Usage:
+    from utils.metrics import metrics, timed
+
+    with timed('pdf_render_seconds', template='certificate'):
+        render()
+
+    metrics.inc('db_statements_total', endpoint='bookkeeping.get_company_ledger', statement='select')
+"""
+
+import bisect
+import json
+import logging
+import os
+import re
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Default histogram buckets (seconds)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Longest delay before a process's new observations reach the shared store
+FLUSH_INTERVAL_SECONDS = 1.0
+
+_STORE_FILE = re.compile(r"^metrics\.(\d+)\.json$")
+
+# Registries to reset in a forked child
+_registries = weakref.WeakSet()
+
+
+def _reset_registries_after_fork():
+    for registry in list(_registries):
+        registry._after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_registries_after_fork)
+
+# Metric metadata: name -> (type, help text)
+METRIC_DEFINITIONS = {
+    'http_requests_total': ('counter', 'HTTP requests handled, by endpoint, method and status'),
+    'http_request_duration_seconds': ('histogram', 'HTTP request latency by endpoint'),
+    'http_response_bytes_total': ('counter', 'Response body bytes served by endpoint'),
+    'db_statements_total': ('counter', 'SQL statements executed via execute_query, by endpoint and statement type'),
+    'db_statement_duration_seconds': ('histogram', 'SQL statement execution time by endpoint'),
+    'db_pool_wait_seconds': ('histogram', 'Time spent waiting for a pooled DB connection'),
+    'db_reads_total': ('counter', 'Read-only statements by target: replica, primary, or primary_fallback when the replica lags or fails'),
+    'ocr_extraction_duration_seconds': ('histogram', 'End-to-end OCR extraction time by document type'),
+    'ocr_preprocess_duration_seconds': ('histogram', 'OCR preprocessing time by stage'),
+    'ocr_tesseract_duration_seconds': ('histogram', 'Single Tesseract pass time by document type and config'),
+    'pdf_render_duration_seconds': ('histogram', 'PDF render time by template'),
+}
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(label_key, extra=None):
+    pairs = list(label_key) + (extra or [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+class _Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def copy(self):
+        histogram = _Histogram(self.buckets)
+        histogram.counts = list(self.counts)
+        histogram.sum = self.sum
+        histogram.count = self.count
+        return histogram
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Thread-safe registry of counters and histograms, optionally shared through a store directory"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, store_dir=None, flush_interval=FLUSH_INTERVAL_SECONDS):
+        self.buckets = tuple(buckets)
+        self.store_dir = store_dir
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._counters = {}    # name -> {label_key: value}
+        self._histograms = {}  # name -> {label_key: _Histogram}
+        self._dirty = False
+        self._flusher_pid = None
+        _registries.add(self)
+
+    def inc(self, name, amount=1, **labels):
+        """Increment a counter"""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+            self._dirty = True
+        self._ensure_flusher()
+
+    def observe(self, name, value, **labels):
+        """Record a histogram observation"""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(self.buckets)
+            histogram.observe(value)
+            self._dirty = True
+        self._ensure_flusher()
+
+    def reset(self):
+        """Drop all recorded series (used by tests)"""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._dirty = True
+
+    # ------------------------------------------------------------------
+    # Shared store
+    # ------------------------------------------------------------------
+    def use_store(self, store_dir, clear=False):
+        """
+        Share series with other processes through `store_dir`.
+
+        Args:
+            store_dir (str): Directory for the per-process files (None disables)
+            clear (bool): Remove files left by a previous server run
+        """
+        self.store_dir = store_dir or None
+        if not self.store_dir:
+            return
+        os.makedirs(self.store_dir, exist_ok=True)
+        if clear:
+            for name in os.listdir(self.store_dir):
+                if _STORE_FILE.match(name) and name != self._store_name():
+                    try:
+                        os.remove(os.path.join(self.store_dir, name))
+                    except OSError:
+                        pass
+        with self._lock:
+            self._dirty = True
+
+    @staticmethod
+    def _store_name():
+        return f"metrics.{os.getpid()}.json"
+
+    def _after_fork(self):
+        # The parent's series stay in the parent's file; count only our own
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._dirty = False
+        self._flusher_pid = None
+
+    def _ensure_flusher(self):
+        if self.store_dir is None or self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+
+        def run():
+            while True:
+                time.sleep(self.flush_interval)
+                try:
+                    self.flush()
+                except Exception as e:
+                    logger.error(f"[METRICS] Failed to write metrics store: {e}")
+
+        threading.Thread(target=run, name='metrics-flush', daemon=True).start()
+
+    def _serialize(self):
+        """This process's series as JSON-compatible lists (lock must be held)"""
+        return {
+            'counters': {name: [[list(map(list, key)), value] for key, value in series.items()]
+                         for name, series in self._counters.items()},
+            'histograms': {name: [[list(map(list, key)), list(h.buckets), h.counts, h.sum, h.count]
+                                  for key, h in series.items()]
+                           for name, series in self._histograms.items()},
+        }
+
+    def flush(self):
+        """Write this process's series to the store if they changed since the last flush"""
+        if self.store_dir is None:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            data = self._serialize()
+            self._dirty = False
+        path = os.path.join(self.store_dir, self._store_name())
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            with self._lock:
+                self._dirty = True
+            raise
+
+    def _merged(self):
+        """Counters and histograms summed over every process in the store"""
+        try:
+            self.flush()
+        except OSError as e:
+            logger.error(f"[METRICS] Failed to write metrics store: {e}")
+        counters, histograms = {}, {}
+        for name in sorted(os.listdir(self.store_dir)):
+            if not _STORE_FILE.match(name):
+                continue
+            try:
+                with open(os.path.join(self.store_dir, name), encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"[METRICS] Skipping unreadable metrics file {name}: {e}")
+                continue
+            for metric, series in data.get('counters', {}).items():
+                merged = counters.setdefault(metric, {})
+                for key, value in series:
+                    key = tuple(map(tuple, key))
+                    merged[key] = merged.get(key, 0) + value
+            for metric, series in data.get('histograms', {}).items():
+                merged = histograms.setdefault(metric, {})
+                for key, buckets, counts, total, count in series:
+                    key = tuple(map(tuple, key))
+                    histogram = merged.get(key)
+                    if histogram is None:
+                        histogram = merged[key] = _Histogram(tuple(buckets))
+                    elif list(histogram.buckets) != buckets:
+                        continue  # written with other buckets; cannot be summed
+                    histogram.counts = [a + b for a, b in zip(histogram.counts, counts)]
+                    histogram.sum += total
+                    histogram.count += count
+        return counters, histograms
+
+    def snapshot(self):
+        """Return a plain-dict view of all series"""
+        with self._lock:
+            counters = {name: {k: v for k, v in series.items()} for name, series in self._counters.items()}
+            histograms = {
+                name: {k: {'count': h.count, 'sum': h.sum} for k, h in series.items()}
+                for name, series in self._histograms.items()
+            }
+        return {'counters': counters, 'histograms': histograms}
+
+    def render_prometheus(self):
+        """Render all series (of every process, with a store) in Prometheus text exposition format (0.0.4)"""
+        if self.store_dir is not None:
+            counters, histograms = self._merged()
+        else:
+            with self._lock:
+                counters = {name: dict(series) for name, series in self._counters.items()}
+                histograms = {name: {key: h.copy() for key, h in series.items()}
+                              for name, series in self._histograms.items()}
+
+        lines = []
+        for name in sorted(counters):
+            self._render_header(lines, name, 'counter')
+            for key, value in sorted(counters[name].items()):
+                lines.append(f"{name}{_format_labels(key)} {value}")
+
+        for name in sorted(histograms):
+            self._render_header(lines, name, 'histogram')
+            for key, histogram in sorted(histograms[name].items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(key, [('le', repr(float(bound)))])} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {histogram.count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {histogram.sum}")
+                lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _render_header(lines, name, default_type):
+        metric_type, help_text = METRIC_DEFINITIONS.get(name, (default_type, name))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+
+
+# Process-wide registry
+metrics = MetricsRegistry()
+
+
+def current_endpoint():
+    """Flask endpoint of the active request, or 'background' outside a request"""
+    try:
+        from flask import has_request_context, request
+    except ImportError:
+        return 'background'
+    if has_request_context():
+        return request.endpoint or 'unmatched'
+    return 'background'
+
+
+@contextmanager
+def timed(name, **labels):
+    """Context manager that records the elapsed time into histogram `name`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.observe(name, time.perf_counter() - start, **labels)
+
+
+def init_metrics(app):
+    """
+    Register request instrumentation hooks and the /metrics endpoint, and
+    aggregate series across worker processes through Config.METRICS_DIR.
+
+    /metrics is only served to loopback clients unless
+    Config.METRICS_ALLOW_REMOTE is enabled.
+    """
+    from flask import Response, g, request
+    from config import Config
+
+    # Shared by every worker forked from this process; a new server starts from zero
+    metrics.use_store(Config.METRICS_DIR, clear=True)
+
+    @app.before_request
+    def _metrics_start_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _metrics_record_request(response):
+        start = g.pop('_metrics_start', None)
+        endpoint = request.endpoint or 'unmatched'
+        if endpoint == 'metrics':
+            return response
+        if start is not None:
+            metrics.observe('http_request_duration_seconds', time.perf_counter() - start, endpoint=endpoint)
+        metrics.inc('http_requests_total', endpoint=endpoint, method=request.method, status=response.status_code)
+        # Streamed/passthrough bodies have no known length up front
+        length = response.calculate_content_length() if not response.direct_passthrough else None
+        if length:
+            metrics.inc('http_response_bytes_total', length, endpoint=endpoint)
+        return response
+
+    def metrics_endpoint():
+        if not Config.METRICS_ALLOW_REMOTE and request.remote_addr not in ('127.0.0.1', '::1'):
+            return Response("Forbidden\n", status=403, mimetype='text/plain')
+        return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+    app.add_url_rule('/metrics', 'metrics', metrics_endpoint, methods=['GET'])
@@ -1,3 +1,4 @@
+import functools
 import os
 import uuid
 from reportlab.lib.pagesizes import letter, A4
@@ -11,13 +12,39 @@ from io import BytesIO
 from PIL import Image as PILImage
 import base64
 import logging
+import time
 import qrcode
 from reportlab.lib.colors import HexColor
 from PyPDF2 import PdfReader, PdfWriter
 from config import Config
+from utils.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'pdf_templates')
+
+# Standard fonts used by the overlays; loaded by warm_up() before workers fork
+FONTS = ("Helvetica", "Helvetica-Bold", "Times-Roman", "Times-Bold")
+
+
+@functools.lru_cache(maxsize=None)
+def load_template(template_type):
+    """Raw bytes of a base template PDF, read once per process (None if missing)"""
+    template_path = os.path.join(TEMPLATE_DIR, f'{template_type.title()}Template.pdf')
+    if not os.path.exists(template_path):
+        return None
+    with open(template_path, 'rb') as f:
+        return f.read()
+
+
+def warm_up():
+    """Load base templates and font metrics so forked workers share them"""
+    from reportlab.pdfbase import pdfmetrics
+
+    for font_name in FONTS:
+        pdfmetrics.getFont(font_name)
+    return [template_type for template_type in ('certificate', 'verification') if load_template(template_type)]
+
 # Verification Template layout coordinates (in points, bottom-left origin)
 VERIFICATION_LAYOUT = {
     # Text fields - (x, y) coordinates
@@ -84,6 +111,7 @@ class PDFGenerator:
     @staticmethod
     def generate_certificate_pdf(certificate_data, template_type="certificate", output_path=None):
         """Generate PDF certificate/verification by overlaying content on base template"""
+        render_start = time.perf_counter()
         try:
             if not output_path:
                 # Generate unique filename
@@ -96,9 +124,8 @@ class PDFGenerator:
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
             # Determine template path
-            script_dir = os.path.dirname(__file__)  # backend/utils/
-            backend_dir = os.path.dirname(script_dir)  # backend/
-            template_path = os.path.join(backend_dir, 'pdf_templates', f'{template_type.title()}Template.pdf')
+            template_path = os.path.join(TEMPLATE_DIR, f'{template_type.title()}Template.pdf')
+            template_bytes = load_template(template_type)
 
             logger.info(f"Generating PDF {template_type}: {output_path}")
             logger.info(f"Using template: {template_path}")
@@ -107,9 +134,9 @@ class PDFGenerator:
             pdf_writer = PdfWriter()
 
             # Load template PDF if it exists
-            if os.path.exists(template_path):
+            if template_bytes is not None:
                 logger.info(f"Loading {template_type} PDF template")
-                template_reader = PdfReader(template_path)
+                template_reader = PdfReader(BytesIO(template_bytes))
                 num_pages = len(template_reader.pages)
                 logger.info(f"Template has {num_pages} pages")
 
@@ -168,6 +195,7 @@ class PDFGenerator:
             with open(output_path, 'wb') as output_file:
                 pdf_writer.write(output_file)
 
+            metrics.observe('pdf_render_duration_seconds', time.perf_counter() - render_start, template=template_type)
             logger.info(f"PDF {template_type} generated successfully: {output_path}")
             return output_path
 
@@ -0,0 +1,136 @@
+"""
+Rate limiter shared by the app and all blueprints
+
+Flask-Limiter keeps its counters in the storage named by
+Config.RATELIMIT_STORAGE_URI. The default sqlite://<file> storage below keeps
+them in one SQLite file in WAL mode, so every gunicorn worker on the host
+enforces the same limits and counts survive restarts, without a network
+service. Each hit is one short write transaction (an upsert plus a read);
+expired windows are deleted in batches every CLEANUP_EVERY hits.
+
+Routes use the module-level limiter, which create_app() binds to the app:
+
+    from utils.rate_limit import limiter
+
+    @bp.route('/upload-images', methods=['POST'])
+    @limiter.limit("10 per minute")
+    def upload_images():
+        ...
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+from limits.storage import Storage
+
+from config import Config
+
+# Delete expired windows once per this many hits in a process
+CLEANUP_EVERY = 1000
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS rate_limits (
+        key TEXT PRIMARY KEY,
+        count INTEGER NOT NULL,
+        expiry REAL NOT NULL
+    ) WITHOUT ROWID
+"""
+
+# A window that has expired restarts at amount; elastic limits move the expiry on every hit
+_INCR_SQL = """
+    INSERT INTO rate_limits (key, count, expiry) VALUES (:key, :amount, :expiry)
+    ON CONFLICT (key) DO UPDATE SET
+        count = CASE WHEN rate_limits.expiry <= :now THEN excluded.count
+                     ELSE rate_limits.count + excluded.count END,
+        expiry = CASE WHEN rate_limits.expiry <= :now OR :elastic THEN excluded.expiry
+                      ELSE rate_limits.expiry END
+"""
+
+
+class SQLiteStorage(Storage):
+    """
+    Fixed-window counters in a SQLite file shared by all processes on a host.
+
+    URI: sqlite://<path>, e.g. sqlite:///var/lib/app/rate_limits.sqlite3
+    Options: busy_timeout_ms (default 5000)
+    """
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri, **options):
+        self.path = uri.split("://", 1)[1]
+        self.busy_timeout_ms = int(options.pop("busy_timeout_ms", 5000))
+        super().__init__(uri, **options)
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._local = threading.local()
+        self._hits = 0
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connection(self):
+        """Connection for this thread, reopened after a fork"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # WAL commits without fsync; a power loss can only lose the last few hits
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(_SCHEMA)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def incr(self, key, expiry, elastic_expiry=False, amount=1):
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(_INCR_SQL, {'key': key, 'amount': amount, 'expiry': now + expiry,
+                                     'now': now, 'elastic': int(elastic_expiry)})
+            count = conn.execute("SELECT count FROM rate_limits WHERE key = ?", (key,)).fetchone()[0]
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        self._hits += 1
+        if self._hits % CLEANUP_EVERY == 0:
+            conn.execute("DELETE FROM rate_limits WHERE expiry <= ?", (now,))
+        return count
+
+    def get(self, key):
+        row = self._connection().execute(
+            "SELECT count FROM rate_limits WHERE key = ? AND expiry > ?", (key, time.time())).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        now = time.time()
+        row = self._connection().execute(
+            "SELECT expiry FROM rate_limits WHERE key = ? AND expiry > ?", (key, now)).fetchone()
+        return int(row[0] if row else now)
+
+    def check(self):
+        try:
+            self._connection().execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        return self._connection().execute("DELETE FROM rate_limits").rowcount
+
+    def clear(self, key):
+        self._connection().execute("DELETE FROM rate_limits WHERE key = ?", (key,))
+
+
+limiter = Limiter(
+    key_func=get_remote_address,
+    default_limits=["200 per day", "200 per hour"],  # Global limits - increased for development
+    storage_uri=Config.RATELIMIT_STORAGE_URI,
+)
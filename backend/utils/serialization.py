@@ -0,0 +1,249 @@
+"""
+Compact, streaming JSON encoding for list endpoints
+
+Rows go from the cursor to the wire without being copied into hand-built
+dicts: datetime/date/time are written as ISO 8601, Decimal as a JSON number,
+UUIDs as strings, and JSON/JSONB columns selected as text (see raw=) are
+spliced in verbatim instead of being parsed and re-encoded. A ?fields=
+projection drops the columns a table does not show, and the list is sent as
+a chunked JSON array inside the endpoint's usual envelope, or as NDJSON
+(one row per line) with ?format=ndjson or Accept: application/x-ndjson.
+
+Usage:
+    from database.db_connection import stream_rows
+    from utils.serialization import ROWS, list_response, requested_fields
+
+    fields = requested_fields(CUSTOMER_FIELDS)
+    return list_response(
+        stream_rows("SELECT ... FROM b2bcustomersdetails"),
+        envelope={"status": "success", "data": ROWS},
+        trailer=lambda count: {"total": count},
+        fields=fields)
+"""
+
+import base64
+import json
+import logging
+import uuid
+from datetime import date, datetime, time
+from decimal import Decimal
+
+logger = logging.getLogger(__name__)
+
+# Placeholder for the streamed row array inside a response envelope
+ROWS = '\u0000rows\u0000'
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+# Rows encoded per chunk written to the WSGI server
+CHUNK_ROWS = 200
+
+
+class FieldSelectionError(ValueError):
+    """Raised when ?fields= names a column the endpoint does not return"""
+
+
+def json_default(value):
+    """json.dumps default= hook for the column types psycopg2 returns"""
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        # Whole amounts stay integers, fractions keep their exact digits
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return base64.b64encode(bytes(value)).decode('ascii')
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+_encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False, default=json_default)
+
+
+def dumps(value):
+    """Compact JSON text for any value a row can hold"""
+    return _encoder.encode(value)
+
+
+def encode_row(row, fields=None, raw=()):
+    """
+    Encode one row as a JSON object.
+
+    Args:
+        row (dict): Row as returned by a RealDictCursor
+        fields (tuple): Columns to keep, in output order (None for all)
+        raw (iterable): Columns that already hold JSON text (e.g. jsonb::text)
+
+    Returns:
+        str: JSON object text
+    """
+    keys = fields if fields is not None else row.keys()
+    parts = []
+    for key in keys:
+        value = row.get(key)
+        if key in raw and value is not None:
+            encoded = value if isinstance(value, str) else dumps(value)
+        else:
+            encoded = dumps(value)
+        parts.append(f"{dumps(key)}:{encoded}")
+    return '{' + ','.join(parts) + '}'
+
+
+def parse_fields(value, allowed):
+    """
+    Parse a comma separated ?fields= value.
+
+    Args:
+        value (str): Raw parameter (None or empty for all fields)
+        allowed (iterable): Columns the endpoint can return
+
+    Returns:
+        tuple or None: Selected columns in request order, None for all
+
+    Raises:
+        FieldSelectionError: If a name is not one of the allowed columns
+    """
+    if not value:
+        return None
+    fields = tuple(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in allowed]
+    if unknown:
+        raise FieldSelectionError(
+            f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(allowed)}")
+    return fields or None
+
+
+def requested_fields(allowed):
+    """parse_fields() for the current request's ?fields= parameter"""
+    from flask import request
+    return parse_fields(request.args.get('fields', ''), tuple(allowed))
+
+
+def wants_ndjson():
+    """True if the current request asked for newline-delimited JSON"""
+    from flask import request
+    if request.args.get('format', '').lower() == 'ndjson':
+        return True
+    return request.accept_mimetypes.best == NDJSON_MIMETYPE
+
+
+def _split_envelope(envelope):
+    """Envelope text before and after the ROWS placeholder"""
+    text = dumps(envelope)
+    marker = dumps(ROWS)
+    if text.count(marker) != 1:
+        raise ValueError("Response envelope must contain ROWS exactly once")
+    return text.split(marker)
+
+
+def iter_json_array(rows, envelope, trailer=None, fields=None, raw=()):
+    """
+    Yield a JSON document whose ROWS placeholder is the streamed row array.
+
+    Args:
+        rows (iterable): Row dicts
+        envelope (dict): Response body containing ROWS once
+        trailer (callable): count -> dict of top-level keys written after the
+            rows (e.g. total, message), for values known only at the end
+        fields (tuple): Projection passed to encode_row
+        raw (iterable): Columns already holding JSON text
+
+    Yields:
+        str: Chunks of the document
+    """
+    head, tail = _split_envelope(envelope)
+    count = 0
+    chunk = [head, '[']
+    for row in rows:
+        if count:
+            chunk.append(',')
+        chunk.append(encode_row(row, fields, raw))
+        count += 1
+        if count % CHUNK_ROWS == 0:
+            yield ''.join(chunk)
+            chunk = []
+    chunk.append(']')
+    if trailer is not None:
+        extra = trailer(count)
+        if extra:
+            # tail is the rest of the envelope ending with its closing brace
+            tail = tail[:-1] + ''.join(f",{dumps(k)}:{dumps(v)}" for k, v in extra.items()) + '}'
+    chunk.append(tail)
+    yield ''.join(chunk)
+
+
+def iter_ndjson(rows, fields=None, raw=()):
+    """Yield one JSON object per line"""
+    chunk = []
+    for row in rows:
+        chunk.append(encode_row(row, fields, raw) + '\n')
+        if len(chunk) == CHUNK_ROWS:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def _guarded(chunks, label):
+    """Log failures that happen after the status line was already sent"""
+    try:
+        yield from chunks
+    except Exception as e:
+        # The truncated body is left invalid so clients see the failure
+        logger.error(f"[JSON] Streaming {label} failed after headers were sent: {e}")
+        raise
+
+
+def list_response(rows, envelope, trailer=None, fields=None, raw=(), status=200, label='response'):
+    """
+    Stream rows as a Flask response in the requested format.
+
+    The first row is read before the response starts, so query and
+    connection errors still raise inside the route's try/except and can be
+    answered with the usual JSON error body.
+
+    Args:
+        rows (iterable): Row dicts, typically database.db_connection.stream_rows()
+        envelope (dict): Body for the JSON array format, containing ROWS once
+        trailer (callable): count -> dict of keys appended after the rows
+        fields (tuple): Projection from requested_fields()
+        raw (iterable): Columns already holding JSON text
+        status (int): HTTP status code
+        label (str): Name used in log messages
+
+    Returns:
+        Response: Streaming response (application/json or NDJSON)
+    """
+    from flask import Response, stream_with_context
+
+    rows = iter(rows)
+    try:
+        first = next(rows)
+    except StopIteration:
+        peeked = []
+    else:
+        peeked = [first]
+
+    def all_rows():
+        yield from peeked
+        yield from rows
+
+    if wants_ndjson():
+        body, mimetype = iter_ndjson(all_rows(), fields, raw), NDJSON_MIMETYPE
+    else:
+        body, mimetype = iter_json_array(all_rows(), envelope, trailer, fields, raw), 'application/json'
+    return Response(stream_with_context(_guarded(body, label)), status=status, mimetype=mimetype)
+
+
+def select_list(columns, fields=None):
+    """
+    SELECT list for a projection, so unrequested columns are never read.
+
+    Args:
+        columns (dict): Output name -> SQL expression, in default order
+        fields (tuple): Projection from requested_fields() (None for all)
+
+    Returns:
+        str: "expr AS name, ..." for the selected columns
+    """
+    return ', '.join(f"{columns[name]} AS {name}" for name in (fields or tuple(columns)))
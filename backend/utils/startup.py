@@ -0,0 +1,121 @@
+"""
+Startup timing and pre-fork warm-up for the production entry point
+
+wsgi.py builds the app through create_app() with a StartupReport, then calls
+warm_up() once in the gunicorn master (preload_app) before workers fork:
+PDF templates, font metrics and selected heavy modules are loaded so every
+worker shares them copy-on-write, and the database is checked through the
+psycopg2 pool, which is closed again so no socket is inherited by a worker.
+after_fork() gives each worker its own pool and background threads.
+
+Usage:
+    report = StartupReport()
+    with report.phase('routes'):
+        register_blueprints(app)
+    warm_up(report)
+    print(report.format())
+"""
+
+import importlib
+import logging
+import sys
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class StartupReport:
+    """Wall time and newly imported modules per startup phase"""
+
+    def __init__(self):
+        self.phases = []   # (name, seconds, modules imported)
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        modules_before = len(sys.modules)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start, len(sys.modules) - modules_before))
+
+    def import_modules(self, module_names):
+        """Import modules one by one, each recorded as its own 'import <name>' phase"""
+        for name in module_names:
+            modules_before = len(sys.modules)
+            start = time.perf_counter()
+            try:
+                importlib.import_module(name)
+            except ImportError as e:
+                logger.warning(f"[STARTUP] Could not preload {name}: {e}")
+                continue
+            self.phases.append((f"import {name}", time.perf_counter() - start, len(sys.modules) - modules_before))
+
+    def as_dict(self):
+        return {
+            'total_seconds': round(time.perf_counter() - self.started, 4),
+            'phases': [{'name': name, 'seconds': round(seconds, 4), 'modules': modules}
+                       for name, seconds, modules in self.phases]
+        }
+
+    def format(self):
+        lines = [f"{'phase':<36} {'ms':>9} {'modules':>8}"]
+        for name, seconds, modules in sorted(self.phases, key=lambda p: p[1], reverse=True):
+            lines.append(f"{name:<36} {seconds * 1000:>9.1f} {modules:>8}")
+        lines.append(f"{'total':<36} {(time.perf_counter() - self.started) * 1000:>9.1f} {len(sys.modules):>8}")
+        return "\n".join(lines)
+
+
+def warm_up(report, preload_modules=()):
+    """
+    Pre-fork warm-up: templates, fonts, optional module preloads, database check.
+
+    Args:
+        report (StartupReport): Receives one phase per step
+        preload_modules (iterable): Heavy modules to import in the master
+    """
+    from config import Config
+
+    with report.phase('templates & fonts'):
+        from utils.pdf_generator import warm_up as warm_up_pdf
+        templates = warm_up_pdf()
+        logger.info(f"[STARTUP] Preloaded PDF templates: {', '.join(templates) or 'none'}")
+        from bookkeeping.invoices import register_fonts
+        register_fonts()
+
+    modules = list(preload_modules)
+    if Config.ENABLE_OCR:
+        modules.append('ocr.preprocess')
+    report.import_modules(modules)
+
+    with report.phase('database pool'):
+        from database.db_connection import DatabaseConnection, execute_query
+        try:
+            execute_query("SELECT 1", fetch=True)
+            logger.info("[STARTUP] Database reachable through connection pool")
+        finally:
+            # Connections must not be shared with forked workers
+            DatabaseConnection.close_all()
+            DatabaseConnection._pool = None
+            DatabaseConnection._replica_pool = None
+
+
+def after_fork():
+    """Per-worker setup: fresh connection pool and background threads"""
+    from config import Config
+    from database.db_connection import DatabaseConnection
+
+    DatabaseConnection._pool = None
+    DatabaseConnection._replica_pool = None
+    try:
+        DatabaseConnection.get_pool()
+    except Exception as e:
+        # The pool is created again on first query
+        logger.error(f"[STARTUP] Worker could not open its connection pool: {e}")
+
+    if Config.ENABLE_TEMP_JANITOR:
+        # Every worker starts one; only the holder of the janitor file lock sweeps
+        from utils.temp_sessions import get_session_manager
+        get_session_manager().start_janitor(Config.TEMP_JANITOR_INTERVAL_SECONDS)
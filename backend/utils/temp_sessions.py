@@ -0,0 +1,477 @@
+"""
+Temporary upload session management
+
+Every /upload-images session gets a small JSON manifest written next to its
+files.  Sessions are kept in an in-process index ordered by expiry, so the
+background janitor only touches sessions that have actually expired instead
+of walking the whole temp tree on every run. A session leaves the index (and
+the byte total the quota is checked against) only once its folder is gone:
+PDF sessions stay indexed, and folders that could not be deleted are queued
+again for the next pass.
+
+The manifests on disk are shared by all gunicorn workers; each worker's index
+is only a cache of them. Before evicting, the index picks up manifests other
+workers created or refreshed (compared by manifest mtime, one stat per
+session folder), and every manifest is read again right before its folder
+is deleted, so a session refreshed elsewhere is never removed. The janitor
+itself - expiry and quota - runs in one process per host, whichever holds
+the non-blocking file lock on temp_root/.janitor.lock.
+
+Usage:
+    from utils.temp_sessions import get_session_manager
+
+    manager = get_session_manager()
+    manager.register_session(session_id, uploaded_files)
+    manager.sweep()  # evict expired sessions + enforce disk quota
+"""
+
+import heapq
+import json
+import logging
+import os
+import shutil
+import threading
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Manifest file stored inside every temp session folder
+MANIFEST_FILENAME = '.session.json'
+
+# Lock file in the temp root held by the one process running the janitor
+JANITOR_LOCK_FILENAME = '.janitor.lock'
+
+
+class TempSessionManager:
+    """Tracks temp upload sessions by expiry and evicts them in bounded batches"""
+
+    def __init__(self, temp_root, ttl_hours=24, batch_size=50, quota_bytes=None):
+        self.temp_root = temp_root
+        self.ttl = timedelta(hours=ttl_hours)
+        self.batch_size = batch_size
+        self.quota_bytes = quota_bytes
+
+        self._lock = threading.Lock()
+        self._heap = []        # (expires_at_ts, session_id)
+        self._sessions = {}    # session_id -> manifest dict
+        self._mtimes = {}      # session_id -> mtime of the manifest file indexed
+        self._total_bytes = 0
+        self._loaded = False
+
+        self._janitor = None
+        self._janitor_lock_file = None
+        self._stop_event = threading.Event()
+
+    # ------------------------------------------------------------------
+    # Manifest handling
+    # ------------------------------------------------------------------
+    def session_path(self, session_id):
+        """Absolute path of a session folder"""
+        return os.path.join(self.temp_root, session_id)
+
+    def _manifest_path(self, session_id):
+        return os.path.join(self.session_path(session_id), MANIFEST_FILENAME)
+
+    def _scan_files(self, session_id):
+        """Return ({filename: size}, contains_pdf) for a session folder"""
+        files = {}
+        contains_pdf = False
+        with os.scandir(self.session_path(session_id)) as entries:
+            for entry in entries:
+                if entry.name == MANIFEST_FILENAME or not entry.is_file():
+                    continue
+                files[entry.name] = entry.stat().st_size
+                if entry.name.lower().endswith('.pdf'):
+                    contains_pdf = True
+        return files, contains_pdf
+
+    def _write_manifest(self, manifest):
+        path = self._manifest_path(manifest['session_id'])
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, path)
+        return os.stat(path).st_mtime
+
+    def _read_manifest(self, session_id):
+        """The manifest currently on disk, or None if it is missing or unreadable"""
+        try:
+            with open(self._manifest_path(session_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _index(self, manifest, mtime=None):
+        """Add or replace a manifest in the in-memory index (lock must be held)"""
+        session_id = manifest['session_id']
+        previous = self._sessions.get(session_id)
+        if previous:
+            self._total_bytes -= previous['total_bytes']
+        self._sessions[session_id] = manifest
+        self._mtimes[session_id] = mtime
+        self._total_bytes += manifest['total_bytes']
+        # Stale heap entries are skipped lazily when popped
+        heapq.heappush(self._heap, (manifest['expires_at'], session_id))
+
+    def _unindex(self, session_id):
+        """Drop a session from the index (lock must be held)"""
+        manifest = self._sessions.pop(session_id, None)
+        self._mtimes.pop(session_id, None)
+        if manifest:
+            self._total_bytes -= manifest['total_bytes']
+
+    def register_session(self, session_id, uploaded_files=None):
+        """
+        Write (or refresh) the manifest for a session and index it by expiry.
+
+        Args:
+            session_id (str): Session ID / temp folder name
+            uploaded_files (dict): Optional mapping of field key -> filename
+
+        Returns:
+            dict: The manifest that was written
+        """
+        self._ensure_loaded()
+        now = datetime.now()
+        files, contains_pdf = self._scan_files(session_id)
+
+        with self._lock:
+            # Another worker may have created the session
+            previous = self._sessions.get(session_id) or self._read_manifest(session_id)
+            created_at = previous['created_at'] if previous else now.timestamp()
+            manifest = {
+                'session_id': session_id,
+                'created_at': created_at,
+                'updated_at': now.timestamp(),
+                'expires_at': (now + self.ttl).timestamp(),
+                'files': files,
+                'uploaded_files': uploaded_files or (previous or {}).get('uploaded_files', {}),
+                'total_bytes': sum(files.values()),
+                'contains_pdf': contains_pdf
+            }
+            mtime = self._write_manifest(manifest)
+            self._index(manifest, mtime)
+
+        logger.info(f"[TEMP SESSIONS] Registered session {session_id} ({manifest['total_bytes']} bytes, {len(files)} files)")
+        return manifest
+
+    def touch_session(self, session_id):
+        """Refresh a session after more files were added to it"""
+        return self.register_session(session_id)
+
+    def forget_session(self, session_id):
+        """Drop a session from the index (e.g. after its files were promoted)"""
+        with self._lock:
+            self._unindex(session_id)
+
+    # ------------------------------------------------------------------
+    # Index bootstrap
+    # ------------------------------------------------------------------
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            indexed = self._sync_from_disk()
+            self._loaded = True
+        logger.info(f"[TEMP SESSIONS] Indexed {indexed} existing sessions ({self._total_bytes} bytes)")
+
+    def refresh_index(self):
+        """Pick up sessions other workers created, refreshed or removed since the last sync"""
+        self._ensure_loaded()
+        with self._lock:
+            self._sync_from_disk()
+
+    def _sync_from_disk(self):
+        """
+        Bring the index in line with the session folders on disk (lock must
+        be held). Manifests are only read when their mtime changed; folders
+        without one (created before manifests existed, or still being
+        uploaded) get one synthesized from their mtime.
+
+        Returns:
+            int: Number of sessions indexed or re-indexed
+        """
+        if not os.path.isdir(self.temp_root):
+            return 0
+
+        indexed = 0
+        present = set()
+        for entry in os.scandir(self.temp_root):
+            if not entry.is_dir():
+                continue
+            present.add(entry.name)
+            manifest_path = os.path.join(entry.path, MANIFEST_FILENAME)
+            try:
+                mtime = os.stat(manifest_path).st_mtime
+            except FileNotFoundError:
+                mtime = None
+            except OSError as e:
+                logger.warning(f"[TEMP SESSIONS] Skipping unreadable manifest {manifest_path}: {e}")
+                continue
+            if entry.name in self._sessions and (mtime is None or self._mtimes.get(entry.name) == mtime):
+                continue
+
+            if mtime is None:
+                try:
+                    files, contains_pdf = self._scan_files(entry.name)
+                    folder_mtime = entry.stat().st_mtime
+                except OSError:
+                    continue  # removed while we were looking
+                manifest = {
+                    'session_id': entry.name,
+                    'created_at': folder_mtime,
+                    'updated_at': folder_mtime,
+                    'expires_at': folder_mtime + self.ttl.total_seconds(),
+                    'files': files,
+                    'uploaded_files': {},
+                    'total_bytes': sum(files.values()),
+                    'contains_pdf': contains_pdf
+                }
+                try:
+                    mtime = self._write_manifest(manifest)
+                except OSError as e:
+                    logger.warning(f"[TEMP SESSIONS] Could not write manifest for {entry.name}: {e}")
+            else:
+                manifest = self._read_manifest(entry.name)
+                if manifest is None:
+                    logger.warning(f"[TEMP SESSIONS] Skipping unreadable manifest {manifest_path}")
+                    continue
+            self._index(manifest, mtime)
+            indexed += 1
+
+        # Folders another worker promoted or deleted
+        for session_id in [sid for sid in self._sessions if sid not in present]:
+            self._unindex(session_id)
+        return indexed
+
+    # ------------------------------------------------------------------
+    # Eviction
+    # ------------------------------------------------------------------
+    def _pop_due(self, deadline, limit):
+        """Pop up to `limit` live sessions with expires_at <= deadline (lock must be held)"""
+        due = []
+        while self._heap and len(due) < limit:
+            expires_at, session_id = self._heap[0]
+            if expires_at > deadline:
+                break
+            heapq.heappop(self._heap)
+            manifest = self._sessions.get(session_id)
+            # Skip heap entries superseded by a later register/forget, and
+            # duplicates left by re-indexing an unchanged expiry
+            if manifest is None or manifest['expires_at'] != expires_at or manifest in due:
+                continue
+            due.append(manifest)
+        return due
+
+    def _remove(self, manifest):
+        """Delete a session folder from disk; returns (removed, error)"""
+        session_id = manifest['session_id']
+        if manifest.get('contains_pdf'):
+            # PDFs in temp sessions are protected from automatic deletion
+            logger.info(f"[TEMP SESSIONS] Skipped session {session_id} - contains PDF files")
+            return False, None
+        try:
+            shutil.rmtree(self.session_path(session_id))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            return False, f"Failed to remove {session_id}: {e}"
+        logger.info(f"[TEMP SESSIONS] Removed expired session: {session_id}")
+        return True, None
+
+    def evict_expired(self, now=None, batch_size=None):
+        """
+        Evict at most one batch of expired sessions.
+
+        Args:
+            now (datetime): Reference time (defaults to now)
+            batch_size (int): Overrides the configured batch size
+
+        Returns:
+            dict: {"removed": [...], "skipped": [...], "errors": [...]}
+        """
+        self.refresh_index()
+        deadline = (now or datetime.now()).timestamp()
+        with self._lock:
+            due = self._pop_due(deadline, batch_size or self.batch_size)
+
+        return self._remove_batch(due, requeue=True)
+
+    def evict_older_than(self, hours_old, batch_size=None):
+        """
+        Evict sessions created more than `hours_old` hours ago.
+
+        All sessions share the configured TTL, so creation order matches
+        expiry order and the expiry index can be used directly.
+        """
+        cutoff = datetime.now() - timedelta(hours=hours_old) + self.ttl
+        return self.evict_expired(now=cutoff, batch_size=batch_size)
+
+    def enforce_quota(self):
+        """Evict the oldest sessions until total temp usage is under quota"""
+        if not self.quota_bytes:
+            return {"removed": [], "skipped": [], "errors": []}
+        self.refresh_index()
+
+        with self._lock:
+            if self._total_bytes <= self.quota_bytes:
+                return {"removed": [], "skipped": [], "errors": []}
+            over = self._total_bytes - self.quota_bytes
+            victims = []
+            freed = 0
+            for manifest in sorted(self._sessions.values(), key=lambda m: m['created_at']):
+                if freed >= over or len(victims) >= self.batch_size:
+                    break
+                if manifest.get('contains_pdf'):
+                    continue
+                victims.append(manifest)
+                freed += manifest['total_bytes']
+
+        if victims:
+            logger.info(f"[TEMP SESSIONS] Over quota by {over} bytes, evicting {len(victims)} sessions")
+        return self._remove_batch(victims)
+
+    def _remove_batch(self, manifests, requeue=False):
+        """
+        Delete session folders, unindexing each only once its folder is gone.
+
+        Sessions that were kept stay indexed and counted. With `requeue`
+        (their heap entries were popped) failed removals are pushed back so
+        the next pass retries them; PDF sessions are not, as they are never
+        deleted automatically. A session whose manifest on disk has moved
+        its expiry (refreshed by another worker) is re-indexed, not deleted.
+        """
+        result = {"removed": [], "skipped": [], "errors": []}
+        for manifest in manifests:
+            session_id = manifest['session_id']
+            on_disk = self._read_manifest(session_id)
+            if on_disk is not None and on_disk['expires_at'] != manifest['expires_at']:
+                with self._lock:
+                    if self._sessions.get(session_id) is manifest:
+                        self._index(on_disk, self._mtimes.get(session_id))
+                logger.info(f"[TEMP SESSIONS] Kept session {session_id} - refreshed by another worker")
+                continue
+            removed, error = self._remove(manifest)
+            with self._lock:
+                # A session registered again meanwhile has a newer manifest
+                current = self._sessions.get(session_id) is manifest
+                if removed and current:
+                    self._unindex(session_id)
+                elif error and current and requeue:
+                    heapq.heappush(self._heap, (manifest['expires_at'], session_id))
+            if removed:
+                result["removed"].append(session_id)
+            elif error:
+                result["errors"].append(error)
+            else:
+                result["skipped"].append(session_id)
+        return result
+
+    def sweep(self):
+        """One janitor pass: expire a batch, then enforce the disk quota"""
+        expired = self.evict_expired()
+        quota = self.enforce_quota()
+        return {
+            "removed": expired["removed"] + quota["removed"],
+            "skipped": expired["skipped"] + quota["skipped"],
+            "errors": expired["errors"] + quota["errors"]
+        }
+
+    def stats(self):
+        """Current index statistics"""
+        self._ensure_loaded()
+        with self._lock:
+            next_expiry = min((m['expires_at'] for m in self._sessions.values()), default=None)
+            return {
+                "sessions": len(self._sessions),
+                "total_bytes": self._total_bytes,
+                "quota_bytes": self.quota_bytes,
+                "next_expiry": datetime.fromtimestamp(next_expiry).isoformat() if next_expiry else None
+            }
+
+    # ------------------------------------------------------------------
+    # Background janitor
+    # ------------------------------------------------------------------
+    def acquire_janitor_lock(self):
+        """
+        Take the host-wide janitor lock without blocking and keep it until
+        stop_janitor(). Returns True if this process holds it; the lock is
+        released by the OS if the process dies, so another worker takes over.
+        """
+        if self._janitor_lock_file is not None:
+            return True
+        try:
+            import fcntl
+        except ImportError:
+            # No fcntl (Windows development server): a single process anyway
+            return True
+        os.makedirs(self.temp_root, exist_ok=True)
+        lock_file = open(os.path.join(self.temp_root, JANITOR_LOCK_FILENAME), 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._janitor_lock_file = lock_file
+        logger.info(f"[TEMP SESSIONS] Janitor lock acquired by process {os.getpid()}")
+        return True
+
+    def release_janitor_lock(self):
+        if self._janitor_lock_file is not None:
+            self._janitor_lock_file.close()
+            self._janitor_lock_file = None
+
+    def start_janitor(self, interval_seconds=300):
+        """Start the background janitor thread (idempotent)"""
+        if self._janitor and self._janitor.is_alive():
+            return self._janitor
+
+        self._stop_event.clear()
+
+        def run():
+            logger.info(f"[TEMP SESSIONS] Janitor started (every {interval_seconds}s)")
+            while not self._stop_event.wait(interval_seconds):
+                # Only the process holding the lock sweeps; the others keep trying
+                if not self.acquire_janitor_lock():
+                    continue
+                try:
+                    result = self.sweep()
+                    if result["removed"] or result["errors"]:
+                        logger.info(f"[TEMP SESSIONS] Janitor removed {len(result['removed'])} sessions, {len(result['errors'])} errors")
+                except Exception as e:
+                    logger.error(f"[TEMP SESSIONS] Janitor pass failed: {e}")
+
+        self._janitor = threading.Thread(target=run, name='temp-session-janitor', daemon=True)
+        self._janitor.start()
+        return self._janitor
+
+    def stop_janitor(self):
+        """Stop the background janitor thread"""
+        self._stop_event.set()
+        if self._janitor:
+            self._janitor.join(timeout=5)
+            self._janitor = None
+        self.release_janitor_lock()
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_session_manager():
+    """Return the process-wide TempSessionManager configured from Config"""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                from config import Config
+                quota_mb = Config.TEMP_QUOTA_MB
+                _manager = TempSessionManager(
+                    Config.TEMP_FOLDER,
+                    ttl_hours=Config.TEMP_SESSION_TTL_HOURS,
+                    batch_size=Config.TEMP_JANITOR_BATCH_SIZE,
+                    quota_bytes=quota_mb * 1024 * 1024 if quota_mb else None
+                )
+    return _manager
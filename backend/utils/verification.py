@@ -0,0 +1,416 @@
+"""
+Public certificate verification (QR /verify hot path)
+
+Every certificate gets a precomputed verification record in
+certificate_verifications (keyed by certificate_number), built once from
+certificate_selections + candidates with the expiry date already normalized
+to ISO. /verify reads it through an in-process LRU that also remembers
+unknown numbers for a short time, so repeated scans and guessing never reach
+the JOIN. Writes to certificates or candidates call refresh_* / remove_*,
+which rebuild the records and evict them from this process's cache (other
+workers pick the change up when their TTL runs out). If a rebuild fails, the
+affected records are deleted instead, so the next scan builds them again
+from the source tables rather than serving the stale record.
+
+When VERIFY_STATIC_DIR and VERIFY_SIGNING_KEY are set, each record is also
+published as <dir>/<certificate_number>.json with an HMAC-SHA256 signature,
+so nginx or a CDN can answer scans without Flask.
+
+Usage:
+    from utils.verification import get_verification_service
+
+    service = get_verification_service()
+    record = service.lookup(certificate_number)     # None when unknown
+    payload = verification_payload(record)          # adds VALID/EXPIRED
+    service.refresh_certificates([certificate_id])  # after an update
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+
+from database.routing import read_from_primary
+from utils.dates import parse_date
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS certificate_verifications (
+        certificate_number VARCHAR(100) PRIMARY KEY,
+        certificate_id INTEGER,
+        candidate_id INTEGER,
+        record JSONB NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE INDEX IF NOT EXISTS idx_certificate_verifications_certificate_id
+        ON certificate_verifications(certificate_id);
+    CREATE INDEX IF NOT EXISTS idx_certificate_verifications_candidate_id
+        ON certificate_verifications(candidate_id);
+"""
+
+UNIQUE_INDEX_SQL = """
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_certificate_selections_certificate_number_unique
+        ON certificate_selections(certificate_number)
+"""
+
+# Fallback while duplicate certificate numbers still exist
+PLAIN_INDEX_SQL = """
+    CREATE INDEX IF NOT EXISTS idx_certificate_selections_certificate_number
+        ON certificate_selections(certificate_number)
+"""
+
+SOURCE_SQL = """
+    SELECT
+        cs.id,
+        cs.candidate_id,
+        cs.candidate_name,
+        cs.client_name,
+        cs.certificate_name,
+        cs.certificate_number,
+        cs.start_date,
+        cs.end_date,
+        cs.issue_date,
+        cs.expiry_date,
+        cs.serial_number,
+        c.json_data
+    FROM certificate_selections cs
+    LEFT JOIN candidates c ON cs.candidate_id = c.id
+"""
+
+UPSERT_SQL = """
+    INSERT INTO certificate_verifications (certificate_number, certificate_id, candidate_id, record, updated_at)
+    VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP)
+    ON CONFLICT (certificate_number) DO UPDATE SET
+        certificate_id = EXCLUDED.certificate_id,
+        candidate_id = EXCLUDED.candidate_id,
+        record = EXCLUDED.record,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+_MISSING = object()
+
+
+def parse_expiry(value):
+    """Expiry date as a date (None if missing or unparseable; formats in utils.dates)"""
+    expiry = parse_date(value)
+    if expiry is None and value:
+        logger.warning(f"[VERIFY] Unparseable expiry date: {value}")
+    return expiry
+
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+
+def build_record(row):
+    """Precompute the date-independent part of a verification response"""
+    candidate_json = row.get('json_data') or {}
+    if isinstance(candidate_json, str):
+        try:
+            candidate_json = json.loads(candidate_json)
+        except ValueError:
+            candidate_json = {}
+    expiry = parse_expiry(row.get('expiry_date'))
+
+    return {
+        'certificate_number': row['certificate_number'],
+        'candidate_name': row['candidate_name'],
+        'client_name': row.get('client_name'),
+        'certificate_name': row['certificate_name'],
+        'passport': candidate_json.get('passport', ''),
+        'nationality': candidate_json.get('nationality', ''),
+        'start_date': _json_value(row.get('start_date')),
+        'end_date': _json_value(row.get('end_date')),
+        'issue_date': _json_value(row.get('issue_date')),
+        'expiry_date': _json_value(row.get('expiry_date')),
+        'serial_number': row.get('serial_number'),
+        'expiry_date_iso': expiry.isoformat() if expiry else None,
+    }
+
+
+def verification_payload(record, today=None):
+    """Add the status fields for today to a precomputed record"""
+    today = today or date.today()
+    expiry_iso = record.get('expiry_date_iso')
+    is_expired = bool(expiry_iso) and today.isoformat() > expiry_iso
+
+    payload = {key: value for key, value in record.items() if key != 'expiry_date_iso'}
+    payload.update({
+        'is_valid': not is_expired,
+        'is_expired': is_expired,
+        'verification_date': today.strftime('%Y-%m-%d'),
+        'status': 'EXPIRED' if is_expired else 'VALID'
+    })
+    return payload
+
+
+def sign_record(record, key):
+    """HMAC-SHA256 over the canonical JSON form of a record"""
+    canonical = json.dumps(record, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hmac.new(key.encode('utf-8'), canonical.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def static_filename(certificate_number):
+    return re.sub(r'[^A-Za-z0-9._-]', '_', certificate_number) + '.json'
+
+
+class LRUCache:
+    """Thread-safe LRU with per-entry expiry; caches misses as None"""
+
+    def __init__(self, max_entries=10000, ttl_seconds=300, negative_ttl_seconds=60):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._entries = OrderedDict()   # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'negative_hits': 0, 'misses': 0}
+
+    def get(self, key):
+        """Return the cached value (None for a cached miss) or _MISSING"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.stats['misses'] += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            self.stats['negative_hits' if entry[1] is None else 'hits'] += 1
+            return entry[1]
+
+    def put(self, key, value):
+        ttl = self.negative_ttl_seconds if value is None else self.ttl_seconds
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def evict(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class VerificationService:
+    """
+    Verification record store with an in-process LRU in front.
+
+    Args:
+        cache (LRUCache): In-process cache of records by certificate number
+        static_dir (str): Optional directory for signed static JSON
+        signing_key (str): HMAC key for static JSON (publishing is off without it)
+        query (callable): execute_query-compatible function (injectable for tests)
+    """
+
+    def __init__(self, cache=None, static_dir=None, signing_key=None, query=None):
+        self.cache = cache or LRUCache()
+        self.static_dir = static_dir if static_dir and signing_key else None
+        self.signing_key = signing_key
+        self._query = query
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+
+    def query(self, sql, params=None, fetch=True):
+        if self._query is None:
+            from database.db_connection import execute_query
+            self._query = execute_query
+        return self._query(sql, params, fetch=fetch)
+
+    def ensure_schema(self):
+        if self._schema_ready:
+            return
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            self.query(SCHEMA_SQL, fetch=False)
+            try:
+                self.query(UNIQUE_INDEX_SQL, fetch=False)
+            except Exception as e:
+                logger.warning(f"[VERIFY] certificate_number is not unique yet, using a plain index: {e}")
+                self.query(PLAIN_INDEX_SQL, fetch=False)
+            self._schema_ready = True
+
+    # ------------------------------------------------------------------
+    # Read path
+    # ------------------------------------------------------------------
+    def lookup(self, certificate_number):
+        """Return the precomputed record for a certificate number, or None"""
+        record = self.cache.get(certificate_number)
+        if record is not _MISSING:
+            return record
+
+        self.ensure_schema()
+        rows = self.query(
+            "SELECT record FROM certificate_verifications WHERE certificate_number = %s",
+            (certificate_number,)
+        )
+        if rows:
+            record = rows[0]['record']
+            if isinstance(record, str):
+                record = json.loads(record)
+        else:
+            # Certificates issued before records existed are built on first scan
+            records = self._store(self.query(SOURCE_SQL + " WHERE cs.certificate_number = %s LIMIT 1",
+                                             (certificate_number,)))
+            record = records[0] if records else None
+
+        self.cache.put(certificate_number, record)
+        return record
+
+    # ------------------------------------------------------------------
+    # Write path
+    # ------------------------------------------------------------------
+    def _store(self, rows):
+        records = []
+        for row in rows or []:
+            if not row.get('certificate_number'):
+                continue
+            record = build_record(row)
+            self.query(UPSERT_SQL, (record['certificate_number'], row['id'], row.get('candidate_id'),
+                                    json.dumps(record)), fetch=False)
+            self._publish(record)
+            records.append(record)
+        self.cache.evict([record['certificate_number'] for record in records])
+        return records
+
+    def _refresh(self, record_column, source_column, value):
+        """Rebuild records for certificates matching a column; drop ones that no longer exist"""
+        self.ensure_schema()
+        # Called right after a write: a lagging replica could miss the new rows
+        with read_from_primary():
+            known = self.query(f"SELECT certificate_number FROM certificate_verifications WHERE {record_column} = ANY(%s)",
+                               (value,))
+            records = self._store(self.query(SOURCE_SQL + f" WHERE cs.{source_column} = ANY(%s)", (value,)))
+        stale = {row['certificate_number'] for row in known or []} - {r['certificate_number'] for r in records}
+        self.remove(stale)
+        return len(records)
+
+    def refresh_certificates(self, certificate_ids):
+        """Rebuild records after certificate_selections rows were inserted or updated"""
+        ids = [int(certificate_id) for certificate_id in certificate_ids]
+        if not ids:
+            return 0
+        return self._refresh('certificate_id', 'id', ids)
+
+    def refresh_candidate(self, candidate_id):
+        """Rebuild records after a candidate's passport/nationality changed or the candidate was deleted"""
+        return self._refresh('candidate_id', 'candidate_id', [int(candidate_id)])
+
+    def remove(self, certificate_numbers):
+        """Drop records (and static files) for deleted certificates"""
+        numbers = [number for number in certificate_numbers if number]
+        if not numbers:
+            return
+        self.ensure_schema()
+        self.query("DELETE FROM certificate_verifications WHERE certificate_number = ANY(%s)",
+                   (numbers,), fetch=False)
+        self.cache.evict(numbers)
+        if self.static_dir:
+            for number in numbers:
+                try:
+                    os.remove(os.path.join(self.static_dir, static_filename(number)))
+                except FileNotFoundError:
+                    pass
+
+    def discard(self, certificate_ids=(), candidate_id=None, certificate_numbers=()):
+        """
+        Delete records (and static files) so lookup() rebuilds them from the
+        source tables; used when refreshing them failed.
+        """
+        ids = [int(certificate_id) for certificate_id in certificate_ids]
+        numbers = [number for number in certificate_numbers if number]
+        if not ids and candidate_id is None and not numbers:
+            return
+        self.ensure_schema()
+        rows = self.query("""
+            DELETE FROM certificate_verifications
+            WHERE certificate_id = ANY(%s) OR candidate_id = %s OR certificate_number = ANY(%s)
+            RETURNING certificate_number
+        """, (ids, candidate_id, numbers))
+        self.remove(set(numbers) | {row['certificate_number'] for row in rows or []})
+
+    def rebuild_all(self):
+        """Backfill every record (and static file) from certificate_selections"""
+        self.ensure_schema()
+        records = self._store(self.query(SOURCE_SQL))
+        self.cache.clear()
+        return len(records)
+
+    def _publish(self, record):
+        if not self.static_dir:
+            return
+        document = {'verification': record, 'signature': sign_record(record, self.signing_key),
+                    'algorithm': 'HMAC-SHA256'}
+        path = os.path.join(self.static_dir, static_filename(record['certificate_number']))
+        try:
+            os.makedirs(self.static_dir, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(document, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"[VERIFY] Failed to publish static record {path}: {e}")
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_verification_service():
+    """Return the process-wide VerificationService configured from Config"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                from config import Config
+                _service = VerificationService(
+                    cache=LRUCache(
+                        max_entries=Config.VERIFY_CACHE_SIZE,
+                        ttl_seconds=Config.VERIFY_CACHE_TTL_SECONDS,
+                        negative_ttl_seconds=Config.VERIFY_NEGATIVE_TTL_SECONDS
+                    ),
+                    static_dir=Config.VERIFY_STATIC_DIR,
+                    signing_key=Config.VERIFY_SIGNING_KEY
+                )
+    return _service
+
+
+def invalidate_certificates(certificate_ids=(), candidate_id=None, removed_numbers=()):
+    """
+    Keep verification records in step with a certificate/candidate write.
+
+    Failures are logged rather than raised, as the write itself has already
+    succeeded. The affected records are deleted instead, so lookup() rebuilds
+    them on the next scan (once other workers' cache TTL has expired). If
+    that fails as well, run_rebuild_verification_records.py repairs them.
+    """
+    try:
+        service = get_verification_service()
+        if removed_numbers:
+            service.remove(removed_numbers)
+        if certificate_ids:
+            service.refresh_certificates(certificate_ids)
+        if candidate_id is not None:
+            service.refresh_candidate(candidate_id)
+    except Exception as e:
+        logger.error(f"[VERIFY] Failed to refresh verification records: {e}")
+        try:
+            get_verification_service().discard(certificate_ids, candidate_id, removed_numbers)
+        except Exception as discard_error:
+            logger.error(f"[VERIFY] Failed to discard stale verification records, "
+                         f"run run_rebuild_verification_records.py: {discard_error}")